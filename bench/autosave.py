@@ -0,0 +1,65 @@
+"""Measures how long a background save holds up the main thread, against saving synchronously."""
+import os
+import sys
+import tempfile
+import threading
+import time
+import timeit
+
+from src.node import Node
+from src.task_graph import TaskGraph, GraphSnapshot
+from src.task_file import write_snapshot, write_task_file
+
+NUM_TASKS: int = 500_000
+FRAME_S: float = 0.005 #a busy event loop wakes up about this often
+
+
+def main() -> None:
+    num_tasks: int = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_TASKS
+    Node._max_children = 8
+    ids: list[int] = list(range(num_tasks))
+    graph: TaskGraph = TaskGraph.from_columns(ids, [f"Task number {i}" for i in ids], [(i - 1) // 8 for i in ids[1:]], ids[1:])
+    nodes: list[Node] = list(graph)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path: str = os.path.join(tmp, "tasks.tasks")
+        start: float = timeit.default_timer()
+        write_task_file(graph, path)
+        blocking: float = timeit.default_timer() - start
+
+        start = timeit.default_timer()
+        snapshot: GraphSnapshot = graph.snapshot()
+        snapshot_time: float = timeit.default_timer() - start
+        worker = threading.Thread(target=write_snapshot, args=(snapshot, path))
+        del snapshot
+        worker.start()
+
+        #stand-in for the Tk main loop: wake up every frame and note how late each wake-up is
+        gaps: list[float] = []
+        edits: list[float] = []
+        last: float = timeit.default_timer()
+        while worker.is_alive():
+            time.sleep(FRAME_S)
+            now: float = timeit.default_timer()
+            gaps.append(now - last - FRAME_S)
+            last = now
+            if len(edits) < 3:
+                #edits while saving; the first one copies the columns the snapshot shares
+                start = timeit.default_timer()
+                nodes[len(edits)].set_value("Edited while saving")
+                edits.append(timeit.default_timer() - start)
+        worker.join()
+        background: float = timeit.default_timer() - last + sum(gaps) + FRAME_S * len(gaps)
+
+    gaps.sort()
+    print(f"tasks: {num_tasks}")
+    print(f"synchronous save:        {blocking * 1000:10.1f}ms main thread blocked")
+    print(f"snapshot:                {snapshot_time * 1000:10.3f}ms")
+    print(f"first edit after it:     {edits[0] * 1000:10.3f}ms (copies shared columns), then {max(edits[1:]) * 1000:.3f}ms")
+    print(f"background save:         {background * 1000:10.1f}ms")
+    print(f"main loop lateness:      {gaps[len(gaps) // 2] * 1000:10.2f}ms median, {gaps[-1] * 1000:.2f}ms max")
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Times how long a layout of 500k tasks blocks the Tk thread, on it and in worker processes, at most per step of the main loop, and how soon a newer layout takes over from a running one."""
+import random
+import sys
+import time
+import timeit
+
+from src.node import Node
+from src.task_graph import TaskGraph
+from src.layout import Level, level_coordinates, placements, spanning_tree, take_over_rows
+from src.background_layout import LAYOUT_WORKERS, BackgroundLayout
+
+NUM_TASKS: int = 500_000
+WINDOW: int = 50 #each task hangs under one of the WINDOW tasks before it
+CANCEL_AFTER: float = 3.0 #seconds the force layout runs before a newer layout cancels it
+WORKER_COUNTS: tuple[int, ...] = (1, 2) #besides LAYOUT_WORKERS, so several workers are measured on any machine
+
+
+class Widget:
+    """Stands in for the Tk widget; the bench waits for the workers instead of polling."""
+
+    def after(self, ms: int, callback) -> str:
+        return "timer"
+
+    def after_cancel(self, timer: str) -> None:
+        return
+
+
+def main() -> None:
+    num_tasks: int = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_TASKS
+    rng = random.Random(1)
+    Node._max_children = WINDOW + 1
+    ids: list[int] = list(range(num_tasks))
+    parents: list[int] = [rng.randrange(max(0, i - WINDOW), i) for i in ids[1:]]
+    graph: TaskGraph = TaskGraph.from_columns(ids, [f"Task number {i}" for i in ids], parents, ids[1:])
+    root: Node = graph.get_root()
+    for node in graph:
+        _ = node.get_children()
+
+    start: float = timeit.default_timer()
+    levels: list[Level] = spanning_tree(root, lambda n: True, ())
+    nodes, coords = level_coordinates(levels, 500.0, 500.0)
+    positions = dict(zip(nodes, zip(coords[0::2], coords[1::2])))
+    _ = placements(levels)
+    on_tk_thread: float = timeit.default_timer() - start
+
+    finished: list[float] = []
+    steps: list[float] = [] #time each step of taking the result over blocked the Tk thread
+
+    def laid_out(levels: list[Level], coords):
+        #what Gui.background_layout_finished does before drawing, one step per after() call
+        finished.append(timeit.default_timer())
+        laid_out_positions = {}
+        placed = {}
+        taking_over = take_over_rows(levels, coords, graph.get_node, laid_out_positions, placed)
+        while True:
+            step: float = timeit.default_timer()
+            done: bool = next(taking_over, True) is True
+            steps.append(timeit.default_timer() - step)
+            if done:
+                break
+            yield
+        assert laid_out_positions == positions
+        return
+
+    print(f"tasks: {num_tasks}, {len(levels)} levels, {LAYOUT_WORKERS} cores")
+    print(f"spiral on the Tk thread:             {on_tk_thread * 1000:8.1f}ms blocked")
+    for workers in sorted({*WORKER_COUNTS, LAYOUT_WORKERS}):
+        layout = BackgroundLayout(Widget(), laid_out, workers)
+        for run in ("first", "again"):
+            #the first run includes starting the workers
+            start = timeit.default_timer()
+            layout.start(graph, root, "spiral", 500.0, 500.0)
+            started: float = timeit.default_timer()
+            layout.wait()
+            print(f"spiral on {workers} workers, {run}: start {(started - start) * 1000:6.1f}ms + result {sum(steps) * 1000:6.1f}ms blocked"
+                  f" in {len(steps)} steps of at most {max(steps) * 1000:5.1f}ms, done after {(finished[0] - start) * 1000:8.1f}ms")
+            finished.clear()
+            steps.clear()
+
+        #a spiral started while a force layout runs, as after an edit
+        layout.start(graph, root, "force", 500.0, 500.0)
+        time.sleep(CANCEL_AFTER)
+        start = timeit.default_timer()
+        layout.start(graph, root, "spiral", 500.0, 500.0)
+        layout.wait()
+        print(f"spiral after cancelling a force layout: done after {(finished[0] - start) * 1000:8.1f}ms")
+        finished.clear()
+        steps.clear()
+        layout.shutdown()
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Times TaskGraph.from_columns on a large edge list against building the same graph with add_child."""
+import random
+import sys
+import timeit
+
+from src.node import Node
+from src.task_graph import TaskGraph
+
+NUM_EDGES: int = 1_000_000
+
+
+def make_columns(num_edges: int, rng: random.Random) -> tuple[list[int], list[str], list[int], list[int]]:
+    """Half as many tasks as edges: each task gets a tree parent and a second, earlier parent."""
+    num_nodes: int = num_edges // 2 + 1
+    ids: list[int] = list(range(1_000_000, 1_000_000 + num_nodes))
+    values: list[str] = [f"Task {i}" for i in range(num_nodes)]
+    parents: list[int] = []
+    children: list[int] = []
+    for i in range(1, num_nodes):
+        first: int = rng.randrange(max(0, i - 50), i)
+        parents.append(ids[first])
+        children.append(ids[i])
+        second: int = rng.randrange(0, i)
+        if second != first:
+            parents.append(ids[second])
+            children.append(ids[i])
+    return ids, values, parents, children
+
+
+def build_per_edge(ids: list[int], values: list[str], parents: list[int], children: list[int]) -> TaskGraph:
+    by_id: dict[int, Node] = {i: Node(v) for i, v in zip(ids, values)}
+    root: Node = by_id[ids[0]]
+    graph: TaskGraph = TaskGraph.from_root(root)
+    for p, c in zip(parents, children):
+        _ = by_id[p].add_child(by_id[c])
+    return graph
+
+
+def main() -> None:
+    num_edges: int = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_EDGES
+    Node._max_children = 1 << 20
+    Node._max_parents = 4
+    rng = random.Random(1)
+
+    ids, values, parents, children = make_columns(num_edges, rng)
+    start: float = timeit.default_timer()
+    graph: TaskGraph = TaskGraph.from_columns(ids, values, parents, children)
+    bulk: float = timeit.default_timer() - start
+    del graph
+
+    #same columns, so both graphs have the same shape
+    start = timeit.default_timer()
+    _ = build_per_edge(ids, values, parents, children)
+    per_edge: float = timeit.default_timer() - start
+
+    print(f"edges: {len(parents)}, tasks: {len(ids)}")
+    print(f"from_columns: {bulk:10.2f}s ({bulk / len(parents) * 1e6:.2f}us per edge)")
+    print(f"add_child:    {per_edge:10.2f}s ({per_edge / len(parents) * 1e6:.2f}us per edge)")
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Times adding and removing edges at high fan-out, list adjacency versus Node's dicts."""
+import sys
+import timeit
+
+from src.node import Node
+
+FAN_OUTS: list[int] = [100, 1_000, 10_000]
+
+
+class ListNode:
+    """Minimal copy of the list-based adjacency Node used before, kept only for comparison."""
+
+    def __init__(self) -> None:
+        self._children: list = []
+        self._parents: list = []
+
+    def add_child(self, child: "ListNode") -> bool:
+        if not (child in self._children):
+            self._children.append(child)
+            child._parents.append(self)
+        return (child in self._children) and (self in child._parents)
+
+    def remove_from_tree(self) -> None:
+        for parent in list(self._parents):
+            if self in parent._children:
+                parent._children.remove(self)
+        self._parents = []
+        for child in list(self._children):
+            if self in child._parents:
+                child._parents.remove(self)
+        self._children = []
+
+
+def add_and_remove(factory, fan_out: int) -> tuple[float, float]:
+    parent = factory()
+    children = [factory() for _ in range(fan_out)]
+    start: float = timeit.default_timer()
+    for child in children:
+        parent.add_child(child)
+    added: float = timeit.default_timer()
+    #removing from the front is the worst case for list.remove
+    for child in children:
+        child.remove_from_tree()
+    removed: float = timeit.default_timer()
+    return added - start, removed - added
+
+
+def main() -> None:
+    fan_outs: list[int] = [int(arg) for arg in sys.argv[1:]] or FAN_OUTS
+    Node._max_children = max(fan_outs)
+    print(f"{'fan-out':>8} {'list add':>10} {'list remove':>12} {'dict add':>10} {'dict remove':>12}")
+    for fan_out in fan_outs:
+        list_add, list_remove = add_and_remove(ListNode, fan_out)
+        dict_add, dict_remove = add_and_remove(lambda: Node("Task"), fan_out)
+        print(f"{fan_out:>8} {list_add * 1000:>8.2f}ms {list_remove * 1000:>10.2f}ms {dict_add * 1000:>8.2f}ms {dict_remove * 1000:>10.2f}ms")
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Export throughput and extra memory for a 1M-task graph in each export format."""
+import os
+import sys
+import tempfile
+import timeit
+import tracemalloc
+
+from src.node import Node
+from src.task_graph import TaskGraph, GraphSnapshot
+from src.exporter import export_snapshot
+
+NUM_TASKS: int = 1_000_000
+FORMATS: tuple[str, ...] = (".dot", ".graphml", ".json")
+
+
+def main() -> None:
+    num_tasks: int = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_TASKS
+    Node._max_children = 8
+    ids: list[int] = list(range(num_tasks))
+    graph: TaskGraph = TaskGraph.from_columns(ids, [f"Task number {i}" for i in ids], [(i - 1) // 8 for i in ids[1:]], ids[1:])
+    positions: dict[int, tuple[float, float]] = {i: (i * 0.5, i * 0.25) for i in ids}
+
+    print(f"tasks: {num_tasks}, edges: {num_tasks - 1}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for suffix in FORMATS:
+            path: str = os.path.join(tmp, "tasks" + suffix)
+            snapshot: GraphSnapshot = graph.snapshot()
+            start: float = timeit.default_timer()
+            size: int = export_snapshot(snapshot, path, positions)
+            elapsed: float = timeit.default_timer() - start
+            #a second run for the memory, tracemalloc slows allocations down too much to time with it
+            tracemalloc.start()
+            _ = export_snapshot(snapshot, path, positions)
+            peak: int = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{suffix:9} {size / 2**20:8.1f}MB in {elapsed:6.2f}s, {size / 2**20 / elapsed:6.1f}MB/s, "
+                  f"{peak / 2**20:6.1f}MB peak extra memory")
+    return
+
+
+if __name__ == "__main__":
+    main()
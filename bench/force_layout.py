@@ -0,0 +1,109 @@
+"""
+Times the coarse-to-fine Barnes–Hut force layout of a 50k-task graph where some tasks have
+two parents, and compares it with the spiral layout and with relaxing the whole graph for
+as long, one level only.
+"""
+from array import array
+import random
+import sys
+import timeit
+
+from src.node import Node
+from src.task_graph import TaskGraph
+from src.layout import Level, level_coordinates, placements, spanning_tree
+from src.force_layout import FORCE_EDGE_LENGTH, FORCE_ITERATIONS, coarsen, relax, relax_coarse_to_fine, repulsion
+from src.gui import NODE_RADIUS
+
+NUM_TASKS: int = 50_000
+WINDOW: int = 30 #each task hangs under one of the WINDOW tasks before it
+EXTRA_PARENT: float = 0.1 #chance of a second parent among the CROSS_WINDOW tasks before it
+CROSS_WINDOW: int = 300
+
+
+def overlapping(points: list[complex]) -> int:
+    """Number of points whose circle overlaps another's, found through a grid of cells one diameter wide."""
+    diameter: float = 2 * NODE_RADIUS
+    grid: dict[tuple[int, int], list[int]] = {}
+    for i, z in enumerate(points):
+        grid.setdefault((int(z.real // diameter), int(z.imag // diameter)), []).append(i)
+    count: int = 0
+    for i, z in enumerate(points):
+        cx, cy = int(z.real // diameter), int(z.imag // diameter)
+        if any(j != i and abs(points[j] - z) < diameter for dx in (-1, 0, 1) for dy in (-1, 0, 1) for j in grid.get((cx + dx, cy + dy), ())):
+            count += 1
+    return count
+
+
+def edge_lengths(points: list[complex], parents: array, children: array, placed: set[tuple[int, int]]) -> tuple[float, float]:
+    """Average length of the edges tasks are placed along and of the other, cross, edges."""
+    along: list[float] = []
+    cross: list[float] = []
+    for a, b in zip(parents, children):
+        (along if (a, b) in placed else cross).append(abs(points[a] - points[b]))
+    return sum(along) / len(along), sum(cross) / len(cross)
+
+
+def main() -> None:
+    num_tasks: int = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_TASKS
+    rng = random.Random(2)
+    Node._max_children = 64
+    Node._max_parents = 2
+    ids: list[int] = list(range(num_tasks))
+    parents: list[int] = [rng.randrange(max(0, i - WINDOW), i) for i in ids[1:]]
+    children: list[int] = ids[1:]
+    for i in ids[1:]:
+        if rng.random() < EXTRA_PARENT:
+            parent: int = rng.randrange(max(0, i - CROSS_WINDOW), i)
+            if parent != parents[i - 1]:
+                parents.append(parent)
+                children.append(i)
+    graph: TaskGraph = TaskGraph.from_columns(ids, [f"Task number {i}" for i in ids], parents, children)
+    root: Node = graph.get_root()
+    for node in graph:
+        _ = node.get_children()
+    levels: list[Level] = spanning_tree(root, lambda n: True, ())
+
+    #the edges as positions in the layout, which is what src.layout.force_coordinates passes to relax
+    nodes, spiral = level_coordinates(levels, 500.0, 500.0)
+    slots: dict[Node, int] = {node: slot for slot, node in enumerate(nodes)}
+    edge_parents: array = array("l", [slots[node] for node in nodes for _ in node._children])
+    edge_children: array = array("l", [slots[child] for node in nodes for child in node._children])
+    placed: set[tuple[int, int]] = {(slots[parent], slots[node]) for node, (parent, _, _) in placements(levels).items()}
+    spiral_points: list[complex] = list(map(complex, spiral[0::2], spiral[1::2]))
+    _, seed = level_coordinates(levels, 500.0, 500.0, FORCE_EDGE_LENGTH)
+    points: list[complex] = list(map(complex, seed[0::2], seed[1::2]))
+    single: list[complex] = list(points)
+    sizes: list[int] = [num_tasks]
+    level_parents, level_children = edge_parents, edge_children
+    while sizes[-1] > 500:
+        cluster, count = coarsen(sizes[-1], level_parents, level_children)
+        edges: set[tuple[int, int]] = {(min(a, b), max(a, b)) for a, b in zip(map(cluster.__getitem__, level_parents), map(cluster.__getitem__, level_children)) if a != b}
+        level_parents, level_children = array("l", [a for a, _ in edges]), array("l", [b for _, b in edges])
+        sizes.append(count)
+
+    start: float = timeit.default_timer()
+    _ = repulsion(points)
+    one: float = timeit.default_timer() - start
+    reports: list[float] = []
+    start = timeit.default_timer()
+    ran: int = relax_coarse_to_fine(points, edge_parents, edge_children, time_limit=float("inf"),
+                                    progress=lambda positions: reports.append(timeit.default_timer() - start))
+    total: float = timeit.default_timer() - start
+    start = timeit.default_timer()
+    single_ran: int = relax(single, edge_parents, edge_children, time_limit=total)
+    single_total: float = timeit.default_timer() - start
+
+    print(f"tasks: {num_tasks}, edges: {len(edge_parents)}, {len(edge_parents) - num_tasks + 1} of them to a second parent")
+    print(f"coarsened levels:     {' > '.join(map(str, sizes))} points")
+    print(f"Barnes-Hut repulsion: {one * 1000:8.1f}ms per iteration of the whole graph")
+    print(f"coarse to fine:       {total * 1000:8.1f}ms for {ran} iterations over all levels, {FORCE_ITERATIONS} on the coarsest")
+    print(f"progress reports:     {len(reports)}, the first after {reports[0] * 1000:.1f}ms" if reports else "progress reports:     none")
+    print(f"one level:            {single_total * 1000:8.1f}ms for {single_ran} of at most {FORCE_ITERATIONS} iterations")
+    for name, layout in (("spiral", spiral_points), ("coarse to fine", points), ("one level", single)):
+        along, cross = edge_lengths(layout, edge_parents, edge_children, placed)
+        print(f"{name:14}: {overlapping(layout) / num_tasks:6.1%} of the tasks overlap another, cross edges {cross / along:5.1f}x as long as the others")
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Streams a generated JSONL task list through the importer and reports throughput and peak memory."""
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import timeit
+
+from src.node import Node
+from src.importer import import_jsonl
+
+NUM_RECORDS: int = 500_000
+
+
+def write_records(path: str, num_records: int, rng: random.Random) -> None:
+    """Writes tasks in shuffled blocks, so many children appear before their parent."""
+    order: list[int] = list(range(num_records))
+    for start in range(0, num_records, 1000):
+        block: list[int] = order[start:start + 1000]
+        rng.shuffle(block)
+        order[start:start + 1000] = block
+    with open(path, "w") as f:
+        for i in order:
+            record: dict = {"id": i, "value": f"Imported task number {i}", "parent": (i - 1) // 8 if i else None}
+            if i % 3 == 0:
+                record["due_date"] = f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}"
+            f.write(json.dumps(record))
+            f.write("\n")
+    return
+
+
+def main() -> None:
+    num_records: int = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_RECORDS
+    Node._max_children = 8
+    with tempfile.TemporaryDirectory() as tmp:
+        path: str = os.path.join(tmp, "tasks.jsonl")
+        write_records(path, num_records, random.Random(1))
+        size: int = os.path.getsize(path)
+        before: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start: float = timeit.default_timer()
+        graph = import_jsonl(path)
+        elapsed: float = timeit.default_timer() - start
+        after: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print(f"records: {len(graph)}, file: {size / 2**20:.1f}MB")
+    print(f"import:          {elapsed:8.2f}s ({size / 2**20 / elapsed:.1f}MB/s, {len(graph) / elapsed:,.0f} records/s)")
+    print(f"peak RSS growth: {(after - before) / 1024:8.1f}MB")
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Times a journaled save of a few changes against rewriting the whole task file."""
+import os
+import statistics
+import sys
+import tempfile
+import timeit
+
+from src.node import Node
+from src.task_graph import TaskGraph
+from src.task_file import write_task_file
+from src.journal import Journal
+
+NUM_TASKS: int = 500_000
+NUM_SAVES: int = 200
+
+
+def main() -> None:
+    num_tasks: int = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_TASKS
+    Node._max_children = 8
+    ids: list[int] = list(range(num_tasks))
+    graph: TaskGraph = TaskGraph.from_columns(ids, [f"Task number {i}" for i in ids], [(i - 1) // 8 for i in ids[1:]], ids[1:])
+    nodes: list[Node] = list(graph)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path: str = os.path.join(tmp, "tasks.tasks")
+        start: float = timeit.default_timer()
+        write_task_file(graph, path)
+        full: float = timeit.default_timer() - start
+
+        journal: Journal = Journal.create(graph, path)
+        latencies: list[float] = []
+        for i in range(NUM_SAVES):
+            #a rename, as after editing one task in the GUI
+            nodes[i * 997 % num_tasks].set_value(f"Renamed {i}")
+            start = timeit.default_timer()
+            _ = journal.save()
+            latencies.append(timeit.default_timer() - start)
+        for i in range(100):
+            nodes[i].set_completed(True)
+        start = timeit.default_timer()
+        _ = journal.save()
+        batch: float = timeit.default_timer() - start
+        size: int = journal.journal_size()
+        journal.close()
+
+        start = timeit.default_timer()
+        replayed: Journal = Journal.open(path)
+        reopen: float = timeit.default_timer() - start
+        replayed.close()
+
+    print(f"tasks: {num_tasks}, journal after {NUM_SAVES + 100} changes: {size / 1024:.1f}KB")
+    print(f"full rewrite:             {full * 1000:10.1f}ms")
+    print(f"journal save, 1 change:   {statistics.median(latencies) * 1000:10.2f}ms median, {max(latencies) * 1000:.2f}ms max")
+    print(f"journal save, 100 changes:{batch * 1000:10.2f}ms")
+    print(f"open and replay:          {reopen * 1000:10.1f}ms")
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Times the level-by-level radial layout against the recursive layout it replaced."""
+import contextlib
+import io
+import logging
+import math
+import sys
+import timeit
+
+from src.node import Node
+from src.task_graph import TaskGraph
+from src.layout import ANGLE_INCREMENT, BASE_DISTANCE, DISTANCE_LEVEL_FACTOR, SPIRAL_FACTOR, radial_layout
+
+NUM_TASKS: int = 100_000
+FAN_OUT: int = 8
+CHAIN: int = 100_000
+
+
+def recursive_layout(root: Node) -> dict[Node, tuple[float, float]]:
+    """The layout of Gui.calculate_node_positions before, with its logging and final print, kept only for comparison."""
+    positions: dict[Node, tuple[float, float]] = {root: (500.0, 500.0)}
+
+    def place_children(parent: Node, parent_x: float, parent_y: float, level: int, start_angle_offset: float) -> None:
+        for i, child in enumerate(parent.get_children()):
+            if child not in positions:
+                logging.debug("finding location of: %s", child.get_value())
+                angle: float = i * ANGLE_INCREMENT + start_angle_offset
+                distance: float = BASE_DISTANCE * (DISTANCE_LEVEL_FACTOR**level)
+                child_x: int = int(parent_x + distance * math.cos(angle))
+                child_y: int = int(parent_y + distance * math.sin(angle))
+                positions[child] = (child_x, child_y)
+                place_children(child, child_x, child_y, level + 1, start_angle_offset + level * SPIRAL_FACTOR)
+        return
+
+    place_children(root, 500.0, 500.0, 1, 0)
+    print(positions.keys())
+    return positions
+
+
+def main() -> None:
+    num_tasks: int = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_TASKS
+    Node._max_children = FAN_OUT
+    ids: list[int] = list(range(num_tasks))
+    graph: TaskGraph = TaskGraph.from_columns(ids, [f"Task number {i}" for i in ids], [(i - 1) // FAN_OUT for i in ids[1:]], ids[1:])
+    root: Node = graph.get_root()
+    for node in graph:
+        _ = node.get_children()
+
+    start: float = timeit.default_timer()
+    with contextlib.redirect_stdout(io.StringIO()):
+        old: dict[Node, tuple[float, float]] = recursive_layout(root)
+    recursive: float = timeit.default_timer() - start
+    start = timeit.default_timer()
+    nodes, coords = radial_layout(root, 500.0, 500.0)
+    levelled: float = timeit.default_timer() - start
+    assert old == dict(zip(nodes, zip(coords[0::2], coords[1::2])))
+
+    chain: list[Node] = [Node(f"Step {i}") for i in range(CHAIN)]
+    for parent, child in zip(chain, chain[1:]):
+        _ = parent.add_child(child)
+    start = timeit.default_timer()
+    _ = radial_layout(chain[0], 500.0, 500.0)
+    deep: float = timeit.default_timer() - start
+
+    print(f"tasks: {num_tasks}, fan-out {FAN_OUT}")
+    print(f"recursive layout: {recursive * 1000:8.1f}ms (with the debug call and print it had)")
+    print(f"level by level:   {levelled * 1000:8.1f}ms, same positions")
+    print(f"chain of {CHAIN}: {deep * 1000:8.1f}ms (the recursive layout exceeds the recursion limit)")
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Times laying out a reopened 200k-task plan from its saved layout cache, unchanged and after an edit, against laying it out from scratch."""
+import gc
+import os
+import random
+import sys
+import tempfile
+import timeit
+
+from src.node import Node
+from src.task_graph import TaskGraph
+from src.layout import LAYOUT_ENGINES, Level, spanning_tree
+from src.layout_cache import cache_entries, restore_coordinates, subtree_keys
+from src.journal import Journal
+from src.background_layout import BACKGROUND_FORCE_TASKS
+
+NUM_TASKS: int = 200_000
+WINDOW: int = 50 #each task hangs under one of the WINDOW tasks before it
+
+
+def build_graph(num_tasks: int) -> TaskGraph:
+    rng = random.Random(1)
+    ids: list[int] = list(range(num_tasks))
+    parents: list[int] = [rng.randrange(max(0, i - WINDOW), i) for i in ids[1:]]
+    return TaskGraph.from_columns(ids, [f"Task number {i}" for i in ids], parents, ids[1:])
+
+
+def main() -> None:
+    num_tasks: int = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_TASKS
+    Node._max_children = WINDOW + 1
+    with tempfile.TemporaryDirectory() as tmp:
+        for engine, count in (("spiral", num_tasks), ("tidy", num_tasks), ("force", min(num_tasks, BACKGROUND_FORCE_TASKS))):
+            graph: TaskGraph = build_graph(count)
+            path: str = os.path.join(tmp, f"{engine}.tasks")
+            levels: list[Level] = spanning_tree(graph.get_root(), lambda n: True, ())
+            nodes, coords = LAYOUT_ENGINES[engine](levels, 500.0, 500.0)
+            positions = dict(zip(nodes, zip(coords[0::2], coords[1::2])))
+            gc.collect()
+            start: float = timeit.default_timer()
+            entries = cache_entries(levels, subtree_keys(levels, engine), positions)
+            recorded: float = timeit.default_timer() - start
+            Journal.create(graph, path, entries).close()
+            print(f"{engine}, {count} tasks: taking the cache entries to save {recorded * 1000:.1f}ms")
+
+            for edit in ("unchanged", "one task added"):
+                journal: Journal = Journal.open(path)
+                if edit != "unchanged":
+                    #the last task is deep in the tree, only the tasks it hangs under change
+                    _ = journal.get_graph().get_node_by_id(count - 1).add_child(Node("New task"))
+                #both need the spanning tree, which reads every task in from the file the first time,
+                #and drawing reads every task, which the first time takes longer than the layout of the spiral
+                levels = spanning_tree(journal.get_graph().get_root(), lambda n: True, ())
+                for level in levels:
+                    _ = list(map(Node.get_id, level.nodes))
+                #so neither side pays for collecting the garbage of the other
+                gc.collect()
+                start = timeit.default_timer()
+                restored = restore_coordinates(levels, subtree_keys(levels, engine), journal.get_layout(), engine, 500.0, 500.0)
+                cached: float = timeit.default_timer() - start
+                gc.collect()
+                start = timeit.default_timer()
+                _, fresh = LAYOUT_ENGINES[engine](levels, 500.0, 500.0)
+                scratch: float = timeit.default_timer() - start
+                if edit == "unchanged":
+                    assert restored == coords
+                elif restored is not None:
+                    assert restored == fresh
+                journal.close()
+                reused: str = f"{cached * 1000:8.1f}ms from the cache" if restored is not None else f"{cached * 1000:8.1f}ms to miss the cache"
+                print(f"  {edit:>14}: {reused}, {scratch * 1000:8.1f}ms from scratch")
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Compares the memory used per task by Node against the pre-__slots__ layout."""
+from datetime import datetime, date, time
+import itertools
+import sys
+import tracemalloc
+
+from src.node import Node
+
+NUM_NODES: int = 100_000
+VALUES: list[str] = ["Write Report", "Review Code", "Email Client", "Plan Sprint", "Fix Bug"]
+
+
+class LegacyNode:
+    """Attribute layout of Node before it used __slots__, kept only for comparison."""
+
+    id_iter = itertools.count()
+
+    def __init__(self, value: str, due_date: date|None=None, due_time: time|None=None) -> None:
+        self._id: int = next(LegacyNode.id_iter)
+        self._value: str = value
+        self._created: datetime = datetime.now()
+        self._due_date: date|None = due_date
+        self._due_time: time|None = due_time
+        self._completed: bool = False
+        self._children: list = []
+        self._parents: list = []
+        self._max_children: int = 4
+        self._max_parents: int = 4
+
+
+def make_value(i: int) -> str:
+    #build a fresh string each time, like values read from a file or a dialog
+    return "".join([VALUES[i % len(VALUES)], " #", str(i % 1000)])
+
+
+def bytes_per_node(factory, num_nodes: int) -> float:
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    nodes = [factory(make_value(i)) for i in range(num_nodes)]
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    #exclude the list that holds the nodes
+    return (end - start - sys.getsizeof(nodes)) / num_nodes
+
+
+def main() -> None:
+    num_nodes: int = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_NODES
+    legacy: float = bytes_per_node(LegacyNode, num_nodes)
+    compact: float = bytes_per_node(Node, num_nodes)
+    Node.intern_values = True
+    interned: float = bytes_per_node(Node, num_nodes)
+    Node.intern_values = False
+
+    print(f"nodes: {num_nodes}")
+    print(f"legacy node:            {legacy:8.1f} bytes/node")
+    print(f"slotted node:           {compact:8.1f} bytes/node ({compact / legacy:.0%} of legacy)")
+    print(f"slotted + interned:     {interned:8.1f} bytes/node ({interned / legacy:.0%} of legacy)")
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Times loading one branch of a large saved tree within a task budget, against loading all of it."""
+import gc
+import os
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from typing import Callable
+
+from src.node import Node
+from src.task_graph import TaskGraph
+from src.task_file import open_task_file, write_task_file
+from src.task_store import TaskStore
+
+NUM_TASKS: int = 2_000_000
+FAN_OUT: int = 8
+BRANCH: int = 3 #id of a task one level below the root, about an eighth of the tree
+BUDGET: int = 10_000
+
+
+def load_branch(graph: TaskGraph) -> None:
+    _ = graph.load_slice(graph.get_node_by_id(BRANCH), max_nodes=BUDGET)
+    return
+
+
+def load_whole(graph: TaskGraph) -> None:
+    for node in graph:
+        _ = node.get_children()
+    return
+
+
+def measure(open_graph: Callable[[], TaskGraph], load: Callable[[TaskGraph], None]) -> tuple[float, int, int]:
+    """Returns the time to open and load, the number of nodes created and the memory held afterwards."""
+    gc.collect()
+    start: float = timeit.default_timer()
+    graph: TaskGraph = open_graph()
+    load(graph)
+    elapsed: float = timeit.default_timer() - start
+    nodes: int = len(graph.get_loaded_index())
+    del graph
+    #a second run for the memory, tracemalloc slows allocations down too much to time with it
+    gc.collect()
+    tracemalloc.start()
+    graph = open_graph()
+    load(graph)
+    memory: int = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return elapsed, nodes, memory
+
+
+def main() -> None:
+    num_tasks: int = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_TASKS
+    Node._max_children = FAN_OUT
+    ids: list[int] = list(range(num_tasks))
+    graph: TaskGraph = TaskGraph.from_columns(ids, [f"Task number {i}" for i in ids], [(i - 1) // FAN_OUT for i in ids[1:]], ids[1:])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path: str = os.path.join(tmp, "tasks.tasks")
+        store_path: str = os.path.join(tmp, "tasks.db")
+        write_task_file(graph, file_path)
+        TaskStore.create(graph, store_path).close()
+        del graph
+        results: list[tuple[str, tuple[float, int, int]]] = [
+            (".tasks branch", measure(lambda: open_task_file(file_path), load_branch)),
+            (".tasks whole", measure(lambda: open_task_file(file_path), load_whole)),
+            (".db branch", measure(lambda: TaskStore.open(store_path).get_graph(), load_branch)),
+        ]
+
+    print(f"tasks: {num_tasks}, branch of task {BRANCH} with a budget of {BUDGET}")
+    for name, (elapsed, nodes, memory) in results:
+        print(f"{name + ':':15} {elapsed * 1000:10.1f}ms, {nodes:8} nodes, {memory / 1e6:8.1f}MB")
+    return
+
+
+if __name__ == "__main__":
+    main()
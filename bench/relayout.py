@@ -0,0 +1,75 @@
+"""Time to add and delete a task in a drawn 50k-task tree, laid out incrementally against a full redraw."""
+import sys
+import timeit
+from unittest.mock import MagicMock, patch
+
+from src.node import Node
+from src.task_graph import TaskGraph
+from src.gui import Gui
+
+NUM_TASKS: int = 50_000
+FAN_OUT: int = 8
+REPEAT: int = 20
+
+
+class CountingCanvas:
+    """Stands in for tk.Canvas without a display: every method returns a new item id and is counted."""
+    def __init__(self, *args, **kwargs) -> None:
+        self.calls: int = 0
+        return
+
+    def __getattr__(self, name: str):
+        def call(*args, **kwargs) -> int:
+            self.calls += 1
+            return self.calls
+        return call
+
+
+def main() -> None:
+    num_tasks: int = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_TASKS
+    Node._max_children = FAN_OUT + REPEAT
+    ids: list[int] = list(range(num_tasks))
+    graph: TaskGraph = TaskGraph.from_columns(ids, [f"Task number {i}" for i in ids], [(i - 1) // FAN_OUT for i in ids[1:]], ids[1:])
+    with patch("tkinter.Tk", MagicMock), patch("tkinter.Canvas", CountingCanvas):
+        gui = Gui(graph.get_root())
+    gui.rebuild_canvas_from_tree(graph.get_root())
+    canvas: CountingCanvas = gui._canvas
+    parent: Node = graph.get_node_by_id(3)
+
+    calls: int = canvas.calls
+    start: float = timeit.default_timer()
+    added: list[Node] = []
+    for i in range(REPEAT):
+        gui._selected_node = parent
+        with patch("tkinter.simpledialog.askstring", return_value=f"New task {i}"):
+            gui.prompt_add_child()
+        added.append(parent.get_children()[-1])
+        if len(added) == 1:
+            #the first add computes the progress index the node colours come from
+            start = timeit.default_timer()
+            calls = canvas.calls
+    add: float = (timeit.default_timer() - start) / (REPEAT - 1)
+    add_calls: float = (canvas.calls - calls) / (REPEAT - 1)
+
+    calls = canvas.calls
+    start = timeit.default_timer()
+    for node in added[:-1]:
+        gui.delete_node_and_descendants(node)
+    delete: float = (timeit.default_timer() - start) / (REPEAT - 1)
+    delete_calls: float = (canvas.calls - calls) / (REPEAT - 1)
+
+    calls = canvas.calls
+    start = timeit.default_timer()
+    gui.redraw_tree()
+    full: float = timeit.default_timer() - start
+    full_calls: int = canvas.calls - calls
+
+    print(f"tasks: {num_tasks}")
+    print(f"add a task:    {add * 1000:8.2f}ms, {add_calls:6.1f} canvas calls")
+    print(f"delete a task: {delete * 1000:8.2f}ms, {delete_calls:6.1f} canvas calls (moves the later siblings)")
+    print(f"full redraw:   {full * 1000:8.2f}ms, {full_calls:6d} canvas calls")
+    return
+
+
+if __name__ == "__main__":
+    main()
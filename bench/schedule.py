@@ -0,0 +1,67 @@
+"""Times the first full critical-path sweep, and the incremental recomputation after single-task edits, on a random DAG of 500k tasks."""
+from datetime import datetime, timedelta
+import random
+import sys
+import timeit
+
+from src.node import Node
+from src.task_graph import TaskGraph
+from src.schedule import Schedule
+
+NUM_NODES: int = 500_000
+NUM_UPDATES: int = 100
+
+
+def build_graph(num_nodes: int, rng: random.Random) -> tuple[TaskGraph, list[Node]]:
+    Node._max_children = 16
+    root = Node("Project")
+    nodes: list[Node] = [root]
+    for i in range(1, num_nodes):
+        node = Node(f"Task {i}")
+        #attach to a recent node so the graph gets deep as well as wide
+        nodes[rng.randrange(max(0, i - 50), i)].add_child(node)
+        nodes.append(node)
+    return TaskGraph.from_root(root), nodes
+
+
+def main() -> None:
+    num_nodes: int = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_NODES
+    rng = random.Random(1)
+    graph, nodes = build_graph(num_nodes, rng)
+    schedule = Schedule(graph, start=datetime(2024, 1, 1))
+    for node in nodes:
+        schedule.set_duration(node, timedelta(hours=rng.randrange(1, 40)))
+
+    start: float = timeit.default_timer()
+    _ = schedule.project_finish()
+    full: float = timeit.default_timer() - start
+
+    #each edit is followed by a query, which recomputes what the edit changed
+    samples: list[Node] = rng.sample(nodes, NUM_UPDATES)
+    updates: list[float] = []
+    for node in samples:
+        start = timeit.default_timer()
+        schedule.set_duration(node, timedelta(hours=rng.randrange(1, 40)))
+        _ = schedule.slack(node)
+        updates.append(timeit.default_timer() - start)
+
+    edits: list[float] = []
+    for node in samples:
+        start = timeit.default_timer()
+        child = Node("New task")
+        if node.add_child(child):
+            schedule.set_duration(child, timedelta(hours=rng.randrange(1, 400)))
+        _ = schedule.slack(child)
+        child.remove_from_tree()
+        _ = schedule.slack(node)
+        edits.append(timeit.default_timer() - start)
+
+    print(f"nodes: {num_nodes}")
+    print(f"first full sweep:                          {full * 1000:8.1f}ms")
+    print(f"duration change and slack (avg, worst):    {sum(updates) / NUM_UPDATES * 1000:8.2f}ms, {max(updates) * 1000:.2f}ms")
+    print(f"add and remove a task and slack (avg, worst): {sum(edits) / NUM_UPDATES * 1000:5.2f}ms, {max(edits) * 1000:.2f}ms")
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Times as-you-type search queries, one per keystroke, on a large graph of generated task names."""
+import random
+import string
+import sys
+import timeit
+
+from src.node import Node
+from src.task_graph import TaskGraph
+from src.search import SearchIndex
+
+NUM_NODES: int = 100_000
+VOCABULARY_SIZE: int = 5_000
+NUM_QUERIES: int = 50
+
+
+def make_vocabulary(rng: random.Random) -> list[str]:
+    return ["".join(rng.choices(string.ascii_lowercase, k=rng.randrange(3, 10))) for _ in range(VOCABULARY_SIZE)]
+
+
+def build_graph(num_nodes: int, vocabulary: list[str], rng: random.Random) -> TaskGraph:
+    Node._max_children = 16
+    root = Node("Project")
+    nodes: list[Node] = [root]
+    for i in range(1, num_nodes):
+        words: list[str] = rng.sample(vocabulary, rng.randrange(2, 5))
+        node = Node(" ".join(words).capitalize())
+        nodes[rng.randrange(max(0, i - 50), i)].add_child(node)
+        nodes.append(node)
+    return TaskGraph.from_root(root)
+
+
+def main() -> None:
+    num_nodes: int = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_NODES
+    rng = random.Random(1)
+    vocabulary: list[str] = make_vocabulary(rng)
+    graph: TaskGraph = build_graph(num_nodes, vocabulary, rng)
+
+    start: float = timeit.default_timer()
+    index = SearchIndex(graph)
+    build: float = timeit.default_timer() - start
+
+    #every prefix of a two word query, as typed
+    timings: list[float] = []
+    for _ in range(NUM_QUERIES):
+        query: str = " ".join(rng.sample(vocabulary, 2))
+        for end in range(1, len(query) + 1):
+            start = timeit.default_timer()
+            _ = index.search(query[:end])
+            timings.append(timeit.default_timer() - start)
+    timings.sort()
+
+    print(f"nodes: {num_nodes}")
+    print(f"index build:           {build * 1000:10.1f}ms")
+    print(f"keystroke (median):    {timings[len(timings) // 2] * 1000:10.3f}ms")
+    print(f"keystroke (p99):       {timings[len(timings) * 99 // 100] * 1000:10.3f}ms")
+    print(f"keystroke (max):       {timings[-1] * 1000:10.3f}ms")
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Times saving a large graph as a task file and opening it lazily, against a pickle round trip."""
+import os
+import pickle
+import sys
+import tempfile
+import timeit
+
+from src.node import Node
+from src.task_graph import TaskGraph
+from src.task_file import open_task_file, write_task_file
+
+NUM_TASKS: int = 1_000_000
+
+
+def make_graph(num_tasks: int) -> TaskGraph:
+    """A tree with eight children per task."""
+    ids: list[int] = list(range(num_tasks))
+    values: list[str] = [f"Task number {i}" for i in ids]
+    return TaskGraph.from_columns(ids, values, [(i - 1) // 8 for i in ids[1:]], ids[1:])
+
+
+def main() -> None:
+    num_tasks: int = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_TASKS
+    Node._max_children = 8
+    graph: TaskGraph = make_graph(num_tasks)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path: str = os.path.join(tmp, "tasks.tasks")
+        start: float = timeit.default_timer()
+        write_task_file(graph, path)
+        save: float = timeit.default_timer() - start
+        size: int = os.path.getsize(path)
+
+        start = timeit.default_timer()
+        loaded: TaskGraph = open_task_file(path)
+        opened: float = timeit.default_timer() - start
+
+        #what a user does first: look at the root's children and one task by id
+        start = timeit.default_timer()
+        _ = [n.get_value() for n in loaded.get_root().get_children()]
+        _ = loaded.get_node_by_id(num_tasks // 2).get_parents()
+        first_use: float = timeit.default_timer() - start
+
+        start = timeit.default_timer()
+        _ = list(loaded)
+        materialize: float = timeit.default_timer() - start
+        del loaded
+
+        pickle_path: str = os.path.join(tmp, "tasks.pkl")
+        with open(pickle_path, "wb") as f:
+            pickle.dump(graph, f)
+        start = timeit.default_timer()
+        with open(pickle_path, "rb") as f:
+            _ = pickle.load(f)
+        unpickle: float = timeit.default_timer() - start
+
+    print(f"tasks: {num_tasks}, file: {size / 2**20:.1f}MB")
+    print(f"save:            {save:8.3f}s")
+    print(f"open:            {opened:8.3f}s")
+    print(f"first use:       {first_use:8.3f}s")
+    print(f"materialize all: {materialize:8.3f}s")
+    print(f"pickle load:     {unpickle:8.3f}s")
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Times opening a large task database and exploring a few branches, and the memory that takes."""
+import gc
+import os
+import sys
+import tempfile
+import timeit
+import tracemalloc
+
+from src.node import Node
+from src.task_graph import TaskGraph
+from src.task_store import TaskStore
+
+NUM_TASKS: int = 1_000_000 #pass 5000000 for the size the store is meant for; building the graph to write takes a while
+FAN_OUT: int = 8
+EXPLORE_LEVELS: int = 4
+
+
+def main() -> None:
+    num_tasks: int = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_TASKS
+    Node._max_children = FAN_OUT + 1 #room for the child added before saving
+    ids: list[int] = list(range(num_tasks))
+    graph: TaskGraph = TaskGraph.from_columns(ids, [f"Task number {i}" for i in ids], [(i - 1) // FAN_OUT for i in ids[1:]], ids[1:])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path: str = os.path.join(tmp, "tasks.db")
+        start: float = timeit.default_timer()
+        TaskStore.create(graph, path).close()
+        create: float = timeit.default_timer() - start
+        size: int = os.path.getsize(path)
+        del graph
+        gc.collect()
+
+        tracemalloc.start()
+        start = timeit.default_timer()
+        store: TaskStore = TaskStore.open(path)
+        root: Node = store.get_graph().get_root()
+        children: list[Node] = root.get_children()
+        first_view: float = timeit.default_timer() - start
+
+        #follow the first child down, expanding every node on the way, as when clicking through a branch
+        start = timeit.default_timer()
+        curr: Node = children[0]
+        for _ in range(EXPLORE_LEVELS):
+            for child in curr.get_children():
+                _ = child.get_children()
+            curr = curr.get_children()[0]
+        explore: float = timeit.default_timer() - start
+        loaded: int = len(store.get_graph().get_loaded_index())
+        memory: int = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        curr.set_value("Renamed")
+        _ = curr.add_child(Node("New"))
+        start = timeit.default_timer()
+        changes: int = store.save()
+        save: float = timeit.default_timer() - start
+        store.close()
+
+    print(f"tasks: {num_tasks}, database {size / 1e6:.1f}MB")
+    print(f"create:                  {create:10.2f}s")
+    print(f"open and show root:      {first_view * 1000:10.2f}ms")
+    print(f"explore {EXPLORE_LEVELS} levels:        {explore * 1000:10.2f}ms, {loaded} tasks loaded")
+    print(f"memory after exploring:  {memory / 1024:10.1f}KB")
+    print(f"save {changes} changes:          {save * 1000:10.2f}ms")
+    return
+
+
+if __name__ == "__main__":
+    main()
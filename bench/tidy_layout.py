@@ -0,0 +1,62 @@
+"""Times the tidy tree layout of 1M tasks and checks that no two drawn circles overlap."""
+import random
+import sys
+import timeit
+
+from src.node import Node
+from src.task_graph import TaskGraph
+from src.layout import TIDY_LEVEL_HEIGHT, Level, level_coordinates, spanning_tree, tidy_coordinates
+from src.gui import NODE_RADIUS
+
+NUM_TASKS: int = 1_000_000
+WINDOW: int = 50 #each task hangs under one of the WINDOW tasks before it, which gives uneven, fairly deep subtrees
+
+
+def closest_neighbours(levels: list[Level], coords) -> float:
+    """The least distance between the centres of two tasks on the same level."""
+    closest: float = float("inf")
+    first: int = 0
+    for level in levels:
+        xs: list[float] = sorted(coords[2 * first:2 * (first + len(level.nodes)):2])
+        closest = min([closest] + [right - left for left, right in zip(xs, xs[1:])])
+        first += len(level.nodes)
+    return closest
+
+
+def main() -> None:
+    num_tasks: int = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_TASKS
+    rng = random.Random(1)
+    Node._max_children = WINDOW + 1
+    ids: list[int] = list(range(num_tasks))
+    parents: list[int] = [rng.randrange(max(0, i - WINDOW), i) for i in ids[1:]]
+    graph: TaskGraph = TaskGraph.from_columns(ids, [f"Task number {i}" for i in ids], parents, ids[1:])
+    root: Node = graph.get_root()
+    for node in graph:
+        _ = node.get_children()
+
+    start: float = timeit.default_timer()
+    levels: list[Level] = spanning_tree(root, lambda n: True, ())
+    spanning: float = timeit.default_timer() - start
+    start = timeit.default_timer()
+    nodes, coords = tidy_coordinates(levels, 500.0, 50.0)
+    tidy: float = timeit.default_timer() - start
+    start = timeit.default_timer()
+    _ = level_coordinates(levels, 500.0, 500.0)
+    spiral: float = timeit.default_timer() - start
+
+    assert len(nodes) == num_tasks
+    closest: float = closest_neighbours(levels, coords)
+    width: float = max(coords[0::2]) - min(coords[0::2])
+    #levels are TIDY_LEVEL_HEIGHT apart, so only circles on the same level could overlap
+    overlaps: bool = closest < 2 * NODE_RADIUS or TIDY_LEVEL_HEIGHT < 2 * NODE_RADIUS
+    print(f"tasks: {num_tasks}, {len(levels)} levels, {width:.0f} wide")
+    print(f"spanning tree:         {spanning * 1000:8.1f}ms (shared by both layouts)")
+    print(f"tidy tree coordinates: {tidy * 1000:8.1f}ms")
+    print(f"spiral coordinates:    {spiral * 1000:8.1f}ms")
+    print(f"closest neighbours: {closest:.1f} apart, circles of radius {NODE_RADIUS:g} {'overlap' if overlaps else 'do not overlap'}")
+    assert not overlaps
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+#!/bin/zsh
+python3 -m bench.node_memory
+python3 -m bench.edge_ops
+python3 -m bench.bulk_build
+python3 -m bench.import_stream
+python3 -m bench.export
+python3 -m bench.schedule
+python3 -m bench.search
+python3 -m bench.task_file
+python3 -m bench.journal
+python3 -m bench.autosave
+python3 -m bench.task_store
+python3 -m bench.partial_load
+python3 -m bench.layout
+python3 -m bench.tidy_layout
+python3 -m bench.force_layout
+python3 -m bench.background_layout
+python3 -m bench.layout_cache
+python3 -m bench.relayout
@@ -0,0 +1,169 @@
+from typing import Callable
+import logging
+import os
+import queue
+import threading
+import tkinter as tk
+
+from src.node import Node
+from src.task_graph import TaskGraph, GraphObserver, GraphSnapshot
+from src.task_file import write_snapshot
+from src.journal import journal_path
+
+AUTOSAVE_INTERVAL_MS: int = 60_000
+POLL_MS: int = 100 #how often the Tk thread checks for a finished save
+AUTOSAVE_SUFFIX: str = ".autosave"
+
+SavedCallback = Callable[[str, Exception|None], None] #called on the Tk thread with (path, error or None)
+
+
+def recovery_path(path: str) -> str|None:
+    """
+    Returns the autosave of the file at path if it was written after the file and its
+    journal were last saved, so it holds changes they do not; otherwise None.
+    """
+    autosave: str = path + AUTOSAVE_SUFFIX
+    if not os.path.exists(autosave):
+        return None
+    saved: float = max(os.path.getmtime(p) for p in (path, journal_path(path)) if os.path.exists(p))
+    return autosave if os.path.getmtime(autosave) > saved else None
+
+
+class Autosave(GraphObserver):
+    """
+    Periodically saves a graph to a task file without blocking the Tk main loop.
+
+    On the Tk thread a save only takes a snapshot of the graph, which shares the
+    graph's columns instead of copying them. Ordering, encoding and writing the file
+    happen on a worker thread; write_snapshot writes to a temporary file and renames
+    it, so the file on disk is always a complete save. The worker never calls into Tk:
+    it leaves its result in a queue, which the Tk thread polls with after().
+    """
+
+    def __init__(self, widget: tk.Misc, interval_ms: int=AUTOSAVE_INTERVAL_MS, on_saved: SavedCallback|None=None) -> None:
+        self._widget: tk.Misc = widget
+        self._interval_ms: int = interval_ms
+        self._on_saved: SavedCallback|None = on_saved
+        self._graph: TaskGraph|None = None
+        self._path: str|None = None
+        self._dirty: bool = False
+        self._worker: threading.Thread|None = None
+        self._results: queue.SimpleQueue[tuple[str, Exception|None]] = queue.SimpleQueue()
+        self._timer: str|None = None
+        return
+
+    def get_path(self) -> str|None:
+        return self._path
+
+    def set_path(self, path: str|None) -> None:
+        """Sets the file to save to; no saves happen while it is None."""
+        self._path = path
+        return
+
+    def set_graph(self, graph: TaskGraph) -> None:
+        if graph is self._graph:
+            return
+        if self._graph is not None:
+            self._graph.remove_observer(self)
+        self._graph = graph
+        _ = graph.add_observer(self)
+        self._dirty = True
+        return
+
+    def is_dirty(self) -> bool:
+        """Whether the graph changed since the last snapshot was taken."""
+        return self._dirty
+
+    def is_saving(self) -> bool:
+        return self._worker is not None
+
+    def start(self) -> None:
+        if self._timer is None:
+            self._timer = self._widget.after(self._interval_ms, self._tick)
+        return
+
+    def stop(self) -> None:
+        if self._timer is not None:
+            self._widget.after_cancel(self._timer)
+            self._timer = None
+        return
+
+    def _tick(self) -> None:
+        self._timer = self._widget.after(self._interval_ms, self._tick)
+        _ = self.save_now()
+        return
+
+    def save_now(self) -> bool:
+        """
+        Starts saving the graph as it is now. Returns False if there is nothing to do: no
+        path, no changes since the last save, or a save still running (the next tick
+        picks the changes up).
+        """
+        if self._graph is None or self._path is None or not self._dirty or self._worker is not None:
+            return False
+        snapshot: GraphSnapshot = self._graph.snapshot()
+        self._dirty = False
+        self._worker = threading.Thread(target=self._write, args=(snapshot, self._path), name="autosave", daemon=True)
+        self._worker.start()
+        _ = self._widget.after(POLL_MS, self._poll)
+        return True
+
+    def _write(self, snapshot: GraphSnapshot, path: str) -> None:
+        #runs on the worker thread, so it must not touch Tk or the graph
+        try:
+            write_snapshot(snapshot, path)
+        except Exception as e:
+            self._results.put((path, e))
+            return
+        self._results.put((path, None))
+        return
+
+    def _poll(self) -> None:
+        if self._worker is None:
+            return
+        if self._worker.is_alive():
+            _ = self._widget.after(POLL_MS, self._poll)
+            return
+        self._worker.join()
+        self._worker = None
+        path, error = self._results.get()
+        if error is not None:
+            #keep the changes marked, so the next tick tries again
+            self._dirty = True
+            logging.error("Autosave to %s failed: %s", path, error)
+        else:
+            logging.info("Autosaved to %s", path)
+        if self._on_saved is not None:
+            self._on_saved(path, error)
+        return
+
+    def wait(self) -> None:
+        """Blocks until a running save has finished and reports it, e.g. before the program exits."""
+        if self._worker is not None:
+            self._worker.join()
+            self._poll()
+        return
+
+    def node_added(self, node: Node) -> None:
+        self._dirty = True
+        return
+
+    def node_removed(self, node: Node) -> None:
+        self._dirty = True
+        return
+
+    def node_changed(self, node: Node, field: str) -> None:
+        self._dirty = True
+        return
+
+    def edge_added(self, parent: Node, child: Node) -> None:
+        self._dirty = True
+        return
+
+    def edge_removed(self, parent: Node, child: Node) -> None:
+        self._dirty = True
+        return
+
+    def nodes_removed(self, nodes: list[Node], edges: list[tuple[Node, Node]]) -> None:
+        self._dirty = True
+        return
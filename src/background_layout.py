@@ -0,0 +1,431 @@
+from array import array
+from bisect import bisect_left
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Collection, Iterator
+import concurrent.futures
+import itertools
+import logging
+import math
+import os
+import struct
+import tkinter as tk
+
+from src.node import Node
+from src.task_graph import TaskGraph, GraphSnapshot, compressed_edges
+from src.layout import LAYOUT_ENGINES, SUBTREE_ENGINES, Level, force_coordinates, level_coordinates, spanning_tree, spiral_coordinates
+
+LAYOUT_WORKERS: int = os.cpu_count() or 1
+JOBS_PER_WORKER: int = 4 #subtree jobs per worker, so a worker done with small subtrees takes the next ones
+BACKGROUND_LAYOUT_TASKS: int = 20_000 #smaller trees are laid out on the Tk thread, faster than a round trip to a worker
+BACKGROUND_FORCE_TASKS: int = 1_000 #force layouts of more tasks run in a worker too, taking about 0.4s at this size
+POLL_MS: int = 50 #how often the Tk thread checks for a finished layout
+
+#called on the Tk thread with the levels, tasks as graph rows, and their coordinates; may return an iterator
+#whose steps are run one per after() call, so taking over a large layout does not block the Tk thread.
+#Also the type of the callback of progress reports, layouts a worker hands back on the way to its result
+LaidOutCallback = Callable[[list[Level], array], Iterator[None]|None]
+Plan = tuple[int, list[array]] #depth of the level the tree was split below, and the ranges of subtrees, see split_subtrees
+
+
+class LayoutMemory:
+    """
+    Shared memory a layout is handed back through, for a graph of up to capacity rows.
+    After a header of CANCELLED, COUNT, LEVELS and PROGRESS come one column of capacity
+    entries per region: the rows of the laid out tasks level by level, the position of
+    each one's parent in the level above, its index among that parent's children, its x
+    and y, and where each level starts. The Tk thread creates it, workers attach by name.
+    """
+    CANCELLED: int = 0 #header slot set to 1 once nobody wants the layout any more
+    COUNT: int = 1 #tasks laid out
+    LEVELS: int = 2
+    PROGRESS: int = 3 #progress reports written to x and y so far
+    HEADER: int = 4
+    REGIONS: tuple[str, ...] = ("rows", "parents", "indexes", "xs", "ys", "level_starts")
+
+    def __init__(self, capacity: int, name: str|None=None) -> None:
+        self._capacity: int = capacity
+        #a slot more for the end of the last level
+        size: int = 8 * (self.HEADER + len(self.REGIONS) * capacity + 1)
+        self._memory: SharedMemory = SharedMemory(name, create=name is None, size=size)
+        return
+
+    def get_name(self) -> str:
+        return self._memory.name
+
+    def get_capacity(self) -> int:
+        return self._capacity
+
+    def read_header(self, slot: int) -> int:
+        return struct.unpack_from("q", self._memory.buf, 8 * slot)[0]
+
+    def write_header(self, slot: int, value: int) -> None:
+        struct.pack_into("q", self._memory.buf, 8 * slot, value)
+        return
+
+    def is_cancelled(self) -> bool:
+        return self.read_header(self.CANCELLED) != 0
+
+    def cancel(self) -> None:
+        self.write_header(self.CANCELLED, 1)
+        return
+
+    def _offset(self, region: str, start: int) -> int:
+        return 8 * (self.HEADER + self.REGIONS.index(region) * self._capacity + start)
+
+    def read(self, region: str, start: int, count: int) -> array:
+        values: array = array("d" if region in ("xs", "ys") else "l")
+        offset: int = self._offset(region, start)
+        values.frombytes(self._memory.buf[offset:offset + 8 * count])
+        return values
+
+    def write(self, region: str, start: int, values: array) -> None:
+        offset: int = self._offset(region, start)
+        self._memory.buf[offset:offset + 8 * len(values)] = memoryview(values).cast("B")
+        return
+
+    def close(self) -> None:
+        self._memory.close()
+        return
+
+    def unlink(self) -> None:
+        self._memory.unlink()
+        return
+
+
+def split_subtrees(levels: list[Level], depth: int, parts: int) -> list[array]:
+    """
+    Splits the tasks from the level at depth down into parts ranges of whole subtrees.
+    Each range is an array of its (start, end) on every level from depth down to its
+    deepest task; the tasks of a range only have parents in the range. The levels list a
+    parent's children together and in the parents' order, so a range on the level below
+    is found with two bisections of its parents.
+    """
+    width: int = len(levels[depth].parents)
+    bounds: list[int] = [width * k // parts for k in range(parts + 1)]
+    ranges: list[array] = [array("l") for _ in range(parts)]
+    for below in range(depth, len(levels)):
+        if below > depth:
+            bounds = [bisect_left(levels[below].parents, b) for b in bounds]
+        #a range empty on a level has nothing below it either
+        for k in range(parts):
+            if bounds[k] < bounds[k + 1]:
+                ranges[k].extend((bounds[k], bounds[k + 1]))
+    return ranges
+
+
+def bare_level(parents: array, indexes: array) -> Level:
+    """A level without its tasks, all a layout engine reads."""
+    level = Level()
+    level.parents = parents
+    level.indexes = indexes
+    return level
+
+
+def write_coordinates(memory: LayoutMemory, start: int, coords: array) -> None:
+    memory.write("xs", start, coords[0::2])
+    memory.write("ys", start, coords[1::2])
+    return
+
+
+def lay_out_snapshot(memory_name: str, capacity: int, engine: str, edge_parents: array, edge_children: array, root_row: int,
+                     shown: array|None, collapsed: array, root_x: float, root_y: float, parts: int) -> Plan|None:
+    """
+    Runs in a worker process. Picks the spanning tree of the graph over its edge columns,
+    with the rows in shown (all rows if None) and the rows in collapsed drawn without
+    their children, writes it to the shared memory and lays it out with engine. With
+    parts > 1 and an engine of SUBTREE_ENGINES, only the levels down to the first with
+    at least parts tasks are laid out, and the ranges of the subtrees below it are
+    returned for lay_out_subtrees to lay out in parallel. The force engine runs without
+    a time limit and writes every layout it reports on the way as a progress report.
+    Returns None if the layout was cancelled, and an empty list of ranges once it is done.
+    """
+    try:
+        memory = LayoutMemory(capacity, memory_name)
+    except FileNotFoundError:
+        #cancelled and released before this job started
+        return None
+    try:
+        offsets, targets = compressed_edges(edge_parents, edge_children, capacity, len(edge_parents))
+        children_of: Callable[[Any], array] = lambda row: targets[offsets[row]:offsets[row + 1]]
+        is_shown: Callable[[Any], bool] = (lambda row: True) if shown is None else set(shown).__contains__
+        levels: list[Level] = spanning_tree(root_row, is_shown, set(collapsed), children_of)
+        starts: array = array("l", itertools.accumulate((len(level.parents) for level in levels), initial=0))
+        for start, level in zip(starts, levels):
+            memory.write("rows", start, array("l", level.nodes))
+            memory.write("parents", start, level.parents)
+            memory.write("indexes", start, level.indexes)
+        memory.write("level_starts", 0, starts)
+        memory.write_header(LayoutMemory.COUNT, starts[-1])
+        memory.write_header(LayoutMemory.LEVELS, len(levels))
+        if memory.is_cancelled():
+            return None
+
+        if engine in SUBTREE_ENGINES and parts > 1:
+            depth: int|None = next((d for d, level in enumerate(levels) if len(level.parents) >= parts), None)
+            if depth is not None and depth + 1 < len(levels):
+                write_coordinates(memory, 0, level_coordinates(levels[:depth + 1], root_x, root_y)[1])
+                return depth, split_subtrees(levels, depth, parts)
+        if engine == "force":
+            def report(coords: array) -> None:
+                #the Tk thread may read a report while the next one is written, which only mixes two layouts a step apart
+                write_coordinates(memory, 0, coords)
+                memory.write_header(LayoutMemory.PROGRESS, memory.read_header(LayoutMemory.PROGRESS) + 1)
+                return
+            coords: array = force_coordinates(levels, root_x, root_y, children_of=children_of, cancelled=memory.is_cancelled,
+                                              time_limit=math.inf, progress=report)[1]
+        else:
+            coords = LAYOUT_ENGINES[engine](levels, root_x, root_y)[1]
+        if memory.is_cancelled():
+            return None
+        write_coordinates(memory, 0, coords)
+        return 0, []
+    finally:
+        memory.close()
+
+
+def lay_out_subtrees(memory_name: str, capacity: int, depth: int, ranges: array) -> bool:
+    """
+    Runs in a worker process. Lays out one range of subtrees from split_subtrees with the
+    spiral, from the positions of their roots at depth, which lay_out_snapshot wrote.
+    Only reads and writes the range, so ranges are laid out side by side. Returns False
+    if the layout was cancelled.
+    """
+    try:
+        memory = LayoutMemory(capacity, memory_name)
+    except FileNotFoundError:
+        return False
+    try:
+        starts: array = memory.read("level_starts", 0, memory.read_header(LayoutMemory.LEVELS) + 1)
+        lo, hi = ranges[0], ranges[1]
+        xs: array = memory.read("xs", starts[depth] + lo, hi - lo)
+        ys: array = memory.read("ys", starts[depth] + lo, hi - lo)
+        levels: list[Level] = [bare_level(array("l"), array("l"))]
+        for k in range(2, len(ranges), 2):
+            lo, hi = ranges[k], ranges[k + 1]
+            start: int = starts[depth + k // 2] + lo
+            #parents are positions in the level above, make them positions in the range above
+            parents: array = array("l", map((-ranges[k - 2]).__add__, memory.read("parents", start, hi - lo)))
+            levels.append(bare_level(parents, memory.read("indexes", start, hi - lo)))
+        coords: array = spiral_coordinates(levels, xs, ys, depth)
+        if memory.is_cancelled():
+            return False
+        slot: int = len(xs)
+        for k in range(2, len(ranges), 2):
+            count: int = ranges[k + 1] - ranges[k]
+            write_coordinates(memory, starts[depth + k // 2] + ranges[k], coords[2 * slot:2 * (slot + count)])
+            slot += count
+        return True
+    finally:
+        memory.close()
+
+
+class BackgroundLayout:
+    """
+    Lays out a graph in worker processes without blocking the Tk main loop, the way
+    Autosave saves one. On the Tk thread a layout only takes a snapshot of the graph and
+    copies its edge columns, which are all a worker gets: no Node is pickled. The worker
+    picks the spanning tree over graph rows and hands the levels and coordinates back
+    through a LayoutMemory. With the spiral, whose subtrees only depend on their root's
+    position, the tree is split below the first level wide enough and ranges of subtrees
+    are laid out by all workers at once. Starting a layout cancels the one running: its
+    jobs that have not started are dropped, running ones see the cancelled flag and
+    stop, and its memory is released. The Tk thread polls with after() and calls
+    on_laid_out with the result; if that returns an iterator, its steps run one per
+    after() call and the layout counts as running, and can be cancelled, until the last.
+    While a layout runs, the newest of its progress reports goes to on_progress the same
+    way, once the steps of the one before have run; the result cuts those steps short.
+    """
+
+    def __init__(self, widget: tk.Misc, on_laid_out: LaidOutCallback|None=None, workers: int=LAYOUT_WORKERS,
+                 on_progress: LaidOutCallback|None=None) -> None:
+        self._widget: tk.Misc = widget
+        self._on_laid_out: LaidOutCallback|None = on_laid_out
+        self._on_progress: LaidOutCallback|None = on_progress
+        self._workers: int = workers
+        self._pool: ProcessPoolExecutor|None = None #started with the first layout
+        self._memory: LayoutMemory|None = None #of the running layout
+        self._futures: list[Future] = []
+        self._split: bool = False #whether the running layout's subtree jobs were sent
+        self._request: tuple[Any, ...] = () #arguments of the running layout's start
+        self._generation: int = 0 #row generation of the graph the running layout was started on
+        self._timer: str|None = None
+        self._finishing: Iterator[None]|None = None #steps of on_laid_out still to run
+        self._progress: int = 0 #progress reports of the running layout taken so far
+        self._reporting: Iterator[None]|None = None #steps of on_progress still to run
+        return
+
+    def is_running(self) -> bool:
+        return self._memory is not None or self._finishing is not None
+
+    def start(self, graph: TaskGraph, root: Node, engine: str, root_x: float, root_y: float,
+              shown: Collection[Node]|None=None, collapsed: Collection[Node]=()) -> None:
+        """Starts laying out the tasks below root, with shown and collapsed as in spanning_tree, cancelling the layout still running"""
+        self.cancel()
+        snapshot: GraphSnapshot = graph.snapshot()
+        self._request = (graph, root, engine, root_x, root_y, shown, collapsed)
+        self._generation = graph.get_row_generation()
+        shown_rows: array|None = None if shown is None else array("l", [graph.get_row(n) for n in shown if n in graph])
+        collapsed_rows: array = array("l", [graph.get_row(n) for n in collapsed if n in graph])
+        if self._pool is None:
+            #spawned rather than forked, so workers start without a copy of Tk
+            self._pool = ProcessPoolExecutor(self._workers, mp_context=get_context("spawn"))
+        self._memory = LayoutMemory(snapshot.num_rows)
+        parts: int = self._workers * JOBS_PER_WORKER if self._workers > 1 else 1
+        self._futures = [self._pool.submit(lay_out_snapshot, self._memory.get_name(), snapshot.num_rows, engine,
+                                           snapshot.edge_parents[:snapshot.num_edges], snapshot.edge_children[:snapshot.num_edges],
+                                           graph.get_row(root), shown_rows, collapsed_rows, root_x, root_y, parts)]
+        self._split = False
+        self._progress = 0
+        self._timer = self._widget.after(POLL_MS, self._poll)
+        logging.debug("Started laying out %d tasks in the background", snapshot.num_rows)
+        return
+
+    def cancel(self) -> None:
+        """Cancels the running layout, if any; on_laid_out is not called for it, or its remaining steps are not run."""
+        if not self.is_running():
+            return
+        if self._timer is not None:
+            self._widget.after_cancel(self._timer)
+            self._timer = None
+        if self._finishing is not None:
+            self._finishing.close()
+            self._finishing = None
+            logging.debug("Cancelled taking over the background layout")
+            return
+        self._stop_reporting()
+        self._memory.cancel()
+        for future in self._futures:
+            _ = future.cancel()
+        self._futures = []
+        self._release()
+        logging.debug("Cancelled the background layout")
+        return
+
+    def _release(self) -> None:
+        #workers still attached keep their mapping until they close it
+        self._memory.close()
+        self._memory.unlink()
+        self._memory = None
+        return
+
+    def _poll(self) -> None:
+        self._timer = None
+        if self._memory is None:
+            return
+        if not all(future.done() for future in self._futures):
+            self._report_progress()
+            #a progress report being taken over runs its next step as soon as Tk is idle
+            self._timer = self._widget.after(0 if self._reporting is not None else POLL_MS, self._poll)
+            return
+        self._stop_reporting()
+        try:
+            results: list[Any] = [future.result() for future in self._futures]
+        except Exception as e:
+            self._futures = []
+            self._release()
+            logging.error("Background layout failed: %s", e)
+            return
+        if not self._split and results[0][1]:
+            depth, ranges = results[0]
+            self._futures = [self._pool.submit(lay_out_subtrees, self._memory.get_name(), self._memory.get_capacity(), depth, part)
+                             for part in ranges]
+            self._split = True
+            self._timer = self._widget.after(POLL_MS, self._poll)
+            return
+        levels, coords = self._read_layout()
+        self._futures = []
+        self._release()
+        if self._request[0].get_row_generation() != self._generation:
+            #the rows were compacted meanwhile, so the result no longer names the right tasks
+            self.start(*self._request)
+            return
+        logging.info("Laid out %d tasks in the background", len(coords) // 2)
+        if self._on_laid_out is not None:
+            self._finishing = self._on_laid_out(levels, coords)
+            if self._finishing is not None:
+                self._timer = self._widget.after(0, self._finish_step)
+        return
+
+    def _report_progress(self) -> None:
+        """Runs the next step of on_progress for the progress report being taken over, or hands it the newest report"""
+        if self._request[0].get_row_generation() != self._generation:
+            #compacted meanwhile, the reports no longer name the right tasks and the result starts the layout over
+            self._stop_reporting()
+            return
+        if self._reporting is None:
+            reports: int = self._memory.read_header(LayoutMemory.PROGRESS)
+            if self._on_progress is None or reports == self._progress:
+                return
+            self._progress = reports
+            levels, coords = self._read_layout()
+            self._reporting = self._on_progress(levels, coords)
+            if self._reporting is None:
+                return
+        try:
+            next(self._reporting)
+        except StopIteration:
+            self._reporting = None
+        return
+
+    def _stop_reporting(self) -> None:
+        if self._reporting is not None:
+            self._reporting.close()
+            self._reporting = None
+        return
+
+    def _finish_step(self) -> None:
+        self._timer = None
+        if self._finishing is None:
+            return
+        if self._request[0].get_row_generation() != self._generation:
+            #compacted between two steps, so the rows left no longer name the right tasks
+            self._finishing.close()
+            self._finishing = None
+            self.start(*self._request)
+            return
+        try:
+            next(self._finishing)
+        except StopIteration:
+            self._finishing = None
+            return
+        self._timer = self._widget.after(0, self._finish_step)
+        return
+
+    def _read_layout(self) -> tuple[list[Level], array]:
+        memory: LayoutMemory = self._memory
+        count: int = memory.read_header(LayoutMemory.COUNT)
+        starts: array = memory.read("level_starts", 0, memory.read_header(LayoutMemory.LEVELS) + 1)
+        rows: array = memory.read("rows", 0, count)
+        parents: array = memory.read("parents", 0, count)
+        indexes: array = memory.read("indexes", 0, count)
+        levels: list[Level] = []
+        for start, end in zip(starts, starts[1:]):
+            level: Level = bare_level(parents[start:end], indexes[start:end])
+            level.nodes = rows[start:end].tolist()
+            levels.append(level)
+        coords: array = array("d", [0.0]) * (2 * count)
+        coords[0::2] = memory.read("xs", 0, count)
+        coords[1::2] = memory.read("ys", 0, count)
+        return levels, coords
+
+    def wait(self) -> None:
+        """Blocks until the running layout is done and reports it, e.g. where there is no main loop to poll."""
+        while self.is_running():
+            if self._timer is not None:
+                self._widget.after_cancel(self._timer)
+            if self._memory is not None:
+                _ = concurrent.futures.wait(self._futures)
+                self._poll()
+            else:
+                self._finish_step()
+        return
+
+    def shutdown(self) -> None:
+        """Cancels the running layout and stops the workers, e.g. before the program exits."""
+        self.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        return
@@ -0,0 +1,101 @@
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, datetime
+
+from src.node import Node
+from src.task_graph import TaskGraph, GraphObserver, time_to_seconds, NO_TIME
+
+END_OF_DAY: int = 24 * 3600 #tasks with a due date but no time are due at the end of that day
+
+DueKey = tuple[int, int, int] #(date ordinal, seconds into the day, node id)
+
+
+def due_key(node: Node) -> DueKey|None:
+    if node._due_date is None:
+        return None
+    seconds: int = time_to_seconds(node._due_time)
+    return (node._due_date.toordinal(), END_OF_DAY if seconds == NO_TIME else seconds, node._id)
+
+
+def bound(moment: date|datetime, end: bool) -> tuple[int, int]:
+    """Converts a query bound to a key prefix; a plain date covers the whole day."""
+    if isinstance(moment, datetime):
+        return (moment.toordinal(), time_to_seconds(moment.time()))
+    return (moment.toordinal(), END_OF_DAY if end else 0)
+
+
+class DueDateIndex(GraphObserver):
+    """
+    Keeps the dated tasks of a TaskGraph in sorted lists, so range queries are a
+    bisect plus a slice. Incomplete tasks are also kept in their own list, so overdue
+    queries never skip over completed tasks.
+    """
+
+    def __init__(self, graph: TaskGraph) -> None:
+        self._graph: TaskGraph = graph
+        self._key_of: dict[Node, DueKey] = {}
+        for node in graph:
+            key: DueKey|None = due_key(node)
+            if key is not None:
+                self._key_of[node] = key
+        self._all: list[DueKey] = sorted(self._key_of.values())
+        self._open: list[DueKey] = sorted(k for n, k in self._key_of.items() if not n._completed)
+        _ = graph.add_observer(self)
+        return
+
+    def __len__(self) -> int:
+        return len(self._all)
+
+    def due_between(self, start: date|datetime, end: date|datetime, include_completed: bool=False) -> list[Node]:
+        """Returns the tasks due from start to end (inclusive), earliest first."""
+        keys: list[DueKey] = self._all if include_completed else self._open
+        lo: int = bisect_left(keys, bound(start, end=False))
+        hi: int = bisect_right(keys, bound(end, end=True) + (float("inf"),))
+        return self._nodes(keys[lo:hi])
+
+    def overdue(self, now: datetime) -> list[Node]:
+        """Returns the incomplete tasks whose due moment is before now, earliest first."""
+        hi: int = bisect_left(self._open, bound(now, end=False))
+        return self._nodes(self._open[:hi])
+
+    def upcoming(self, now: datetime, limit: int) -> list[Node]:
+        """Returns the next limit incomplete tasks due at or after now."""
+        lo: int = bisect_left(self._open, bound(now, end=False))
+        return self._nodes(self._open[lo:lo + limit])
+
+    def _nodes(self, keys: list[DueKey]) -> list[Node]:
+        by_id: dict[int, Node] = self._graph.get_id_index()
+        return [by_id[key[2]] for key in keys]
+
+    def _insert(self, node: Node) -> None:
+        key: DueKey|None = due_key(node)
+        if key is None:
+            return
+        self._key_of[node] = key
+        insort(self._all, key)
+        if not node._completed:
+            insort(self._open, key)
+        return
+
+    def _remove(self, node: Node) -> None:
+        key: DueKey|None = self._key_of.pop(node, None)
+        if key is None:
+            return
+        del self._all[bisect_left(self._all, key)]
+        i: int = bisect_left(self._open, key)
+        if i < len(self._open) and self._open[i] == key:
+            del self._open[i]
+        return
+
+    def node_added(self, node: Node) -> None:
+        self._insert(node)
+        return
+
+    def node_removed(self, node: Node) -> None:
+        self._remove(node)
+        return
+
+    def node_changed(self, node: Node, field: str) -> None:
+        if field in ("due_date", "due_time", "completed"):
+            self._remove(node)
+            self._insert(node)
+        return
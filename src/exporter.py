@@ -0,0 +1,200 @@
+from datetime import date
+from typing import BinaryIO, Callable, Iterator, Mapping
+from xml.sax.saxutils import escape
+import json
+import logging
+import os
+
+from src.task_graph import TaskGraph, GraphSnapshot, NO_DATE, NO_TIME, seconds_to_time
+
+CHUNK_SIZE: int = 1 << 20 #characters gathered before they are encoded and written
+
+Positions = Mapping[int, tuple[float, float]] #task id -> layout (x, y)
+Exporter = Callable[[GraphSnapshot, "ChunkedWriter", Positions|None], None]
+
+GRAPHML_KEYS: tuple[tuple[str, str], ...] = (
+    ("value", "string"),
+    ("due_date", "string"),
+    ("due_time", "string"),
+    ("completed", "boolean"),
+    ("x", "double"),
+    ("y", "double"),
+)
+
+
+class ChunkedWriter:
+    """
+    Buffers text and writes it to a binary file as utf-8 in chunks of about chunk_size
+    characters, so an export makes a few large writes instead of one per task and never
+    holds more than one chunk.
+    """
+
+    def __init__(self, file: BinaryIO, chunk_size: int=CHUNK_SIZE) -> None:
+        self._file: BinaryIO = file
+        self._chunk_size: int = chunk_size
+        self._parts: list[str] = []
+        self._buffered: int = 0
+        self._written: int = 0
+        return
+
+    def get_written(self) -> int:
+        """Number of bytes handed to the file so far."""
+        return self._written
+
+    def write(self, text: str) -> None:
+        self._parts.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self._chunk_size:
+            self.flush()
+        return
+
+    def flush(self) -> None:
+        if self._parts:
+            chunk: bytes = "".join(self._parts).encode("utf-8")
+            self._parts = []
+            self._buffered = 0
+            _ = self._file.write(chunk)
+            self._written += len(chunk)
+        return
+
+
+def live_rows(snapshot: GraphSnapshot) -> Iterator[int]:
+    """Yields the rows of tasks that were not removed, as a scan over the alive column."""
+    alive = snapshot.alive
+    for row in range(snapshot.num_rows):
+        if alive[row]:
+            yield row
+    return
+
+
+def due_fields(snapshot: GraphSnapshot, row: int) -> tuple[str|None, str|None]:
+    """Returns a row's due date and due time in ISO format, None where unset."""
+    day: int = snapshot.due_dates[row]
+    seconds: int = snapshot.due_times[row]
+    return (date.fromordinal(day).isoformat() if day != NO_DATE else None,
+            seconds_to_time(seconds).isoformat() if seconds != NO_TIME else None)
+
+
+def dot_string(text: str) -> str:
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+
+
+def write_dot(snapshot: GraphSnapshot, out: ChunkedWriter, positions: Positions|None) -> None:
+    """
+    Writes a Graphviz digraph. Positions become pinned pos attributes in points; Tk's
+    y axis points down and Graphviz's up, so y is negated.
+    """
+    ids = snapshot.ids
+    completed = snapshot.completed
+    out.write("digraph tasks {\n")
+    for row in live_rows(snapshot):
+        task_id: int = ids[row]
+        due_date, due_time = due_fields(snapshot, row)
+        line: str = f"  {task_id} [label={dot_string(snapshot.value(row))}"
+        if due_date is not None:
+            line += f', due_date="{due_date}"'
+        if due_time is not None:
+            line += f', due_time="{due_time}"'
+        line += ", completed=true" if completed[row] else ", completed=false"
+        xy: tuple[float, float]|None = positions.get(task_id) if positions is not None else None
+        if xy is not None:
+            line += f', pos="{xy[0]:g},{-xy[1]:g}!"'
+        out.write(line + "];\n")
+    for parent, child in snapshot.edges():
+        out.write(f"  {ids[parent]} -> {ids[child]};\n")
+    out.write("}\n")
+    return
+
+
+def write_graphml(snapshot: GraphSnapshot, out: ChunkedWriter, positions: Positions|None) -> None:
+    """Writes GraphML with one data key per task field and x and y keys for the positions."""
+    ids = snapshot.ids
+    completed = snapshot.completed
+    out.write('<?xml version="1.0" encoding="UTF-8"?>\n<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+    for name, kind in GRAPHML_KEYS:
+        out.write(f'  <key id="{name}" for="node" attr.name="{name}" attr.type="{kind}"/>\n')
+    out.write('  <graph id="tasks" edgedefault="directed">\n')
+    for row in live_rows(snapshot):
+        task_id: int = ids[row]
+        due_date, due_time = due_fields(snapshot, row)
+        line: str = f'    <node id="{task_id}"><data key="value">{escape(snapshot.value(row))}</data>'
+        if due_date is not None:
+            line += f'<data key="due_date">{due_date}</data>'
+        if due_time is not None:
+            line += f'<data key="due_time">{due_time}</data>'
+        line += '<data key="completed">true</data>' if completed[row] else '<data key="completed">false</data>'
+        xy: tuple[float, float]|None = positions.get(task_id) if positions is not None else None
+        if xy is not None:
+            line += f'<data key="x">{xy[0]!r}</data><data key="y">{xy[1]!r}</data>'
+        out.write(line + "</node>\n")
+    for parent, child in snapshot.edges():
+        out.write(f'    <edge source="{ids[parent]}" target="{ids[child]}"/>\n')
+    out.write("  </graph>\n</graphml>\n")
+    return
+
+
+def write_json(snapshot: GraphSnapshot, out: ChunkedWriter, positions: Positions|None) -> None:
+    """
+    Writes a node-link JSON document: {"directed", "root", "nodes", "links"}. Nodes carry
+    the fields src.importer reads plus x and y, links are {"source", "target"} task ids.
+    """
+    ids = snapshot.ids
+    completed = snapshot.completed
+    encode_string: Callable[[str], str] = json.JSONEncoder(ensure_ascii=False).encode
+    root: int|None = ids[snapshot.root_row] if snapshot.root_row >= 0 else None
+    out.write(f'{{"directed": true, "root": {json.dumps(root)}, "nodes": [')
+    separator: str = "\n"
+    for row in live_rows(snapshot):
+        task_id: int = ids[row]
+        due_date, due_time = due_fields(snapshot, row)
+        line: str = f'{separator}{{"id": {task_id}, "value": {encode_string(snapshot.value(row))}'
+        if due_date is not None:
+            line += f', "due_date": "{due_date}"'
+        if due_time is not None:
+            line += f', "due_time": "{due_time}"'
+        line += ', "completed": true' if completed[row] else ', "completed": false'
+        xy: tuple[float, float]|None = positions.get(task_id) if positions is not None else None
+        if xy is not None:
+            line += f', "x": {xy[0]!r}, "y": {xy[1]!r}'
+        out.write(line + "}")
+        separator = ",\n"
+    out.write('\n], "links": [')
+    separator = "\n"
+    for parent, child in snapshot.edges():
+        out.write(f'{separator}{{"source": {ids[parent]}, "target": {ids[child]}}}')
+        separator = ",\n"
+    out.write("\n]}\n")
+    return
+
+
+EXPORTERS: dict[str, Exporter] = {
+    ".dot": write_dot,
+    ".gv": write_dot,
+    ".graphml": write_graphml,
+    ".json": write_json,
+}
+
+
+def export_snapshot(snapshot: GraphSnapshot, path: str, positions: Positions|None=None, chunk_size: int=CHUNK_SIZE) -> int:
+    """
+    Writes a snapshot to path in the format its suffix names (see EXPORTERS) and returns
+    the number of bytes written. Tasks are written by a scan over the rows and edges by
+    a scan over the edge list, neither of which recurses or collects anything, so the
+    extra memory is one chunk whatever the size of the graph. Only the snapshot is read,
+    so this can run on a worker thread.
+    """
+    suffix: str = os.path.splitext(path)[1].lower()
+    exporter: Exporter|None = EXPORTERS.get(suffix)
+    if exporter is None:
+        raise ValueError(f"Cannot export to {suffix or 'files without a suffix'}, use one of {', '.join(EXPORTERS)}.")
+    with open(path, "wb") as f:
+        out = ChunkedWriter(f, chunk_size)
+        exporter(snapshot, out, positions)
+        out.flush()
+    logging.info("Exported %d bytes to %s", out.get_written(), path)
+    return out.get_written()
+
+
+def export_graph(graph: TaskGraph, path: str, positions: Positions|None=None) -> int:
+    """Exports graph to path, see export_snapshot."""
+    return export_snapshot(graph.snapshot(), path, positions)
@@ -0,0 +1,360 @@
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Callable
+import cmath
+import logging
+import math
+import time
+
+from src.task_graph import paused_gc
+
+FORCE_EDGE_LENGTH: float = 120 #length at which an edge's pull and its ends' push balance
+FORCE_ITERATIONS: int = 50 #iteration budget of a layout
+FORCE_TIME_LIMIT: float = 3.0 #seconds after which a layout on the Tk thread stops where it is, whatever its iteration budget
+FORCE_COARSEST: int = 500 #coarsening stops at this many points, which get the full iteration budget
+FORCE_MIN_SHRINK: float = 0.8 #coarsening also stops once a level keeps more than this fraction of the points
+FORCE_REFINE_WORK: int = 60_000 #points times iterations each finer level is refined with; an iteration costs about 25µs per point
+FORCE_REFINE_ITERATIONS: tuple[int, int] = (3, 10) #least and most iterations of a finer level
+FORCE_REFINE_STEP: float = 0.5 #largest move in a finer level's first iteration, in edge lengths
+FORCE_TOLERANCE: float = 0.01 #stops early once tasks move less than this fraction of the edge length on average
+FORCE_GRAVITY: float = math.pi #pull towards the centroid per unit of distance, which balances the push on a disc of points edge_length apart
+FORCE_START_STEP: float = 10 #largest move in the first iteration, in edge lengths
+FORCE_COOLING: float = 0.9 #factor the largest allowed move shrinks by each iteration
+THETA: float = 1.0 #a quadtree cell counts as one body for another cell when its side < THETA * distance,
+REACH: float = 0.6 #and the other's half diagonal < REACH * distance, so the series of its push converges quickly
+LEAF_SIZE: int = 16 #bodies in a quadtree leaf
+EXPANSION_TERMS: int = 6 #terms of the series the push of far cells is summed into
+MORTON_BITS: int = 16 #bits per axis of the z-order codes the quadtree is built from
+GOLDEN_RATIO: float = (1 + math.sqrt(5)) / 2
+GOLDEN_ANGLE: float = math.pi * (3 - math.sqrt(5))
+
+#SPREAD[b] has the bits of the byte b at the even bit positions
+SPREAD: list[int] = [sum(((b >> i) & 1) << (2 * i) for i in range(8)) for b in range(256)]
+
+
+class QuadTree:
+    """
+    A quadtree over points in the complex plane, built from the points sorted in z-order,
+    so each cell holds a contiguous range of the sorted points. Cells are stored as
+    parallel lists and their centre of mass comes from prefix sums, so nothing recurses.
+    """
+
+    def __init__(self, points: list[complex], leaf_size: int=LEAF_SIZE) -> None:
+        xs: list[float] = [z.real for z in points]
+        ys: list[float] = [z.imag for z in points]
+        left: float = min(xs)
+        top: float = min(ys)
+        side: float = max(max(xs) - left, max(ys) - top, 1e-9)
+        scale: float = ((1 << MORTON_BITS) - 1) / side
+        codes: list[int] = [morton_code(int((x - left) * scale), int((y - top) * scale)) for x, y in zip(xs, ys)]
+        self.order: list[int] = sorted(range(len(points)), key=codes.__getitem__) #position in points of the k-th sorted point
+        codes.sort()
+        self.points: list[complex] = [points[i] for i in self.order]
+        sums: list[complex] = [0j, *accumulate(self.points)]
+
+        side = (1 << MORTON_BITS) / scale
+        self.lo: list[int] = []
+        self.hi: list[int] = []
+        self.side: list[float] = []
+        self.center: list[complex] = [] #middle of the cell's square
+        self.com: list[complex] = [] #centre of mass of its points
+        self.children: list[list[int]] = []
+        self.leaves: list[int] = []
+        #(cell, z-order prefix, depth of the cell)
+        stack: list[tuple[int, int, int]] = [(self.add_cell(0, len(points), side, complex(left + side / 2, top + side / 2), sums), 0, 0)]
+        while stack:
+            cell, prefix, depth = stack.pop()
+            lo: int = self.lo[cell]
+            hi: int = self.hi[cell]
+            if hi - lo <= leaf_size or depth == MORTON_BITS:
+                self.leaves.append(cell)
+                continue
+            shift: int = 2 * (MORTON_BITS - depth - 1)
+            quarter: float = self.side[cell] / 4
+            for q in range(4):
+                start: int = bisect_left(codes, (prefix * 4 + q) << shift, lo, hi)
+                end: int = bisect_left(codes, (prefix * 4 + q + 1) << shift, start, hi)
+                if start < end:
+                    center: complex = self.center[cell] + complex(quarter if q & 1 else -quarter, quarter if q & 2 else -quarter)
+                    child: int = self.add_cell(start, end, self.side[cell] / 2, center, sums)
+                    self.children[cell].append(child)
+                    stack.append((child, prefix * 4 + q, depth + 1))
+        return
+
+    def add_cell(self, lo: int, hi: int, side: float, center: complex, sums: list[complex]) -> int:
+        self.lo.append(lo)
+        self.hi.append(hi)
+        self.side.append(side)
+        self.center.append(center)
+        self.com.append((sums[hi] - sums[lo]) / (hi - lo))
+        self.children.append([])
+        return len(self.lo) - 1
+
+
+def morton_code(x: int, y: int) -> int:
+    """Interleaves the low MORTON_BITS bits of x and y, x in the even bits."""
+    return (SPREAD[x & 255] | SPREAD[x >> 8] << 16) | (SPREAD[y & 255] | SPREAD[y >> 8] << 16) << 1
+
+
+def inverse_distance_sum(z: complex, others: list[complex]) -> complex:
+    """Sums 1 / (z - w) over others, skipping points on top of z."""
+    try:
+        return sum(map((1 + 0j).__truediv__, map(z.__sub__, others)), 0j)
+    except ZeroDivisionError:
+        return sum((1 / (z - w) for w in others if w != z), 0j)
+
+
+def shift_expansion(coefficients: list[complex], delta: complex) -> list[complex]:
+    """Re-centres the polynomial sum of coefficients[k] * u**k at a point delta away, where it equals sum of result[j] * (u - delta)**j."""
+    shifted: list[complex] = list(coefficients)
+    #repeated synthetic division by (u - delta)
+    for j in range(len(shifted) - 1):
+        for k in range(len(shifted) - 2, j - 1, -1):
+            shifted[k] += delta * shifted[k + 1]
+    return shifted
+
+
+def repulsion(points: list[complex], theta: float=THETA, reach: float=REACH, leaf_size: int=LEAF_SIZE, terms: int=EXPANSION_TERMS) -> list[complex]:
+    """
+    Returns, for each point z, the sum of 1 / (z - w) over the other points w, with the
+    Barnes–Hut approximation: cells far enough from a point count as one body of their
+    size at their centre of mass. The conjugate of that sum is the direction and strength
+    of the 1 / distance push the other points give z.
+
+    Rather than walking the quadtree once per point, cells are matched against cells from
+    the root down: a cell far from a whole cell is summed once into the first terms of the
+    Taylor series of its push around that cell's centre, which is handed down to the
+    children, and only the cells near a cell are opened further. Each point evaluates its
+    leaf's series in a few multiplications and sums the points of near leaves directly,
+    as map() over lists. O(n log n) per call.
+    """
+    tree = QuadTree(points, leaf_size)
+    sorted_points: list[complex] = tree.points
+    side: list[float] = tree.side
+    center: list[complex] = tree.center
+    com: list[complex] = tree.com
+    children: list[list[int]] = tree.children
+    sums: list[complex] = [0j] * len(points)
+    #(cell, cells near its parent, the parent's series re-centred on the cell)
+    stack: list[tuple[int, list[int], list[complex]]] = [(0, [0], [0j] * terms)]
+    with paused_gc():
+        while stack:
+            cell, candidates, coefficients = stack.pop()
+            half_diagonal: float = side[cell] * 0.7072 #no point of the cell is further from its centre
+            middle: complex = center[cell]
+            leaf: bool = not children[cell]
+            far: list[complex] = []
+            far_mass: list[int] = []
+            kept: list[int] = []
+            near: list[complex] = []
+            while candidates:
+                other: int = candidates.pop()
+                distance: float = abs(com[other] - middle)
+                if side[other] < theta * distance and half_diagonal < reach * distance and other != cell:
+                    far.append(com[other])
+                    far_mass.append(tree.hi[other] - tree.lo[other])
+                elif children[other] and (leaf or side[other] >= side[cell]):
+                    candidates.extend(children[other])
+                elif not leaf:
+                    kept.append(other)
+                elif other != cell:
+                    near.extend(sorted_points[tree.lo[other]:tree.hi[other]])
+            if far:
+                #1 / (z - w) = -sum over k of (z - middle)**k / (w - middle)**(k + 1)
+                inverse: list[complex] = list(map((1 + 0j).__truediv__, map(middle.__rsub__, far)))
+                term: list[complex] = list(map(complex.__mul__, map(complex, far_mass), inverse))
+                for k in range(terms):
+                    if k:
+                        term = list(map(complex.__mul__, term, inverse))
+                    coefficients[k] -= sum(term, 0j)
+            if not leaf:
+                for child in children[cell]:
+                    stack.append((child, list(kept), shift_expansion(coefficients, center[child] - middle)))
+                continue
+            lo: int = tree.lo[cell]
+            own: list[complex] = sorted_points[lo:tree.hi[cell]]
+            for k, z in enumerate(own):
+                u: complex = z - middle
+                total: complex = 0j
+                for c in reversed(coefficients):
+                    total = total * u + c
+                sums[lo + k] = total + inverse_distance_sum(z, near) + inverse_distance_sum(z, own[:k] + own[k + 1:])
+    result: list[complex] = [0j] * len(points)
+    for k, i in enumerate(tree.order):
+        result[i] = sums[k]
+    return result
+
+
+def relax(points: list[complex], parents: array, children: array, iterations: int=FORCE_ITERATIONS, tolerance: float=FORCE_TOLERANCE,
+          edge_length: float=FORCE_EDGE_LENGTH, cancelled: Callable[[], bool]|None=None, time_limit: float=FORCE_TIME_LIMIT,
+          start_step: float=FORCE_START_STEP, progress: Callable[[list[complex]], None]|None=None) -> int:
+    """
+    Moves points in place with a force-directed (Fruchterman–Reingold) layout: every pair
+    of points pushes apart with edge_length**2 / distance, found with the Barnes–Hut
+    repulsion, and the ends of each edge parents[k] -> children[k] pull together with
+    distance**2 / edge_length. Every point is also pulled towards the centroid by
+    FORCE_GRAVITY times its distance from it, which balances the push on points spread
+    edge_length apart; without it the push on the outer points grows with the number of
+    points and stretches the edges of large graphs. Stops after iterations, or once
+    points move less than tolerance * edge_length on average, or as soon as cancelled
+    returns True or time_limit seconds have passed, and returns the number of iterations run.
+    progress is called with points after every iteration.
+
+    Points are first nudged to spots spread evenly over a disc of radius edge_length / 10,
+    which separates points on top of each other. A point then moves along its net force
+    by at most a step that starts at start_step edge lengths, by default far enough for
+    subtrees the seed layout puts on top of each other to pass through each other, and
+    shrinks by FORCE_COOLING per iteration.
+    """
+    count: int = len(points)
+    if count < 2:
+        return 0
+    for i in range(count):
+        #i * GOLDEN_RATIO mod 1 spreads evenly over [0, 1), so the nudges of any run of points cover the disc evenly
+        points[i] += cmath.rect(edge_length / 10 * math.sqrt(i * GOLDEN_RATIO % 1.0), i * GOLDEN_ANGLE)
+    push: float = edge_length * edge_length
+    step: float = start_step * edge_length
+    deadline: float = time.perf_counter() + time_limit
+    for iteration in range(1, iterations + 1):
+        if cancelled is not None and cancelled():
+            return iteration - 1
+        if iteration > 1 and time.perf_counter() > deadline:
+            logging.info("Force layout stopped after %d of %d iterations, at its time limit of %.1fs", iteration - 1, iterations, time_limit)
+            return iteration - 1
+        centroid: complex = sum(points, 0j) / count
+        forces: list[complex] = [push * s.conjugate() - FORCE_GRAVITY * (z - centroid) for s, z in zip(repulsion(points), points)]
+        for a, b in zip(parents, children):
+            delta: complex = points[b] - points[a]
+            pull: complex = delta * (abs(delta) / edge_length)
+            forces[a] += pull
+            forces[b] -= pull
+        moved: float = 0.0
+        for i, force in enumerate(forces):
+            length: float = abs(force)
+            if length > step:
+                force *= step / length
+                length = step
+            points[i] += force
+            moved += length
+        step *= FORCE_COOLING
+        logging.debug("Force layout iteration %d moved tasks %.2f on average", iteration, moved / count)
+        if progress is not None:
+            progress(points)
+        if moved / count < tolerance * edge_length:
+            return iteration
+    return iterations
+
+
+def coarsen(count: int, parents: array, children: array) -> tuple[array, int]:
+    """
+    Groups count points into clusters for a coarser level of relax_coarse_to_fine: points
+    are matched in pairs along edges, each with the first unmatched neighbour, and then
+    every point at the end of a single edge joins its neighbour's cluster, so the leaves
+    of a wide subtree collapse at once where pairs alone would take a level per leaf.
+    Returns the cluster of each point and the number of clusters.
+    """
+    neighbours: list[list[int]] = [[] for _ in range(count)]
+    for a, b in zip(parents, children):
+        neighbours[a].append(b)
+        neighbours[b].append(a)
+    cluster: array = array("l", [-1]) * count
+    clusters: int = 0
+    for i in range(count):
+        if cluster[i] >= 0 or len(neighbours[i]) == 1:
+            continue
+        cluster[i] = clusters
+        for j in neighbours[i]:
+            if cluster[j] < 0 and len(neighbours[j]) != 1:
+                cluster[j] = clusters
+                break
+        clusters += 1
+    for i in range(count):
+        if cluster[i] < 0:
+            j: int = neighbours[i][0]
+            if cluster[j] < 0:
+                #two points on their own, each the other's only neighbour
+                cluster[j] = clusters
+                clusters += 1
+            cluster[i] = cluster[j]
+    return cluster, clusters
+
+
+def relax_coarse_to_fine(points: list[complex], parents: array, children: array, iterations: int=FORCE_ITERATIONS,
+                         tolerance: float=FORCE_TOLERANCE, edge_length: float=FORCE_EDGE_LENGTH, cancelled: Callable[[], bool]|None=None,
+                         time_limit: float=FORCE_TIME_LIMIT, progress: Callable[[list[complex]], None]|None=None) -> int:
+    """
+    Moves points in place like relax, but spends the iteration budget on a coarse version
+    of the graph: points are grouped with coarsen, level after level, until at most
+    FORCE_COARSEST are left, each cluster seeded at the centre of its points and pulled
+    along the edges between clusters. The coarsest level is relaxed with the whole
+    budget. Each finer level is then moved into place with prolong and relaxed with a few
+    short iterations, FORCE_REFINE_WORK divided by its points within
+    FORCE_REFINE_ITERATIONS. Graphs of FORCE_COARSEST points or fewer are relaxed as relax
+    would. cancelled, time_limit and tolerance are as for relax, over all levels; once
+    time_limit has passed, the finer levels are only moved into place. progress is
+    called with the positions of all the points after every coarser level, which are
+    moved into place down to the finest for it, and after every iteration of the finest
+    level. Returns the number of iterations run on all levels.
+    """
+    graphs: list[tuple[list[complex], array, array]] = [(points, parents, children)]
+    clusters_of: list[array] = [] #of each point of a level, the cluster it is in on the next coarser level
+    while len(graphs[-1][0]) > FORCE_COARSEST:
+        if cancelled is not None and cancelled():
+            return 0
+        fine, fine_parents, fine_children = graphs[-1]
+        cluster, count = coarsen(len(fine), fine_parents, fine_children)
+        if count > FORCE_MIN_SHRINK * len(fine):
+            break
+        sums: list[complex] = [0j] * count
+        sizes: list[int] = [0] * count
+        for c, z in zip(cluster, fine):
+            sums[c] += z
+            sizes[c] += 1
+        edges: set[tuple[int, int]] = {(min(a, b), max(a, b)) for a, b in zip(map(cluster.__getitem__, fine_parents), map(cluster.__getitem__, fine_children)) if a != b}
+        graphs.append(([z / n for z, n in zip(sums, sizes)], array("l", [a for a, _ in edges]), array("l", [b for _, b in edges])))
+        clusters_of.append(cluster)
+    logging.debug("Force layout coarsened %d points to %s", len(points), ", ".join(str(len(g[0])) for g in graphs[1:]) or "none")
+
+    deadline: float = time.perf_counter() + time_limit
+    ran: int = 0
+    for depth in range(len(graphs) - 1, -1, -1):
+        level, level_parents, level_children = graphs[depth]
+        start_step: float = FORCE_START_STEP
+        budget: int = iterations
+        if depth < len(graphs) - 1:
+            level[:] = prolong(graphs[depth + 1][0], clusters_of[depth], edge_length)
+            start_step = FORCE_REFINE_STEP
+            budget = min(max(FORCE_REFINE_WORK // len(level), FORCE_REFINE_ITERATIONS[0]), FORCE_REFINE_ITERATIONS[1])
+        if cancelled is not None and cancelled():
+            return ran
+        remaining: float = deadline - time.perf_counter()
+        if remaining > 0 or depth == len(graphs) - 1:
+            ran += relax(level, level_parents, level_children, budget, tolerance, edge_length, cancelled, remaining, start_step,
+                         progress if depth == 0 else None)
+        if depth > 0 and progress is not None:
+            preview: list[complex] = level
+            for finer in range(depth - 1, -1, -1):
+                preview = prolong(preview, clusters_of[finer], edge_length)
+            progress(preview)
+    return ran
+
+
+def prolong(relaxed: list[complex], cluster: array, edge_length: float) -> list[complex]:
+    """
+    Returns positions for the points of a finer level in the relaxed layout of the coarser
+    one, where cluster gives the coarser point each finer one is in: the coarser layout is
+    spread out by the square root of how many more points there are, since relaxed points
+    keep about edge_length apart, and the points of a cluster are spread over a disc around
+    it the way relax nudges points, about edge_length apart.
+    """
+    centroid: complex = sum(relaxed, 0j) / len(relaxed)
+    spread: float = math.sqrt(len(cluster) / len(relaxed))
+    targets: list[complex] = [centroid + spread * (z - centroid) for z in relaxed]
+    taken: list[int] = [0] * len(relaxed) #points of each cluster placed so far
+    fine: list[complex] = []
+    for c in cluster:
+        k: int = taken[c]
+        taken[c] = k + 1
+        fine.append(targets[c] + cmath.rect(edge_length / 2 * math.sqrt(k), k * GOLDEN_ANGLE))
+    return fine
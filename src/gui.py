@@ -1,32 +1,80 @@
 import tkinter as tk
 from tkinter import simpledialog
 from tkinter import filedialog
+from tkinter import messagebox
 from src.node import Node
+from src.task_graph import TaskGraph
+from src.reachability import ReachabilityIndex
+from src.progress import ProgressIndex
+from src.search import SearchIndex
+from src.importer import import_csv, import_jsonl
+from src.exporter import export_graph
+from src.layout import LAYOUT_ENGINES, SUBTREE_ENGINES, Level, child_position, placements, relayout_subtree, spanning_tree, take_over_rows
+from src.layout_cache import CacheEntry, SavedLayout, cache_entries, engine_code, restore_coordinates, subtree_key, subtree_keys
+from src.background_layout import BackgroundLayout, BACKGROUND_FORCE_TASKS, BACKGROUND_LAYOUT_TASKS
+from src.task_file import is_task_file, load_graph, open_task_file
+from src.journal import Journal
+from src.autosave import Autosave, AUTOSAVE_SUFFIX, recovery_path
+from src.task_store import TaskStore, STORE_SUFFIX, is_task_store
+from array import array
 from collections import deque
+from typing import Any, Callable, Iterable, Iterator, Mapping
+import itertools
 import logging
 import math
-import pickle
 
 
 NODE_RADIUS: float = 30.0#10
-# RADIAL_SPACING: int = 100  # Adjust as needed for spacing between levels
-# SPIRAL_FACTOR: float = 0.2  # Adjust to control the spiral effect
 WIDTH: int = 1000
 HEIGHT: int = 1000
-BASE_DISTANCE: float = 500  # Base distance from parent to first child
-DISTANCE_LEVEL_FACTOR: float = 0.55
-ANGLE_INCREMENT: float = 2 * math.pi / 5  # Base angle between siblings (adjust for branching)
-SPIRAL_FACTOR: float = 20#0.6  # Controls the spiral effect (angle offset per level)
 ZOOM_FACTOR: float = 1.1
+SEARCH_LIMIT: int = 10 #matches listed under the search box
+MAX_LISTED_ROOTS: int = 5 #top-level tasks named when an import has more than the one shown
+EXPLORE_DEPTH: int = 2 #levels below the root drawn when a database is opened, deeper tasks load when expanded
+REDRAW_CHUNK: int = 5_000 #tasks moved on the canvas per step of redrawing a background layout's progress report
+SLICE_PROMPT: str = "Any of root=<id> depth=<levels> tasks=<count> box=<x0,y0,x1,y1>\n(box needs a task file or database with saved positions)"
+NO_PROGRESS_COLOR: tuple[int, int, int] = (0, 0, 255) #blue
+FULL_PROGRESS_COLOR: tuple[int, int, int] = (0, 160, 0) #green
+
+
+def parse_slice_spec(text: str) -> dict[str, Any]:
+    """Reads e.g. "root=12 depth=3 tasks=500 box=0,0,800,600" into the keyword arguments of Gui.load_tree_from_file"""
+    options: dict[str, Any] = {}
+    for part in text.split():
+        key, _, value = part.partition("=")
+        if key == "root":
+            options["root_id"] = int(value)
+        elif key == "depth":
+            options["max_depth"] = int(value)
+        elif key == "tasks":
+            options["max_nodes"] = int(value)
+        elif key == "box":
+            box: tuple[float, ...] = tuple(float(v) for v in value.split(","))
+            if len(box) != 4:
+                raise ValueError(f"A box needs four coordinates, got {value!r}.")
+            options["box"] = box
+        else:
+            raise ValueError(f"Unknown option {part!r}.")
+    return options
+
+
+def progress_color(percent: float) -> str:
+    """Blends from blue at 0% to green at 100% complete."""
+    mix: float = percent / 100.0
+    rgb = [round(a + (b - a) * mix) for a, b in zip(NO_PROGRESS_COLOR, FULL_PROGRESS_COLOR)]
+    return "#%02x%02x%02x" % tuple(rgb)
 
 
 class Gui:
 
     def __init__(self, tree: Node):
         self._tree: Node = tree
+        self._graph: TaskGraph = TaskGraph.from_root(tree)
         self._window: tk.Tk = tk.Tk()
         self._window.title("Task-Grapher")
 
+        self.create_search_bar()
+
         self._frame: tk.Frame = tk.Frame(self._window)
         self._frame.pack(fill=tk.BOTH, expand=True)
 
@@ -61,9 +109,14 @@ class Gui:
         self._drag_start_y: float = 0.0
         self._pan_start_x: float = 0.0
         self._pan_start_y: float = 0.0
-        self._id_to_node: dict[int, Node] = {}
+        self._id_to_node: dict[int, Node] = self._graph.get_loaded_index() #owned and kept current by the graph
         
         self._optimal_node_positions: dict[Node, tuple[float, float]] = {} #each tuple consists of (x, y)
+        self._placed_under: dict[Node, tuple[Node, int, int]] = {} #task -> (task it is laid out under, index among its children, depth)
+        self._layout_engine: str = "spiral" #key of src.layout.LAYOUT_ENGINES
+        self._saved_layout: Mapping[int, CacheEntry]|None = None #layout cache of the file just loaded, used by the next redraw_tree
+        self._layout_keys: dict[Node, int] = {} #layout cache key of each drawn task when its entry was last taken, see changed_layout_entries
+        self._layout_changed: set[Node]|None = None #drawn tasks whose layout cache entry may have changed since, None for all of them
         self._node_positions: dict[Node, tuple[float, float, int, int]] = {} #each tuple consists of (x, y, circle_id, text_id)
         self._line_positions: dict[int, tuple[float, float, float, float]] = {} #each tuple consists of (xp, yp, xc, yc)
 
@@ -75,6 +128,19 @@ class Gui:
         self._selected_child_line_ids: set[int] = set()
         self._selected_parent_line_ids: set[int] = set()
         self._selected_node: Node|None = None
+        self._focused_node: Node|None = None
+        self._shown: set[Node]|None = None #the tasks drawn when only part of the tree is, None when all are
+        self._collapsed: set[Node] = set() #drawn without their descendants, which are loaded and drawn when expanded
+        self._search_results: list[Node] = []
+        self._store: TaskStore|None = None #database the tree was last saved to or opened from, saved O(changes) on demand
+        self._journal: Journal|None = None #records changes since the tree was last saved to or loaded from a task file
+        #saves in the background next to the last file saved or loaded, once there is one
+        self._autosave: Autosave = Autosave(self._window, on_saved=self.autosave_finished)
+        self._autosave.set_graph(self._graph)
+        #lays out large trees in worker processes, see redraw_tree
+        self._background_layout: BackgroundLayout = BackgroundLayout(self._window, on_laid_out=self.background_layout_finished,
+                                                                     on_progress=self.background_layout_progress)
+        self._progress_drawn: bool = False #whether the tasks of the background layout running are drawn from one of its progress reports
 
         self.add_nodes()
 
@@ -90,6 +156,7 @@ class Gui:
         self._canvas.bind("<Button-1>", self.start_drag)
         self._canvas.bind("<B1-Motion>", self.drag)
         self._canvas.bind("<ButtonRelease-1>", self.stop_drag)
+        self._canvas.bind("<Double-Button-1>", self.handle_double_click)
 
         self._canvas.bind("<Button-3>", self.handle_canvas_right_click)
 
@@ -98,10 +165,180 @@ class Gui:
 
         return
 
-    def rebuild_canvas_from_tree(self, root_node: Node):
+    def rebuild_canvas_from_tree(self, root_node: Node, part: tuple[list[Node], list[Node]]|None = None):
+        """Shows the tree of root_node, or only part of it: the tasks and stubs returned by TaskGraph.load_slice"""
+        self.clear_canvas()
+        self._search_results = []
+        self._search_list.delete(0, tk.END)
+
+        self._tree = root_node
+        self._graph = TaskGraph.from_root(root_node)
+        self._id_to_node = self._graph.get_loaded_index()
+        self._autosave.set_graph(self._graph)
+        self._shown = set(part[0]) if part is not None else None
+        self._collapsed = set(part[1]) if part is not None else set()
+        self.redraw_tree()
+
+    def redraw_tree(self) -> None:
+        """
+        Lays the tree out again and draws it, cancelling a layout still running, which no
+        longer matches the tree. Trees of BACKGROUND_LAYOUT_TASKS tasks or more, and force
+        layouts of more than BACKGROUND_FORCE_TASKS, are laid out in worker processes, see
+        src.background_layout, and stay drawn as they were until it is done, or until the
+        first progress report of a force layout, so the window keeps responding.
+        """
+        self._background_layout.cancel()
+        saved: Mapping[int, CacheEntry]|None = self._saved_layout
+        self._saved_layout = None
+        #without the root's entry no subtree matches, see restore_coordinates
+        if saved is not None and self._tree.get_id() in saved and self.restore_layout(saved):
+            return
+        if not self.lays_out_in_background():
+            self.clear_canvas()
+            self.calculate_node_positions()
+            self.draw_tree(self._canvas)
+            return
+        root_x, root_y = self.root_position()
+        self._progress_drawn = False
+        self._background_layout.start(self._graph, self._tree, self._layout_engine, root_x, root_y, self._shown, self._collapsed)
+        return
+
+    def shown_count(self) -> int:
+        #tasks under collapsed ones are counted too, so this is an upper bound on the tasks laid out
+        return len(self._graph) if self._shown is None else len(self._shown)
+
+    def lays_out_in_background(self) -> bool:
+        #workers read the graph's columns, which only hold every task once it is loaded;
+        #without them a force layout runs on the Tk thread and stops at FORCE_TIME_LIMIT
+        count: int = self.shown_count()
+        large: bool = count >= BACKGROUND_LAYOUT_TASKS or (self._layout_engine == "force" and count > BACKGROUND_FORCE_TASKS)
+        return large and self._graph.is_loaded()
+
+    def background_layout_finished(self, levels: list[Level], coords: array) -> Iterator[None]:
+        """
+        Draws a layout from BackgroundLayout, whose tasks are graph rows. The rows are taken
+        over a chunk at a time, see src.layout.take_over_rows, so BackgroundLayout hands a
+        large layout over in several after() calls; the tree stays drawn as it was until the
+        last. If a progress report of the layout is drawn, its tasks are moved instead, see
+        background_layout_progress.
+        """
+        yield from self.background_layout_progress(levels, coords)
+        self._progress_drawn = False
+        return
+
+    def background_layout_progress(self, levels: list[Level], coords: array) -> Iterator[None]:
+        """
+        Draws a progress report of the running background layout, in steps like
+        background_layout_finished: the first report is drawn as a result would be, later
+        ones move the drawn tasks and their lines, REDRAW_CHUNK tasks a step.
+        """
+        positions: dict[Node, tuple[float, float]] = {}
+        placed: dict[Node, tuple[Node, int, int]] = {}
+        yield from take_over_rows(levels, coords, self._graph.get_node, positions, placed)
+        if not self._progress_drawn:
+            self.clear_canvas()
+            self._optimal_node_positions = positions
+            self._placed_under = placed
+            self.draw_tree(self._canvas)
+            self._progress_drawn = True
+            return
+        old: list[tuple[Node, tuple[float, float]]] = [(n, xy) for n, xy in self._optimal_node_positions.items() if n in positions]
+        self._optimal_node_positions = positions
+        self._placed_under = placed
+        #every task may have moved
+        self._layout_changed = None
+        for start in range(0, len(old), REDRAW_CHUNK):
+            yield
+            self.move_drawn_nodes(dict(old[start:start + REDRAW_CHUNK]))
+        return
+
+    def restore_layout(self, saved: Mapping[int, CacheEntry]) -> bool:
+        """
+        Draws the tree at the positions saved with it, laying out anew only the tasks whose
+        subtree changed since, see src.layout_cache. Returns False without drawing if the
+        layout engine has to run instead.
+        """
+        levels: list[Level] = spanning_tree(self._tree, self.is_shown, self._collapsed)
+        keys: list[array] = subtree_keys(levels, self._layout_engine)
+        coords: array|None = restore_coordinates(levels, keys, saved, self._layout_engine, *self.root_position())
+        if coords is None:
+            return False
+        for node in itertools.chain.from_iterable(level.nodes for level in levels):
+            _ = self.add_node(node)
+        self.draw_layout(levels, coords)
+        #only the entries of tasks laid out anew differ from the saved ones
+        self._layout_keys = dict(zip(itertools.chain.from_iterable(level.nodes for level in levels), itertools.chain.from_iterable(keys)))
+        self._layout_changed = {node for node, key in self._layout_keys.items() if saved.get(node.get_id()) != (key, *self._optimal_node_positions[node])}
+        return True
+
+    def draw_layout(self, levels: list[Level], coords: array) -> None:
+        """Draws the tasks of the levels at coords, which hold them level by level"""
+        self.clear_canvas()
+        nodes: list[Node] = list(itertools.chain.from_iterable(level.nodes for level in levels))
+        self._optimal_node_positions = dict(zip(nodes, zip(coords[0::2], coords[1::2])))
+        self._placed_under = placements(levels)
+        self.draw_tree(self._canvas)
+        return
+
+    def layout_entries(self) -> dict[int, CacheEntry]:
+        """Returns the layout cache entry of each drawn task by id, see src.layout_cache; none while a layout is still running"""
+        if self._background_layout.is_running():
+            return {}
+        levels: list[Level] = spanning_tree(self._tree, self.is_shown, self._collapsed)
+        keys: list[array] = subtree_keys(levels, self._layout_engine)
+        self._layout_keys = dict(zip(itertools.chain.from_iterable(level.nodes for level in levels), itertools.chain.from_iterable(keys)))
+        self._layout_changed = set()
+        return cache_entries(levels, keys, self._optimal_node_positions)
+
+    def changed_layout_entries(self) -> dict[int, CacheEntry]:
+        """
+        Returns the layout cache entries that changed since they were last taken, by id, so
+        saving an edit stays O(changes): those of the tasks edits moved or placed something
+        under, and of every task those are placed under, whose keys are recomputed bottom-up
+        from the keys kept of the tasks below, see mark_layout_changed. All of them, see
+        layout_entries, after the tree was laid out anew; none while a layout is running.
+        """
+        if self._background_layout.is_running():
+            return {}
+        changed: set[Node]|None = self._layout_changed
+        if changed is None:
+            return self.layout_entries()
+        keys: dict[Node, int] = self._layout_keys
+        code: int = engine_code(self._layout_engine)
+        entries: dict[int, CacheEntry] = {}
+        deepest_first: list[Node] = sorted(filter(self._optimal_node_positions.__contains__, changed),
+                                           key=lambda n: self._placed_under[n][2] if n in self._placed_under else 0, reverse=True)
+        try:
+            for node in deepest_first:
+                parent, index, depth = self._placed_under.get(node, (None, 0, 0))
+                under: list[int] = [keys[child] for child in node._children if self._placed_under.get(child, (None,))[0] is node]
+                keys[node] = subtree_key(code, node.get_id(), parent.get_id() if parent is not None else -1, depth, index, under)
+                entries[node.get_id()] = (keys[node], *self._optimal_node_positions[node])
+        except KeyError:
+            #a task below was placed without being marked
+            logging.warning("Layout cache key missing, taking every entry")
+            return self.layout_entries()
+        self._layout_changed = set()
+        return entries
+
+    def mark_layout_changed(self, moved: Iterable[Node], placed_under: Node|None=None) -> None:
+        """Marks the layout cache entries of the moved tasks as changed, and of placed_under and every task it is placed under, whose subtrees changed"""
+        changed: set[Node]|None = self._layout_changed
+        if changed is None:
+            return
+        changed.update(moved)
+        node: Node|None = placed_under
+        while node is not None:
+            changed.add(node)
+            placement: tuple[Node, int, int]|None = self._placed_under.get(node)
+            node = placement[0] if placement is not None else None
+        return
+
+    def clear_canvas(self) -> None:
         self._canvas.delete("all")
-        self._id_to_node = {}
+        self._layout_changed = None
         self._optimal_node_positions = {} #each tuple consists of (x, y)
+        self._placed_under = {}
         self._node_positions = {} #each tuple consists of (x, y, circle_id, text_id)
         self._line_positions = {} #each tuple consists of (xp, yp, xc, yc)
         self._node_to_child_line_ids = {}
@@ -111,11 +348,80 @@ class Gui:
         self._selected_child_line_ids = set()
         self._selected_parent_line_ids = set()
         self._selected_node = None
+        self._focused_node = None
+        return
+
+    def is_shown(self, node: Node) -> bool:
+        return self._shown is None or node in self._shown
+
+    def shows_part(self) -> bool:
+        """Whether only part of the graph is loaded or shown, so indexes over the whole graph must not be built"""
+        return self._shown is not None or not self._graph.is_loaded()
+
+    def handle_double_click(self, event: tk.Event) -> None:
+        node: Node|None = self.find_node_at(*self.event_to_canvas_coords(event))
+        if node is not None:
+            self.toggle_expanded(node)
+        return
+
+    def handle_toggle_expanded(self):
+        if self._selected_node:
+            self.toggle_expanded(self._selected_node)
+            self._selected_node = None
+        return
+
+    def toggle_expanded(self, node: Node) -> None:
+        """Shows or hides node's descendants; showing them loads node's children if they are still in the database"""
+        if node in self._collapsed or not all(map(self.is_shown, node.get_children())):
+            self._collapsed.discard(node)
+            #one level at a time, so exploring a branch never loads the rest of it
+            hidden: list[Node] = [c for c in node.get_children() if c not in self._node_positions]
+            self._collapsed.update(hidden)
+            if self._shown is not None:
+                self._shown.update(hidden)
+        else:
+            self._collapsed.add(node)
+        self.redraw_tree()
+        return
+
+    def create_search_bar(self):
+        self._search_frame: tk.Frame = tk.Frame(self._window)
+        self._search_frame.pack(side=tk.TOP, fill=tk.X)
+        self._search_entry: tk.Entry = tk.Entry(self._search_frame)
+        self._search_entry.pack(side=tk.TOP, fill=tk.X)
+        self._search_list: tk.Listbox = tk.Listbox(self._search_frame, height=SEARCH_LIMIT)
+        self._search_list.pack(side=tk.TOP, fill=tk.X)
+
+        #searches on every keystroke, Return jumps to the best match
+        self._search_entry.bind("<KeyRelease>", self.update_search)
+        self._search_entry.bind("<Return>", self.select_first_search_result)
+        self._search_list.bind("<<ListboxSelect>>", self.select_search_result)
+        return
+
+    def update_search(self, event: tk.Event|None = None) -> None:
+        query: str = self._search_entry.get()
+        if self._store is not None and self._store.get_graph() is self._graph and not self._graph.is_loaded():
+            #an index would load the whole database, ask it for the matches instead
+            self._search_results = self._store.search(query, SEARCH_LIMIT)
+        else:
+            self._search_results = self._graph.get_index(SearchIndex).search(query, SEARCH_LIMIT)
+        self._search_list.delete(0, tk.END)
+        for node in self._search_results:
+            self._search_list.insert(tk.END, node.get_value())
+        return
+
+    def select_search_result(self, event: tk.Event|None = None) -> None:
+        selection = self._search_list.curselection()
+        if selection:
+            self.focus_node(self._search_results[selection[0]])
+        return
+
+    def select_first_search_result(self, event: tk.Event|None = None) -> None:
+        self.update_search()
+        if self._search_results:
+            self.focus_node(self._search_results[0])
+        return
 
-        self._tree = root_node
-        self.calculate_node_positions()
-        self.draw_tree(self._canvas)
-    
     def handle_canvas_right_click(self, event: tk.Event):
         clicked_items = self._canvas.find_overlapping(event.x, event.y, event.x, event.y)
         circle_ids = [self._node_positions[n][2] for n in self._node_positions.keys()]
@@ -128,6 +434,12 @@ class Gui:
         self._canvas_menu: tk.Menu = tk.Menu(self._window, tearoff=0)
         self._canvas_menu.add_command(label="Save Tree", command=self.save_tree_to_file)
         self._canvas_menu.add_command(label="Load Tree", command=self.load_tree_from_file)
+        self._canvas_menu.add_command(label="Load Part of Tree", command=self.load_part_of_tree_from_file)
+        self._canvas_menu.add_command(label="Import Tasks", command=self.import_tasks_from_file)
+        self._canvas_menu.add_command(label="Export Tree", command=self.export_tree_to_file)
+        self._canvas_menu.add_command(label="Spiral Layout", command=lambda: self.set_layout_engine("spiral"))
+        self._canvas_menu.add_command(label="Tidy Tree Layout", command=lambda: self.set_layout_engine("tidy"))
+        self._canvas_menu.add_command(label="Force Layout", command=lambda: self.set_layout_engine("force"))
         return
 
     def save_tree_to_file(self):
@@ -136,35 +448,194 @@ class Gui:
             return
 
         file_path = filedialog.asksaveasfilename(
-            defaultextension=".pkl",
-            filetypes=[("Pickle Files", "*.pkl"), ("All Files", "*.*")]
+            defaultextension=".tasks",
+            filetypes=[("Task Files", "*.tasks"), ("Task Databases", "*" + STORE_SUFFIX), ("All Files", "*.*")]
         )
-        if file_path:
-            with open(file_path, "wb") as f:
-                pickle.dump(self._tree, f)
+        if file_path and file_path.endswith(STORE_SUFFIX):
+            self.save_tree_to_store(file_path)
+        elif file_path:
+            journal: Journal|None = self._journal
+            if journal is not None and journal.get_graph() is self._graph and journal.get_path() == file_path:
+                #saving again to the same file only appends what changed
+                _ = journal.set_layout(self.changed_layout_entries())
+                count: int = journal.save()
+                print(f"Tree saved to {file_path} ({count} changes)")
+                return
+            if journal is not None:
+                journal.close()
+            if self._store is not None:
+                self._store.detach()
+                self._store = None
+            #the graph carries its id allocator, so ids are not reused after loading
+            self._journal = Journal.create(self._graph, file_path, self.layout_entries())
+            self._autosave.set_path(file_path + AUTOSAVE_SUFFIX)
             print(f"Tree saved to {file_path}")
         else:
             print(f"file path does not exist: {file_path}")
         return
 
-    def load_tree_from_file(self):
+    def get_layout_positions(self) -> dict[int, tuple[float, float]]:
+        """Returns the layout position of each drawn task by id; unlike the drawn ones they do not move with panning and zooming, but they do with dragging."""
+        return {n.get_id(): xy for n, xy in self._optimal_node_positions.items()}
+
+    def save_tree_to_store(self, file_path: str) -> None:
+        store: TaskStore|None = self._store
+        if store is not None and store.get_graph() is self._graph and store.get_path() == file_path:
+            store.set_layout(self.changed_layout_entries())
+            count: int = store.save()
+            print(f"Tree saved to {file_path} ({count} changes)")
+            return
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if store is not None:
+            store.detach()
+        self._store = TaskStore.create(self._graph, file_path)
+        self._store.set_layout(self.layout_entries())
+        _ = self._store.save()
+        #a database is saved in place at O(changes), there is no snapshot to autosave
+        self._autosave.set_path(None)
+        print(f"Tree saved to {file_path}")
+        return
+
+    def load_part_of_tree_from_file(self) -> None:
+        spec: str|None = simpledialog.askstring("Load Part of Tree", SLICE_PROMPT)
+        if spec is None:
+            return
+        try:
+            options: dict[str, Any] = parse_slice_spec(spec)
+        except ValueError as e:
+            print(f"Could not read {spec!r}: {e}")
+            return
+        self.load_tree_from_file(**options)
+        return
+
+    def load_tree_from_file(self, root_id: int|None = None, max_depth: int|None = None, max_nodes: int|None = None,
+                            box: tuple[float, float, float, float]|None = None):
+        """
+        Loads a tree, or with any of the arguments only part of it: the tasks below root_id
+        (the file's root by default), at most max_depth levels and max_nodes tasks, and with
+        a box only through tasks whose saved position lies in it. Databases open with
+        EXPLORE_DEPTH levels if nothing is given. Tasks at the edge can be expanded later.
+        """
         file_path = filedialog.askopenfilename(
-            defaultextension=".pkl",
-            filetypes=[("Pickle Files", "*.pkl"), ("All Files", "*.*")]
+            defaultextension=".tasks",
+            filetypes=[("Task Files", "*.tasks"), ("Task Databases", "*" + STORE_SUFFIX), ("Pickle Files", "*.pkl"), ("All Files", "*.*")]
         )
         if file_path:
+            #task files open lazily with their journal replayed, databases load as they are explored,
+            #pickles from older versions are still read
             with open(file_path, "rb") as f:
-                self._tree = pickle.load(f)
+                task_file: bool = is_task_file(f)
+            database: bool = not task_file and is_task_store(file_path)
+            #a crash or a quit without saving leaves changes only in the autosave
+            recovered: str|None = recovery_path(file_path) if not database else None
+            if recovered is not None and not messagebox.askyesno(
+                    "Recover Autosave", f"{recovered} has changes that were not saved to {file_path}. Open them instead?"):
+                recovered = None
+            try:
+                journal: Journal|None = Journal.open(file_path) if task_file and recovered is None else None
+                store: TaskStore|None = TaskStore.open(file_path) if database else None
+                if recovered is not None:
+                    #not tied to file_path any more, the next save to it writes the whole tree
+                    loaded: TaskGraph = open_task_file(recovered)
+                elif journal is not None:
+                    loaded = journal.get_graph()
+                elif store is not None:
+                    loaded = store.get_graph()
+                else:
+                    loaded = load_graph(file_path)
+            except ValueError as e:
+                print(f"Could not load {file_path}: {e}")
+                return
+            root: Node|None = loaded.get_root() if root_id is None else loaded.get_node_by_id(root_id)
+            if root is None:
+                if journal is not None:
+                    journal.close()
+                if store is not None:
+                    store.close()
+                print(f"No tree found in {file_path}")
+                return
 
-            print(f"Tree loaded from {file_path}")
-            self.rebuild_canvas_from_tree(self._tree)
+            self.close_files()
+            self._journal = journal
+            self._store = store
+            #the first layout of the loaded tree reuses the positions saved with it
+            self._saved_layout = journal.get_layout() if journal is not None else store.get_layout() if store is not None else None
+            self._autosave.set_path(file_path + AUTOSAVE_SUFFIX if store is None else None)
+
+            keep: Callable[[Node], bool]|None = None
+            saved: Mapping[int, CacheEntry]|None = self._saved_layout
+            if box is not None and not isinstance(saved, SavedLayout):
+                print(f"{file_path} is not a task file or database with saved positions, loading without the box")
+            elif box is not None:
+                inside: set[int] = saved.ids_in_box(*box)
+                keep = lambda n: n.get_id() in inside
+            if store is not None and max_depth is None and max_nodes is None:
+                max_depth = EXPLORE_DEPTH
+            part: tuple[list[Node], list[Node]]|None = None
+            if max_depth is not None or max_nodes is not None or keep is not None:
+                part = loaded.load_slice(root, max_depth, max_nodes, keep)
+            if recovered is not None:
+                print(f"Recovered unsaved changes from {recovered}")
+            print(f"Tree loaded from {file_path}" if part is None else f"{len(part[0])} tasks loaded from {file_path}")
+            self.rebuild_canvas_from_tree(root, part)
         else:
             print(f"file path does not exist: {file_path}")
 
+    def import_tasks_from_file(self):
+        file_path = filedialog.askopenfilename(
+            filetypes=[("Task Lists", "*.jsonl *.csv"), ("All Files", "*.*")]
+        )
+        if not file_path:
+            print(f"file path does not exist: {file_path}")
+            return
+        importer = import_csv if file_path.lower().endswith(".csv") else import_jsonl
+        try:
+            graph: TaskGraph = importer(file_path, progress=lambda count, _: logging.info("Imported %d records", count))
+        except ValueError as e:
+            print(f"Could not import {file_path}: {e}")
+            return
+        root: Node|None = graph.get_root()
+        if root is None:
+            print(f"No tasks found in {file_path}")
+            return
+        print(f"Tasks imported from {file_path}")
+        #the canvas shows one tree, so say which top-level tasks are left out
+        hidden: list[Node] = [n for n in graph.get_roots() if n is not root]
+        if hidden:
+            named: str = ", ".join(f"{n.get_value()!r} (id {n.get_id()})" for n in hidden[:MAX_LISTED_ROOTS])
+            more: str = f" and {len(hidden) - MAX_LISTED_ROOTS} more" if len(hidden) > MAX_LISTED_ROOTS else ""
+            print(f"{file_path} has {len(hidden) + 1} top-level tasks, showing {root.get_value()!r}; not shown: {named}{more}")
+        self.rebuild_canvas_from_tree(root)
+        return
+
+    def export_tree_to_file(self) -> None:
+        """Exports the whole graph as DOT, GraphML or JSON, with the layout positions of the tasks that were drawn."""
+        if not self._tree:
+            print("No tree to export.")
+            return
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("JSON", "*.json"), ("GraphML", "*.graphml"), ("Graphviz", "*.dot *.gv"), ("All Files", "*.*")]
+        )
+        if not file_path:
+            print(f"file path does not exist: {file_path}")
+            return
+        try:
+            size: int = export_graph(self._graph, file_path, self.get_layout_positions())
+        except (OSError, ValueError) as e:
+            print(f"Could not export to {file_path}: {e}")
+            return
+        print(f"Tree exported to {file_path} ({size / 2**20:.1f}MB)")
+        return
+
     def create_context_menu(self):
         self.context_menu: tk.Menu = tk.Menu(self._window, tearoff=0)
         #self.context_menu.add_command(label="Delete Singular Node", command=self.handle_delete_single_node)
         self.context_menu.add_command(label="Add Child", command=self.prompt_add_child)
+        self.context_menu.add_command(label="Toggle Completed", command=self.handle_toggle_completed)
+        self.context_menu.add_command(label="Expand / Collapse", command=self.handle_toggle_expanded)
         self.context_menu.add_command(label="Delete Node and Descendants", command=self.handle_delete_node_and_descendants)
         return
 
@@ -178,10 +649,14 @@ class Gui:
             value = simpledialog.askstring("New Task", "Enter name for the new task:")
             if value is not None:
                 child = Node(value)
-                added = self._selected_node.add_child(child)
+                parent: Node = self._selected_node #a redraw clears the selection
+                added = parent.add_child(child)
                 if added:
                     _ = self.add_node(child)
-                    self.draw_branch_and_child(self._canvas, self._selected_node, child, 0, 100)
+                    if self._shown is not None:
+                        self._shown.add(child)
+                    _ = self.place_new_child(parent, child)
+                    self.recolor_with_ancestors(parent)
             self._selected_node = None
 
     def handle_delete_single_node(self):
@@ -190,6 +665,37 @@ class Gui:
             self._selected_node = None
         return
 
+    def handle_toggle_completed(self):
+        if self._selected_node:
+            self.toggle_completed(self._selected_node)
+            self._selected_node = None
+        return
+
+    def toggle_completed(self, node: Node) -> None:
+        _ = node.set_completed(not node.is_completed())
+        self.recolor_with_ancestors(node)
+        return
+
+    def node_color(self, node: Node) -> str:
+        if self.shows_part():
+            #rolling progress up needs every descendant, which would read the rest of the file
+            return progress_color(100.0 if node.is_completed() else 0.0)
+        return progress_color(self._graph.get_index(ProgressIndex).percent_complete(node))
+
+    def recolor_with_ancestors(self, node: Node) -> None:
+        """Updates the fill of node and its ancestors, the only nodes whose progress can change"""
+        seen: set[Node] = {node}
+        stack: list[Node] = [node]
+        while stack:
+            curr: Node = stack.pop()
+            if curr in self._node_positions:
+                self._canvas.itemconfig(self._node_positions[curr][2], fill=self.node_color(curr))
+            for parent in curr.get_parents():
+                if parent not in seen:
+                    seen.add(parent)
+                    stack.append(parent)
+        return
+
     def handle_delete_node_and_descendants(self):
         if self._selected_node:
             self.delete_node_and_descendants(self._selected_node)
@@ -198,16 +704,52 @@ class Gui:
 
     def delete_node_and_descendants(self, n: Node) -> None:
         """Deletes Node and Descendants from Canvas and Tree"""
+        parents: list[Node] = n.get_parents()
+        doomed: list[Node] = n.delete_subtree()
+        self._collapsed.difference_update(doomed)
+        if self._shown is not None:
+            self._shown.difference_update(doomed)
+        self.delete_nodes_from_canvas(doomed)
+        for node in doomed:
+            self._placed_under.pop(node, None)
+        redraw: bool = not self.lays_out_incrementally() or self._background_layout.is_running()
+        if redraw:
+            self.redraw_tree()
+        for parent in parents:
+            if not redraw:
+                self.relayout_children(parent)
+            self.recolor_with_ancestors(parent)
+        return
 
-        def recursive_remove(node: Node) -> None:
-            children_lst_copy = node.get_children().copy()
-            for child in children_lst_copy:
-                recursive_remove(child)
-            self.delete_node_from_canvas(node)
-            node.remove_from_tree()
-            return
-
-        recursive_remove(n)
+    def delete_nodes_from_canvas(self, nodes: list[Node]) -> None:
+        """Deletes Nodes and Surrounding Lines from Canvas with a single canvas call"""
+        doomed: set[Node] = set(nodes)
+        if self._layout_changed is not None:
+            self._layout_changed -= doomed
+        item_ids: list[int] = []
+        line_ids: set[int] = set()
+        for node in nodes:
+            line_ids.update(self._node_to_parent_line_ids.pop(node, ()))
+            line_ids.update(self._node_to_child_line_ids.pop(node, ()))
+            if node in self._node_positions:
+                _, _, c_id, t_id = self._node_positions.pop(node)
+                item_ids.append(c_id)
+                item_ids.append(t_id)
+            self._optimal_node_positions.pop(node, None)
+            self._layout_keys.pop(node, None)
+
+        #lines from surviving parents are also referenced by those parents
+        for l_id in line_ids:
+            p, c = self._line_ids_to_nodes.pop(l_id)
+            if p not in doomed:
+                self._node_to_child_line_ids[p].discard(l_id)
+            if c not in doomed:
+                self._node_to_parent_line_ids[c].discard(l_id)
+            del self._line_positions[l_id]
+        item_ids.extend(line_ids)
+
+        if item_ids:
+            self._canvas.delete(*item_ids)
         return
 
     def delete_node_from_canvas(self, node: Node) -> None:
@@ -245,8 +787,6 @@ class Gui:
 
         if node in self._optimal_node_positions:
             del self._optimal_node_positions[node]
-        
-        del self._id_to_node[node.get_id()]
 
         #node.remove_from_tree()
         #del node
@@ -299,37 +839,15 @@ class Gui:
 
     def zoom_in(self, event: tk.Event):
         x, y = self.event_to_canvas_coords(event)
-        factor = ZOOM_FACTOR
-        #updating internal tracker of scale factor
-        self._scale_factor *= factor
-        #scale all objects
-        self._canvas.scale("all", x, y, factor, factor)
-
-        # Update node positions
-        for node, (nx, ny, cid, tid) in self._node_positions.items():
-            dx = nx - x
-            dy = ny - y
-            new_x = x + dx * factor
-            new_y = y + dy * factor
-            self._node_positions[node] = (new_x, new_y, cid, tid)
-
-        # Update line positions
-        for line_id, (x_p, y_p, x_c, y_c) in self._line_positions.items():
-            dx_p = x_p - x
-            dy_p = y_p - y
-            dx_c = x_c - x
-            dy_c = y_c - y
-            new_x_p = x + dx_p * factor
-            new_y_p = y + dy_p * factor
-            new_x_c = x + dx_c * factor
-            new_y_c = y + dy_c * factor
-            self._line_positions[line_id] = (new_x_p, new_y_p, new_x_c, new_y_c)
-        
+        self.zoom_canvas(x, y, ZOOM_FACTOR)
         return
 
     def zoom_out(self, event: tk.Event):
         x, y = self.event_to_canvas_coords(event)
-        factor = 1 / ZOOM_FACTOR
+        self.zoom_canvas(x, y, 1 / ZOOM_FACTOR)
+        return
+
+    def zoom_canvas(self, x: float, y: float, factor: float) -> None:
         #updating internal tracker of scale factor
         self._scale_factor *= factor
         #scale all objects
@@ -357,6 +875,23 @@ class Gui:
         
         return
 
+    def focus_node(self, node: Node) -> None:
+        """Zooms back in if zoomed out, centres the view on node and outlines it"""
+        if node not in self._node_positions:
+            return
+        x, y = self._node_positions[node][:2]
+        if self._scale_factor < 1.0:
+            self.zoom_canvas(x, y, 1.0 / self._scale_factor)
+        center_x: float = float(self._canvas.canvasx(self._canvas.winfo_width() / 2))
+        center_y: float = float(self._canvas.canvasy(self._canvas.winfo_height() / 2))
+        self.pan_canvas(center_x - x, center_y - y)
+
+        if self._focused_node in self._node_positions:
+            self._canvas.itemconfig(self._node_positions[self._focused_node][2], outline="black", width=1)
+        self._canvas.itemconfig(self._node_positions[node][2], outline="orange", width=3)
+        self._focused_node = node
+        return
+
     def add_nodes(self):
         visited: set[Node] = set()
         stack: deque[Node] = deque()
@@ -366,65 +901,111 @@ class Gui:
         while stack:
             curr = stack.pop()
             _ = self.add_node(curr)
+            if curr in self._collapsed:
+                continue
             for child in curr.get_children():
-                if child not in visited:
+                if child not in visited and self.is_shown(child):
                     visited.add(child)
                     stack.append(child)
         return
 
 
     def add_node(self, node: Node) -> Node:
-        if node.get_id() in self._id_to_node:
-            assert self._id_to_node[node.get_id()] == node, "Attempting to add 2 different nodes with the same ID!"
-            return node
-        self._id_to_node[node.get_id()] = node
-        return node 
-
-    def calculate_node_positions(self):
-        """Calculates node positions with a parent-relative spiral effect."""
-
-        def calculate_child_positions(parent_node: Node, parent_x: float, parent_y: float, level: int, visited: set[Node], start_angle_offset: float = 0):
-            num_children = len(parent_node.get_children())
-            if num_children == 0:
-                return
-
-            # Calculate the base angle step for this parent
-            angle_step = ANGLE_INCREMENT
-
-            for i, child_node in enumerate(parent_node.get_children()):
-                if child_node not in visited:
-                    logging.debug("finding location of: %s", child_node.get_value())
-                    visited.add(child_node)
-                    # Calculate angle relative to the parent
-                    angle = i * angle_step + start_angle_offset
-
-                    # Calculate distance from parent (can be constant or vary)
-                    distance = BASE_DISTANCE * (DISTANCE_LEVEL_FACTOR**level) # You could make this depend on the level
-
-                    # Convert polar coordinates (relative to parent) to Cartesian coordinates
-                    child_x = int(parent_x + distance * math.cos(angle))
-                    child_y = int(parent_y + distance * math.sin(angle))
-
-                    _ = self.add_node(child_node)
-                    self._optimal_node_positions[child_node] = (child_x, child_y)
+        #the graph indexes the node by id, see TaskGraph.add_node
+        return self._graph.add_node(node)
+
+    def get_layout_engine(self) -> str:
+        return self._layout_engine
+
+    def set_layout_engine(self, name: str) -> None:
+        """Lays the tree out again with one of src.layout.LAYOUT_ENGINES"""
+        if name not in LAYOUT_ENGINES:
+            raise ValueError(f"Unknown layout {name!r}, use one of {', '.join(LAYOUT_ENGINES)}.")
+        if name != self._layout_engine:
+            self._layout_engine = name
+            self.redraw_tree()
+        return
 
-                    # Introduce a spiral effect by offsetting the starting angle for the next level
-                    next_level_angle_offset = start_angle_offset + level * SPIRAL_FACTOR
+    def lays_out_incrementally(self) -> bool:
+        """Whether an edit only moves the tasks placed under the edited one, see place_new_child; in a tidy tree it can move whole subtrees and in a force layout every task"""
+        return self._layout_engine in SUBTREE_ENGINES
 
-                    calculate_child_positions(child_node, child_x, child_y, level + 1, visited, next_level_angle_offset)
-            return
+    def calculate_node_positions(self):
+        """Calculates node positions with the selected layout engine, the spiral one by default, see src.layout"""
+        levels = spanning_tree(self._tree, self.is_shown, self._collapsed)
+        nodes, coords = LAYOUT_ENGINES[self._layout_engine](levels, *self.root_position())
+        for node in nodes:
+            _ = self.add_node(node)
+        self._optimal_node_positions = dict(zip(nodes, zip(coords[0::2], coords[1::2])))
+        self._placed_under = placements(levels)
+        return
 
-        # Position the root node
-        root_x: float = WIDTH/2#200
-        root_y: float = HEIGHT/2#200
-        _ = self.add_node(self._tree)
-        self._optimal_node_positions[self._tree] = (root_x, root_y)
-        visited_nodes: set[Node] = set()
-        visited_nodes.add(self._tree)
+    def root_position(self) -> tuple[float, float]:
+        #a tidy tree hangs down from the root, the other layouts grow around it
+        return WIDTH/2, 2 * NODE_RADIUS if self._layout_engine == "tidy" else HEIGHT/2
+
+    def place_new_child(self, parent: Node, child: Node) -> bool:
+        """Lays out and draws a child just added as the last child of parent; returns False if parent's children are not drawn"""
+        if self._background_layout.is_running():
+            #the layout running misses the child
+            self.redraw_tree()
+            return True
+        if parent not in self._node_positions or parent in self._collapsed or child in self._placed_under:
+            return False
+        if not self.lays_out_incrementally():
+            self.redraw_tree()
+            return True
+        index: int = len(parent._children) - 1
+        depth: int = self._placed_under[parent][2] + 1 if parent in self._placed_under else 1
+        parent_x, parent_y = self._optimal_node_positions[parent]
+        x, y = child_position(parent_x, parent_y, depth, index)
+        self._optimal_node_positions[child] = (x, y)
+        self._placed_under[child] = (parent, index, depth)
+        self.mark_layout_changed((), child)
+        #appending a child moves no sibling, so only the new task is drawn
+        self.draw_branch_and_child(self._canvas, parent, child, (x - parent_x) * self._scale_factor, (y - parent_y) * self._scale_factor)
+        return True
+
+    def relayout_children(self, parent: Node) -> None:
+        """
+        After children of parent were removed, moves the ones placed under it whose index
+        changed, with everything placed under them; nothing else in the layout depends on
+        those indexes. Only the canvas items of the moved tasks are updated.
+        """
+        old: dict[Node, tuple[float, float]] = {}
+        for index, child in enumerate(parent._children):
+            placement: tuple[Node, int, int]|None = self._placed_under.get(child)
+            if placement is not None and placement[0] is parent and placement[1] != index:
+                self._placed_under[child] = (parent, index, placement[2])
+                old.update(relayout_subtree(child, self._optimal_node_positions, self._placed_under))
+        #parent lost children, which changes its key even if no sibling moved
+        self.mark_layout_changed(old, parent)
+        self.move_drawn_nodes(old)
+        return
 
-        # Start the recursive positioning from the root
-        calculate_child_positions(self._tree, root_x, root_y, 1, visited_nodes, 0)
-        print(self._optimal_node_positions.keys())
+    def move_drawn_nodes(self, old: dict[Node, tuple[float, float]]) -> None:
+        """Moves the drawn tasks whose layout positions changed from old, and the ends of their lines, by the change at the current zoom"""
+        for node, (old_x, old_y) in old.items():
+            if node not in self._node_positions:
+                continue
+            new_x, new_y = self._optimal_node_positions[node]
+            dx: float = (new_x - old_x) * self._scale_factor
+            dy: float = (new_y - old_y) * self._scale_factor
+            if not dx and not dy:
+                continue
+            x, y, circle_id, text_id = self._node_positions[node]
+            self._canvas.move(circle_id, dx, dy)
+            self._canvas.move(text_id, dx, dy)
+            x, y = x + dx, y + dy
+            self._node_positions[node] = (x, y, circle_id, text_id)
+            for line_id in self._node_to_parent_line_ids.get(node, ()):
+                x_p, y_p, _, _ = self._line_positions[line_id]
+                self._line_positions[line_id] = (x_p, y_p, x, y)
+                self._canvas.coords(line_id, x_p, y_p, x, y)
+            for line_id in self._node_to_child_line_ids.get(node, ()):
+                _, _, x_c, y_c = self._line_positions[line_id]
+                self._line_positions[line_id] = (x, y, x_c, y_c)
+                self._canvas.coords(line_id, x, y, x_c, y_c)
         return
 
     def draw_tree(self, canvas: tk.Canvas) -> None:
@@ -439,8 +1020,10 @@ class Gui:
         parent: Node
         while parent_queue:
             parent = parent_queue.popleft()
+            if parent in self._collapsed:
+                continue
             for child in parent.get_children():
-                if child not in nodes_visited:
+                if child not in nodes_visited and self.is_shown(child):
                     nodes_visited.add(child)
                     parent_queue.append(child)
                     dx = self._optimal_node_positions[child][0] - self._optimal_node_positions[parent][0]
@@ -453,13 +1036,11 @@ class Gui:
         y1: float = y - NODE_RADIUS
         x2: float = x + NODE_RADIUS
         y2: float = y + NODE_RADIUS
-        circle_id: int = canvas.create_oval(x1, y1, x2, y2, fill="blue", outline="black", tags=(str(node.get_id()), "circle"))
+        circle_id: int = canvas.create_oval(x1, y1, x2, y2, fill=self.node_color(node), outline="black", tags=(str(node.get_id()), "circle"))
         text_id: int = canvas.create_text(x, y, text=node.get_value(), fill="white", font=("Arial", 6), tags=(str(node.get_id()), "text"))
         self._node_positions[node] = (x, y, circle_id, text_id)
         self._canvas.tag_bind(circle_id, "<Button-3>", lambda event, n=node: self.show_context_menu(event, n))
 
-        logging.info("Drawing Node: %d", node.get_id())
-        logging.debug("Position: %d,%d, Circle_Id: %d, Text_Id: %d", x, y, circle_id, text_id)
 
     def draw_branch_and_child(self, canvas: tk.Canvas, parent_node: Node, child_node: Node, dx: float, dy: float) -> None:
         x_p: float; y_p: float
@@ -483,9 +1064,6 @@ class Gui:
 
         self._line_positions[line_id] = (x_p, y_p, x_c, y_c)
 
-        logging.debug("node to child line ids %s", str(self._node_to_child_line_ids))
-        logging.debug("node to parent line ids %s", str(self._node_to_parent_line_ids))
-
         canvas.tag_lower("line", "circle")
 
 
@@ -539,7 +1117,10 @@ class Gui:
             logging.info("Starting drag")
             logging.debug("Selected Node value: %s", selected_node.get_value())
             self._selected_nodes.add(selected_node)
-            children_r = selected_node.get_children_r()
+            if not self.shows_part():
+                children_r = self._graph.get_index(ReachabilityIndex).descendants(selected_node)
+            else:
+                children_r = self.drawn_descendants(selected_node)
             for child in children_r:
                 self._selected_nodes.add(child)
 
@@ -552,6 +1133,22 @@ class Gui:
         else:
             logging.info("No Nodes to drag")
 
+    def drawn_descendants(self, node: Node) -> list[Node]:
+        """Descendants of node that are on the canvas, found without loading hidden parts of the graph"""
+        seen: set[Node] = {node}
+        stack: list[Node] = [node]
+        found: list[Node] = []
+        while stack:
+            curr: Node = stack.pop()
+            if curr in self._collapsed:
+                continue
+            for child in curr.get_children():
+                if child not in seen and self.is_shown(child):
+                    seen.add(child)
+                    found.append(child)
+                    stack.append(child)
+        return found
+
     def drag(self, event: tk.Event) -> None:
         """Drag the selected node."""
         if len(self._selected_nodes) > 0:
@@ -584,6 +1181,11 @@ class Gui:
 
                     # Update the stored position
                     self._node_positions[selected_node] = (new_x, new_y, circle_id, text_id)
+                    #and the layout position, which is saved, undoing the zoom
+                    if selected_node in self._optimal_node_positions:
+                        layout_x, layout_y = self._optimal_node_positions[selected_node]
+                        self._optimal_node_positions[selected_node] = (layout_x + dx / self._scale_factor, layout_y + dy / self._scale_factor)
+                        self.mark_layout_changed((selected_node,))
 
             x_p: float; y_p: float; x_c: float; y_c: float 
             # Child Lines
@@ -624,5 +1226,25 @@ class Gui:
         else:
             logging.info("No Nodes dragged")
 
+    def autosave_finished(self, path: str, error: Exception|None) -> None:
+        if error is not None:
+            print(f"Autosave to {path} failed: {error}")
+        return
+
+    def close_files(self) -> None:
+        """Closes the journal or database the tree was saved to or opened from; changes not saved yet are dropped."""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+        return
+
     def run(self) -> None:
+        self._autosave.start()
         self._window.mainloop()
+        self._background_layout.shutdown()
+        #let a save that is still being written finish before exiting
+        self._autosave.wait()
+        self.close_files()
@@ -0,0 +1,174 @@
+from array import array
+from datetime import date, time
+from typing import Any, BinaryIO, Callable, Iterable, Iterator
+import csv
+import io
+import json
+import logging
+
+from src.task_graph import TaskGraph
+
+PROGRESS_EVERY: int = 100_000 #records between progress reports
+
+TaskRecord = tuple[int, str, list[int], date|None, time|None, bool] #(id, value, parent ids, due date, due time, completed)
+ProgressCallback = Callable[[int, int], None] #called with (records read, bytes read)
+
+
+def read_jsonl(file: BinaryIO) -> Iterator[tuple[int, dict[str, Any]]]:
+    """Yields (line number, object) for every non-blank line of a JSON Lines file."""
+    for number, line in enumerate(file, start=1):
+        if line.strip():
+            try:
+                yield number, json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Line {number}: invalid JSON ({e.msg}).") from None
+    return
+
+
+def read_csv(file: BinaryIO) -> Iterator[tuple[int, dict[str, Any]]]:
+    """
+    Yields (line number, row) for every row of a CSV file with a header line; parents are
+    separated by ';'. The line number is the last line of the row, which quoted values
+    with line breaks spread over several lines.
+    """
+    text = io.TextIOWrapper(file, encoding="utf-8", newline="")
+    reader = csv.DictReader(text)
+    for row in reader:
+        parents: str = row.pop("parents", None) or ""
+        row["parents"] = [p for p in parents.split(";") if p.strip()]
+        yield reader.line_num, row
+    #leave the binary file open for the caller
+    _ = text.detach()
+    return
+
+
+def parse_record(raw: dict[str, Any], number: int) -> TaskRecord:
+    """
+    Converts one raw record into typed fields. Recognised keys are id, value, parents
+    (a list, or a single id), or a single parent, due_date (ISO date), due_time
+    (HH:MM[:SS]) and completed. Empty strings count as missing, so CSV and JSON input
+    parse the same way.
+    """
+    try:
+        task_id: int = int(raw["id"])
+        value: str = str(raw["value"])
+        parents: Any = raw.get("parents")
+        if parents is None:
+            parent: Any = raw.get("parent")
+            parents = [] if parent in (None, "") else [parent]
+        elif isinstance(parents, int) and not isinstance(parents, bool):
+            parents = [parents]
+        elif not isinstance(parents, list):
+            #a string would otherwise be read one character at a time
+            raise ValueError(f"parents must be a list of ids or a single id, not {type(parents).__name__} {parents!r}.")
+        due_date: Any = raw.get("due_date") or None
+        due_time: Any = raw.get("due_time") or None
+        completed: Any = raw.get("completed") or False
+        if isinstance(completed, str):
+            completed = completed.strip().lower() in ("1", "true", "yes", "y")
+        return (
+            task_id,
+            value,
+            [int(p) for p in parents],
+            date.fromisoformat(due_date) if due_date is not None else None,
+            time.fromisoformat(due_time) if due_time is not None else None,
+            bool(completed),
+        )
+    except KeyError as e:
+        raise ValueError(f"Line {number}: missing field {e.args[0]}.") from None
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Line {number}: {e}") from None
+
+
+class GraphImporter:
+    """
+    Collects task records into flat columns and builds the graph with TaskGraph.from_columns.
+
+    Records can arrive in any order. An edge whose parent has been seen goes straight
+    into the edge columns; an edge to a parent that has not been seen yet waits in the
+    pending table under that parent's id and is moved over when the parent arrives.
+    Only the columns and the pending edges are kept, so memory grows with the graph,
+    not with the size of the input.
+    """
+
+    def __init__(self) -> None:
+        self._ids: array = array("q")
+        self._values: list[str] = []
+        self._due_dates: list[date|None] = []
+        self._due_times: list[time|None] = []
+        self._completed: list[bool] = []
+        self._seen: set[int] = set()
+        self._edge_parents: array = array("q")
+        self._edge_children: array = array("q")
+        self._pending: dict[int, list[int]] = {} #missing parent id -> ids of its children seen so far
+        self._num_pending: int = 0
+        return
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def pending_count(self) -> int:
+        """Number of edges still waiting for their parent."""
+        return self._num_pending
+
+    def add(self, record: TaskRecord) -> None:
+        task_id, value, parents, due_date, due_time, completed = record
+        if task_id in self._seen:
+            raise ValueError(f"Task id {task_id} appears more than once.")
+        self._seen.add(task_id)
+        self._ids.append(task_id)
+        self._values.append(value)
+        self._due_dates.append(due_date)
+        self._due_times.append(due_time)
+        self._completed.append(completed)
+
+        for parent in parents:
+            if parent in self._seen:
+                self._edge_parents.append(parent)
+                self._edge_children.append(task_id)
+            else:
+                self._pending.setdefault(parent, []).append(task_id)
+                self._num_pending += 1
+        waiting: list[int]|None = self._pending.pop(task_id, None)
+        if waiting is not None:
+            self._edge_parents.extend([task_id] * len(waiting))
+            self._edge_children.extend(waiting)
+            self._num_pending -= len(waiting)
+        return
+
+    def finish(self) -> TaskGraph:
+        """Builds the graph. Raises ValueError if some edges still point to tasks that never appeared."""
+        if self._pending:
+            missing: list[int] = list(self._pending)[:5]
+            raise ValueError(f"{self._num_pending} edges refer to {len(self._pending)} unknown parents, e.g. {missing}.")
+        graph: TaskGraph = TaskGraph.from_columns(
+            self._ids, self._values, self._edge_parents, self._edge_children,
+            due_dates=self._due_dates, due_times=self._due_times, completed=self._completed,
+        )
+        logging.info("Imported %d tasks and %d edges", len(self._ids), len(self._edge_parents))
+        return graph
+
+
+def import_records(file: BinaryIO, reader: Callable[[BinaryIO], Iterable[tuple[int, dict[str, Any]]]],
+                   progress: ProgressCallback|None=None) -> TaskGraph:
+    """Streams the records of file through reader and parse_record into a GraphImporter."""
+    importer = GraphImporter()
+    count: int = 0
+    for number, raw in reader(file):
+        importer.add(parse_record(raw, number))
+        count += 1
+        if progress is not None and count % PROGRESS_EVERY == 0:
+            progress(count, file.tell())
+    if progress is not None:
+        progress(count, file.tell())
+    return importer.finish()
+
+
+def import_jsonl(path: str, progress: ProgressCallback|None=None) -> TaskGraph:
+    with open(path, "rb") as f:
+        return import_records(f, read_jsonl, progress)
+
+
+def import_csv(path: str, progress: ProgressCallback|None=None) -> TaskGraph:
+    with open(path, "rb") as f:
+        return import_records(f, read_csv, progress)
@@ -0,0 +1,287 @@
+from datetime import date
+from typing import BinaryIO, Iterator, Mapping, MutableMapping
+import logging
+import os
+import struct
+import zlib
+
+from src.node import Node
+from src.task_graph import TaskGraph, GraphObserver, NO_DATE, time_to_seconds, seconds_to_time
+from src.task_file import TaskFile, open_task_file, read_generation, write_task_file
+from src.layout_cache import CacheEntry, SavedLayout
+
+JOURNAL_MAGIC: bytes = b"TASKJRNL"
+JOURNAL_VERSION: int = 1
+#magic, version, generation of the task file the records apply to
+JOURNAL_HEADER: struct.Struct = struct.Struct("<8sIq")
+#op code and payload length; the payload follows, then a CRC-32 of op, length and payload
+RECORD: struct.Struct = struct.Struct("<BI")
+CRC: struct.Struct = struct.Struct("<I")
+
+#compaction starts once the journal is this large and at least COMPACT_RATIO times the snapshot
+COMPACT_MIN_BYTES: int = 1 << 20
+COMPACT_RATIO: float = 0.5
+
+OP_ADD: int = 1 #id, created, due date, due time, completed, then the value
+OP_REMOVE: int = 2 #id
+OP_EDGE_ADD: int = 3 #parent id, child id
+OP_EDGE_REMOVE: int = 4 #parent id, child id
+OP_VALUE: int = 5 #id, then the value
+OP_DUE_DATE: int = 6 #id, date ordinal
+OP_DUE_TIME: int = 7 #id, seconds since midnight
+OP_COMPLETED: int = 8 #id, 0 or 1
+OP_LAYOUT: int = 9 #LAYOUT_ENTRY for each task whose layout cache entry changed
+
+ADD: struct.Struct = struct.Struct("<qdqqb")
+ID: struct.Struct = struct.Struct("<q")
+ID_PAIR: struct.Struct = struct.Struct("<qq")
+LAYOUT_ENTRY: struct.Struct = struct.Struct("<qqdd") #id, subtree key, x, y
+
+
+def journal_path(path: str) -> str:
+    return f"{path}.journal"
+
+
+def encode_record(op: int, payload: bytes) -> bytes:
+    head: bytes = RECORD.pack(op, len(payload))
+    return head + payload + CRC.pack(zlib.crc32(payload, zlib.crc32(head)))
+
+
+def read_records(file: BinaryIO) -> Iterator[tuple[int, bytes, int]]:
+    """
+    Yields (op, payload, end offset) for each intact record after the header. Stops at
+    the first torn or corrupt record, which is what a crash in the middle of an append
+    leaves behind; everything before it is valid.
+    """
+    while True:
+        head: bytes = file.read(RECORD.size)
+        if len(head) < RECORD.size:
+            return
+        op, length = RECORD.unpack(head)
+        payload: bytes = file.read(length)
+        crc: bytes = file.read(CRC.size)
+        if len(payload) < length or len(crc) < CRC.size or CRC.unpack(crc)[0] != zlib.crc32(payload, zlib.crc32(head)):
+            logging.warning("Journal ends in a damaged record at offset %d, ignoring the rest", file.tell())
+            return
+        yield op, payload, file.tell()
+
+
+def layout_record(payload: bytes) -> Iterator[tuple[int, CacheEntry]]:
+    """Yields the (id, cache entry) pairs of an OP_LAYOUT record."""
+    for node_id, key, x, y in LAYOUT_ENTRY.iter_unpack(payload):
+        yield node_id, (key, x, y)
+
+
+def apply_record(graph: TaskGraph, op: int, payload: bytes) -> None:
+    """Replays one record on graph. Raises ValueError if it refers to tasks the graph does not have."""
+    if op == OP_ADD:
+        node_id, created, day, seconds, done = ADD.unpack_from(payload)
+        node = Node(payload[ADD.size:].decode("utf-8"), date.fromordinal(day) if day != NO_DATE else None,
+                    seconds_to_time(seconds))
+        node._id = node_id
+        node._created_at = created
+        node._completed = bool(done)
+        _ = graph.add_node(node)
+        return
+    if op in (OP_EDGE_ADD, OP_EDGE_REMOVE):
+        parent: Node|None = graph.get_node_by_id(ID_PAIR.unpack_from(payload)[0])
+        child: Node|None = graph.get_node_by_id(ID_PAIR.unpack_from(payload)[1])
+        if parent is None or child is None:
+            raise ValueError(f"Journal edge {ID_PAIR.unpack_from(payload)} refers to a missing task.")
+        if op == OP_EDGE_REMOVE:
+            _ = parent.remove_child(child)
+        elif not parent.add_child(child):
+            raise ValueError(f"Journal edge {parent.get_id()} -> {child.get_id()} cannot be added.")
+        return
+
+    node_id: int = ID.unpack_from(payload)[0]
+    node = graph.get_node_by_id(node_id)
+    if node is None:
+        raise ValueError(f"Journal record {op} refers to missing task {node_id}.")
+    if op == OP_REMOVE:
+        node.remove_from_tree()
+    elif op == OP_VALUE:
+        _ = node.set_value(payload[ID.size:].decode("utf-8"))
+    elif op == OP_DUE_DATE:
+        _ = node.set_due_date(date.fromordinal(ID_PAIR.unpack(payload)[1]))
+    elif op == OP_DUE_TIME:
+        _ = node.set_due_time(seconds_to_time(ID_PAIR.unpack(payload)[1]))
+    elif op == OP_COMPLETED:
+        _ = node.set_completed(bool(ID_PAIR.unpack(payload)[1]))
+    else:
+        raise ValueError(f"Unknown journal record {op}.")
+    return
+
+
+class Journal(GraphObserver):
+    """
+    Append-only log of the changes made to a graph since it was last written to its task
+    file. Every change is encoded into a small record as it happens; save() appends the
+    records collected since the last save and syncs, so saving costs O(changes).
+
+    Once the journal outgrows the snapshot, save() compacts: the whole graph is written
+    to the task file with the next generation number and the journal starts over. A
+    journal whose generation does not match its task file was already folded in, so
+    a crash between the two steps does not apply any record twice.
+
+    The layout cache saved with the graph, see src.layout_cache, is kept the same way:
+    set_layout() records only the entries that changed, and compaction writes all of them.
+    An opened file's entries are only read from it as they are looked up, see SavedLayout.
+    """
+
+    def __init__(self, graph: TaskGraph, path: str, layout: MutableMapping[int, CacheEntry]|None=None) -> None:
+        """Journals graph, which must hold the contents of the task file at path plus the records of its journal, as must layout."""
+        self._graph: TaskGraph = graph
+        self._path: str = path
+        self._layout: MutableMapping[int, CacheEntry] = layout if layout is not None else {}
+        self._generation: int = read_generation(path)
+        self._snapshot_size: int = os.path.getsize(path)
+        self._pending: list[bytes] = []
+        self._file: BinaryIO = open(journal_path(path), "ab")
+        if self._file.tell() == 0:
+            self._write_header()
+            self._file.flush()
+        _ = graph.add_observer(self)
+        return
+
+    @classmethod
+    def create(cls, graph: TaskGraph, path: str, layout: Mapping[int, CacheEntry]|None=None) -> "Journal":
+        """Writes graph, with its layout cache entries, to a new task file at path and starts an empty journal for it."""
+        layout = dict(layout or {})
+        write_task_file(graph, path, 0, layout)
+        with open(journal_path(path), "wb") as f:
+            _ = f.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION, 0))
+        return cls(graph, path, layout)
+
+    @classmethod
+    def open(cls, path: str) -> "Journal":
+        """
+        Opens the task file at path and replays its journal, recovering the changes saved
+        after the last compaction. A damaged tail left by a crash is cut off.
+        """
+        graph: TaskGraph = open_task_file(path)
+        source: TaskFile = graph._source
+        layout: SavedLayout = source.layout()
+        generation: int = read_generation(path)
+        valid_end: int = 0
+        count: int = 0
+        if os.path.exists(journal_path(path)):
+            with open(journal_path(path), "rb") as f:
+                header: bytes = f.read(JOURNAL_HEADER.size)
+                if len(header) == JOURNAL_HEADER.size:
+                    magic, version, journal_generation = JOURNAL_HEADER.unpack(header)
+                    if magic != JOURNAL_MAGIC or version != JOURNAL_VERSION:
+                        raise ValueError(f"{journal_path(path)} is not a task journal.")
+                    if journal_generation == generation:
+                        valid_end = f.tell()
+                        for op, payload, end in read_records(f):
+                            if op == OP_LAYOUT:
+                                layout.update(layout_record(payload))
+                            else:
+                                apply_record(graph, op, payload)
+                            valid_end = end
+                            count += 1
+                    else:
+                        logging.info("Journal of %s was already compacted, discarding it", path)
+            #drop a damaged tail or a stale journal, so new records follow the last good one
+            with open(journal_path(path), "r+b") as f:
+                _ = f.truncate(valid_end)
+        logging.info("Replayed %d journal records for %s", count, path)
+        return cls(graph, path, layout)
+
+    def get_graph(self) -> TaskGraph:
+        return self._graph
+
+    def get_path(self) -> str:
+        return self._path
+
+    def get_layout(self) -> MutableMapping[int, CacheEntry]:
+        """The layout cache as of the last set_layout(), by task id; not to be changed."""
+        return self._layout
+
+    def set_layout(self, entries: Mapping[int, CacheEntry]) -> int:
+        """Records the layout cache entries that differ from the ones already recorded, to be saved with the next save(). Returns how many."""
+        layout: MutableMapping[int, CacheEntry] = self._layout
+        changed: list[tuple[int, CacheEntry]] = [(node_id, entry) for node_id, entry in entries.items() if layout.get(node_id) != entry]
+        if changed:
+            layout.update(changed)
+            self._append(OP_LAYOUT, b"".join(LAYOUT_ENTRY.pack(node_id, *entry) for node_id, entry in changed))
+        return len(changed)
+
+    def pending_count(self) -> int:
+        """Number of records not saved yet."""
+        return len(self._pending)
+
+    def journal_size(self) -> int:
+        return self._file.tell()
+
+    def _write_header(self) -> None:
+        _ = self._file.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION, self._generation))
+        return
+
+    def _append(self, op: int, payload: bytes) -> None:
+        self._pending.append(encode_record(op, payload))
+        return
+
+    def save(self) -> int:
+        """Appends the pending records and syncs them to disk, compacting if the journal has grown too large. Returns the number of records saved."""
+        count: int = len(self._pending)
+        if count:
+            _ = self._file.write(b"".join(self._pending))
+            self._pending.clear()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        if self._file.tell() > max(COMPACT_MIN_BYTES, COMPACT_RATIO * self._snapshot_size):
+            self.compact()
+        return count
+
+    def compact(self) -> None:
+        """Folds the journal into the task file and starts an empty one."""
+        self._generation += 1
+        #entries still to be read come from the task file, which is closed before it is overwritten
+        self._layout = dict(self._layout)
+        write_task_file(self._graph, self._path, self._generation, self._layout)
+        self._pending.clear()
+        self._snapshot_size = os.path.getsize(self._path)
+        _ = self._file.seek(0)
+        _ = self._file.truncate()
+        self._write_header()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        logging.info("Compacted journal of %s into generation %d", self._path, self._generation)
+        return
+
+    def close(self) -> None:
+        """Stops journaling; records not saved yet are dropped."""
+        self._graph.remove_observer(self)
+        self._file.close()
+        return
+
+    def node_added(self, node: Node) -> None:
+        day: int = node._due_date.toordinal() if node._due_date is not None else NO_DATE
+        payload: bytes = ADD.pack(node._id, node._created_at, day, time_to_seconds(node._due_time), node._completed)
+        self._append(OP_ADD, payload + node._value.encode("utf-8"))
+        return
+
+    def node_removed(self, node: Node) -> None:
+        self._append(OP_REMOVE, ID.pack(node._id))
+        return
+
+    def edge_added(self, parent: Node, child: Node) -> None:
+        self._append(OP_EDGE_ADD, ID_PAIR.pack(parent._id, child._id))
+        return
+
+    def edge_removed(self, parent: Node, child: Node) -> None:
+        self._append(OP_EDGE_REMOVE, ID_PAIR.pack(parent._id, child._id))
+        return
+
+    def node_changed(self, node: Node, field: str) -> None:
+        if field == "value":
+            self._append(OP_VALUE, ID.pack(node._id) + node._value.encode("utf-8"))
+        elif field == "due_date":
+            self._append(OP_DUE_DATE, ID_PAIR.pack(node._id, node._due_date.toordinal()))
+        elif field == "due_time":
+            self._append(OP_DUE_TIME, ID_PAIR.pack(node._id, time_to_seconds(node._due_time)))
+        elif field == "completed":
+            self._append(OP_COMPLETED, ID_PAIR.pack(node._id, node._completed))
+        return
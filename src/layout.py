@@ -0,0 +1,411 @@
+from array import array
+from typing import Callable, Collection, Iterator, Sequence
+import itertools
+import logging
+import math
+import operator
+
+from src.node import Node
+from src.task_graph import paused_gc
+from src.force_layout import FORCE_EDGE_LENGTH, FORCE_ITERATIONS, FORCE_TIME_LIMIT, relax_coarse_to_fine
+
+# RADIAL_SPACING: int = 100  # Adjust as needed for spacing between levels
+# SPIRAL_FACTOR: float = 0.2  # Adjust to control the spiral effect
+BASE_DISTANCE: float = 500  # Base distance from parent to first child
+DISTANCE_LEVEL_FACTOR: float = 0.55
+ANGLE_INCREMENT: float = 2 * math.pi / 5  # Base angle between siblings (adjust for branching)
+SPIRAL_FACTOR: float = 20#0.6  # Controls the spiral effect (angle offset per level)
+TIDY_SPACING: float = 80 #least distance between the centres of neighbours on a level of a tidy tree
+TIDY_LEVEL_HEIGHT: float = 100
+TAKE_OVER_CHUNK: int = 20_000 #tasks take_over_rows handles between two yields
+
+
+class Level:
+    """
+    The tasks of one depth of a layout, with the position of each task's parent in the level
+    above and its index among that parent's children. Laid out in a worker process, the
+    tasks are rows of a GraphSnapshot instead of nodes; the layout engines only read the
+    parents and indexes, so they work on either.
+    """
+    __slots__ = ("nodes", "parents", "indexes")
+
+    def __init__(self) -> None:
+        self.nodes: list[Node] = []
+        self.parents: array = array("l")
+        self.indexes: array = array("l")
+        return
+
+
+def task_children(node: Node) -> Sequence[Node]:
+    return list(node._children)
+
+
+def spanning_tree(root: Node, is_shown: Callable[[Node], bool], collapsed: Collection[Node],
+                  children_of: Callable[[Node], Sequence[Node]]=task_children) -> list[Level]:
+    """
+    Picks the parent each task is placed under: depth first in child order, the first
+    parent to reach a task places it, as the recursive layout did. Children of collapsed
+    tasks and children is_shown rejects are skipped but keep their index among their
+    siblings. Returns the tasks grouped by depth, root alone in the first level. A stack
+    replaces the recursion, so depth is not limited. children_of gives a task's children
+    in order, so the same walk runs over graph rows.
+    """
+    levels: list[Level] = []
+    placed: set[Node] = set()
+    #(task, depth and position in its level of the parent that reached it, index among the parent's children);
+    #children are pushed in reverse, so they are taken in order and a task reached again
+    #further up the stack is skipped, which gives the order of the recursion
+    stack: list[tuple[Node, int, int, int]] = [(root, -1, -1, 0)]
+    with paused_gc():
+        while stack:
+            node, depth, parent, i = stack.pop()
+            if node in placed:
+                continue
+            placed.add(node)
+            depth += 1
+            if depth == len(levels):
+                levels.append(Level())
+            level: Level = levels[depth]
+            position: int = len(level.nodes)
+            level.nodes.append(node)
+            level.parents.append(parent)
+            level.indexes.append(i)
+            if node not in collapsed:
+                children: Sequence[Node] = children_of(node)
+                stack.extend([(children[j], depth, position, j) for j in range(len(children) - 1, -1, -1)
+                              if children[j] not in placed and is_shown(children[j])])
+    return levels
+
+
+def level_geometry(depth: int) -> tuple[float, float]:
+    """Returns the distance of the tasks at depth from their parents and the angle offset of their level."""
+    offset: float = 0
+    for level in range(1, depth):
+        offset = offset + level * SPIRAL_FACTOR
+    return BASE_DISTANCE * (DISTANCE_LEVEL_FACTOR**depth), offset
+
+
+def child_position(parent_x: float, parent_y: float, depth: int, index: int) -> tuple[float, float]:
+    """Returns the position of the index-th child, at depth, of a task at (parent_x, parent_y); the same as radial_layout gives it."""
+    distance, offset = level_geometry(depth)
+    angle: float = index * ANGLE_INCREMENT + offset
+    return float(int(parent_x + distance * math.cos(angle))), float(int(parent_y + distance * math.sin(angle)))
+
+
+def radial_layout(root: Node, root_x: float, root_y: float, is_shown: Callable[[Node], bool]=lambda n: True,
+                  collapsed: Collection[Node]=()) -> tuple[list[Node], array]:
+    """Lays out the tasks below root, see spanning_tree and level_coordinates."""
+    return level_coordinates(spanning_tree(root, is_shown, collapsed), root_x, root_y)
+
+
+def level_coordinates(levels: list[Level], root_x: float, root_y: float, distance: float|None=None) -> tuple[list[Node], array]:
+    """
+    Lays out the levels of a spanning tree with a parent-relative spiral: the i-th child
+    of a task at depth d - 1 sits BASE_DISTANCE * DISTANCE_LEVEL_FACTOR**d away from it,
+    at angle i * ANGLE_INCREMENT plus an offset that grows by d * SPIRAL_FACTOR per level.
+    Child coordinates are truncated to whole numbers. With distance, every level sits that
+    far from the one above instead. Returns the tasks level by level and their
+    coordinates as one array, x of task k at 2k and y at 2k + 1.
+
+    Distance and offset only depend on the depth, so the positions are computed a level
+    at a time: each level gets one table of offsets per child index, and its coordinates
+    are the parents' coordinates plus a lookup in that table, as map() over the arrays,
+    with no trigonometry and no Python loop per task.
+    """
+    nodes: list[Node] = list(itertools.chain.from_iterable(level.nodes for level in levels))
+    coords: array = spiral_coordinates(levels, array("d", [root_x]), array("d", [root_y]), 0, distance)
+    logging.debug("Laid out %d tasks in %d levels", len(coords) // 2, len(levels))
+    return nodes, coords
+
+
+def spiral_coordinates(levels: list[Level], xs: array, ys: array, depth: int, distance: float|None=None) -> array:
+    """
+    The coordinates of level_coordinates for levels whose first level is at depth, with
+    its tasks at xs and ys, e.g. a range of the subtrees below a level laid out apart from
+    the rest. Returns the coordinates of all the levels, the first one's included.
+    """
+    xs = array("d", xs)
+    ys = array("d", ys)
+    above_x: array = xs
+    above_y: array = ys
+    for level, (dx, dy) in zip(levels[1:], spiral_offsets(levels, depth, distance)):
+        above_x = array("d", map(int, map(operator.add, map(above_x.__getitem__, level.parents), map(dx.__getitem__, level.indexes))))
+        above_y = array("d", map(int, map(operator.add, map(above_y.__getitem__, level.parents), map(dy.__getitem__, level.indexes))))
+        xs.extend(above_x)
+        ys.extend(above_y)
+    coords: array = array("d", [0.0]) * (2 * len(xs))
+    coords[0::2] = xs
+    coords[1::2] = ys
+    return coords
+
+
+def spiral_offsets(levels: list[Level], depth: int, distance: float|None=None) -> Iterator[tuple[list[float], list[float]]]:
+    """
+    Yields, for each level after the first, whose first level is at depth, how far the
+    spiral puts a child from its parent by the child's index, as tables of x and y.
+    """
+    offset: float = level_geometry(depth + 1)[1]
+    for below, level in enumerate(levels[1:], start=depth + 1):
+        away: float = BASE_DISTANCE * (DISTANCE_LEVEL_FACTOR**below) if distance is None else distance
+        angles: list[float] = [i * ANGLE_INCREMENT + offset for i in range(max(level.indexes) + 1)]
+        yield [away * math.cos(angle) for angle in angles], [away * math.sin(angle) for angle in angles]
+        # Introduce a spiral effect by offsetting the starting angle for the next level
+        offset = offset + below * SPIRAL_FACTOR
+    return
+
+
+def tidy_coordinates(levels: list[Level], root_x: float, root_y: float) -> tuple[list[Node], array]:
+    """
+    Lays out the levels of a spanning tree as a tidy tree, with Walker's algorithm in the
+    linear-time form of Buchheim, Jünger and Leipert: each level sits TIDY_LEVEL_HEIGHT
+    below the one above, parents are centred over their children, and neighbouring tasks
+    on a level are at least TIDY_SPACING apart, so no two tasks overlap. Returns the same
+    as level_coordinates, with root at (root_x, root_y).
+
+    The first walk runs from the deepest level up and the second from the top down, so
+    neither recurses. The levels list each parent's children next to each other and in
+    order, so tasks are numbered level by level and children are a range of numbers.
+    Subtrees are pushed apart by walking their facing contours, with threads linking a
+    contour across shallower subtrees, and the shifts are spread over the subtrees in
+    between in one pass per parent.
+    """
+    nodes: list[Node] = []
+    parent_of: list[int] = []
+    above: int = 0 #number of the first task on the level above
+    for depth, level in enumerate(levels):
+        if depth == 0:
+            parent_of.append(-1)
+        else:
+            parent_of.extend([above + p for p in level.parents])
+            above += len(levels[depth - 1].parents)
+        nodes.extend(level.nodes)
+    count: int = len(nodes)
+    first_child: list[int] = [-1] * count
+    last_child: list[int] = [-1] * count
+    for slot in range(1, count):
+        parent: int = parent_of[slot]
+        if first_child[parent] < 0:
+            first_child[parent] = slot
+        last_child[parent] = slot
+    #1-based number among siblings; a task is the first of its siblings if its number is 1
+    number: list[int] = [1] * count
+    for slot in range(2, count):
+        if parent_of[slot] == parent_of[slot - 1]:
+            number[slot] = number[slot - 1] + 1
+    prelim: list[float] = [0.0] * count
+    mod: list[float] = [0.0] * count
+    shift: list[float] = [0.0] * count
+    change: list[float] = [0.0] * count
+    thread: list[int] = [-1] * count
+    ancestor: list[int] = list(range(count))
+    midpoint: list[float|None] = [None] * count #None for leaves
+
+    def next_left(v: int) -> int:
+        return first_child[v] if first_child[v] >= 0 else thread[v]
+
+    def next_right(v: int) -> int:
+        return last_child[v] if last_child[v] >= 0 else thread[v]
+
+    def move_subtree(wl: int, wr: int, amount: float) -> None:
+        subtrees: int = number[wr] - number[wl]
+        change[wr] -= amount / subtrees
+        shift[wr] += amount
+        change[wl] += amount / subtrees
+        prelim[wr] += amount
+        mod[wr] += amount
+        return
+
+    def apportion(v: int, default_ancestor: int) -> int:
+        vir: int = v
+        vor: int = v
+        vil: int = v - 1
+        vol: int = first_child[parent_of[v]]
+        sir: float = mod[vir]
+        sor: float = mod[vor]
+        sil: float = mod[vil]
+        sol: float = mod[vol]
+        while next_right(vil) >= 0 and next_left(vir) >= 0:
+            vil = next_right(vil)
+            vir = next_left(vir)
+            vol = next_left(vol)
+            vor = next_right(vor)
+            ancestor[vor] = v
+            amount: float = prelim[vil] + sil - (prelim[vir] + sir) + TIDY_SPACING
+            if amount > 0:
+                #the left subtree vil belongs to, if it is a sibling of v
+                left: int = ancestor[vil] if parent_of[ancestor[vil]] == parent_of[v] else default_ancestor
+                move_subtree(left, v, amount)
+                sir += amount
+                sor += amount
+            sil += mod[vil]
+            sir += mod[vir]
+            sol += mod[vol]
+            sor += mod[vor]
+        if next_right(vil) >= 0 and next_right(vor) < 0:
+            thread[vor] = next_right(vil)
+            mod[vor] += sil - sor
+        if next_left(vir) >= 0 and next_left(vol) < 0:
+            thread[vol] = next_left(vir)
+            mod[vol] += sir - sol
+            default_ancestor = v
+        return default_ancestor
+
+    def place_after_sibling(w: int) -> None:
+        #the end of the first walk of w, which needs its left sibling's final place
+        if number[w] > 1:
+            prelim[w] = prelim[w - 1] + TIDY_SPACING
+            if midpoint[w] is not None:
+                mod[w] = prelim[w] - midpoint[w]
+        elif midpoint[w] is not None:
+            prelim[w] = midpoint[w]
+        return
+
+    with paused_gc():
+        for v in range(count - 1, -1, -1):
+            first: int = first_child[v]
+            if first < 0:
+                continue
+            default_ancestor: int = first
+            for w in range(first, last_child[v] + 1):
+                place_after_sibling(w)
+                if w > first:
+                    default_ancestor = apportion(w, default_ancestor)
+            #execute the shifts collected by move_subtree, right to left
+            total_shift: float = 0.0
+            total_change: float = 0.0
+            for w in range(last_child[v], first - 1, -1):
+                prelim[w] += total_shift
+                mod[w] += total_shift
+                total_change += change[w]
+                total_shift += shift[w] + total_change
+            midpoint[v] = (prelim[first] + prelim[last_child[v]]) / 2
+        place_after_sibling(0)
+
+        #second walk, top down: x is prelim plus the mods of all ancestors
+        offset: list[float] = [0.0] * count
+        coords: array = array("d", [0.0]) * (2 * count)
+        shift_x: float = root_x - prelim[0]
+        for slot in range(count):
+            parent: int = parent_of[slot]
+            if parent >= 0:
+                offset[slot] = offset[parent] + mod[parent]
+        coords[0::2] = array("d", [p + o + shift_x for p, o in zip(prelim, offset)])
+        depth_of: list[float] = []
+        for depth, level in enumerate(levels):
+            depth_of.extend(itertools.repeat(root_y + depth * TIDY_LEVEL_HEIGHT, len(level.parents)))
+        coords[1::2] = array("d", depth_of)
+    logging.debug("Laid out a tidy tree of %d tasks in %d levels", count, len(levels))
+    return nodes, coords
+
+
+def force_coordinates(levels: list[Level], root_x: float, root_y: float, iterations: int=FORCE_ITERATIONS,
+                      children_of: Callable[[Node], Sequence[Node]]=task_children, cancelled: Callable[[], bool]|None=None,
+                      time_limit: float=FORCE_TIME_LIMIT, progress: Callable[[array], None]|None=None) -> tuple[list[Node], array]:
+    """
+    Lays out the levels of a spanning tree force-directed, coarse to fine, see
+    src.force_layout.relax_coarse_to_fine, seeded from the spiral layout with every level
+    FORCE_EDGE_LENGTH from the one above: the spiral's levels shrink towards the leaves
+    until deep tasks sit on their parents, which a force layout would need many
+    iterations to pull apart. Every edge between two laid out tasks pulls, not only the
+    ones of the spanning tree, so a task with several parents settles between them.
+    Returns the same as level_coordinates, with root moved back to (root_x, root_y).
+    children_of is as for spanning_tree, cancelled and time_limit are as for relax, and
+    progress is called with the coordinates of every layout relax_coarse_to_fine reports
+    on the way, root in place too.
+    """
+    nodes, coords = level_coordinates(levels, root_x, root_y, FORCE_EDGE_LENGTH)
+    slots: dict[Node, int] = {node: slot for slot, node in enumerate(nodes)}
+    parents: array = array("l")
+    children: array = array("l")
+    for slot, node in enumerate(nodes):
+        for child in children_of(node):
+            child_slot: int|None = slots.get(child)
+            if child_slot is not None:
+                parents.append(slot)
+                children.append(child_slot)
+
+    def to_coordinates(points: list[complex]) -> array:
+        shift: complex = complex(root_x, root_y) - points[0]
+        placed: array = array("d", [0.0]) * (2 * len(points))
+        placed[0::2] = array("d", [z.real + shift.real for z in points])
+        placed[1::2] = array("d", [z.imag + shift.imag for z in points])
+        return placed
+
+    points: list[complex] = list(map(complex, coords[0::2], coords[1::2]))
+    report: Callable[[list[complex]], None]|None = None if progress is None else lambda positions: progress(to_coordinates(positions))
+    ran: int = relax_coarse_to_fine(points, parents, children, iterations, cancelled=cancelled, time_limit=time_limit, progress=report)
+    logging.debug("Laid out %d tasks and %d edges force-directed in %d iterations", len(nodes), len(parents), ran)
+    return nodes, to_coordinates(points)
+
+
+LayoutEngine = Callable[[list[Level], float, float], tuple[list[Node], array]]
+LAYOUT_ENGINES: dict[str, LayoutEngine] = {
+    "spiral": level_coordinates,
+    "tidy": tidy_coordinates,
+    "force": force_coordinates,
+}
+SUBTREE_ENGINES: frozenset[str] = frozenset({"spiral"}) #engines that place a subtree from its root's position alone
+
+
+def placements(levels: list[Level]) -> dict[Node, tuple[Node, int, int]]:
+    """Returns, for every task of the levels but the root, the task it is placed under, its index among that task's children and its depth."""
+    placed: dict[Node, tuple[Node, int, int]] = {}
+    for depth in range(1, len(levels)):
+        above: list[Node] = levels[depth - 1].nodes
+        level: Level = levels[depth]
+        placed.update(zip(level.nodes, zip(map(above.__getitem__, level.parents), level.indexes, itertools.repeat(depth))))
+    return placed
+
+
+def take_over_rows(levels: list[Level], coords: array, node_of: Callable[[int], Node],
+                   positions: dict[Node, tuple[float, float]], placed: dict[Node, tuple[Node, int, int]]) -> Iterator[None]:
+    """
+    Turns the rows of levels laid out in a worker into tasks with node_of, in place, and
+    fills positions from coords and placed as placements would. Yields after every
+    TAKE_OVER_CHUNK tasks, so a large layout can be taken over in several steps of the
+    Tk main loop. The garbage collector stays off until the last step or until the
+    iterator is closed: a full collection over a large graph takes longer than all steps.
+    """
+    above: list[Node] = []
+    slot: int = 0 #of the level's first task in coords
+    taken: int = 0 #tasks taken over since the last yield
+    with paused_gc():
+        for depth, level in enumerate(levels):
+            nodes: list[Node] = []
+            for start in range(0, len(level.nodes), TAKE_OVER_CHUNK):
+                end: int = min(start + TAKE_OVER_CHUNK, len(level.nodes))
+                chunk: list[Node] = list(map(node_of, level.nodes[start:end]))
+                nodes.extend(chunk)
+                positions.update(zip(chunk, zip(coords[2 * (slot + start):2 * (slot + end):2], coords[2 * (slot + start) + 1:2 * (slot + end):2])))
+                if depth:
+                    placed.update(zip(chunk, zip(map(above.__getitem__, level.parents[start:end]), level.indexes[start:end], itertools.repeat(depth))))
+                taken += end - start
+                if taken >= TAKE_OVER_CHUNK:
+                    taken = 0
+                    yield
+            slot += len(level.nodes)
+            level.nodes = above = nodes
+    return
+
+
+def relayout_subtree(node: Node, positions: dict[Node, tuple[float, float]], placed_under: dict[Node, tuple[Node, int, int]]) -> dict[Node, tuple[float, float]]:
+    """
+    Recomputes the positions of node and of the tasks placed under it, from its parent's
+    position and the placements, after node's index changed or its parent moved. Nothing
+    else depends on them, so the rest of the layout stays as it is. Returns the previous
+    positions of the tasks it recomputed.
+    """
+    parent, index, depth = placed_under[node]
+    old: dict[Node, tuple[float, float]] = {node: positions[node]}
+    positions[node] = child_position(*positions[parent], depth, index)
+    stack: list[Node] = [node]
+    while stack:
+        curr: Node = stack.pop()
+        x, y = positions[curr]
+        for child in curr._children:
+            placement: tuple[Node, int, int]|None = placed_under.get(child)
+            if placement is not None and placement[0] is curr:
+                old[child] = positions[child]
+                positions[child] = child_position(x, y, placement[2], placement[1])
+                stack.append(child)
+    return old
@@ -0,0 +1,169 @@
+from array import array
+from hashlib import blake2b
+from typing import Callable, Iterable, Iterator, Mapping, MutableMapping, Sequence
+import itertools
+import logging
+import struct
+import zlib
+
+from src.node import Node
+from src.task_graph import paused_gc
+from src.layout import SUBTREE_ENGINES, Level, spiral_offsets
+
+CacheEntry = tuple[int, float, float] #key of the subtree below a task when it was laid out, and where the task was
+
+
+class SavedLayout(MutableMapping[int, CacheEntry]):
+    """
+    A saved layout cache by task id, read on demand: read returns the saved entry of an
+    id, or None, and ids lists the ids that have one. Only the entries looked up, such as
+    those of the tasks drawn, are read, and each once. Entries set since override the
+    saved ones.
+    """
+
+    def __init__(self, read: Callable[[int], CacheEntry|None], ids: Callable[[], Iterable[int]],
+                 in_box: Callable[[float, float, float, float], Iterable[int]]) -> None:
+        self._read: Callable[[int], CacheEntry|None] = read
+        self._ids: Callable[[], Iterable[int]] = ids
+        self._in_box: Callable[[float, float, float, float], Iterable[int]] = in_box #ids whose saved position lies in a box
+        self._entries: dict[int, CacheEntry|None] = {} #read or set, None if there is none
+        return
+
+    def __getitem__(self, node_id: int) -> CacheEntry:
+        entries: dict[int, CacheEntry|None] = self._entries
+        entry: CacheEntry|None = entries[node_id] if node_id in entries else entries.setdefault(node_id, self._read(node_id))
+        if entry is None:
+            raise KeyError(node_id)
+        return entry
+
+    def __setitem__(self, node_id: int, entry: CacheEntry) -> None:
+        self._entries[node_id] = entry
+        return
+
+    def __delitem__(self, node_id: int) -> None:
+        _ = self[node_id]
+        self._entries[node_id] = None
+        return
+
+    def __iter__(self) -> Iterator[int]:
+        saved: Iterable[int] = self._ids()
+        yield from (node_id for node_id in saved if node_id not in self._entries or self._entries[node_id] is not None)
+        yield from (node_id for node_id, entry in self._entries.items() if entry is not None and self._read(node_id) is None)
+        return
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def ids_in_box(self, x0: float, y0: float, x1: float, y1: float) -> set[int]:
+        """Returns the ids whose position lies in the box, reading only the saved ones in it."""
+        inside: set[int] = set(self._in_box(x0, y0, x1, y1))
+        for node_id, entry in self._entries.items():
+            if entry is not None and min(x0, x1) <= entry[1] <= max(x0, x1) and min(y0, y1) <= entry[2] <= max(y0, y1):
+                inside.add(node_id)
+            else:
+                inside.discard(node_id)
+        return inside
+
+
+def engine_code(engine: str) -> int:
+    return zlib.crc32(engine.encode("utf-8"))
+
+
+def subtree_key(code: int, node_id: int, parent_id: int, depth: int, index: int, under: Sequence[int]) -> int:
+    """
+    The key of a task, see subtree_keys: a 64-bit BLAKE2b digest of engine_code(engine),
+    the ids, depth, index and keys below packed as 64-bit ints, so keys saved in one run
+    match in the next whatever the hash seed.
+    """
+    data: bytes = struct.pack(f"<{5 + len(under)}q", code, node_id, parent_id, depth, index, *under)
+    return int.from_bytes(blake2b(data, digest_size=8).digest(), "little", signed=True)
+
+
+def subtree_keys(levels: list[Level], engine: str) -> list[array]:
+    """
+    Returns a key for each task of the levels of a spanning tree, level by level: a digest
+    of the engine, the task's id, its parent's id, its depth and index, and the keys of
+    the tasks placed under it in order, see subtree_key. Two layouts give a task the same
+    key only if the same tasks are placed under it the same way, so their positions
+    relative to it are the same too. Computed bottom-up a level at a time.
+    """
+    code: int = engine_code(engine)
+    keys: list[array] = [array("q")] * len(levels)
+    with paused_gc():
+        ids: list[list[int]] = [list(map(Node.get_id, level.nodes)) for level in levels]
+        for depth in range(len(levels) - 1, -1, -1):
+            level: Level = levels[depth]
+            below: list[list[int]] = [[] for _ in range(len(level.nodes))]
+            if depth + 1 < len(levels):
+                for parent, key in zip(levels[depth + 1].parents, keys[depth + 1]):
+                    below[parent].append(key)
+            above: list[int] = ids[depth - 1] if depth else [-1]
+            keys[depth] = array("q", [subtree_key(code, node_id, above[parent], depth, index, under)
+                                      for node_id, parent, index, under in zip(ids[depth], level.parents, level.indexes, below)])
+    return keys
+
+
+def cache_entries(levels: list[Level], keys: list[array], positions: Mapping[Node, tuple[float, float]]) -> dict[int, CacheEntry]:
+    """Returns the cache entry of each task of the levels that has a position, by id."""
+    entries: dict[int, CacheEntry] = {}
+    with paused_gc():
+        for level, level_keys in zip(levels, keys):
+            for node, key in zip(level.nodes, level_keys):
+                xy: tuple[float, float]|None = positions.get(node)
+                if xy is not None:
+                    entries[node.get_id()] = (key, *xy)
+    return entries
+
+
+def restore_coordinates(levels: list[Level], keys: list[array], saved: Mapping[int, CacheEntry], engine: str,
+                        root_x: float, root_y: float) -> array|None:
+    """
+    Returns the coordinates of the levels, as level_coordinates does, from the positions
+    saved with their keys: if the root's key matches, nothing changed and every task is
+    where it was saved. Otherwise an engine of SUBTREE_ENGINES places a task whose key
+    matches where it was saved relative to its parent, so moved tasks keep their offsets,
+    and places only the others anew, as the spiral does. Other engines move every task
+    after any change, so None is returned and the engine has to run.
+    """
+    get_id = Node.get_id
+    entry: CacheEntry|None = saved.get(get_id(levels[0].nodes[0]))
+    if entry is not None and entry[0] == keys[0][0]:
+        with paused_gc():
+            entries: list[CacheEntry|None] = [saved.get(get_id(node)) for level in levels for node in level.nodes]
+        if None not in entries:
+            logging.debug("Reused the saved positions of all %d tasks", len(entries))
+            return array("d", itertools.chain.from_iterable(e[1:] for e in entries))
+    if engine not in SUBTREE_ENGINES:
+        return None
+
+    #a task's shift is how far it is from where it was saved, None if it was not
+    xs: array = array("d", [root_x])
+    ys: array = array("d", [root_y])
+    shifts: list[tuple[float, float]|None] = [(root_x - entry[1], root_y - entry[2]) if entry is not None else None]
+    coords: array = array("d", [root_x, root_y])
+    reused: int = 0
+    with paused_gc():
+        for depth, (dx, dy) in enumerate(spiral_offsets(levels, 0), start=1):
+            level: Level = levels[depth]
+            above_x, above_y, above_shifts = xs, ys, shifts
+            xs = array("d")
+            ys = array("d")
+            shifts = []
+            for node, parent, index, key in zip(level.nodes, level.parents, level.indexes, keys[depth]):
+                entry = saved.get(get_id(node))
+                shift: tuple[float, float]|None = above_shifts[parent]
+                if entry is not None and entry[0] == key and shift is not None:
+                    x, y = entry[1] + shift[0], entry[2] + shift[1]
+                    reused += 1
+                else:
+                    x, y = float(int(above_x[parent] + dx[index])), float(int(above_y[parent] + dy[index]))
+                    shift = (x - entry[1], y - entry[2]) if entry is not None else None
+                xs.append(x)
+                ys.append(y)
+                shifts.append(shift)
+            level_coords: array = array("d", [0.0]) * (2 * len(xs))
+            level_coords[0::2] = xs
+            level_coords[1::2] = ys
+            coords.extend(level_coords)
+    logging.debug("Reused the saved positions of %d of %d tasks", reused, len(coords) // 2)
+    return coords
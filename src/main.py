@@ -20,8 +20,7 @@ def main():
     # graphics.draw_branch_and_child(graphics._canvas, node_p, node_c2, 50, 50)
     # graphics.draw_branch_and_child(graphics._canvas, node_c2, node_gc1, -50, 50)
     # graphics.draw_branch_and_child(graphics._canvas, node_c2, node_gc2, 50, 50)
-    graphics.calculate_node_positions()
-    graphics.draw_tree(graphics._canvas)
+    graphics.redraw_tree()
 
     graphics.run()
 
@@ -190,8 +189,7 @@ def main():
 
     # Create and run the GUI with the manually created tree
     gui = Gui(project_management)
-    gui.calculate_node_positions()
-    gui.draw_tree(gui._canvas)
+    gui.redraw_tree()
     gui.run()
 """
 
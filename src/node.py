@@ -1,12 +1,56 @@
 from datetime import datetime, date, time
-from typing import Self, Iterator
+from typing import Self, Iterator, Iterable, Any, TYPE_CHECKING
 import itertools
 from collections import deque
 import logging
+import sys
+import time as _time
+
+if TYPE_CHECKING:
+    from src.task_graph import TaskGraph
+
+class IdAllocator:
+    """
+    Hands out increasing integer ids, like itertools.count, but can be moved past ids
+    that are already in use, e.g. after loading a saved graph.
+    """
+
+    def __init__(self, start: int = 0) -> None:
+        self._next: int = start
+        return
+
+    def __iter__(self) -> Iterator[int]:
+        return self
+
+    def __next__(self) -> int:
+        new_id: int = self._next
+        self._next += 1
+        return new_id
+
+    def reserve(self, used_id: int) -> None:
+        """Makes sure used_id is never handed out."""
+        if used_id >= self._next:
+            self._next = used_id + 1
+        return
+
+    def peek(self) -> int:
+        return self._next
 
 class Node:
 
-    id_iter: Iterator[int] = itertools.count()
+    __slots__ = ("_id", "_value", "_created_at", "_due_date", "_due_time", "_completed", "_children", "_parents", "_graph", "_ord")
+
+    #process-wide source of ids, graphs reserve the ids they load so they are never reissued
+    id_iter: IdAllocator = IdAllocator()
+    #source of topological positions; a new node has no edges, so the next free position is valid
+    ord_iter: Iterator[int] = itertools.count()
+
+    # limits are shared by every node instead of being stored per instance
+    _max_children: int = 4
+    _max_parents: int = 4
+
+    # when set, task values are passed through sys.intern so repeated names share one string
+    intern_values: bool = False
 
     def __init__(self, value: str, due_date: date|None=None, due_time: time|None=None) -> None:
         if not isinstance(value, str):
@@ -17,29 +61,111 @@ class Node:
             raise TypeError(f"Node time must be a time or None, not a {type(due_time)}.")
 
         self._id: int = next(Node.id_iter)
-        self._value: str = value
-        self._created: datetime = datetime.now()
+        self._value: str = sys.intern(value) if Node.intern_values else value
+        self._created_at: float = _time.time() #packed as a POSIX timestamp, see _created
         self._due_date: date|None = due_date
         self._due_time: time|None = due_time
         self._completed: bool = False
 
-        self._children: list[Self] = []
+        #adjacency is kept in insertion-ordered dicts (values unused) for O(1) membership and removal
+        self._children: dict[Self, None] = {}
         #self._siblings: list[Self] = []
-        self._parents: list[Self] = []
-        self._max_children: int = 4
-        self._max_parents: int = 4
+        self._parents: dict[Self, None] = {}
+        self._graph: TaskGraph|None = None #graph container this node belongs to, kept in sync on every change
+        self._ord: int = next(Node.ord_iter) #position in a topological order, parents always sort before children
         #self._time
 
+    def __getstate__(self) -> dict[str, Any]:
+        #the owning graph is not part of a node's state, TaskGraph pickles itself column-wise
+        #topological positions are only unique within one process, so they are reassigned on load
+        return {name: getattr(self, name) for name in Node.__slots__ if name not in ("_graph", "_ord")}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        #trees pickled before Node used __slots__ carry a datetime and per-node limits
+        if "_created" in state:
+            state["_created_at"] = state.pop("_created").timestamp()
+        state.pop("_max_children", None)
+        state.pop("_max_parents", None)
+        #older pickles stored adjacency as lists
+        state["_children"] = dict.fromkeys(state["_children"])
+        state["_parents"] = dict.fromkeys(state["_parents"])
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._graph = None
+        self._ord = next(Node.ord_iter)
+        #pickle restores the nodes a node refers to before the node itself, and the node that
+        #first referred to it after it, so the node whose neighbours are all restored is the last
+        #of its connected tasks; positions given in restore order put children first, so redo them
+        if all(hasattr(n, "_ord") for n in itertools.chain(self._children, self._parents)):
+            _ = Node.order_topologically(self._connected())
+        return
+
+    def _connected(self) -> list["Node"]:
+        """Returns the tasks connected to this one through any edges, this one included."""
+        found: dict[Node, None] = {self: None}
+        stack: list[Node] = [self]
+        while stack:
+            curr: Node = stack.pop()
+            for nxt in itertools.chain(curr._children, curr._parents):
+                if nxt not in found:
+                    found[nxt] = None
+                    stack.append(nxt)
+        return list(found)
+
+    @staticmethod
+    def order_topologically(nodes: Iterable["Node"]) -> list["Node"]:
+        """
+        Gives nodes fresh topological positions (Kahn's algorithm) and returns them in that order.
+        Edges leading outside of nodes are ignored. Raises ValueError if the nodes contain a cycle.
+        """
+        members: list[Node] = list(nodes)
+        in_degree: dict[Node, int] = dict.fromkeys(members, 0)
+        for node in members:
+            for child in node._children:
+                if child in in_degree:
+                    in_degree[child] += 1
+        ready: deque[Node] = deque(n for n in members if in_degree[n] == 0)
+        ordered: list[Node] = []
+        while ready:
+            curr: Node = ready.popleft()
+            ordered.append(curr)
+            for child in curr._children:
+                if child in in_degree:
+                    in_degree[child] -= 1
+                    if in_degree[child] == 0:
+                        ready.append(child)
+        if len(ordered) != len(members):
+            raise ValueError("Nodes contain a cycle.")
+        for node in ordered:
+            node._ord = next(Node.ord_iter)
+        return ordered
+
+    @staticmethod
+    def reserve_orders(count: int) -> int:
+        """Takes count consecutive topological positions at once and returns the first of them."""
+        first: int = next(Node.ord_iter)
+        Node.ord_iter = itertools.count(first + count)
+        return first
+
+    @property
+    def _created(self) -> datetime:
+        return datetime.fromtimestamp(self._created_at)
+
     def get_id(self) -> int:
         return self._id
 
+    def get_created(self) -> datetime:
+        return self._created
+
     def get_value(self) -> str:
         return self._value
 
     def set_value(self, new_value: str) -> str:
         if not isinstance(new_value, str):
             raise TypeError(f"Node value must be a string, not a {type(new_value)}.")
-        self._value = new_value
+        self._value = sys.intern(new_value) if Node.intern_values else new_value
+        if self._graph is not None:
+            self._graph._node_changed(self, "value")
         return self._value
 
     def get_due_date(self) -> date|None:
@@ -49,6 +175,8 @@ class Node:
         if not isinstance(new_date, date):
             raise TypeError(f"Node date must be a date, not a {type(new_date)}.")
         self._due_date = new_date
+        if self._graph is not None:
+            self._graph._node_changed(self, "due_date")
         return self._due_date
 
     def get_due_time(self) -> time|None:
@@ -58,56 +186,224 @@ class Node:
         if not isinstance(new_time, time):
             raise TypeError(f"Node time must be a time, not a {type(new_time)}.")
         self._due_time = new_time
+        if self._graph is not None:
+            self._graph._node_changed(self, "due_time")
         return self._due_time
 
+    def is_completed(self) -> bool:
+        return self._completed
+
+    def set_completed(self, completed: bool) -> bool:
+        if not isinstance(completed, bool):
+            raise TypeError(f"Node completion must be a bool, not a {type(completed)}.")
+        self._completed = completed
+        if self._graph is not None:
+            self._graph._node_changed(self, "completed")
+        return self._completed
+
+    def get_graph(self) -> "TaskGraph|None":
+        return self._graph
+
+    def get_order(self) -> int:
+        """Position of this node in a topological order: every parent's position is lower."""
+        return self._ord
+
     def get_children(self) -> list[Self]:
-        logging.debug(print([c._value for c in self._children]))
-        return self._children
+        return list(self._children)
 
     def get_parents(self) -> list[Self]:
-        return self._parents
+        return list(self._parents)
+
+    def has_child(self, child: Self) -> bool:
+        return child in self._children
 
     def add_child(self, child: Self) -> bool:
-        if not (child in self._children) \
-                and len(self._children) < self._max_children \
-                and len(child._parents) < child._max_parents:
-            self._children.append(child)
-            child._parents.append(self)
         if child in self._children:
             assert (self in child._parents), "Parent missing in Child's Parent List?"
-        return (child in self._children) and (self in child._parents)
+            return True
+        if len(self._children) >= self._max_children or len(child._parents) >= child._max_parents:
+            return False
+        if not self._make_order_room(child):
+            logging.info("Rejecting edge %d -> %d, it would create a cycle", self._id, child._id)
+            return False
+
+        #both ends must live in the same graph before the edge is recorded
+        graph: TaskGraph|None = self._graph if self._graph is not None else child._graph
+        if graph is not None:
+            try:
+                _ = graph.add_node(self)
+                _ = graph.add_node(child)
+            except ValueError as e:
+                logging.info("Rejecting edge %d -> %d: %s", self._id, child._id, e)
+                return False
+        self._children[child] = None
+        child._parents[self] = None
+        if graph is not None:
+            graph._edge_added(self, child)
+        return True
+
+    def _make_order_room(self, child: Self) -> bool:
+        """
+        Pearce-Kelly update for a new edge self -> child. If child already sorts after self
+        nothing changes. Otherwise only the nodes between the two positions are searched:
+        descendants of child and ancestors of self in that window swap positions, so that
+        the ancestors come first. Returns False when child reaches self, i.e. a cycle.
+        """
+        lower: int = child._ord
+        upper: int = self._ord
+        if lower > upper:
+            return True
+        if child is self:
+            return False
+
+        forward: list[Node] = []
+        seen: set[Node] = {child}
+        stack: list[Node] = [child]
+        while stack:
+            curr: Node = stack.pop()
+            forward.append(curr)
+            for nxt in curr._children:
+                if nxt is self:
+                    return False
+                if nxt._ord < upper and nxt not in seen:
+                    seen.add(nxt)
+                    stack.append(nxt)
+
+        backward: list[Node] = []
+        seen = {self}
+        stack = [self]
+        while stack:
+            curr = stack.pop()
+            backward.append(curr)
+            for nxt in curr._parents:
+                if nxt._ord > lower and nxt not in seen:
+                    seen.add(nxt)
+                    stack.append(nxt)
+
+        backward.sort(key=lambda n: n._ord)
+        forward.sort(key=lambda n: n._ord)
+        affected: list[Node] = backward + forward
+        positions: list[int] = sorted(n._ord for n in affected)
+        for node, position in zip(affected, positions):
+            node._ord = position
+        for graph in {n._graph for n in affected if n._graph is not None}:
+            graph._nodes_reordered(affected)
+        return True
+
+    def remove_child(self, child: Self) -> bool:
+        if child not in self._children:
+            return False
+        del self._children[child]
+        del child._parents[self]
+        if self._graph is not None:
+            self._graph._edge_removed(self, child)
+        return True
 
     def get_children_r(self) -> list[Self]:
         visited: set[Self] = set()
         stack: deque[Self] = deque()
-        for child in self.get_children():
+        for child in self._children:
             visited.add(child)
             stack.append(child)
 
         while stack:
             curr: Self = stack.pop()
-            for child in curr.get_children():
+            for child in curr._children:
                 if child is not self and child not in visited:
                     visited.add(child)
                     stack.append(child)
 
         return list(visited)
 
+    def delete_subtree(self) -> list[Self]:
+        """
+        Removes this node and all of its descendants in one iterative pass and returns them.
+        Only edges from surviving parents are unlinked one by one; edges inside the subtree
+        are dropped along with the nodes, and the owning graph is updated in bulk.
+        """
+        doomed: dict[Self, None] = {self: None}
+        stack: list[Self] = [self]
+        while stack:
+            curr: Self = stack.pop()
+            for child in curr._children:
+                if child not in doomed:
+                    doomed[child] = None
+                    stack.append(child)
+
+        edges: list[tuple[Self, Self]] = []
+        for node in doomed:
+            for parent in node._parents:
+                edges.append((parent, node))
+                if parent not in doomed:
+                    del parent._children[node]
+        graph: TaskGraph|None = self._graph
+        if graph is not None:
+            graph._remove_rows(list(doomed), edges)
+        for node in doomed:
+            node._parents = {}
+            node._children = {}
+        return list(doomed)
+
     def remove_from_tree(self) -> None:
         """
         Removes this node from its parents' children lists and clears references
-        to and from its children.
+        to and from its children. The node also leaves its TaskGraph, if any.
         """
-        # 1. Remove from parents
-        for parent in list(self._parents):
-            if self in parent._children:
-                parent._children.remove(self)
-        self._parents = []
+        # 1. Remove from parents, latest first so the first parent is the last one left
+        for parent in reversed(list(self._parents)):
+            del parent._children[self]
+            del self._parents[parent]
+            if self._graph is not None:
+                self._graph._edge_removed(parent, self)
 
         # 2. Clear references to children and remove parent reference from children
         for child in list(self._children):  # Iterate over a copy
-            if self in child._parents:
-                child._parents.remove(self)
-        self._children = []
+            del child._parents[self]
+            del self._children[child]
+            if self._graph is not None:
+                self._graph._edge_removed(self, child)
+
+        # 3. A detached node no longer belongs to its graph
+        if self._graph is not None:
+            self._graph._remove_row(self)
+        return
+
+
+class LazyNode(Node):
+    """
+    A node loaded from a task file or database whose edges have not been read yet. The first read of
+    _children or _parents asks the owning graph to fill in both, after which the object
+    becomes a plain Node, so expanded nodes pay nothing for having been lazy.
+    """
+
+    __slots__ = ()
+
+    def _expand(self) -> None:
+        self._graph._expand(self)
+        return
+
+    def __reduce_ex__(self, protocol: int) -> Any:
+        #expand first, so the node is pickled as a plain Node
+        self._expand()
+        return Node.__reduce_ex__(self, protocol)
+
+    def _get_children(self) -> dict[Node, None]:
+        self._expand()
+        return self._children
+
+    def _set_children(self, children: dict[Node, None]) -> None:
+        self._expand()
+        self._children = children
+        return
+
+    def _get_parents(self) -> dict[Node, None]:
+        self._expand()
+        return self._parents
+
+    def _set_parents(self, parents: dict[Node, None]) -> None:
+        self._expand()
+        self._parents = parents
         return
 
+    _children = property(_get_children, _set_children)
+    _parents = property(_get_parents, _set_parents)
@@ -0,0 +1,146 @@
+import logging
+
+from src.node import Node
+from src.task_graph import TaskGraph, GraphObserver
+from src.reachability import ReachabilityIndex
+
+
+class ProgressIndex(GraphObserver):
+    """
+    Completion roll-up per subtree: how many of a task and its descendants exist and
+    how many of them are completed. Every descendant is counted once, even when it can
+    be reached through several parents.
+
+    Counts are cached per node. A structural change marks the affected node and its
+    ancestors dirty (a dirty node's ancestors are always dirty too), and dirty nodes are
+    recomputed from their children on the next read, children first. Completing a task
+    does not dirty anything: the task is in every ancestor's subtree exactly once, so
+    each clean ancestor's count moves by one.
+
+    Summing the children is only exact while no descendant is reachable twice. A node
+    whose subtree contains a task with several parents is marked shared and counted
+    from its descendant set instead.
+    """
+
+    def __init__(self, graph: TaskGraph) -> None:
+        self._graph: TaskGraph = graph
+        self._total: dict[Node, int] = {}
+        self._done: dict[Node, int] = {}
+        self._shared: dict[Node, bool] = {}
+        self._counted: dict[Node, bool] = {} #completion state each node's cached counts include
+        self._dirty: set[Node] = set(graph)
+        _ = graph.add_observer(self)
+        return
+
+    def counts(self, node: Node) -> tuple[int, int]:
+        """Returns (completed, total) for node and its descendants."""
+        if node not in self._graph:
+            subtree: list[Node] = [node] + node.get_children_r()
+            return (sum(n._completed for n in subtree), len(subtree))
+        if node in self._dirty:
+            self._recompute(node)
+        return (self._done[node], self._total[node])
+
+    def percent_complete(self, node: Node) -> float:
+        done, total = self.counts(node)
+        return 100.0 * done / total
+
+    def remaining(self, node: Node) -> int:
+        """Number of incomplete tasks in node's subtree, node included."""
+        done, total = self.counts(node)
+        return total - done
+
+    def node_added(self, node: Node) -> None:
+        self._mark_dirty(node)
+        return
+
+    def node_removed(self, node: Node) -> None:
+        #remove_from_tree reports every edge first, so the former parents are dirty already
+        self._forget(node)
+        return
+
+    def nodes_removed(self, nodes: list[Node], edges: list[tuple[Node, Node]]) -> None:
+        for node in nodes:
+            self._forget(node)
+        for parent, _ in edges:
+            if parent in self._graph:
+                self._mark_dirty(parent)
+        return
+
+    def node_changed(self, node: Node, field: str) -> None:
+        if field != "completed" or node in self._dirty:
+            return
+        if node._completed == self._counted[node]:
+            return
+        self._counted[node] = node._completed
+        delta: int = 1 if node._completed else -1
+        #every clean ancestor counts node once; dirty ones are recounted when read
+        seen: set[Node] = {node}
+        stack: list[Node] = [node]
+        while stack:
+            curr: Node = stack.pop()
+            self._done[curr] += delta
+            for parent in curr._parents:
+                if parent not in seen and parent not in self._dirty:
+                    seen.add(parent)
+                    stack.append(parent)
+        return
+
+    def edge_added(self, parent: Node, child: Node) -> None:
+        self._mark_dirty(parent)
+        return
+
+    def edge_removed(self, parent: Node, child: Node) -> None:
+        self._mark_dirty(parent)
+        return
+
+    def _forget(self, node: Node) -> None:
+        self._dirty.discard(node)
+        self._total.pop(node, None)
+        self._done.pop(node, None)
+        self._shared.pop(node, None)
+        self._counted.pop(node, None)
+        return
+
+    def _mark_dirty(self, node: Node) -> None:
+        #stops at dirty nodes, whose ancestors are dirty already
+        stack: list[Node] = [node]
+        while stack:
+            curr: Node = stack.pop()
+            if curr in self._dirty:
+                continue
+            self._dirty.add(curr)
+            stack.extend(curr._parents)
+        return
+
+    def _recompute(self, node: Node) -> None:
+        """Recounts the dirty part of node's subtree, children before parents."""
+        pending: list[Node] = [node]
+        stack: list[Node] = [node]
+        seen: set[Node] = {node}
+        while stack:
+            curr: Node = stack.pop()
+            for child in curr._children:
+                if child in self._dirty and child not in seen:
+                    seen.add(child)
+                    pending.append(child)
+                    stack.append(child)
+        #children always sort after their parents
+        pending.sort(key=Node.get_order, reverse=True)
+
+        for curr in pending:
+            shared: bool = any(self._shared[c] or len(c._parents) > 1 for c in curr._children)
+            if shared:
+                descendants: list[Node] = self._graph.get_index(ReachabilityIndex).descendants(curr)
+                total: int = 1 + len(descendants)
+                done: int = curr._completed + sum(n._completed for n in descendants)
+            else:
+                total = 1 + sum(self._total[c] for c in curr._children)
+                done = curr._completed + sum(self._done[c] for c in curr._children)
+            self._total[curr] = total
+            self._done[curr] = done
+            self._shared[curr] = shared
+            self._counted[curr] = curr._completed
+            self._dirty.discard(curr)
+        logging.debug("Recounted progress of %d nodes", len(pending))
+        return
@@ -0,0 +1,233 @@
+from bisect import bisect_left, bisect_right
+from typing import Iterator
+import logging
+
+from src.node import Node
+from src.task_graph import TaskGraph, GraphObserver
+
+LABEL_GAP: int = 1 << 32 #spacing between labels after a rebuild, leaves room for inserts
+
+
+class ReachabilityIndex(GraphObserver):
+    """
+    Answers descendant queries for a TaskGraph without traversing it.
+
+    Every node's first parent is its tree parent. The tree edges get Euler-tour labels:
+    pre[n] < pre[d] < post[n] exactly when d is a tree descendant of n, and the labels
+    are kept in one sorted list, so a node's tree descendants are a contiguous slice.
+    Edges to any further parent are cross edges; descendants reached through them are
+    added by following the cross edges out of the slice, and full closures are cached
+    until the next structural change.
+
+    New edges move the child's labelled block into the gap left inside its parent's
+    interval. Only when that gap is used up is the index marked stale and relabelled
+    in one pass on the next query.
+    """
+
+    def __init__(self, graph: TaskGraph) -> None:
+        self._graph: TaskGraph = graph
+        self._labels: list[int] = [] #sorted pre and post labels
+        self._entries: list[Node|None] = [] #node for a pre label, None for a post label
+        self._pre: dict[Node, int] = {}
+        self._post: dict[Node, int] = {}
+        self._cross_children: dict[Node, set[Node]] = {}
+        self._closures: dict[Node, frozenset[Node]] = {}
+        self._stale: bool = True
+        _ = graph.add_observer(self)
+        return
+
+    def is_descendant(self, node: Node, ancestor: Node) -> bool:
+        """True if node can be reached from ancestor by following child edges."""
+        self._refresh()
+        if node not in self._pre or ancestor not in self._pre:
+            return node in ancestor.get_children_r()
+        if self._pre[ancestor] < self._pre[node] < self._post[ancestor]:
+            return True
+        if not self._cross_children:
+            return False
+        if ancestor not in self._closures:
+            self._closures[ancestor] = frozenset(self.descendants(ancestor))
+        return node in self._closures[ancestor]
+
+    def descendants(self, node: Node) -> list[Node]:
+        """Returns every node reachable from node, like Node.get_children_r."""
+        self._refresh()
+        if node not in self._pre:
+            return node.get_children_r()
+        if node in self._closures:
+            return list(self._closures[node])
+        result: list[Node] = self._tree_descendants(node)
+        if not self._cross_children:
+            return result
+
+        seen: set[Node] = set(result)
+        seen.add(node)
+        frontier: list[Node] = [node] + result
+        while frontier:
+            curr: Node = frontier.pop()
+            for child in self._cross_children.get(curr, ()):
+                if child in seen:
+                    continue
+                block: list[Node] = [child] + self._tree_descendants(child)
+                for n in block:
+                    if n not in seen:
+                        seen.add(n)
+                        result.append(n)
+                        frontier.append(n)
+        seen.discard(node)
+        self._closures[node] = frozenset(seen)
+        return result
+
+    def _tree_descendants(self, node: Node) -> list[Node]:
+        lo: int = bisect_right(self._labels, self._pre[node])
+        hi: int = bisect_left(self._labels, self._post[node])
+        return [n for n in self._entries[lo:hi] if n is not None]
+
+    def node_added(self, node: Node) -> None:
+        if not self._stale:
+            self._append_root(node)
+        return
+
+    def node_removed(self, node: Node) -> None:
+        #remove_from_tree reports every edge first, so node is an unlinked root by now
+        self._closures.clear()
+        self._cross_children.pop(node, None)
+        if not self._stale and node in self._pre:
+            _ = self._cut_block(node)
+        return
+
+    def nodes_removed(self, nodes: list[Node], edges: list[tuple[Node, Node]]) -> None:
+        #the removed nodes are closed under descendants, so their labels form whole blocks
+        self._closures.clear()
+        for parent, child in edges:
+            cross: set[Node]|None = self._cross_children.get(parent)
+            if cross is not None:
+                cross.discard(child)
+                if not cross:
+                    del self._cross_children[parent]
+        for node in nodes:
+            self._cross_children.pop(node, None)
+            if not self._stale and node in self._pre:
+                _ = self._cut_block(node)
+        return
+
+    def edge_added(self, parent: Node, child: Node) -> None:
+        self._closures.clear()
+        if self._stale:
+            return
+        if next(iter(child._parents)) is not parent:
+            self._cross_children.setdefault(parent, set()).add(child)
+            return
+        self._move_block(child, parent)
+        return
+
+    def edge_removed(self, parent: Node, child: Node) -> None:
+        self._closures.clear()
+        if self._stale:
+            return
+        cross: set[Node]|None = self._cross_children.get(parent)
+        if cross is not None and child in cross:
+            cross.discard(child)
+            if not cross:
+                del self._cross_children[parent]
+            return
+        if child._parents:
+            #the next parent becomes the tree parent, which turns one of its cross edges into a tree edge
+            self._stale = True
+            return
+        self._move_block(child, None)
+        return
+
+    def _refresh(self) -> None:
+        if self._stale:
+            self._rebuild()
+        return
+
+    def _rebuild(self) -> None:
+        """Relabels every node with one iterative pass over the tree edges."""
+        self._labels = []
+        self._entries = []
+        self._pre = {}
+        self._post = {}
+        self._cross_children = {}
+        self._closures = {}
+        label: int = 0
+        for root in self._graph.get_roots():
+            self._pre[root] = label
+            self._labels.append(label)
+            self._entries.append(root)
+            label += LABEL_GAP
+            stack: list[tuple[Node, Iterator[Node]]] = [(root, iter(list(root._children)))]
+            while stack:
+                curr, pending = stack[-1]
+                child: Node|None = next(pending, None)
+                if child is None:
+                    _ = stack.pop()
+                    self._post[curr] = label
+                    self._labels.append(label)
+                    self._entries.append(None)
+                    label += LABEL_GAP
+                    continue
+                if next(iter(child._parents)) is not curr:
+                    self._cross_children.setdefault(curr, set()).add(child)
+                    continue
+                self._pre[child] = label
+                self._labels.append(label)
+                self._entries.append(child)
+                label += LABEL_GAP
+                stack.append((child, iter(list(child._children))))
+        self._stale = False
+        logging.debug("Relabelled reachability index for %d nodes", len(self._pre))
+        return
+
+    def _append_root(self, node: Node) -> None:
+        last: int = self._labels[-1] if self._labels else -LABEL_GAP
+        self._pre[node] = last + LABEL_GAP
+        self._post[node] = last + 2 * LABEL_GAP
+        self._labels.extend((self._pre[node], self._post[node]))
+        self._entries.extend((node, None))
+        return
+
+    def _cut_block(self, node: Node) -> list[Node|None]:
+        """Removes the labels of node's tree subtree and returns its entries in order."""
+        lo: int = bisect_left(self._labels, self._pre[node])
+        hi: int = bisect_right(self._labels, self._post[node])
+        block: list[Node|None] = self._entries[lo:hi]
+        del self._labels[lo:hi]
+        del self._entries[lo:hi]
+        for n in block:
+            if n is not None:
+                del self._pre[n]
+                del self._post[n]
+        return block
+
+    def _move_block(self, node: Node, new_parent: Node|None) -> None:
+        """Moves node's tree subtree under new_parent, or to the end as a root."""
+        if node not in self._pre or (new_parent is not None and new_parent not in self._pre):
+            self._stale = True
+            return
+        block: list[Node|None] = self._cut_block(node)
+        if new_parent is None:
+            low: int = self._labels[-1] if self._labels else -LABEL_GAP
+            step: int = LABEL_GAP
+            pos: int = len(self._labels)
+        else:
+            high: int = self._post[new_parent]
+            pos = bisect_left(self._labels, high)
+            low = self._labels[pos - 1]
+            step = (high - low) // (len(block) + 1)
+            if step < 1:
+                self._stale = True
+                return
+
+        labels: list[int] = [low + step * (i + 1) for i in range(len(block))]
+        open_nodes: list[Node] = []
+        for entry, label in zip(block, labels):
+            if entry is not None:
+                self._pre[entry] = label
+                open_nodes.append(entry)
+            else:
+                self._post[open_nodes.pop()] = label
+        self._labels[pos:pos] = labels
+        self._entries[pos:pos] = block
+        return
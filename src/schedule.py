@@ -0,0 +1,363 @@
+from array import array
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta
+import heapq
+import logging
+import math
+
+from src.node import Node
+from src.task_graph import TaskGraph, GraphObserver
+
+SLACK_EPSILON: float = 1e-6 #seconds, float sums of durations are compared with this tolerance
+MAX_EDIT_LOG: int = 4096 #edits remembered for checking latest times before all of them are treated as stale
+
+
+class Schedule(GraphObserver):
+    """
+    Critical-path schedule over a TaskGraph.
+
+    A parent task can only finish once all of its children have finished, so children
+    come first: a node's earliest start is the latest earliest finish of its children,
+    and its latest finish is the earliest latest start of its parents, capped by its own
+    due date. Tasks with no parents must finish by their due date, or otherwise by the
+    project finish. Times are kept as float seconds since the schedule's start in arrays
+    indexed by graph row.
+
+    The first query runs one full sweep over the topological order; after that nothing
+    is recomputed in full. Earliest times are kept up to date: an edit queues the tasks
+    it touches, and the next query revisits their ancestors as far as values change.
+    A latest finish is min(project finish - a, d), where a is the greatest total duration
+    of the tasks above it on a path to a root and d the tightest due date passed down
+    to it. Neither depends on the project finish, which an edit on the critical path
+    moves for every task, and a duration change near the top shifts a for a whole
+    subtree, so they are computed only when a task is asked for, together with the
+    stale tasks above it. Edits only reach tasks later in the topological order, so a
+    row's a and d are stale if an edit at a position no later than the task's came
+    after they were computed.
+    """
+
+    def __init__(self, graph: TaskGraph, start: datetime|None=None) -> None:
+        self._graph: TaskGraph = graph
+        self._start: datetime = start if start is not None else datetime.combine(date.today(), time())
+        self._duration: array = array("d")
+        self._es: array = array("d")
+        self._ef: array = array("d")
+        self._above: array = array("d") #a: greatest total duration above a task on a path to a root
+        self._bound: array = array("d") #d: due date bound on a task's finish, inf if none
+        self._computed: array = array("q") #edit count a row's a and d were computed at, -1 if never
+        self._edits: int = 0 #edits so far
+        self._valid_from: int = 0 #a and d computed before this edit count are stale
+        #edits since _valid_from whose position is lower than that of every later edit, as parallel arrays
+        self._edit_counts: array = array("q")
+        self._edit_orders: array = array("q")
+        self._finish: float = 0.0
+        self._roots: dict[Node, None] = {} #tasks without parents, whose earliest finishes bound the project finish
+        self._stale: bool = True #whether the next query needs a full sweep
+        self._earliest_dirty: dict[Node, None] = {} #tasks whose earliest times have to be recomputed
+        self._roots_changed: bool = False #whether a task stopped or started being a root
+        _ = graph.add_observer(self)
+        return
+
+    def set_duration(self, node: Node, duration: timedelta) -> None:
+        if not isinstance(duration, timedelta):
+            raise TypeError(f"Duration must be a timedelta, not a {type(duration)}.")
+        if duration < timedelta(0):
+            raise ValueError("Duration must not be negative.")
+        self._grow()
+        row: int = self._graph.get_row(node)
+        self._duration[row] = duration.total_seconds()
+        self._earliest_dirty[node] = None
+        self._edited(node._ord)
+        return
+
+    def get_duration(self, node: Node) -> timedelta:
+        self._grow()
+        return timedelta(seconds=self._duration[self._graph.get_row(node)])
+
+    def earliest_start(self, node: Node) -> datetime:
+        self._refresh()
+        return self._moment(self._es[self._graph.get_row(node)])
+
+    def earliest_finish(self, node: Node) -> datetime:
+        self._refresh()
+        return self._moment(self._ef[self._graph.get_row(node)])
+
+    def latest_start(self, node: Node) -> datetime:
+        self._refresh()
+        row: int = self._latest_row(node)
+        return self._moment(self._latest_finish(row) - self._duration[row])
+
+    def latest_finish(self, node: Node) -> datetime:
+        self._refresh()
+        return self._moment(self._latest_finish(self._latest_row(node)))
+
+    def slack(self, node: Node) -> timedelta:
+        """Total float: how long node can slip without delaying the project or missing a due date."""
+        self._refresh()
+        row: int = self._latest_row(node)
+        return timedelta(seconds=self._latest_finish(row) - self._duration[row] - self._es[row])
+
+    def project_finish(self) -> datetime:
+        self._refresh()
+        return self._moment(self._finish)
+
+    def critical_path(self) -> list[Node]:
+        """Returns the nodes with the least slack, in order of earliest start."""
+        self._refresh()
+        nodes: list[Node] = self._graph.topological_order()
+        if not nodes:
+            return []
+        rows: list[int] = [self._graph.get_row(n) for n in nodes]
+        stale: list[int] = [i for i, (n, r) in enumerate(zip(nodes, rows)) if not self._is_current(n, r)]
+        self._sweep_latest([nodes[i] for i in stale], [rows[i] for i in stale])
+        slack: list[float] = [self._latest_finish(r) - self._duration[r] - self._es[r] for r in rows]
+        least: float = min(slack)
+        critical: list[tuple[float, int, Node]] = [
+            (self._es[r], -n.get_order(), n) for n, r, s in zip(nodes, rows, slack) if s <= least + SLACK_EPSILON
+        ]
+        critical.sort(key=lambda item: item[:2])
+        return [n for _, _, n in critical]
+
+    def node_changed(self, node: Node, field: str) -> None:
+        if field in ("due_date", "due_time"):
+            self._edited(node._ord)
+        return
+
+    def node_added(self, node: Node) -> None:
+        #a new task has no duration yet, its edges follow as edge_added
+        self._grow()
+        row: int = self._graph.get_row(node)
+        for column in (self._duration, self._es, self._ef):
+            column[row] = 0.0
+        self._computed[row] = -1
+        self._earliest_dirty[node] = None
+        if not node._parents:
+            self._roots[node] = None
+            self._roots_changed = True
+        return
+
+    def node_removed(self, node: Node) -> None:
+        self._forget([node])
+        return
+
+    def edge_added(self, parent: Node, child: Node) -> None:
+        self._earliest_dirty[parent] = None
+        self._edited(child._ord)
+        if child in self._roots:
+            del self._roots[child]
+            self._roots_changed = True
+        return
+
+    def edge_removed(self, parent: Node, child: Node) -> None:
+        self._earliest_dirty[parent] = None
+        self._edited(child._ord)
+        if not child._parents:
+            self._roots[child] = None
+            self._roots_changed = True
+        return
+
+    def nodes_reordered(self, nodes: list[Node]) -> None:
+        #the nodes swapped positions among their own, so every position from their lowest on may have moved
+        if nodes:
+            self._edited(min(n._ord for n in nodes))
+        return
+
+    def nodes_removed(self, nodes: list[Node], edges: list[tuple[Node, Node]]) -> None:
+        self._forget(nodes)
+        #the removed tasks include their descendants, so only surviving parents are left to update
+        for parent, _ in edges:
+            if parent._graph is self._graph:
+                self._earliest_dirty[parent] = None
+        return
+
+    def _forget(self, nodes: list[Node]) -> None:
+        for node in nodes:
+            _ = self._earliest_dirty.pop(node, None)
+            if node in self._roots:
+                del self._roots[node]
+                self._roots_changed = True
+        return
+
+    def rows_compacted(self, kept: array) -> None:
+        self._grow()
+        for name in ("_duration", "_es", "_ef", "_above", "_bound", "_computed"):
+            column: array = getattr(self, name)
+            setattr(self, name, array(column.typecode, map(column.__getitem__, kept)))
+        return
+
+    def _edited(self, order: int) -> None:
+        """Records an edit that can change a and d of the tasks at topological positions from order on."""
+        self._edits += 1
+        counts, orders = self._edit_counts, self._edit_orders
+        if len(counts) >= MAX_EDIT_LOG:
+            #too many to check against, everything computed so far is treated as stale
+            self._valid_from = self._edits
+            del counts[:]
+            del orders[:]
+            return
+        while orders and orders[-1] >= order:
+            _ = counts.pop()
+            _ = orders.pop()
+        counts.append(self._edits)
+        orders.append(order)
+        return
+
+    def _is_current(self, node: Node, row: int) -> bool:
+        """Whether a and d of node, at row, were computed after every edit that can change them."""
+        computed: int = self._computed[row]
+        if computed < self._valid_from:
+            return False
+        later: int = bisect_right(self._edit_counts, computed)
+        return later == len(self._edit_counts) or self._edit_orders[later] > node._ord
+
+    def _moment(self, seconds: float) -> datetime:
+        return self._start + timedelta(seconds=seconds)
+
+    def _latest_finish(self, row: int) -> float:
+        return min(self._finish - self._above[row], self._bound[row])
+
+    def _deadline(self, node: Node) -> float:
+        if node._due_date is None:
+            return math.inf
+        due_time: time = node._due_time if node._due_time is not None else time.max
+        return (datetime.combine(node._due_date, due_time) - self._start).total_seconds()
+
+    def _grow(self) -> None:
+        missing: int = self._graph.row_count() - len(self._duration)
+        if missing > 0:
+            zeros: array = array("d", [0.0]) * missing
+            for column in (self._duration, self._es, self._ef, self._above, self._bound):
+                column.extend(zeros)
+            self._computed.extend(array("q", [-1]) * missing)
+        return
+
+    def _refresh(self) -> None:
+        if self._stale:
+            self._recompute()
+            return
+        if self._earliest_dirty or self._roots_changed:
+            self._update_earliest()
+        return
+
+    def _recompute(self) -> None:
+        """Full forward and backward pass over the topological order."""
+        self._grow()
+        graph: TaskGraph = self._graph
+        order: list[Node] = graph.topological_order()
+        duration, es, ef = self._duration, self._es, self._ef
+        row_of = graph.get_row_index().__getitem__
+
+        #children sort after their parents, so walk the order backwards for earliest times
+        for node in reversed(order):
+            row: int = row_of(node)
+            children: dict[Node, None] = node._children
+            start: float = max(map(ef.__getitem__, map(row_of, children))) if children else 0.0
+            es[row] = start
+            ef[row] = start + duration[row]
+        self._roots = {n: None for n in order if not n._parents}
+        self._finish = max((ef[row_of(n)] for n in self._roots), default=0.0)
+        self._stale = False
+        self._earliest_dirty = {}
+        self._roots_changed = False
+        self._valid_from = self._edits
+        del self._edit_counts[:]
+        del self._edit_orders[:]
+        self._sweep_latest(order, list(map(row_of, order)))
+        logging.debug("Recomputed schedule for %d nodes", len(order))
+        return
+
+    def _sweep_latest(self, nodes: list[Node], rows: list[int]) -> None:
+        """Computes a and d of nodes, which are in topological order at rows, from those of their parents."""
+        above, bound, duration, computed = self._above, self._bound, self._duration, self._computed
+        row_of = self._graph.get_row_index().__getitem__
+        edits: int = self._edits
+        inf: float = math.inf
+        for node, row in zip(nodes, rows):
+            deadline: float = inf if node._due_date is None else self._deadline(node)
+            parents: dict[Node, None] = node._parents
+            if len(parents) == 1:
+                #most tasks have a single parent
+                r: int = row_of(next(iter(parents)))
+                above[row] = above[r] + duration[r]
+                passed: float = bound[r] - duration[r]
+                bound[row] = passed if passed < deadline else deadline
+            elif parents:
+                parent_rows: list[int] = list(map(row_of, parents))
+                above[row] = max([above[r] + duration[r] for r in parent_rows])
+                bound[row] = min(deadline, min([bound[r] - duration[r] for r in parent_rows]))
+            else:
+                above[row] = 0.0
+                bound[row] = deadline
+            computed[row] = edits
+        return
+
+    def _latest_row(self, node: Node) -> int:
+        """Brings a and d of node up to date, with those of the stale tasks above it they depend on, and returns its row."""
+        row_of = self._graph.get_row_index().__getitem__
+        row: int = row_of(node)
+        if self._is_current(node, row):
+            return row
+        computed, counts, orders = self._computed, self._edit_counts, self._edit_orders
+        valid_from: int = self._valid_from
+        logged: int = len(counts)
+        stale: list[tuple[int, int, Node]] = [(node._ord, row, node)]
+        seen: set[Node] = {node}
+        for _, _, task in stale:
+            for parent in task._parents:
+                if parent in seen:
+                    continue
+                #inlined _is_current, this walk can cover every task above a deep one
+                parent_row: int = row_of(parent)
+                stamp: int = computed[parent_row]
+                if stamp >= valid_from:
+                    later: int = bisect_right(counts, stamp)
+                    if later == logged or orders[later] > parent._ord:
+                        continue
+                seen.add(parent)
+                stale.append((parent._ord, parent_row, parent))
+        #positions are unique, so the nodes themselves are never compared
+        stale.sort()
+        self._sweep_latest([n for _, _, n in stale], [r for _, r, _ in stale])
+        return row
+
+    def _update_earliest(self) -> None:
+        """Recomputes earliest times of the queued tasks and of the ancestors whose values change, then the project finish."""
+        es, ef, duration = self._es, self._ef, self._duration
+        row_of = self._graph.get_row_index().__getitem__
+        origins, self._earliest_dirty = self._earliest_dirty, {}
+        roots_changed: bool = self._roots_changed
+        self._roots_changed = False
+        #higher topological positions first, so every child is settled before its parents
+        heap: list[tuple[int, int, Node]] = [(-n.get_order(), n.get_id(), n) for n in origins]
+        heapq.heapify(heap)
+        queued: set[Node] = set(origins)
+        while heap:
+            node: Node|None = heapq.heappop(heap)[2]
+            while node is not None:
+                row: int = row_of(node)
+                children: dict[Node, None] = node._children
+                start: float = max(map(ef.__getitem__, map(row_of, children))) if children else 0.0
+                finish: float = start + duration[row]
+                es[row] = start
+                if finish == ef[row]:
+                    break
+                ef[row] = finish
+                parents: dict[Node, None] = node._parents
+                node = None
+                if not parents:
+                    roots_changed = True
+                elif len(parents) == 1 and not heap:
+                    #a lone parent with nothing else pending is next anyway, so skip the heap
+                    parent: Node = next(iter(parents))
+                    if parent not in queued:
+                        queued.add(parent)
+                        node = parent
+                else:
+                    for parent in parents:
+                        if parent not in queued:
+                            queued.add(parent)
+                            heapq.heappush(heap, (-parent.get_order(), parent.get_id(), parent))
+        if roots_changed:
+            self._finish = max((ef[row_of(n)] for n in self._roots), default=0.0)
+        return
+
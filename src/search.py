@@ -0,0 +1,209 @@
+from bisect import bisect_left, insort
+from typing import Iterable
+import heapq
+import logging
+
+from src.node import Node
+from src.task_graph import TaskGraph, GraphObserver
+
+
+def word_grams(word: str) -> set[str]:
+    """
+    Trigrams of a casefolded word, padded so that the first one or two letters of the
+    word also form a gram ("  t", " ta") and short queries can match word starts.
+    """
+    padded: str = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def query_grams(token: str) -> set[str]:
+    """Trigrams a value must contain to match token; short tokens match word starts."""
+    if len(token) < 3:
+        return {(" " * (3 - len(token))) + token}
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+def matches(text: str, token: str) -> bool:
+    if len(token) < 3:
+        return text.startswith(token) or f" {token}" in text
+    return token in text
+
+
+def rank(text: str, phrase: str) -> int:
+    """Ranks a matching casefolded text: exact, prefix, word start, then anywhere."""
+    if text == phrase:
+        return 0
+    if text.startswith(phrase):
+        return 1
+    if f" {phrase}" in text:
+        return 2
+    if phrase in text:
+        return 3
+    return 4
+
+
+def search_values(values: Iterable[tuple[int, str]], query: str, limit: int) -> list[int]:
+    """
+    Matches and ranks (id, value) pairs like SearchIndex.search and returns the ids of
+    up to limit matches, for tasks that are not indexed, e.g. candidates read from a
+    database. Every pair is checked, so values should be narrowed down first.
+    """
+    phrase: str = " ".join(query.casefold().split())
+    tokens: list[str] = phrase.split(" ") if phrase else []
+    if not tokens or limit <= 0:
+        return []
+    ranked: list[tuple[int, int, int]] = []
+    for task_id, value in values:
+        text: str = " ".join(value.casefold().split())
+        if all(matches(text, t) for t in tokens):
+            ranked.append((rank(text, phrase), len(text), task_id))
+    return [item[2] for item in heapq.nsmallest(limit, ranked)]
+
+
+class SearchIndex(GraphObserver):
+    """
+    Trigram index over the task values of a TaskGraph, kept current as tasks are added,
+    renamed and removed.
+
+    A query is split into words; each word of three or more letters must appear
+    somewhere in a value, shorter words must start a word of the value. Candidates are
+    the intersection of the posting sets of the query's trigrams, smallest set first,
+    and only those are checked against the value. Matches are ranked exact, prefix,
+    word start, then anywhere, with shorter values first.
+
+    A single letter matches too many tasks to rank them all on every keystroke, so
+    the tasks with a word starting with each letter are also kept in lists sorted
+    shortest first, and the best matches are read off the front of those lists.
+    """
+
+    def __init__(self, graph: TaskGraph) -> None:
+        self._graph: TaskGraph = graph
+        self._postings: dict[str, set[Node]] = {}
+        self._grams_of: dict[Node, set[str]] = {}
+        self._text_of: dict[Node, str] = {} #casefolded value, words separated by single spaces
+        self._initials: dict[str, list[Node]] = {} #letter -> tasks with a word starting with it
+        self._leading: dict[str, list[Node]] = {} #letter -> tasks whose value starts with it
+        for node in graph:
+            self._add(node, keep_sorted=False)
+        for nodes in (*self._initials.values(), *self._leading.values()):
+            nodes.sort(key=self._order)
+        _ = graph.add_observer(self)
+        return
+
+    def __len__(self) -> int:
+        return len(self._grams_of)
+
+    def search(self, query: str, limit: int=20) -> list[Node]:
+        """Returns up to limit tasks matching query, best match first."""
+        phrase: str = " ".join(query.casefold().split())
+        tokens: list[str] = phrase.split(" ") if phrase else []
+        if not tokens or limit <= 0:
+            return []
+        if len(phrase) == 1:
+            return self._search_initial(phrase, limit)
+        grams: set[str] = set()
+        for token in tokens:
+            grams.update(query_grams(token))
+        postings: list[set[Node]] = sorted((self._postings.get(g, set()) for g in grams), key=len)
+        if not postings[0]:
+            return []
+        candidates: set[Node] = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return []
+
+        ranked: list[tuple[int, int, int, Node]] = []
+        for node in candidates:
+            text: str = self._text_of[node]
+            if all(matches(text, t) for t in tokens):
+                ranked.append((rank(text, phrase), len(text), node._id, node))
+        best: list[tuple[int, int, int, Node]] = heapq.nsmallest(limit, ranked, key=lambda item: item[:3])
+        logging.debug("Search %r: %d candidates, %d matches", query, len(candidates), len(ranked))
+        return [item[3] for item in best]
+
+    def _search_initial(self, letter: str, limit: int) -> list[Node]:
+        #values starting with the letter rank first, a value equal to it is also the shortest
+        found: list[Node] = self._leading.get(letter, [])[:limit]
+        if len(found) < limit:
+            taken: set[Node] = set(found)
+            for node in self._initials.get(letter, ()):
+                if node not in taken:
+                    found.append(node)
+                    if len(found) == limit:
+                        break
+        return found
+
+    def _order(self, node: Node) -> tuple[int, int]:
+        return (len(self._text_of[node]), node._id)
+
+    def _add(self, node: Node, keep_sorted: bool=True) -> None:
+        words: list[str] = node._value.casefold().split()
+        self._text_of[node] = " ".join(words)
+        grams: set[str] = set()
+        for word in words:
+            grams.update(word_grams(word))
+        self._grams_of[node] = grams
+        postings: dict[str, set[Node]] = self._postings
+        for gram in grams:
+            posting: set[Node]|None = postings.get(gram)
+            if posting is None:
+                postings[gram] = {node}
+            else:
+                posting.add(node)
+        for letter in {word[0] for word in words}:
+            self._insert_sorted(self._initials, letter, node, keep_sorted)
+        if words:
+            self._insert_sorted(self._leading, words[0][0], node, keep_sorted)
+        return
+
+    def _discard(self, node: Node) -> None:
+        if node not in self._text_of:
+            return
+        words: list[str] = self._text_of[node].split()
+        for letter in {word[0] for word in words}:
+            self._remove_sorted(self._initials, letter, node)
+        if words:
+            self._remove_sorted(self._leading, words[0][0], node)
+        for gram in self._grams_of.pop(node):
+            posting: set[Node] = self._postings[gram]
+            posting.discard(node)
+            if not posting:
+                del self._postings[gram]
+        del self._text_of[node]
+        return
+
+    def _insert_sorted(self, lists: dict[str, list[Node]], letter: str, node: Node, keep_sorted: bool) -> None:
+        #the initial build appends and sorts every list once at the end
+        nodes: list[Node] = lists.setdefault(letter, [])
+        if keep_sorted:
+            insort(nodes, node, key=self._order)
+        else:
+            nodes.append(node)
+        return
+
+    def _remove_sorted(self, lists: dict[str, list[Node]], letter: str, node: Node) -> None:
+        nodes: list[Node] = lists[letter]
+        del nodes[bisect_left(nodes, self._order(node), key=self._order)]
+        if not nodes:
+            del lists[letter]
+        return
+
+    def node_added(self, node: Node) -> None:
+        self._add(node)
+        return
+
+    def node_removed(self, node: Node) -> None:
+        self._discard(node)
+        return
+
+    def nodes_removed(self, nodes: list[Node], edges: list[tuple[Node, Node]]) -> None:
+        for node in nodes:
+            self._discard(node)
+        return
+
+    def node_changed(self, node: Node, field: str) -> None:
+        if field == "value":
+            self._discard(node)
+            self._add(node)
+        return
@@ -0,0 +1,379 @@
+from array import array
+from typing import Any, BinaryIO, Iterable, Iterator, Mapping, Sequence
+import itertools
+import logging
+import math
+import mmap
+import os
+import pickle
+import struct
+import sys
+
+from src.node import Node, LazyNode
+from src.task_graph import TaskGraph, GraphSnapshot, GraphSource
+from src.layout_cache import CacheEntry, SavedLayout
+
+MAGIC: bytes = b"TASKGRPH"
+VERSION: int = 2 #version 1 files have no layout sections and are still read
+
+#magic, version, generation, number of nodes, number of edges, next free id, root row (-1 for none)
+#the generation is bumped each time a journal is folded into the file, see src.journal
+HEADER: struct.Struct = struct.Struct("<8sIIqqqq")
+SECTION: struct.Struct = struct.Struct("<qq") #offset and length in bytes
+ALIGNMENT: int = 8
+WRITE_CHUNK: int = 16_384 #rows gathered per call while writing
+
+#(name, typecode, entries) in file order; entries says how many items a section holds
+#rows are stored in topological order, edges as CSR blocks grouped by parent and by child
+SECTIONS: tuple[tuple[str, str, str], ...] = (
+    ("ids", "q", "nodes"),
+    ("created", "d", "nodes"),
+    ("due_dates", "q", "nodes"), #date ordinals, NO_DATE when unset
+    ("due_times", "q", "nodes"), #seconds since midnight, NO_TIME when unset
+    ("completed", "b", "nodes"),
+    ("value_offsets", "q", "offsets"),
+    ("values", "B", "heap"), #utf-8 text of all values, back to back
+    ("child_offsets", "q", "offsets"),
+    ("children", "q", "edges"),
+    ("edge_parents", "q", "edges"), #parent row of each entry of children
+    ("parent_offsets", "q", "offsets"),
+    ("parents", "q", "edges"),
+    #since version 2: the layout cache, see src.layout_cache; x is NaN for tasks that were not laid out
+    ("layout_keys", "q", "nodes"),
+    ("layout_xs", "d", "nodes"),
+    ("layout_ys", "d", "nodes"),
+)
+SECTIONS_OF_VERSION: dict[int, tuple[tuple[str, str, str], ...]] = {1: SECTIONS[:12], 2: SECTIONS}
+NOT_LAID_OUT: CacheEntry = (0, math.nan, math.nan)
+
+
+def little_endian(column: array) -> bytes:
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+class TaskFile(GraphSource):
+    """
+    Read access to a task file through a read-only memory map. Columns the graph keeps
+    are copied out whole with column(); values and the CSR edge blocks are read in
+    place, one row at a time, as nodes are materialized.
+    """
+
+    rows_up_front: bool = True
+
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        with open(path, "rb") as f:
+            self._map: mmap.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_header(path)
+        except Exception:
+            self.close()
+            raise
+        self._row_of_id: dict[int, int]|None = None
+        return
+
+    def _read_header(self, path: str) -> None:
+        size: int = len(self._map)
+        if size < HEADER.size:
+            raise ValueError(f"{path} is too short to be a task file.")
+        magic, version, self.generation, self.num_nodes, self.num_edges, self.next_id, self.root_row = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a task file.")
+        if version not in SECTIONS_OF_VERSION:
+            raise ValueError(f"{path} has format version {version}, only versions up to {VERSION} are supported.")
+        sections: tuple[tuple[str, str, str], ...] = SECTIONS_OF_VERSION[version]
+        if size < HEADER.size + SECTION.size * len(sections):
+            raise ValueError(f"{path} is too short to be a task file.")
+        entries: dict[str, int] = {"nodes": self.num_nodes, "offsets": self.num_nodes + 1, "edges": self.num_edges}
+
+        self._sections: dict[str, tuple[int, int]] = {}
+        for i, (name, typecode, kind) in enumerate(sections):
+            offset, nbytes = SECTION.unpack_from(self._map, HEADER.size + i * SECTION.size)
+            if offset < 0 or nbytes < 0 or offset + nbytes > size:
+                raise ValueError(f"{path} is truncated, section {name} ends past the end of the file.")
+            if kind != "heap" and nbytes != entries[kind] * array(typecode).itemsize:
+                raise ValueError(f"{path} is corrupt, section {name} has {nbytes} bytes.")
+            self._sections[name] = (offset, nbytes)
+
+        #views straight into the map for the blocks read per row
+        self._value_offsets: Sequence[int] = self._view("value_offsets", "q")
+        self._child_offsets: Sequence[int] = self._view("child_offsets", "q")
+        self._children: Sequence[int] = self._view("children", "q")
+        self._parent_offsets: Sequence[int] = self._view("parent_offsets", "q")
+        self._parents: Sequence[int] = self._view("parents", "q")
+        laid_out: bool = "layout_keys" in self._sections
+        self._layout_keys: Sequence[int] = self._view("layout_keys", "q") if laid_out else ()
+        self._layout_xs: Sequence[float] = self._view("layout_xs", "d") if laid_out else ()
+        self._layout_ys: Sequence[float] = self._view("layout_ys", "d") if laid_out else ()
+        self._values_start: int = self._sections["values"][0]
+        self._check_index(path)
+        return
+
+    def _check_index(self, path: str) -> None:
+        """
+        Raises ValueError unless the root, the ends of the CSR offsets and every row number in
+        the edge blocks are in bounds. The offsets in between are checked as rows are read.
+        """
+        if not -1 <= self.root_row < self.num_nodes:
+            raise ValueError(f"{path} is corrupt, root row {self.root_row} is out of range.")
+        ends: tuple[tuple[str, Sequence[int], int], ...] = (
+            ("value_offsets", self._value_offsets, self._sections["values"][1]),
+            ("child_offsets", self._child_offsets, self.num_edges),
+            ("parent_offsets", self._parent_offsets, self.num_edges),
+        )
+        for name, offsets, end in ends:
+            if offsets[0] != 0 or offsets[-1] != end:
+                raise ValueError(f"{path} is corrupt, section {name} does not run from 0 to {end}.")
+        if self.num_edges:
+            for name in ("children", "edge_parents", "parents"):
+                if self._largest_unsigned(name) >= self.num_nodes:
+                    raise ValueError(f"{path} is corrupt, section {name} refers to rows outside 0..{self.num_nodes - 1}.")
+        return
+
+    def _largest_unsigned(self, name: str) -> int:
+        """Returns the largest entry of a "q" section read as unsigned, so a negative one counts as too large as well."""
+        if sys.byteorder == "big":
+            return max(map((2**64).__rmod__, self.column(name, "q")))
+        offset, nbytes = self._sections[name]
+        entries: memoryview = memoryview(self._map)[offset:offset + nbytes].cast("Q")
+        largest: int = max(entries)
+        entries.release()
+        return largest
+
+    def _block(self, offsets: Sequence[int], row: int, end: int) -> tuple[int, int]:
+        """Returns where row's entries start and stop, checked against the end of their section."""
+        start, stop = offsets[row], offsets[row + 1]
+        if not 0 <= start <= stop <= end:
+            raise ValueError(f"{self.path} is corrupt, row {row} has entries {start}..{stop} outside 0..{end}.")
+        return start, stop
+
+    def _view(self, name: str, typecode: str) -> Sequence[int|float]:
+        """Returns the section as a typed sequence, without copying on little-endian machines."""
+        offset, nbytes = self._sections[name]
+        if sys.byteorder == "little":
+            return memoryview(self._map)[offset:offset + nbytes].cast(typecode)
+        return self.column(name, typecode)
+
+    def column(self, name: str, typecode: str) -> array:
+        """Copies a section into a new array of the given type code."""
+        offset, nbytes = self._sections[name]
+        stored: str = next(t for n, t, _ in SECTIONS if n == name)
+        column: array = array(stored)
+        column.frombytes(self._map[offset:offset + nbytes])
+        if sys.byteorder == "big":
+            column.byteswap()
+        #e.g. "l" is 4 bytes on Windows, the file always holds 8
+        if typecode != stored:
+            column = array(typecode, column)
+        return column
+
+    def layout(self) -> SavedLayout:
+        """Returns the saved layout cache by task id, read an entry at a time as tasks are looked up; empty for files written before there was one."""
+        return SavedLayout(self.layout_entry, self.laid_out_ids, self.ids_in_box)
+
+    def layout_entry(self, node_id: int) -> CacheEntry|None:
+        row: int|None = self.row_of_id(node_id) if self._layout_xs else None
+        if row is None:
+            return None
+        x: float = self._layout_xs[row]
+        #NaN is the one x that differs from itself
+        return (self._layout_keys[row], x, self._layout_ys[row]) if x == x else None
+
+    def laid_out_ids(self) -> Iterator[int]:
+        return itertools.compress(self.column("ids", "q"), (x == x for x in self._layout_xs))
+
+    def ids_in_box(self, x0: float, y0: float, x1: float, y1: float) -> list[int]:
+        """Returns the ids of the tasks whose saved position lies in the box, reading only the position columns and the ids in it."""
+        left, right, top, bottom = min(x0, x1), max(x0, x1), min(y0, y1), max(y0, y1)
+        ids: Sequence[int] = self._view("ids", "q")
+        try:
+            return [ids[row] for row, (x, y) in enumerate(zip(self._layout_xs, self._layout_ys)) if left <= x <= right and top <= y <= bottom]
+        finally:
+            if isinstance(ids, memoryview):
+                ids.release()
+
+    def value(self, row: int) -> str:
+        start, stop = self._block(self._value_offsets, row, self._sections["values"][1])
+        return self._map[self._values_start + start:self._values_start + stop].decode("utf-8")
+
+    def value_heap(self) -> tuple[Sequence[int], memoryview]:
+        """Returns the value offsets and the string heap as new views into the map, which stays open while they are held, see close."""
+        offset, nbytes = self._sections["values"]
+        return self._view("value_offsets", "q"), memoryview(self._map)[offset:offset + nbytes]
+
+    def children(self, row: int) -> Sequence[int]:
+        start, stop = self._block(self._child_offsets, row, self.num_edges)
+        return self._children[start:stop]
+
+    def parents(self, row: int) -> Sequence[int]:
+        start, stop = self._block(self._parent_offsets, row, self.num_edges)
+        return self._parents[start:stop]
+
+    def row_of_id(self, node_id: int) -> int|None:
+        """Returns the row holding node_id; the lookup table is built on the first call."""
+        if self._row_of_id is None:
+            self._row_of_id = dict(zip(self.column("ids", "q"), range(self.num_nodes)))
+        return self._row_of_id.get(node_id)
+
+    def load(self, graph: TaskGraph, node_id: int) -> Node|None:
+        row: int|None = self.row_of_id(node_id)
+        return graph.get_node(row) if row is not None else None
+
+    def load_all(self, graph: TaskGraph) -> bool:
+        #every task already has a row and every edge is listed, see TaskGraph.from_source
+        if graph._unloaded:
+            graph._materialize_rows()
+        return False
+
+    def adjacency(self, graph: TaskGraph, node: LazyNode) -> tuple[Iterable[Node], Iterable[Node]]:
+        row: int = graph.get_row(node)
+        get_node = graph.get_node
+        return map(get_node, self.children(row)), map(get_node, self.parents(row))
+
+    def close(self) -> None:
+        #views into the map must be released before it can be closed
+        for name in ("_value_offsets", "_child_offsets", "_children", "_parent_offsets", "_parents", "_layout_keys", "_layout_xs", "_layout_ys"):
+            view: Any = getattr(self, name, None)
+            if isinstance(view, memoryview):
+                view.release()
+        try:
+            self._map.close()
+        except BufferError:
+            #a snapshot still reads values through value_heap, the map is unmapped once the snapshot is gone
+            logging.debug("Leaving %s mapped for a snapshot", self.path)
+        return
+
+
+def write_task_file(graph: TaskGraph, path: str, generation: int=0, layout: Mapping[int, CacheEntry]|None=None) -> None:
+    """
+    Saves graph to path in the task file format, with the layout cache entries of its
+    tasks. A graph that was opened from the file at path reads in the rest of it first,
+    as the file is about to be replaced.
+    """
+    source: TaskFile|None = graph._source
+    if source is not None and os.path.abspath(source.path) == os.path.abspath(path):
+        graph.detach_source()
+    write_snapshot(graph.snapshot(), path, generation, layout)
+    return
+
+
+def write_snapshot(snapshot: GraphSnapshot, path: str, generation: int=0, layout: Mapping[int, CacheEntry]|None=None) -> None:
+    """
+    Writes a snapshot to path in the task file format, with the entries of layout whose
+    tasks it holds. Only the snapshot is read, so this can run on a worker thread as long
+    as layout is not changed meanwhile; columns are gathered WRITE_CHUNK rows at a time,
+    so no single call holds the GIL for long. The file is written next to path and
+    renamed over it, so an existing file is replaced only by a complete one.
+    """
+    order: array = snapshot.topological_rows()
+    new_row: array = array("q", [-1]) * snapshot.num_rows
+    for i, row in enumerate(order):
+        new_row[row] = i
+
+    columns: dict[str, array|bytes] = {
+        "ids": gather(snapshot.ids, order, "q"),
+        "created": gather(snapshot.created, order, "d"),
+        "due_dates": gather(snapshot.due_dates, order, "q"),
+        "due_times": gather(snapshot.due_times, order, "q"),
+        "completed": gather(snapshot.completed, order, "b"),
+    }
+    value_offsets: array = array("q", [0])
+    heap: bytearray = bytearray()
+    for row in order:
+        heap += snapshot.value(row).encode("utf-8")
+        value_offsets.append(len(heap))
+    columns["value_offsets"] = value_offsets
+    columns["values"] = bytes(heap)
+    del heap
+    #each parent's children stay in edge list order, which is the order they were added in
+    columns["child_offsets"], columns["children"], columns["edge_parents"] = regroup(*snapshot.grouped_edges(), order, new_row)
+    columns["parent_offsets"], columns["parents"], _ = regroup(*snapshot.grouped_edges(by_child=True), order, new_row)
+    placed: list[CacheEntry] = list(map((layout if layout is not None else {}).get, columns["ids"], itertools.repeat(NOT_LAID_OUT)))
+    columns["layout_keys"] = array("q", [entry[0] for entry in placed])
+    columns["layout_xs"] = array("d", [entry[1] for entry in placed])
+    columns["layout_ys"] = array("d", [entry[2] for entry in placed])
+    del placed
+    num_edges: int = len(columns["children"])
+    root_row: int = new_row[snapshot.root_row] if snapshot.root_row >= 0 else -1
+
+    tmp_path: str = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        _ = f.write(HEADER.pack(MAGIC, VERSION, generation, len(order), num_edges, snapshot.next_id, root_row))
+        offset: int = HEADER.size + SECTION.size * len(SECTIONS)
+        for name, _, _ in SECTIONS:
+            offset += -offset % ALIGNMENT
+            nbytes: int = len(columns[name]) * (1 if isinstance(columns[name], bytes) else columns[name].itemsize)
+            _ = f.write(SECTION.pack(offset, nbytes))
+            offset += nbytes
+        for name, _, _ in SECTIONS:
+            column: array|bytes = columns[name]
+            _ = f.write(b"\0" * (-f.tell() % ALIGNMENT))
+            _ = f.write(column if isinstance(column, bytes) else little_endian(column))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    logging.info("Saved %d tasks to %s", len(order), path)
+    return
+
+
+def gather(column: array, rows: array, typecode: str) -> array:
+    """Returns column[rows] as a new array."""
+    gathered: array = array(typecode)
+    for start in range(0, len(rows), WRITE_CHUNK):
+        gathered.extend(map(column.__getitem__, rows[start:start + WRITE_CHUNK]))
+    return gathered
+
+
+def regroup(offsets: array, targets: array, order: array, new_row: array) -> tuple[array, array, array]:
+    """
+    Renumbers CSR edge groups from snapshot rows to file rows: returns the offsets, the
+    renumbered targets and, for each target, the file row of its group.
+    """
+    new_offsets: array = array("q", [0])
+    new_targets: array = array("q")
+    sources: array = array("q")
+    for i, row in enumerate(order):
+        group: array = targets[offsets[row]:offsets[row + 1]]
+        new_targets.extend(map(new_row.__getitem__, group))
+        sources.extend(array("q", [i]) * len(group))
+        new_offsets.append(len(new_targets))
+    return new_offsets, new_targets, sources
+
+
+def open_task_file(path: str) -> TaskGraph:
+    """Opens a task file lazily: nodes are created as they are first reached."""
+    return TaskGraph.from_source(TaskFile(path))
+
+
+def read_generation(path: str) -> int:
+    with open(path, "rb") as f:
+        header: bytes = f.read(HEADER.size)
+    if len(header) < HEADER.size or header[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a task file.")
+    return HEADER.unpack(header)[2]
+
+
+def is_task_file(file: BinaryIO) -> bool:
+    magic: bytes = file.read(len(MAGIC))
+    _ = file.seek(-len(magic), os.SEEK_CUR)
+    return magic == MAGIC
+
+
+def load_graph(path: str) -> TaskGraph:
+    """
+    Loads a task file, or a pickle written by older versions, which hold either a
+    TaskGraph or just the root Node. Only open pickles from a trusted source.
+    """
+    with open(path, "rb") as f:
+        if is_task_file(f):
+            return open_task_file(path)
+        loaded: Any = pickle.load(f)
+    if isinstance(loaded, Node):
+        loaded = TaskGraph.from_root(loaded)
+    if not isinstance(loaded, TaskGraph):
+        raise ValueError(f"{path} holds a {type(loaded).__name__}, not a task graph.")
+    logging.info("Loaded %d tasks from pickle %s", len(loaded), path)
+    return loaded
@@ -0,0 +1,1004 @@
+from array import array
+from datetime import date, time
+from typing import Any, Callable, Iterable, Iterator, Sequence, TypeVar, TYPE_CHECKING
+from collections import Counter
+from contextlib import contextmanager
+import gc
+import itertools
+import operator
+import logging
+import sys
+import time as _time
+import weakref
+
+from src.node import Node, LazyNode, IdAllocator
+
+if TYPE_CHECKING:
+    from src.task_file import TaskFile
+
+NO_DATE: int = 0 #date.toordinal() starts at 1
+NO_TIME: int = -1
+MIN_DEAD_EDGES: int = 1024 #tombstoned edges tolerated before the edge list is squeezed
+MIN_DEAD_ROWS: int = 1024 #tombstoned rows tolerated before the columns are compacted
+
+ObserverT = TypeVar("ObserverT", bound="GraphObserver")
+
+
+def check_types(name: str, column: Sequence[Any], allowed: tuple[type, ...]) -> None:
+    """Raises TypeError unless every entry of column is an instance of allowed; checks each distinct type once."""
+    for kind in set(map(type, column)):
+        if not issubclass(kind, allowed):
+            raise TypeError(f"Column {name} must hold {' or '.join(t.__name__ for t in allowed)}, not {kind.__name__}.")
+    return
+
+
+@contextmanager
+def paused_gc() -> Iterator[None]:
+    """
+    Turns off the cyclic garbage collector while a large number of objects is created.
+    Otherwise full collections keep rescanning the growing graph during bulk loads.
+    """
+    was_enabled: bool = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+    return
+
+
+def time_to_seconds(t: time|None) -> int:
+    if t is None:
+        return NO_TIME
+    return t.hour * 3600 + t.minute * 60 + t.second
+
+
+def seconds_to_time(seconds: int) -> time|None:
+    if seconds == NO_TIME:
+        return None
+    return time(seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+
+class GraphObserver:
+    """
+    Receives notifications when a TaskGraph changes.
+    Indexes subclass this and override only the events they care about.
+    """
+
+    def node_added(self, node: Node) -> None:
+        return
+
+    def node_removed(self, node: Node) -> None:
+        return
+
+    def node_changed(self, node: Node, field: str) -> None:
+        return
+
+    def edge_added(self, parent: Node, child: Node) -> None:
+        return
+
+    def edge_removed(self, parent: Node, child: Node) -> None:
+        return
+
+    def nodes_removed(self, nodes: list[Node], edges: list[tuple[Node, Node]]) -> None:
+        """Bulk removal of nodes, which include all of their descendants, together with every edge that touched them."""
+        for parent, child in edges:
+            self.edge_removed(parent, child)
+        for node in nodes:
+            self.node_removed(node)
+        return
+
+    def nodes_reordered(self, nodes: list[Node]) -> None:
+        """add_child gave nodes new topological positions, taken from the positions they had between them."""
+        return
+
+    def rows_compacted(self, kept: array) -> None:
+        """The tombstoned rows were dropped: row r now holds what row kept[r] held. Indexes keyed by row remap here."""
+        return
+
+
+class GraphSource:
+    """
+    Storage a graph was opened from without creating its nodes. The graph asks its
+    source for a task the first time it is looked up, and for a node's edges the first
+    time they are used; until then the node is a LazyNode.
+    """
+
+    rows_up_front: bool = False #whether the graph holds a row for every task of the source from the start
+
+    def load(self, graph: "TaskGraph", node_id: int) -> Node|None:
+        """Returns the node with node_id, creating it in graph if needed, or None if there is no such task."""
+        raise NotImplementedError
+
+    def load_all(self, graph: "TaskGraph") -> bool:
+        """
+        Creates every task graph has not created yet. Returns True if graph now holds
+        everything, edges included, so it does not need the source any more.
+        """
+        raise NotImplementedError
+
+    def adjacency(self, graph: "TaskGraph", node: LazyNode) -> tuple[Iterable[Node], Iterable[Node]]:
+        """Returns node's children and parents, each in order, as nodes of graph."""
+        raise NotImplementedError
+
+    def value_heap(self) -> tuple[Sequence[int], bytes|memoryview]|None:
+        """
+        Values of the rows not materialized yet, for a snapshot, as (offsets, heap) shared with
+        the source rather than copied: they must stay readable after the source is closed.
+        None if unloaded tasks have no rows.
+        """
+        return None
+
+    def close(self) -> None:
+        return
+
+
+def compressed_edges(edge_parents: array, edge_children: array, num_rows: int, num_edges: int, by_child: bool=False) -> tuple[array, array]:
+    """GraphSnapshot.grouped_edges over bare edge columns, for code that gets the columns without a snapshot, e.g. in another process."""
+    ends, others = (edge_children, edge_parents) if by_child else (edge_parents, edge_children)
+    parents: array = edge_parents
+    counts: array = array("l", [0]) * (num_rows + 1)
+    for i in range(num_edges):
+        if parents[i] >= 0:
+            counts[ends[i] + 1] += 1
+    offsets: array = array("l", itertools.accumulate(counts))
+    fill: array = offsets[:]
+    targets: array = array("l", [0]) * offsets[-1]
+    for i in range(num_edges):
+        if parents[i] >= 0:
+            end: int = ends[i]
+            targets[fill[end]] = others[i]
+            fill[end] += 1
+    return offsets, targets
+
+
+class GraphSnapshot:
+    """
+    Read-only view of a TaskGraph's columns at the moment TaskGraph.snapshot was called.
+    It never touches Node objects, so it can be read on another thread while the graph
+    keeps changing. Rows of a task file that were never materialized have no value in
+    the values column, their text is read from heap, the file's string heap in its memory map.
+    """
+
+    def __init__(self, ids: array, values: list[str|None], created: array, due_dates: array, due_times: array,
+                 completed: array, alive: array, num_rows: int, edge_parents: array, edge_children: array,
+                 num_edges: int, root_row: int, next_id: int, heap: tuple[Sequence[int], bytes|memoryview]|None) -> None:
+        self.ids: array = ids
+        self.values: list[str|None] = values
+        self.created: array = created
+        self.due_dates: array = due_dates
+        self.due_times: array = due_times
+        self.completed: array = completed
+        self.alive: array = alive
+        self.num_rows: int = num_rows
+        self.edge_parents: array = edge_parents
+        self.edge_children: array = edge_children
+        self.num_edges: int = num_edges #edge slots, including tombstones
+        self.root_row: int = root_row
+        self.next_id: int = next_id
+        self._heap: tuple[Sequence[int], bytes|memoryview]|None = heap
+        return
+
+    def value(self, row: int) -> str:
+        value: str|None = self.values[row]
+        if value is None:
+            offsets, heap = self._heap
+            value = str(heap[offsets[row]:offsets[row + 1]], "utf-8")
+        return value
+
+    def edges(self) -> Iterator[tuple[int, int]]:
+        """Yields the live (parent row, child row) pairs in edge list order."""
+        for i in range(self.num_edges):
+            parent: int = self.edge_parents[i]
+            if parent >= 0:
+                yield parent, self.edge_children[i]
+        return
+
+    def grouped_edges(self, by_child: bool=False) -> tuple[array, array]:
+        """
+        Returns the live edges in compressed sparse row form as (offsets, targets), grouped
+        by parent (or by child), each group in edge list order: the child rows of row r
+        are targets[offsets[r]:offsets[r + 1]]. Only arrays are allocated, so building it
+        for a large graph does not set off the garbage collector.
+        """
+        return compressed_edges(self.edge_parents, self.edge_children, self.num_rows, self.num_edges, by_child)
+
+    def topological_rows(self) -> array:
+        """Returns the live rows with every parent before its children (Kahn's algorithm over the edge columns)."""
+        offsets, targets = self.grouped_edges()
+        in_degree: array = array("l", [0]) * self.num_rows
+        for child in targets:
+            in_degree[child] += 1
+        alive: array = self.alive
+        #the order doubles as the queue of rows whose parents are all placed
+        order: array = array("l", [r for r in range(self.num_rows) if alive[r] and not in_degree[r]])
+        i: int = 0
+        while i < len(order):
+            row: int = order[i]
+            i += 1
+            for child in targets[offsets[row]:offsets[row + 1]]:
+                in_degree[child] -= 1
+                if not in_degree[child]:
+                    order.append(child)
+        return order
+
+
+class TaskGraph:
+    """
+    Container for a task graph that stores node fields and edges in parallel arrays.
+
+    Each node owns one row. Rows of removed nodes are tombstoned, not reused, so row
+    numbers stay stable until the tombstones outnumber the live rows; then the next
+    snapshot compacts the columns first, see compact_rows. The Node objects remain the handles used to edit the graph:
+    their setters, add_child and remove_from_tree write through to the columns, so bulk
+    scans can run over flat arrays instead of walking objects.
+    """
+
+    def __init__(self) -> None:
+        self._ids: array = array("q")
+        self._values: list[str|None] = [] #None for rows of a task file that are not materialized yet
+        self._created: array = array("d") #POSIX timestamps
+        self._due_dates: array = array("l") #date ordinals, NO_DATE when unset
+        self._due_times: array = array("l") #seconds since midnight, NO_TIME when unset
+        self._completed: array = array("b")
+        self._alive: array = array("b")
+        self._nodes: list[Node|None] = []
+        self._row_of: dict[Node, int] = {}
+        self._by_id: dict[int, Node] = {}
+        self._id_allocator: IdAllocator = IdAllocator() #high-water mark of ids ever used in this graph, saved with it
+        self._root: Node|None = None
+
+        #edge list in the order edges were added, so each parent's edges follow the order of its children
+        #removed edges are tombstoned with -1 and squeezed out once they make up half of the list
+        self._edge_parents: array = array("l")
+        self._edge_children: array = array("l")
+        self._edge_slot: dict[tuple[int, int], int]|None = {} #built on first use after opening a task file
+        self._dead_edges: int = 0
+        self._dead_rows: int = 0
+        self._row_generation: int = 0 #counts compactions, so holders of row numbers can tell theirs are stale
+
+        #snapshots sharing the columns; while any is alive, the columns are copied before the next change in place
+        self._snapshots: weakref.WeakSet[GraphSnapshot] = weakref.WeakSet()
+
+        #storage the graph was opened from; nodes are created on first access, see GraphSource
+        self._source: GraphSource|None = None
+        self._unloaded: int = 0 #tasks of the source that have no Node yet
+        self._ord_base: int = 0 #topological position of row 0 of the source, rows follow in order
+
+        self._observers: list[GraphObserver] = []
+        return
+
+    @classmethod
+    def from_root(cls, root: Node) -> "TaskGraph":
+        """Returns the graph root belongs to, creating one for its connected tasks if needed."""
+        if root._graph is not None:
+            if root._graph._root is None:
+                root._graph._root = root
+            return root._graph
+        graph = cls()
+        _ = graph.add_node(root)
+        graph._root = root
+        return graph
+
+    @classmethod
+    def from_columns(cls, ids: Sequence[int], values: Sequence[str], edge_parents: Sequence[int], edge_children: Sequence[int],
+                     due_dates: Sequence[date|None]|None=None, due_times: Sequence[time|None]|None=None,
+                     completed: Sequence[bool]|None=None, root: int|None=None) -> "TaskGraph":
+        """
+        Builds a graph in one pass from parallel columns: one entry per task in ids and
+        values (and the optional due_dates, due_times, completed), one entry per edge in
+        edge_parents and edge_children, which hold task ids. The whole input is checked
+        up front instead of once per add_child; invalid input raises TypeError or
+        ValueError and builds nothing. root defaults to the first task without parents.
+        """
+        num_nodes: int = len(ids)
+        for name, column in (("values", values), ("due_dates", due_dates), ("due_times", due_times), ("completed", completed)):
+            if column is not None and len(column) != num_nodes:
+                raise ValueError(f"Column {name} has {len(column)} entries, expected {num_nodes}.")
+        if len(edge_parents) != len(edge_children):
+            raise ValueError(f"Edge columns differ in length: {len(edge_parents)} parents, {len(edge_children)} children.")
+        check_types("ids", ids, (int,))
+        check_types("values", values, (str,))
+        if due_dates is not None:
+            check_types("due_dates", due_dates, (date, type(None)))
+        if due_times is not None:
+            check_types("due_times", due_times, (time, type(None)))
+        if completed is not None:
+            check_types("completed", completed, (bool,))
+
+        row_of_id: dict[int, int] = dict(zip(ids, range(num_nodes)))
+        if len(row_of_id) != num_nodes:
+            duplicates: list[int] = [i for i, count in Counter(ids).items() if count > 1]
+            raise ValueError(f"Task ids must be unique, {len(duplicates)} are repeated, e.g. {duplicates[0]}.")
+        try:
+            #mapping into a list first is much faster than filling an array from an iterator
+            parent_rows: array = array("l", list(map(row_of_id.__getitem__, edge_parents)))
+            child_rows: array = array("l", list(map(row_of_id.__getitem__, edge_children)))
+        except KeyError as e:
+            raise ValueError(f"Edge refers to unknown task id {e.args[0]}.") from None
+        if any(map(operator.eq, parent_rows, child_rows)):
+            raise ValueError("Edges must not connect a task to itself.")
+        #repeated edges are accepted once, like a repeated add_child
+        unique_edges: dict[tuple[int, int], None] = dict.fromkeys(zip(parent_rows, child_rows))
+        if len(unique_edges) != len(parent_rows):
+            parent_rows = array("l", [p for p, _ in unique_edges])
+            child_rows = array("l", [c for _, c in unique_edges])
+        for rows, limit, kind in ((parent_rows, Node._max_children, "children"), (child_rows, Node._max_parents, "parents")):
+            if rows:
+                row, count = Counter(rows).most_common(1)[0]
+                if count > limit:
+                    raise ValueError(f"Task {ids[row]} has {count} {kind}, the limit is {limit}.")
+
+        if root is not None and root not in row_of_id:
+            raise ValueError(f"Root {root} is not one of the task ids.")
+
+        with paused_gc():
+            graph = cls._build_from_columns(ids, values, due_dates, due_times, completed, parent_rows, child_rows)
+        if root is not None:
+            graph._root = graph._nodes[row_of_id[root]]
+        else:
+            graph._root = next((n for n in graph._nodes if not n._parents), None)
+        logging.debug("Built graph of %d tasks and %d edges from columns", num_nodes, len(parent_rows))
+        return graph
+
+    @classmethod
+    def _build_from_columns(cls, ids: Sequence[int], values: Sequence[str], due_dates: Sequence[date|None]|None,
+                            due_times: Sequence[time|None]|None, completed: Sequence[bool]|None,
+                            parent_rows: array, child_rows: array) -> "TaskGraph":
+        created: float = _time.time()
+        nodes: list[Node] = []
+        columns = zip(ids, map(sys.intern, values) if Node.intern_values else values,
+                      due_dates if due_dates is not None else itertools.repeat(None),
+                      due_times if due_times is not None else itertools.repeat(None),
+                      completed if completed is not None else itertools.repeat(False))
+        for node_id, value, due_date, due_time, done in columns:
+            node = Node.__new__(Node)
+            node._id = node_id
+            node._value = value
+            node._created_at = created
+            node._due_date = due_date
+            node._due_time = due_time
+            node._completed = done
+            nodes.append(node)
+
+        graph = cls()
+        graph._load_rows(nodes, parent_rows, child_rows) #raises ValueError on a cycle
+        return graph
+
+    @classmethod
+    def from_source(cls, source: "TaskFile") -> "TaskGraph":
+        """
+        Opens a graph over a task file without creating its nodes. The columns and the
+        edge list are copied out of the file in one block each; a Node is created when
+        its row is first asked for, and its edges are read when they are first used.
+        The file stores rows in topological order, so row r gets position _ord_base + r.
+        """
+        graph = cls()
+        num_rows: int = source.num_nodes
+        graph._ids = source.column("ids", "q")
+        graph._created = source.column("created", "d")
+        graph._due_dates = source.column("due_dates", "l")
+        graph._due_times = source.column("due_times", "l")
+        graph._completed = source.column("completed", "b")
+        graph._alive = array("b", [True]) * num_rows
+        graph._values = [None] * num_rows
+        graph._nodes = [None] * num_rows
+        graph._edge_parents = source.column("edge_parents", "l")
+        graph._edge_children = source.column("children", "l")
+        graph._edge_slot = None
+        graph._source = source
+        graph._unloaded = num_rows
+        graph._ord_base = Node.reserve_orders(num_rows)
+        graph._id_allocator.reserve(source.next_id - 1)
+        Node.id_iter.reserve(source.next_id - 1)
+        if source.root_row >= 0:
+            graph._root = graph.get_node(source.root_row)
+        logging.debug("Opened graph of %d tasks and %d edges", num_rows, source.num_edges)
+        return graph
+
+    @classmethod
+    def from_store(cls, source: GraphSource, num_tasks: int, next_id: int, root_id: int) -> "TaskGraph":
+        """
+        Opens a graph over a source that gives a task its row when the task is loaded,
+        such as a task database, instead of holding a row for every task up front. Only
+        the root is loaded here.
+        """
+        graph = cls()
+        graph._source = source
+        graph._unloaded = num_tasks
+        graph._id_allocator.reserve(next_id - 1)
+        Node.id_iter.reserve(next_id - 1)
+        if root_id >= 0:
+            graph._root = graph.get_node_by_id(root_id)
+        return graph
+
+    def __len__(self) -> int:
+        return len(self._row_of) + self._unloaded
+
+    def __contains__(self, node: object) -> bool:
+        return node in self._row_of
+
+    def __iter__(self) -> Iterator[Node]:
+        self._materialize_all()
+        return iter(list(self._row_of))
+
+    def __getstate__(self) -> dict[str, Any]:
+        #pickle flat columns and edge arrays, so saving never recurses through the nodes
+        #saved in topological order, so loading can skip the sort
+        nodes: list[Node] = self.topological_order()
+        row_to_index: dict[int, int] = {self._row_of[n]: i for i, n in enumerate(nodes)}
+        edges: list[tuple[int, int]] = [(row_to_index[p], row_to_index[c]) for p, c in self._get_edge_slots()]
+        return {
+            "ids": array("q", (n._id for n in nodes)),
+            "values": [n._value for n in nodes],
+            "created": array("d", (n._created_at for n in nodes)),
+            "due_dates": [n._due_date for n in nodes],
+            "due_times": [n._due_time for n in nodes],
+            "completed": array("b", (n._completed for n in nodes)),
+            "edge_parents": array("l", (p for p, _ in edges)),
+            "edge_children": array("l", (c for _, c in edges)),
+            "next_id": self._id_allocator.peek(),
+            "root": self._root._id if self._root is not None else -1,
+        }
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__init__()
+        nodes: list[Node] = []
+        for i in range(len(state["ids"])):
+            node = Node.__new__(Node)
+            node._id = state["ids"][i]
+            node._value = state["values"][i]
+            node._created_at = state["created"][i]
+            node._due_date = state["due_dates"][i]
+            node._due_time = state["due_times"][i]
+            node._completed = bool(state["completed"][i])
+            nodes.append(node)
+        #ids of deleted nodes stay reserved too, so nothing saved can be confused with a new node
+        self._id_allocator.reserve(state.get("next_id", 0) - 1)
+        Node.id_iter.reserve(state.get("next_id", 0) - 1)
+        with paused_gc():
+            self._load_rows(nodes, state["edge_parents"], state["edge_children"])
+        self._root = self._by_id.get(state.get("root", -1))
+        return
+
+    def _load_rows(self, nodes: list[Node], parent_rows: Sequence[int], child_rows: Sequence[int]) -> None:
+        """
+        Fills an empty graph with new nodes and the edges between them, given as indexes
+        into nodes, by extending every column at once. The nodes' adjacency, graph and
+        topological position are set here. Ids must be unique.
+        """
+        #input that lists every parent before its children is already in topological order
+        in_order: bool = all(map(operator.lt, parent_rows, child_rows))
+        first_ord: int = Node.reserve_orders(len(nodes)) if in_order else 0
+        for i, node in enumerate(nodes):
+            node._children = {}
+            node._parents = {}
+            node._graph = self
+            node._ord = first_ord + i
+        #group the edges by endpoint, so each adjacency dict is built in one call, in edge order
+        for ends, others, field in ((parent_rows, child_rows, "_children"), (child_rows, parent_rows, "_parents")):
+            grouped: list[int] = sorted(range(len(ends)), key=ends.__getitem__)
+            other_nodes: list[Node] = list(map(nodes.__getitem__, map(others.__getitem__, grouped)))
+            start: int = 0
+            for row, count in sorted(Counter(ends).items()):
+                setattr(nodes[row], field, dict.fromkeys(other_nodes[start:start + count]))
+                start += count
+
+        if not in_order:
+            _ = Node.order_topologically(nodes)
+
+        self._ids.extend([n._id for n in nodes])
+        self._values.extend([n._value for n in nodes])
+        self._created.extend([n._created_at for n in nodes])
+        self._due_dates.extend([n._due_date.toordinal() if n._due_date is not None else NO_DATE for n in nodes])
+        self._due_times.extend([time_to_seconds(n._due_time) for n in nodes])
+        self._completed.extend([n._completed for n in nodes])
+        self._alive.extend(itertools.repeat(True, len(nodes)))
+        self._nodes.extend(nodes)
+        self._row_of = dict(zip(nodes, range(len(nodes))))
+        self._by_id.update(zip(self._ids, nodes))
+        if nodes:
+            self._id_allocator.reserve(max(self._ids))
+            Node.id_iter.reserve(max(self._ids))
+
+        self._edge_parents.extend(parent_rows)
+        self._edge_children.extend(child_rows)
+        self._edge_slot = dict(zip(zip(parent_rows, child_rows), range(len(parent_rows))))
+        return
+
+    def _materialize(self, row: int) -> Node:
+        """Creates the node of an alive row of the source file, without its edges."""
+        node = LazyNode.__new__(LazyNode)
+        node._id = self._ids[row]
+        value: str = self._source.value(row)
+        node._value = sys.intern(value) if Node.intern_values else value
+        node._created_at = self._created[row]
+        day: int = self._due_dates[row]
+        node._due_date = date.fromordinal(day) if day != NO_DATE else None
+        node._due_time = seconds_to_time(self._due_times[row])
+        node._completed = bool(self._completed[row])
+        node._graph = self
+        node._ord = self._ord_base + row
+        #same text as the file holds, so a snapshot sharing the column is not affected
+        self._values[row] = node._value
+        self._nodes[row] = node
+        self._row_of[node] = row
+        self._by_id[node._id] = node
+        self._unloaded -= 1
+        return node
+
+    def _materialize_all(self) -> None:
+        if self._source is not None and self._source.load_all(self):
+            self._source = None
+        return
+
+    def _materialize_rows(self) -> None:
+        """Creates the node of every alive row not created yet, keeping the row order of _row_of and _by_id."""
+        nodes: list[Node|None] = self._nodes
+        alive: array = self._alive
+        with paused_gc():
+            for row in range(len(nodes)):
+                if nodes[row] is None and alive[row]:
+                    _ = self._materialize(row)
+        self._row_of = {n: row for row, n in enumerate(nodes) if n is not None}
+        #in place, callers hold on to the index, see get_loaded_index
+        by_id: dict[int, Node] = {n._id: n for n in self._row_of}
+        self._by_id.clear()
+        self._by_id.update(by_id)
+        return
+
+    def _expand(self, node: LazyNode) -> None:
+        """
+        Reads node's edges from the source and turns it into a plain Node. Any change to
+        the edges of a node goes through its own adjacency first, so the edges of a node
+        that is still lazy are exactly those in the source.
+        """
+        children, parents = self._source.adjacency(self, node)
+        Node._children.__set__(node, dict.fromkeys(children))
+        Node._parents.__set__(node, dict.fromkeys(parents))
+        node.__class__ = Node
+        return
+
+    def detach_source(self) -> None:
+        """Reads everything still needed from the source and closes it, e.g. before overwriting its file."""
+        source: GraphSource|None = self._source
+        if source is None:
+            return
+        self._materialize_all()
+        if self._source is not None:
+            for node in self._nodes:
+                if type(node) is LazyNode:
+                    self._expand(node)
+            self._source = None
+        source.close()
+        return
+
+    def _get_edge_slots(self) -> dict[tuple[int, int], int]:
+        if self._edge_slot is None:
+            live: Iterator[tuple[int, int]] = zip(self._edge_parents, self._edge_children)
+            self._edge_slot = {key: slot for slot, key in enumerate(live) if key[0] >= 0}
+        return self._edge_slot
+
+    def _own_columns(self) -> None:
+        """Copies the columns shared with a snapshot, before one of them is changed in place."""
+        if not self._snapshots:
+            return
+        self._values = list(self._values)
+        self._due_dates = self._due_dates[:]
+        self._due_times = self._due_times[:]
+        self._completed = self._completed[:]
+        self._alive = self._alive[:]
+        self._edge_parents = self._edge_parents[:]
+        self._edge_children = self._edge_children[:]
+        self._snapshots = weakref.WeakSet()
+        return
+
+    def snapshot(self) -> "GraphSnapshot":
+        """
+        Returns the graph as it is now: the snapshot shares the column arrays, and the graph
+        copies them before its next change in place, unless the snapshot is gone by then.
+        Appends do not need a copy, the snapshot only reads the rows and edges that existed
+        when it was taken. This is O(1) for a graph in memory or read from a task file, whose
+        unloaded values the snapshot reads from the file's memory map. A graph opened from a
+        database loads its remaining tasks first, since those have no rows yet.
+        """
+        if self._dead_rows > max(MIN_DEAD_ROWS, len(self._row_of)):
+            self.compact_rows()
+        heap: tuple[Sequence[int], bytes|memoryview]|None = None
+        if self._source is not None:
+            #a task file's unloaded rows are read from its heap, other sources are read in whole first
+            heap = self._source.value_heap() if self._unloaded else None
+            if heap is None:
+                self._materialize_all()
+        root_row: int = self._row_of[self._root] if self._root is not None else -1
+        snapshot = GraphSnapshot(self._ids, self._values, self._created, self._due_dates, self._due_times, self._completed,
+                                 self._alive, len(self._nodes), self._edge_parents, self._edge_children,
+                                 len(self._edge_parents), root_row, self.get_next_id(), heap)
+        self._snapshots.add(snapshot)
+        return snapshot
+
+    def compact_rows(self) -> None:
+        """
+        Drops the tombstoned rows and edges, so a long session of deletions does not grow
+        the columns without bound. Rows keep their order, and observers are told how they
+        moved. The rows of a task file are its own rows, so a graph still reading one is
+        left as it is. A snapshot holding the old columns is not affected.
+        """
+        if self._source is not None and self._source.rows_up_front:
+            return
+        kept: array = array("l", itertools.compress(range(len(self._nodes)), self._alive))
+        new_row: array = array("l", [-1]) * len(self._nodes)
+        for row, old in enumerate(kept):
+            new_row[old] = row
+        with paused_gc():
+            for name in ("_ids", "_created", "_due_dates", "_due_times", "_completed"):
+                column: array = getattr(self, name)
+                setattr(self, name, array(column.typecode, map(column.__getitem__, kept)))
+            self._values = list(map(self._values.__getitem__, kept))
+            self._nodes = list(map(self._nodes.__getitem__, kept))
+            self._alive = array("b", [True]) * len(kept)
+            self._row_of = dict(zip(self._nodes, range(len(kept))))
+            live: list[tuple[int, int]] = [(new_row[p], new_row[c]) for p, c in self._get_edge_slots()]
+            self._edge_parents = array("l", [p for p, _ in live])
+            self._edge_children = array("l", [c for _, c in live])
+            self._edge_slot = dict(zip(live, range(len(live))))
+        logging.debug("Compacted %d rows of removed tasks", self._dead_rows)
+        self._dead_edges = 0
+        self._dead_rows = 0
+        self._row_generation += 1
+        self._snapshots = weakref.WeakSet()
+        for observer in self._observers:
+            observer.rows_compacted(kept)
+        return
+
+    def get_row_generation(self) -> int:
+        """Returns how often the rows were compacted; row numbers taken under another generation are stale."""
+        return self._row_generation
+
+    def add_observer(self, observer: GraphObserver) -> GraphObserver:
+        self._observers.append(observer)
+        return observer
+
+    def remove_observer(self, observer: GraphObserver) -> None:
+        self._observers.remove(observer)
+        return
+
+    def get_index(self, index_type: type[ObserverT]) -> ObserverT:
+        """
+        Returns this graph's index of the given type, creating it on first use.
+        Index types take the graph as their only argument and subscribe themselves.
+        """
+        for observer in self._observers:
+            if type(observer) is index_type:
+                return observer
+        return index_type(self)
+
+    def add_task(self, value: str, due_date: date|None=None, due_time: time|None=None) -> Node:
+        """Creates a new node in this graph."""
+        return self.add_node(Node(value, due_date, due_time))
+
+    def add_node(self, node: Node) -> Node:
+        """
+        Adds node and every task connected to it, moving them out of any other graph.
+        Raises ValueError, before anything is moved, if one of them has an id another
+        task of this graph already has, e.g. a copy of it restored from a pickle: ids
+        name tasks on the canvas and in saved files, so they are never changed.
+        """
+        if node._graph is self:
+            return node
+        added: list[Node] = []
+        seen: set[Node] = {node}
+        stack: list[Node] = [node]
+        while stack:
+            curr: Node = stack.pop()
+            added.append(curr)
+            for nxt in itertools.chain(curr._children, curr._parents):
+                if nxt._graph is not self and nxt not in seen:
+                    seen.add(nxt)
+                    stack.append(nxt)
+        for curr in added:
+            existing: Node|None = self.get_node_by_id(curr._id)
+            if existing is not None and existing is not curr:
+                raise ValueError(f"Task id {curr._id} is already used in this graph.")
+        for curr in added:
+            if curr._graph is not None:
+                curr._graph._remove_row(curr)
+            self._insert_row(curr)
+        #nodes loaded from an old pickle get provisional positions that may not respect their edges
+        if any(child._ord <= n._ord for n in added for child in n._children):
+            _ = Node.order_topologically(added)
+
+        for n in added:
+            for observer in self._observers:
+                observer.node_added(n)
+        #every edge touching an added node has both ends in this graph now
+        #edges are listed parent by parent, in the order of each parent's children
+        for n in added:
+            for child in n._children:
+                self._insert_edge(n, child)
+        for n in added:
+            for parent in n._parents:
+                self._insert_edge(parent, n)
+        logging.debug("Added %d nodes to graph", len(added))
+        return node
+
+    def get_root(self) -> Node|None:
+        """Returns the node the graph was created from, if it still exists."""
+        return self._root
+
+    def get_next_id(self) -> int:
+        """Returns the lowest id never used in this graph."""
+        return self._id_allocator.peek()
+
+    def get_node_by_id(self, node_id: int) -> Node|None:
+        node: Node|None = self._by_id.get(node_id)
+        if node is None and self._unloaded:
+            node = self._source.load(self, node_id)
+        return node
+
+    def get_id_index(self) -> dict[int, Node]:
+        """Returns the live id -> node map of this graph. Callers must not modify it."""
+        self._materialize_all()
+        return self._by_id
+
+    def get_loaded_index(self) -> dict[int, Node]:
+        """
+        Like get_id_index, but only holds the nodes created so far, so nothing is loaded.
+        It is the same dict for the life of the graph and follows every change, loads included.
+        """
+        return self._by_id
+
+    def is_loaded(self) -> bool:
+        """Whether every task has a row, so whole-graph scans and indexes do not have to read the rest of the source first."""
+        return self._source is None or self._source.rows_up_front
+
+    def get_node(self, row: int) -> Node|None:
+        """Returns the node stored at row, or None if it was removed."""
+        node: Node|None = self._nodes[row]
+        if node is None and self._alive[row]:
+            node = self._materialize(row)
+        return node
+
+    def get_row(self, node: Node) -> int:
+        return self._row_of[node]
+
+    def get_row_index(self) -> dict[Node, int]:
+        """Returns the live node -> row map, for loops that look up many rows. Callers must not modify it, and must fetch it again after compact_rows."""
+        return self._row_of
+
+    def row_count(self) -> int:
+        """Number of rows, including tombstoned ones; every row number is below this."""
+        return len(self._nodes)
+
+    def load_slice(self, root: Node, max_depth: int|None=None, max_nodes: int|None=None,
+                   keep: Callable[[Node], bool]|None=None) -> tuple[list[Node], list[Node]]:
+        """
+        Loads the tasks below root breadth-first, at most max_depth levels deep and at
+        most max_nodes tasks, following only the tasks keep accepts. A task's children are
+        taken together or not at all. Returns the tasks in the order they were reached and
+        the stubs among them, the tasks whose children were not taken. A stub's edges are
+        read when they are first used, so the source is read no further than one level
+        below the slice.
+        """
+        found: list[Node] = [root]
+        seen: set[Node] = {root}
+        level: list[Node] = [root]
+        depth: int = 0
+        while level and (max_depth is None or depth < max_depth):
+            below: list[Node] = []
+            for i, node in enumerate(level):
+                children: list[Node] = [c for c in node.get_children() if c not in seen and (keep is None or keep(c))]
+                if max_nodes is not None and len(found) + len(children) > max_nodes:
+                    return found, level[i:] + below
+                seen.update(children)
+                found.extend(children)
+                below.extend(children)
+            level = below
+            depth += 1
+        return found, level
+
+    def topological_order(self) -> list[Node]:
+        """Returns the nodes with every parent before its children, without a traversal."""
+        self._materialize_all()
+        return sorted(self._row_of, key=Node.get_order)
+
+    def get_roots(self) -> list[Node]:
+        self._materialize_all()
+        return [n for n in self._row_of if not n._parents]
+
+    def find_due(self, start: date, end: date, include_completed: bool=False) -> list[Node]:
+        """
+        Returns the tasks due between start and end (inclusive), as a column scan.
+        The comparisons run through map() over the arrays, so no Node is touched until
+        the matching rows are known.
+        """
+        lo: int = start.toordinal()
+        hi: int = end.toordinal()
+        dates: array = self._due_dates
+        mask: Iterator[bool] = map(operator.and_, map(lo.__le__, dates), map(hi.__ge__, dates))
+        if not include_completed:
+            mask = map(operator.and_, mask, map(operator.not_, self._completed))
+        return [self.get_node(row) for row in itertools.compress(itertools.count(), mask)]
+
+    def find_incomplete(self) -> list[Node]:
+        mask: Iterator[bool] = map(operator.and_, map(bool, self._alive), map(operator.not_, self._completed))
+        return [self.get_node(row) for row in itertools.compress(itertools.count(), mask)]
+
+    def adjacency(self) -> tuple[array, array]:
+        """
+        Returns the child edges in compressed sparse row form as (offsets, targets):
+        the child rows of row r are targets[offsets[r]:offsets[r + 1]].
+        """
+        self._materialize_all()
+        num_rows: int = len(self._nodes)
+        counts: array = array("l", [0]) * (num_rows + 1)
+        for p in self._edge_parents:
+            if p >= 0:
+                counts[p + 1] += 1
+        offsets: array = array("l", itertools.accumulate(counts))
+        fill: array = array("l", offsets)
+        targets: array = array("l", [0]) * offsets[-1]
+        for p, c in zip(self._edge_parents, self._edge_children):
+            if p >= 0:
+                targets[fill[p]] = c
+                fill[p] += 1
+        return offsets, targets
+
+    def _insert_row(self, node: Node) -> int:
+        self._by_id[node._id] = node
+        self._id_allocator.reserve(node._id)
+        Node.id_iter.reserve(node._id)
+        return self._append_row(node)
+
+    def _add_loaded(self, node: LazyNode) -> int:
+        """
+        Gives a node the source just created its row. Loading is not a change to the
+        graph, so observers are not told.
+        """
+        self._by_id[node._id] = node
+        self._unloaded -= 1
+        return self._append_row(node)
+
+    def _append_row(self, node: Node) -> int:
+        row: int = len(self._nodes)
+        self._ids.append(node._id)
+        self._values.append(node._value)
+        self._created.append(node._created_at)
+        self._due_dates.append(node._due_date.toordinal() if node._due_date is not None else NO_DATE)
+        self._due_times.append(time_to_seconds(node._due_time))
+        self._completed.append(node._completed)
+        self._alive.append(True)
+        self._nodes.append(node)
+        self._row_of[node] = row
+        node._graph = self
+        return row
+
+    def _remove_row(self, node: Node) -> None:
+        """Tombstones node's row and edges without touching the node's own adjacency."""
+        row: int = self._row_of.pop(node)
+        del self._by_id[node._id]
+        if node is self._root:
+            self._root = None
+        for child in node._children:
+            if child in self._row_of:
+                self._delete_edge(row, self._row_of[child])
+        for parent in node._parents:
+            if parent in self._row_of:
+                self._delete_edge(self._row_of[parent], row)
+        self._own_columns()
+        self._nodes[row] = None
+        self._alive[row] = False
+        self._due_dates[row] = NO_DATE
+        self._dead_rows += 1
+        node._graph = None
+        for observer in self._observers:
+            observer.node_removed(node)
+        return
+
+    def _remove_rows(self, nodes: list[Node], edges: list[tuple[Node, Node]]) -> None:
+        """Tombstones the rows of a removed subtree at once; edges lists every edge touching it."""
+        for parent, child in edges:
+            _ = self._delete_edge(self._row_of[parent], self._row_of[child])
+        self._own_columns()
+        for node in nodes:
+            row: int = self._row_of.pop(node)
+            del self._by_id[node._id]
+            if node is self._root:
+                self._root = None
+            self._nodes[row] = None
+            self._alive[row] = False
+            self._due_dates[row] = NO_DATE
+            node._graph = None
+        self._dead_rows += len(nodes)
+        for observer in self._observers:
+            observer.nodes_removed(nodes, edges)
+        return
+
+    def _insert_edge(self, parent: Node, child: Node) -> None:
+        key: tuple[int, int] = (self._row_of[parent], self._row_of[child])
+        edge_slot: dict[tuple[int, int], int] = self._get_edge_slots()
+        if key in edge_slot:
+            return
+        if self._dead_edges > max(MIN_DEAD_EDGES, len(edge_slot)):
+            self._squeeze_edges()
+            edge_slot = self._edge_slot
+        slot: int = len(self._edge_parents)
+        self._edge_parents.append(key[0])
+        self._edge_children.append(key[1])
+        edge_slot[key] = slot
+        for observer in self._observers:
+            observer.edge_added(parent, child)
+        return
+
+    def _delete_edge(self, parent_row: int, child_row: int) -> bool:
+        slot: int|None = self._get_edge_slots().pop((parent_row, child_row), None)
+        if slot is None:
+            return False
+        self._own_columns()
+        self._edge_parents[slot] = -1
+        self._edge_children[slot] = -1
+        self._dead_edges += 1
+        return True
+
+    def _add_loaded_edge(self, parent: Node, child: Node) -> None:
+        """Lists an edge the source just read, unless it is listed already; like _add_loaded, observers are not told."""
+        key: tuple[int, int] = (self._row_of[parent], self._row_of[child])
+        edge_slot: dict[tuple[int, int], int] = self._get_edge_slots()
+        if key not in edge_slot:
+            edge_slot[key] = len(self._edge_parents)
+            self._edge_parents.append(key[0])
+            self._edge_children.append(key[1])
+        return
+
+    def _rebuild_edges(self) -> None:
+        """Lists the edges anew from the nodes' adjacency, parent by parent in the order of their children."""
+        row_of: dict[Node, int] = self._row_of
+        live: list[tuple[int, int]] = [(row, row_of[child]) for node, row in row_of.items() for child in node._children]
+        #new arrays, so a snapshot holding the old ones is not affected
+        self._edge_parents = array("l", [p for p, _ in live])
+        self._edge_children = array("l", [c for _, c in live])
+        self._edge_slot = dict(zip(live, range(len(live))))
+        self._dead_edges = 0
+        return
+
+    def _squeeze_edges(self) -> None:
+        """Drops the tombstones from the edge list, keeping the order of the live edges."""
+        live: list[tuple[int, int]] = list(self._get_edge_slots())
+        #new arrays, so a snapshot holding the old ones is not affected
+        self._edge_parents = array("l", [p for p, _ in live])
+        self._edge_children = array("l", [c for _, c in live])
+        self._edge_slot = dict(zip(live, range(len(live))))
+        self._dead_edges = 0
+        return
+
+    def _edge_added(self, parent: Node, child: Node) -> None:
+        self._insert_edge(parent, child)
+        return
+
+    def _edge_removed(self, parent: Node, child: Node) -> None:
+        if self._delete_edge(self._row_of[parent], self._row_of[child]):
+            for observer in self._observers:
+                observer.edge_removed(parent, child)
+        return
+
+    def _nodes_reordered(self, nodes: list[Node]) -> None:
+        mine: list[Node] = [n for n in nodes if n._graph is self]
+        for observer in self._observers:
+            observer.nodes_reordered(mine)
+        return
+
+    def _node_changed(self, node: Node, field: str) -> None:
+        row: int = self._row_of[node]
+        self._own_columns()
+        if field == "value":
+            self._values[row] = node._value
+        elif field == "due_date":
+            self._due_dates[row] = node._due_date.toordinal() if node._due_date is not None else NO_DATE
+        elif field == "due_time":
+            self._due_times[row] = time_to_seconds(node._due_time)
+        elif field == "completed":
+            self._completed[row] = node._completed
+        for observer in self._observers:
+            observer.node_changed(node, field)
+        return
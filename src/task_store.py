@@ -0,0 +1,418 @@
+from array import array
+from datetime import date
+from typing import Iterable, Iterator, Mapping
+import logging
+import os
+import sqlite3
+import sys
+
+from src.node import Node, LazyNode
+from src.task_graph import TaskGraph, GraphObserver, GraphSource, GraphSnapshot, paused_gc, time_to_seconds, seconds_to_time
+from src.layout_cache import CacheEntry, SavedLayout
+from src.search import search_values
+
+SQLITE_MAGIC: bytes = b"SQLite format 3\x00"
+STORE_VERSION: int = 3 #kept in PRAGMA user_version; version 1 had no positions, version 2 no layout keys
+STORE_SUFFIX: str = ".db"
+
+#dates are ordinals and times seconds since midnight, NULL when unset
+#ord is the task's topological position, so tasks loaded one at a time can be placed relative to each other
+#x and y are where the task was last laid out, NULL if it never was, and layout_key the key of its subtree
+#then, see src.layout_cache, NULL if positions were saved without one
+#position orders each parent's children; it only ever grows, so a re-added child goes last
+SCHEMA: str = """
+CREATE TABLE tasks (
+    id INTEGER PRIMARY KEY,
+    value TEXT NOT NULL,
+    created REAL NOT NULL,
+    due_date INTEGER,
+    due_time INTEGER,
+    completed INTEGER NOT NULL,
+    ord INTEGER NOT NULL,
+    x REAL,
+    y REAL,
+    layout_key INTEGER
+);
+CREATE TABLE edges (
+    parent INTEGER NOT NULL,
+    child INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (parent, child)
+) WITHOUT ROWID;
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+#created after the bulk insert, which is faster than keeping them up to date row by row
+INDEXES: str = """
+CREATE INDEX edges_by_parent ON edges (parent, position);
+CREATE INDEX edges_by_child ON edges (child, position);
+CREATE INDEX tasks_by_position ON tasks (x, y) WHERE x IS NOT NULL;
+"""
+UPGRADE_FROM_1: str = """
+ALTER TABLE tasks ADD COLUMN x REAL;
+ALTER TABLE tasks ADD COLUMN y REAL;
+CREATE INDEX tasks_by_position ON tasks (x, y) WHERE x IS NOT NULL;
+PRAGMA user_version=2;
+"""
+UPGRADE_FROM_2: str = """
+ALTER TABLE tasks ADD COLUMN layout_key INTEGER;
+PRAGMA user_version=3;
+"""
+
+#sqlite3 keeps the compiled statement of each of these, so every use after the first only binds parameters
+TASK_COLUMNS: str = "id, value, created, due_date, due_time, completed, ord"
+SELECT_TASK: str = f"SELECT {TASK_COLUMNS} FROM tasks WHERE id = ?"
+SELECT_ALL: str = f"SELECT {TASK_COLUMNS} FROM tasks"
+SELECT_EDGES_BY_PARENT: str = "SELECT parent, child FROM edges ORDER BY parent, position"
+SELECT_EDGES_BY_CHILD: str = "SELECT parent, child FROM edges ORDER BY child, position"
+SELECT_CHILDREN: str = ("SELECT t.id, t.value, t.created, t.due_date, t.due_time, t.completed, t.ord "
+                        "FROM edges e JOIN tasks t ON t.id = e.child WHERE e.parent = ? ORDER BY e.position")
+SELECT_PARENTS: str = ("SELECT t.id, t.value, t.created, t.due_date, t.due_time, t.completed, t.ord "
+                       "FROM edges e JOIN tasks t ON t.id = e.parent WHERE e.child = ? ORDER BY e.position")
+#an upsert rather than INSERT OR REPLACE, which would drop the saved position
+UPSERT_TASK: str = (f"INSERT INTO tasks ({TASK_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (id) DO UPDATE SET "
+                    "value = excluded.value, created = excluded.created, due_date = excluded.due_date, "
+                    "due_time = excluded.due_time, completed = excluded.completed, ord = excluded.ord")
+UPDATE_POSITION: str = "UPDATE tasks SET layout_key = ?, x = ?, y = ? WHERE id = ?"
+SELECT_LAYOUT_ENTRY: str = "SELECT layout_key, x, y FROM tasks WHERE id = ? AND layout_key IS NOT NULL"
+SELECT_LAID_OUT: str = "SELECT id FROM tasks WHERE layout_key IS NOT NULL"
+SELECT_IN_BOX: str = "SELECT id FROM tasks WHERE x BETWEEN ? AND ? AND y BETWEEN ? AND ?"
+UPDATE_ORD: str = "UPDATE tasks SET ord = ? WHERE id = ?"
+DELETE_TASK: str = "DELETE FROM tasks WHERE id = ?"
+UPSERT_EDGE: str = "INSERT OR REPLACE INTO edges (parent, child, position) VALUES (?, ?, ?)"
+DELETE_EDGE: str = "DELETE FROM edges WHERE parent = ? AND child = ?"
+DELETE_CHILD_EDGES: str = "DELETE FROM edges WHERE parent = ?"
+DELETE_PARENT_EDGES: str = "DELETE FROM edges WHERE child = ?"
+UPSERT_META: str = "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)"
+
+TaskRow = tuple[int, str, float, int|None, int|None, int, int]
+
+
+def task_row(node: Node, ord: int) -> TaskRow:
+    due_date: int|None = node._due_date.toordinal() if node._due_date is not None else None
+    due_time: int|None = time_to_seconds(node._due_time) if node._due_time is not None else None
+    return (node._id, node._value, node._created_at, due_date, due_time, int(node._completed), ord)
+
+
+def is_task_store(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(SQLITE_MAGIC)) == SQLITE_MAGIC
+
+
+class TaskStore(GraphSource, GraphObserver):
+    """
+    A task graph kept in an SQLite database. Opening one reads only the meta table and
+    the root: tasks are loaded as the graph reaches them, and a node's edges are read
+    through the indexes on parent and child the first time they are used. Memory grows
+    with the part of the graph that was explored, not with the size of the database.
+
+    Changes made to the graph are collected as they happen and written by save() in one
+    transaction, with one executemany per kind of change. Where tasks were laid out can
+    be saved too, so a later session can load just the tasks in a region.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Opens the database at path; get_graph() returns the graph over it, see open()."""
+        self.path: str = path
+        self._conn: sqlite3.Connection = sqlite3.connect(path)
+        try:
+            version: int = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            self._meta: dict[str, int] = dict(self._conn.execute("SELECT key, value FROM meta"))
+            upgraded: int = version
+            if version == 1:
+                _ = self._conn.executescript(UPGRADE_FROM_1)
+                version = 2
+            if version == 2:
+                _ = self._conn.executescript(UPGRADE_FROM_2)
+                version = 3
+            if version != upgraded:
+                logging.info("Upgraded task database %s from version %d to %d", path, upgraded, version)
+        except sqlite3.DatabaseError as e:
+            self._conn.close()
+            raise ValueError(f"{path} is not a task database: {e}") from e
+        if version != STORE_VERSION:
+            self._conn.close()
+            raise ValueError(f"{path} is a task database of version {version}, expected {STORE_VERSION}.")
+        _ = self._conn.execute("PRAGMA journal_mode=WAL")
+        _ = self._conn.execute("PRAGMA synchronous=NORMAL")
+
+        self._graph: TaskGraph|None = None
+        self._ord_base: int = 0 #in-memory position of stored ord 0
+        self._saved_ord: dict[int, int] = {} #stored ord of each loaded task, to find the ones reordered since
+        self._changed: set[int] = set() #ids of tasks added or edited since the last save
+        self._removed: set[int] = set()
+        self._added_edges: dict[tuple[int, int], None] = {} #in the order they were added
+        self._removed_edges: set[tuple[int, int]] = set()
+        self._positions: dict[int, tuple[int|None, float, float]] = {} #layout key and position of tasks laid out since the last save
+        return
+
+    @classmethod
+    def create(cls, graph: TaskGraph, path: str) -> "TaskStore":
+        """Writes graph to a new database at path and returns a store saving graph's later changes to it."""
+        source: GraphSource|None = graph._source
+        if isinstance(source, TaskStore) and os.path.abspath(source.path) == os.path.abspath(path):
+            graph.detach_source()
+        nodes: list[Node] = graph.topological_order()
+        snapshot: GraphSnapshot = graph.snapshot()
+        ids: array = snapshot.ids
+        edges: Iterable[tuple[int, int]] = ((ids[p], ids[c]) for p, c in snapshot.edges())
+        tmp_path: str = f"{path}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        conn: sqlite3.Connection = sqlite3.connect(tmp_path)
+        try:
+            #the file only replaces path once it is complete, so it needs no rollback journal
+            _ = conn.execute("PRAGMA journal_mode=OFF")
+            _ = conn.execute("PRAGMA synchronous=OFF")
+            _ = conn.executescript(SCHEMA)
+            with conn:
+                _ = conn.executemany(UPSERT_TASK, (task_row(n, n._ord) for n in nodes))
+                _ = conn.executemany(UPSERT_EDGE, ((p, c, i) for i, (p, c) in enumerate(edges)))
+            _ = conn.executescript(INDEXES)
+            meta: dict[str, int] = {
+                "count": len(nodes),
+                "next_id": graph.get_next_id(),
+                "root": graph.get_root().get_id() if graph.get_root() is not None else -1,
+                "min_ord": nodes[0]._ord if nodes else 0,
+                "max_ord": nodes[-1]._ord if nodes else 0,
+            }
+            meta["next_position"] = snapshot.num_edges
+            with conn:
+                _ = conn.executemany(UPSERT_META, meta.items())
+            _ = conn.execute(f"PRAGMA user_version={STORE_VERSION}")
+        finally:
+            conn.close()
+        #a log left by an earlier database at path would otherwise be applied to this one
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        os.replace(tmp_path, path)
+        logging.info("Wrote %d tasks to %s", len(nodes), path)
+
+        store = cls(path)
+        store._graph = graph
+        store._saved_ord = {n._id: n._ord for n in nodes}
+        _ = graph.add_observer(store)
+        return store
+
+    @classmethod
+    def open(cls, path: str) -> "TaskStore":
+        """Opens the database at path with only its root loaded. Raises ValueError if it is not a task database."""
+        store = cls(path)
+        meta: dict[str, int] = store._meta
+        #stored positions are relative to each other; map them onto a fresh range of in-memory ones
+        store._ord_base = Node.reserve_orders(meta["max_ord"] - meta["min_ord"] + 1) - meta["min_ord"]
+        store._graph = TaskGraph.from_store(store, meta["count"], meta["next_id"], meta["root"])
+        _ = store._graph.add_observer(store)
+        logging.debug("Opened task database %s of %d tasks", path, meta["count"])
+        return store
+
+    def get_graph(self) -> TaskGraph:
+        return self._graph
+
+    def get_path(self) -> str:
+        return self.path
+
+    def pending_count(self) -> int:
+        """Number of changes not saved yet."""
+        return len(self._changed) + len(self._removed) + len(self._added_edges) + len(self._removed_edges)
+
+    def set_positions(self, positions: Mapping[int, tuple[float, float]]) -> None:
+        """Records where tasks were laid out, by id; saved with the next save()."""
+        self._positions.update((node_id, (None, x, y)) for node_id, (x, y) in positions.items())
+        return
+
+    def set_layout(self, entries: Mapping[int, CacheEntry]) -> None:
+        """Records layout cache entries by id, see src.layout_cache, which also save where the tasks were; saved with the next save()."""
+        self._positions.update(entries)
+        return
+
+    def get_layout(self) -> SavedLayout:
+        """Returns the saved layout cache entries by id, without loading their tasks; each is queried as it is looked up."""
+        return SavedLayout(self.layout_entry, self.laid_out_ids, self.ids_in_box)
+
+    def layout_entry(self, node_id: int) -> CacheEntry|None:
+        return self._conn.execute(SELECT_LAYOUT_ENTRY, (node_id,)).fetchone()
+
+    def laid_out_ids(self) -> Iterator[int]:
+        return (row[0] for row in self._conn.execute(SELECT_LAID_OUT))
+
+    def ids_in_box(self, x0: float, y0: float, x1: float, y1: float) -> set[int]:
+        """Returns the ids of the tasks whose saved position lies in the box, without loading them."""
+        box: tuple[float, float, float, float] = (min(x0, x1), max(x0, x1), min(y0, y1), max(y0, y1))
+        return {row[0] for row in self._conn.execute(SELECT_IN_BOX, box)}
+
+    def search(self, query: str, limit: int) -> list[Node]:
+        """
+        Returns up to limit tasks matching query, ranked like SearchIndex.search, without
+        loading the graph: tasks not loaded yet are narrowed down in the database with
+        LIKE, which ignores case for ASCII letters only, and loaded tasks are matched by
+        their current values. Only the matches are loaded.
+        """
+        tokens: list[str] = query.casefold().split()
+        if not tokens or self._graph is None:
+            return []
+        loaded: dict[int, Node] = self._graph.get_loaded_index()
+        condition: str = " AND ".join(["value LIKE ? ESCAPE '\\'"] * len(tokens))
+        patterns: list[str] = ["%" + t.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%" for t in tokens]
+        stored: Iterable[tuple[int, str]] = self._conn.execute(f"SELECT id, value FROM tasks WHERE {condition}", patterns)
+        values: list[tuple[int, str]] = [(i, v) for i, v in stored if i not in loaded and i not in self._removed]
+        values.extend((n._id, n._value) for n in loaded.values())
+        found: list[Node|None] = [self._graph.get_node_by_id(i) for i in search_values(values, query, limit)]
+        return [n for n in found if n is not None]
+
+    def _make_node(self, graph: TaskGraph, row: TaskRow) -> LazyNode:
+        node_id, value, created, due_date, due_time, completed, ord = row
+        node = LazyNode.__new__(LazyNode)
+        node._id = node_id
+        node._value = sys.intern(value) if Node.intern_values else value
+        node._created_at = created
+        node._due_date = date.fromordinal(due_date) if due_date is not None else None
+        node._due_time = seconds_to_time(due_time) if due_time is not None else None
+        node._completed = bool(completed)
+        node._ord = self._ord_base + ord
+        _ = graph._add_loaded(node)
+        self._saved_ord[node_id] = ord
+        return node
+
+    def _node_of(self, graph: TaskGraph, row: TaskRow) -> Node:
+        node: Node|None = graph.get_loaded_index().get(row[0])
+        if node is None:
+            node = self._make_node(graph, row)
+        return node
+
+    def load(self, graph: TaskGraph, node_id: int) -> Node|None:
+        if node_id in self._removed:
+            return None
+        row: TaskRow|None = self._conn.execute(SELECT_TASK, (node_id,)).fetchone()
+        return self._make_node(graph, row) if row is not None else None
+
+    def load_all(self, graph: TaskGraph) -> bool:
+        """
+        Loads every task and the edges of every node that is still lazy, reading each
+        table in one pass instead of one query per node, and lists all edges in the graph.
+        """
+        loaded: dict[int, Node] = graph.get_loaded_index()
+        with paused_gc():
+            for row in self._conn.execute(SELECT_ALL):
+                if row[0] not in loaded and row[0] not in self._removed:
+                    _ = self._make_node(graph, row)
+            lazy: list[Node] = [n for n in loaded.values() if type(n) is LazyNode]
+            children: dict[Node, list[Node]] = {n: [] for n in lazy}
+            parents: dict[Node, list[Node]] = {n: [] for n in lazy}
+            for query, ends, others, adjacent in ((SELECT_EDGES_BY_PARENT, 0, 1, children), (SELECT_EDGES_BY_CHILD, 1, 0, parents)):
+                for edge in self._conn.execute(query):
+                    node: Node|None = loaded.get(edge[ends])
+                    if node in adjacent:
+                        adjacent[node].append(loaded[edge[others]])
+            for node in lazy:
+                Node._children.__set__(node, dict.fromkeys(children[node]))
+                Node._parents.__set__(node, dict.fromkeys(parents[node]))
+                node.__class__ = Node
+            graph._rebuild_edges()
+        return True
+
+    def adjacency(self, graph: TaskGraph, node: LazyNode) -> tuple[Iterable[Node], Iterable[Node]]:
+        children: list[Node] = [self._node_of(graph, row) for row in self._conn.execute(SELECT_CHILDREN, (node._id,))]
+        parents: list[Node] = [self._node_of(graph, row) for row in self._conn.execute(SELECT_PARENTS, (node._id,))]
+        #listed in the graph, so removing one of them is seen by the graph's observers
+        for child in children:
+            graph._add_loaded_edge(node, child)
+        for parent in parents:
+            graph._add_loaded_edge(parent, node)
+        return children, parents
+
+    def save(self) -> int:
+        """
+        Writes the changes made since the last save, and the positions recorded since, in
+        one transaction. Returns the number of changes written, not counting positions.
+        """
+        graph: TaskGraph = self._graph
+        loaded: dict[int, Node] = graph.get_loaded_index()
+        changed: list[TaskRow] = []
+        for node_id in self._changed:
+            node: Node = loaded[node_id]
+            self._saved_ord[node_id] = node._ord - self._ord_base
+            changed.append(task_row(node, self._saved_ord[node_id]))
+        #inserting an edge can move tasks that were not changed otherwise to new topological positions
+        reordered: list[tuple[int, int]] = []
+        saved_ord: dict[int, int] = self._saved_ord
+        for node_id, node in loaded.items():
+            ord: int = node._ord - self._ord_base
+            if saved_ord.get(node_id) != ord:
+                saved_ord[node_id] = ord
+                reordered.append((ord, node_id))
+        removed: list[tuple[int]] = [(node_id,) for node_id in self._removed]
+        position: int = self._meta["next_position"]
+        added_edges: list[tuple[int, int, int]] = [(p, c, position + i) for i, (p, c) in enumerate(self._added_edges)]
+        count: int = self.pending_count()
+
+        written: list[int] = [ord for *_, ord in changed] + [ord for ord, _ in reordered]
+        self._meta.update({
+            "count": len(graph),
+            "next_id": graph.get_next_id(),
+            "root": graph.get_root().get_id() if graph.get_root() is not None else -1,
+            "min_ord": min(written, default=self._meta["min_ord"]),
+            "max_ord": max(written, default=self._meta["max_ord"]),
+            "next_position": position + len(added_edges),
+        })
+        with self._conn:
+            _ = self._conn.executemany(DELETE_EDGE, self._removed_edges)
+            _ = self._conn.executemany(DELETE_CHILD_EDGES, removed)
+            _ = self._conn.executemany(DELETE_PARENT_EDGES, removed)
+            _ = self._conn.executemany(DELETE_TASK, removed)
+            _ = self._conn.executemany(UPSERT_TASK, changed)
+            _ = self._conn.executemany(UPDATE_ORD, reordered)
+            _ = self._conn.executemany(UPSERT_EDGE, added_edges)
+            _ = self._conn.executemany(UPDATE_POSITION, ((*entry, node_id) for node_id, entry in self._positions.items()))
+            _ = self._conn.executemany(UPSERT_META, self._meta.items())
+        for pending in (self._changed, self._removed, self._added_edges, self._removed_edges, self._positions):
+            pending.clear()
+        logging.info("Saved %d changes to %s", count, self.path)
+        return count
+
+    def detach(self) -> None:
+        """Loads everything the graph still needs from the database and closes it, leaving the graph in memory only."""
+        if self._graph is not None and self._graph._source is self:
+            self._graph.detach_source() #closes the store when done
+        else:
+            self.close()
+        return
+
+    def close(self) -> None:
+        """Stops recording changes; changes not saved yet are dropped. A graph still loading from the store cannot load any more."""
+        if self._graph is not None:
+            self._graph.remove_observer(self)
+            self._graph = None
+        self._conn.close()
+        return
+
+    def node_added(self, node: Node) -> None:
+        self._changed.add(node._id)
+        self._removed.discard(node._id)
+        return
+
+    def node_removed(self, node: Node) -> None:
+        self._changed.discard(node._id)
+        self._removed.add(node._id)
+        self._saved_ord.pop(node._id, None)
+        return
+
+    def node_changed(self, node: Node, field: str) -> None:
+        self._changed.add(node._id)
+        return
+
+    def edge_added(self, parent: Node, child: Node) -> None:
+        key: tuple[int, int] = (parent._id, child._id)
+        self._removed_edges.discard(key)
+        self._added_edges[key] = None
+        return
+
+    def edge_removed(self, parent: Node, child: Node) -> None:
+        key: tuple[int, int] = (parent._id, child._id)
+        _ = self._added_edges.pop(key, None)
+        self._removed_edges.add(key)
+        return
+
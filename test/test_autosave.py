@@ -0,0 +1,135 @@
+import unittest
+import os
+import tempfile
+
+from src.node import Node
+from src.task_graph import TaskGraph
+from src.task_file import open_task_file, write_task_file
+from src.autosave import Autosave, recovery_path
+
+
+class FakeWidget:
+    """Stands in for a Tk widget: after() callbacks are collected and run on request."""
+    def __init__(self):
+        self.pending = []
+        self.cancelled = []
+
+    def after(self, ms, func):
+        self.pending.append((ms, func))
+        return f"after#{len(self.pending)}"
+
+    def after_cancel(self, timer):
+        self.cancelled.append(timer)
+
+    def run_pending(self):
+        pending, self.pending = self.pending, []
+        for _, func in pending:
+            func()
+
+
+class Test_Autosave(unittest.TestCase):
+    """
+    Test cases for saving in the background.
+    """
+    def setUp(self):
+        """Set up root -> a, b and an autosave into a temporary directory."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "tree.tasks.autosave")
+        self.root = Node("Root")
+        self.a = Node("A")
+        self.root.add_child(self.a)
+        self.root.add_child(Node("B"))
+        self.graph = TaskGraph.from_root(self.root)
+        self.widget = FakeWidget()
+        self.saved = []
+        self.autosave = Autosave(self.widget, interval_ms=1000, on_saved=lambda path, error: self.saved.append((path, error)))
+        self.autosave.set_graph(self.graph)
+        self.autosave.set_path(self.path)
+        return
+
+    def tearDown(self):
+        self.autosave.wait()
+        self.tmp.cleanup()
+        return
+
+    def finish(self):
+        """Waits for the worker like the Tk thread would, by running the polls scheduled with after()."""
+        while self.autosave.is_saving():
+            self.autosave._worker.join()
+            self.widget.run_pending()
+        return
+
+    def test_save_in_background(self):
+        """Test that a save runs on a worker thread and reports back through after()."""
+        self.assertTrue(self.autosave.save_now())
+        self.assertTrue(self.autosave.is_saving())
+        self.assertEqual(self.saved, [])
+        self.finish()
+        self.assertEqual(self.saved, [(self.path, None)])
+        self.assertEqual(sorted(n.get_value() for n in open_task_file(self.path)), ["A", "B", "Root"])
+        return
+
+    def test_saves_only_after_changes(self):
+        """Test that nothing is saved until the graph changes again."""
+        self.assertTrue(self.autosave.save_now())
+        self.assertFalse(self.autosave.save_now()) #still running
+        self.finish()
+        self.assertFalse(self.autosave.save_now())
+        self.a.set_completed(True)
+        self.assertTrue(self.autosave.is_dirty())
+        self.assertTrue(self.autosave.save_now())
+        self.finish()
+        self.assertTrue(open_task_file(self.path).get_node_by_id(self.a.get_id()).is_completed())
+        return
+
+    def test_changes_during_save_are_not_written(self):
+        """Test that the file holds the graph as it was when the save started."""
+        self.assertTrue(self.autosave.save_now())
+        self.a.set_value("Renamed")
+        self.a.add_child(Node("New"))
+        self.finish()
+        saved = open_task_file(self.path)
+        self.assertEqual(sorted(n.get_value() for n in saved), ["A", "B", "Root"])
+        self.assertTrue(self.autosave.is_dirty())
+        return
+
+    def test_failed_save(self):
+        """Test that a failed write is reported and the changes stay marked for the next try."""
+        self.autosave.set_path(os.path.join(self.tmp.name, "missing", "tree.tasks"))
+        with self.assertLogs(level="ERROR"):
+            self.assertTrue(self.autosave.save_now())
+            self.finish()
+        self.assertIsInstance(self.saved[0][1], OSError)
+        self.assertTrue(self.autosave.is_dirty())
+        return
+
+    def test_timer(self):
+        """Test that start schedules saves every interval and stop cancels them."""
+        self.autosave.start()
+        self.assertEqual(self.widget.pending[0][0], 1000)
+        self.widget.run_pending()
+        self.assertTrue(self.autosave.is_saving())
+        self.assertEqual([ms for ms, _ in self.widget.pending], [1000, 100])
+        self.finish()
+        self.autosave.stop()
+        self.assertEqual(self.widget.cancelled, ["after#1"])
+        return
+
+    def test_recovery_path(self):
+        """Test that only an autosave written after the file and its journal is offered for recovery."""
+        path = self.path[:-len(".autosave")]
+        write_task_file(self.graph, path)
+        self.assertIsNone(recovery_path(path))
+        self.assertTrue(self.autosave.save_now())
+        self.finish()
+        os.utime(self.path, (os.path.getmtime(path) + 10,) * 2)
+        self.assertEqual(recovery_path(path), self.path)
+        with open(path + ".journal", "wb"):
+            pass
+        os.utime(path + ".journal", (os.path.getmtime(path) + 20,) * 2)
+        self.assertIsNone(recovery_path(path))
+        return
+
+
+if __name__ == "__main__":
+    unittest.main()
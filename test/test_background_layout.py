@@ -0,0 +1,191 @@
+import unittest
+import random
+from array import array
+from multiprocessing.shared_memory import SharedMemory
+import concurrent.futures
+from unittest.mock import MagicMock
+
+from src.node import Node
+from src.task_graph import TaskGraph
+from src.layout import LAYOUT_ENGINES, spanning_tree
+from src.background_layout import BackgroundLayout, LayoutMemory, lay_out_snapshot, split_subtrees
+
+
+class Test_BackgroundLayout(unittest.TestCase):
+    """
+    Test cases for laying out in worker processes.
+    """
+    def setUp(self):
+        """Set up a random graph of 2000 tasks where some tasks have several parents, and a layout with two workers."""
+        rng = random.Random(7)
+        self.nodes = [Node(f"Task {i}") for i in range(2000)]
+        for i, node in enumerate(self.nodes[1:], start=1):
+            self.nodes[rng.randrange(max(0, i - 20), i)].add_child(node)
+            if i > 5 and rng.random() < 0.1:
+                _ = self.nodes[rng.randrange(0, i)].add_child(node)
+        self.root = self.nodes[0]
+        self.graph = TaskGraph.from_root(self.root)
+        self.laid_out = []
+        self.layout = BackgroundLayout(MagicMock(), lambda levels, coords: self.laid_out.append((levels, coords)), workers=2)
+        return
+
+    def tearDown(self):
+        self.layout.shutdown()
+        return
+
+    def assert_same_layout(self, engine, shown=None, collapsed=()):
+        self.layout.start(self.graph, self.root, engine, 500.0, 500.0, shown, collapsed)
+        self.assertTrue(self.layout.is_running())
+        self.layout.wait()
+        self.assertFalse(self.layout.is_running())
+        levels, coords = self.laid_out.pop()
+        is_shown = (lambda n: True) if shown is None else shown.__contains__
+        expected = spanning_tree(self.root, is_shown, collapsed)
+        self.assertEqual([list(map(self.graph.get_node, level.nodes)) for level in levels], [level.nodes for level in expected])
+        self.assertEqual([level.parents for level in levels], [level.parents for level in expected])
+        self.assertEqual([level.indexes for level in levels], [level.indexes for level in expected])
+        self.assertEqual(coords, LAYOUT_ENGINES[engine](expected, 500.0, 500.0)[1])
+        return
+
+    def test_spiral_matches_layout_on_tk_thread(self):
+        """Test that the spiral, laid out in subtrees on two workers, places every task where the Tk thread would."""
+        self.assert_same_layout("spiral")
+        return
+
+    def test_tidy_matches_layout_on_tk_thread(self):
+        """Test that the tidy tree from a worker is the one the Tk thread would lay out."""
+        self.assert_same_layout("tidy")
+        return
+
+    def test_hidden_and_collapsed_tasks(self):
+        """Test that only the shown tasks are laid out, without the descendants of collapsed ones."""
+        shown = set(self.nodes) - set(self.nodes[3::17])
+        self.assert_same_layout("spiral", shown, set(self.nodes[5::29]))
+        return
+
+    def test_force_matches_layout_on_tk_thread(self):
+        """Test that the force layout from a worker pulls along the same edges as on the Tk thread."""
+        self.root = self.nodes[1]
+        self.assert_same_layout("force", set(self.nodes[:300]))
+        return
+
+    def test_layout_restarts_after_rows_are_compacted(self):
+        """Test that a layout whose rows were compacted while it ran is laid out again instead of naming the wrong tasks."""
+        for node in [n for n in self.nodes[100:] if not n.get_children()]:
+            node.remove_from_tree()
+        self.layout.start(self.graph, self.root, "spiral", 500.0, 500.0)
+        self.graph.compact_rows()
+        self.layout.wait()
+        levels, coords = self.laid_out.pop()
+        expected = spanning_tree(self.root, lambda n: True, ())
+        self.assertEqual([list(map(self.graph.get_node, level.nodes)) for level in levels], [level.nodes for level in expected])
+        self.assertEqual(coords, LAYOUT_ENGINES["spiral"](expected, 500.0, 500.0)[1])
+        return
+
+    def test_newer_layout_cancels_running_one(self):
+        """Test that starting a layout cancels the running one: only the newer one is reported and the older one's memory is released."""
+        self.layout.start(self.graph, self.root, "force", 500.0, 500.0)
+        name = self.layout._memory.get_name()
+        self.layout.start(self.graph, self.root, "tidy", 500.0, 500.0)
+        self.layout.wait()
+        self.assertEqual(len(self.laid_out), 1)
+        self.assertEqual(self.laid_out[0][1], LAYOUT_ENGINES["tidy"](spanning_tree(self.root, lambda n: True, ()), 500.0, 500.0)[1])
+        with self.assertRaises(FileNotFoundError):
+            SharedMemory(name)
+        return
+
+    def test_result_is_taken_over_in_steps(self):
+        """Test that an iterator returned by on_laid_out runs one step per after() call, counts as running and can be cancelled."""
+        taken = []
+        def take_over(levels, coords):
+            for level in levels:
+                taken.append(len(level.nodes))
+                yield
+        widget = MagicMock()
+        sizes = [len(level.nodes) for level in spanning_tree(self.root, lambda n: True, ())]
+        layout = BackgroundLayout(widget, take_over, workers=1)
+        self.addCleanup(layout.shutdown)
+        layout.start(self.graph, self.root, "spiral", 500.0, 500.0)
+        _ = concurrent.futures.wait(layout._futures)
+        layout._poll()
+        self.assertTrue(layout.is_running())
+        self.assertEqual(taken, [])
+        widget.after.assert_called_with(0, layout._finish_step)
+        layout._finish_step()
+        layout._finish_step()
+        self.assertEqual(taken, sizes[:2])
+        layout.cancel()
+        self.assertFalse(layout.is_running())
+        layout._finish_step()
+        self.assertEqual(taken, sizes[:2])
+
+        layout.start(self.graph, self.root, "spiral", 500.0, 500.0)
+        layout.wait()
+        self.assertFalse(layout.is_running())
+        self.assertEqual(taken[2:], sizes)
+        return
+
+    def test_progress_reports(self):
+        """Test that a force layout's progress reports go to on_progress a step per poll, and that the result cuts their steps short."""
+        reports = []
+        def report(levels, coords):
+            reports.append(coords)
+            yield
+            yield
+        layout = BackgroundLayout(MagicMock(), lambda levels, coords: self.laid_out.append((levels, coords)), workers=1, on_progress=report)
+        self.addCleanup(layout.shutdown)
+        layout.start(self.graph, self.nodes[1], "force", 500.0, 500.0, set(self.nodes[:300]))
+        _ = concurrent.futures.wait(layout._futures)
+        self.assertGreater(layout._memory.read_header(LayoutMemory.PROGRESS), 1)
+        layout._report_progress()
+        layout._report_progress()
+        layout._report_progress()
+        #the steps of the report ran out and no newer one was written
+        layout._report_progress()
+        self.assertEqual(len(reports), 1)
+        layout._memory.write_header(LayoutMemory.PROGRESS, layout._memory.read_header(LayoutMemory.PROGRESS) + 1)
+        layout._report_progress()
+        self.assertEqual(len(reports), 2)
+        self.assertIsNotNone(layout._reporting)
+        layout._poll()
+        self.assertIsNone(layout._reporting)
+        self.assertFalse(layout.is_running())
+        #the last report is the result
+        self.assertEqual(reports[-1], self.laid_out[0][1])
+        return
+
+    def test_cancelled_job_stops(self):
+        """Test that a job sees the cancelled flag and leaves no coordinates."""
+        memory = LayoutMemory(len(self.nodes))
+        try:
+            memory.cancel()
+            snapshot = self.graph.snapshot()
+            plan = lay_out_snapshot(memory.get_name(), len(self.nodes), "tidy", snapshot.edge_parents, snapshot.edge_children,
+                                    self.graph.get_row(self.root), None, array("l"), 0.0, 0.0, 1)
+            self.assertIsNone(plan)
+            self.assertEqual(memory.read("xs", 0, len(self.nodes)), array("d", [0.0]) * len(self.nodes))
+        finally:
+            memory.close()
+            memory.unlink()
+        return
+
+    def test_split_subtrees(self):
+        """Test that the ranges cover each level once, in order, and hold the parents of their tasks."""
+        levels = spanning_tree(self.root, lambda n: True, ())
+        ranges = split_subtrees(levels, 2, 5)
+        self.assertEqual(len(ranges), 5)
+        for depth in range(2, len(levels)):
+            spans = [(part[2 * (depth - 2)], part[2 * (depth - 2) + 1]) for part in ranges if len(part) > 2 * (depth - 2)]
+            self.assertEqual(spans[0][0], 0)
+            self.assertEqual(spans[-1][1], len(levels[depth].parents))
+            for (_, end), (start, _) in zip(spans, spans[1:]):
+                self.assertEqual(end, start)
+        for part in ranges:
+            for k in range(2, len(part), 2):
+                parents = levels[2 + k // 2].parents[part[k]:part[k + 1]]
+                self.assertTrue(all(part[k - 2] <= p < part[k - 1] for p in parents))
+        return
+
+
+if __name__ == "__main__":
+    unittest.main()
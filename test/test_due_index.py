@@ -0,0 +1,89 @@
+import unittest
+from datetime import date, time, datetime, timedelta
+
+from src.node import Node
+from src.task_graph import TaskGraph
+from src.due_index import DueDateIndex
+
+
+class Test_DueDateIndex(unittest.TestCase):
+    """
+    Test cases for the DueDateIndex.
+    """
+    def setUp(self):
+        """Set up a graph with tasks due over one week."""
+        self.day = date(2024, 6, 3)
+        self.root = Node("Root")
+        self.monday = Node("Monday 9:00", due_date=self.day, due_time=time(9, 0))
+        self.monday_eod = Node("Monday", due_date=self.day)
+        self.wednesday = Node("Wednesday", due_date=self.day + timedelta(days=2), due_time=time(12, 0))
+        self.undated = Node("Undated")
+        for node in (self.monday, self.monday_eod, self.wednesday, self.undated):
+            self.root.add_child(node)
+        self.graph = TaskGraph.from_root(self.root)
+        self.index = self.graph.get_index(DueDateIndex)
+        return
+
+    def test_builds_from_existing_nodes(self):
+        """Test that only dated tasks are indexed, earliest first."""
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(self.index.due_between(self.day, self.day + timedelta(days=6)),
+                         [self.monday, self.monday_eod, self.wednesday])
+        return
+
+    def test_due_between_datetimes(self):
+        """Test range queries with datetime bounds."""
+        start = datetime(2024, 6, 3, 10, 0)
+        end = datetime(2024, 6, 5, 12, 0)
+        self.assertEqual(self.index.due_between(start, end), [self.monday_eod, self.wednesday])
+        self.assertEqual(self.index.due_between(start, datetime(2024, 6, 5, 11, 59)), [self.monday_eod])
+        return
+
+    def test_overdue(self):
+        """Test that overdue returns incomplete tasks due before now."""
+        now = datetime(2024, 6, 4, 8, 0)
+        self.assertEqual(self.index.overdue(now), [self.monday, self.monday_eod])
+        self.monday.set_completed(True)
+        self.assertEqual(self.index.overdue(now), [self.monday_eod])
+        self.assertEqual(self.index.overdue(datetime(2024, 6, 3, 23, 0)), [])
+        return
+
+    def test_upcoming(self):
+        """Test that upcoming returns the next tasks after now."""
+        now = datetime(2024, 6, 3, 9, 0)
+        self.assertEqual(self.index.upcoming(now, 2), [self.monday, self.monday_eod])
+        self.assertEqual(self.index.upcoming(now, 10), [self.monday, self.monday_eod, self.wednesday])
+        return
+
+    def test_include_completed(self):
+        """Test that completed tasks are only returned when asked for."""
+        self.wednesday.set_completed(True)
+        week_end = self.day + timedelta(days=6)
+        self.assertEqual(self.index.due_between(self.day, week_end), [self.monday, self.monday_eod])
+        self.assertEqual(self.index.due_between(self.day, week_end, include_completed=True),
+                         [self.monday, self.monday_eod, self.wednesday])
+        self.wednesday.set_completed(False)
+        self.assertEqual(self.index.due_between(self.day, week_end), [self.monday, self.monday_eod, self.wednesday])
+        return
+
+    def test_setters_update_index(self):
+        """Test that changing a due date or time moves the task in the index."""
+        self.undated.set_due_date(self.day + timedelta(days=1))
+        self.monday.set_due_time(time(23, 0))
+        self.assertEqual(self.index.due_between(self.day, self.day + timedelta(days=6)),
+                         [self.monday, self.monday_eod, self.undated, self.wednesday])
+        return
+
+    def test_added_and_removed_nodes(self):
+        """Test that nodes joining or leaving the graph are indexed or dropped."""
+        late = Node("Late", due_date=self.day - timedelta(days=1))
+        self.wednesday.add_child(late)
+        self.assertEqual(self.index.overdue(datetime(2024, 6, 3)), [late])
+        self.wednesday.delete_subtree()
+        self.monday.remove_from_tree()
+        self.assertEqual(self.index.due_between(self.day - timedelta(days=7), self.day + timedelta(days=7)),
+                         [self.monday_eod])
+        return
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,138 @@
+import unittest
+import io
+import json
+import os
+import tempfile
+import xml.etree.ElementTree as ET
+from datetime import date, time
+
+from src.node import Node
+from src.task_graph import TaskGraph
+from src.task_file import open_task_file, write_task_file
+from src.exporter import ChunkedWriter, export_graph
+
+GRAPHML: str = "{http://graphml.graphdrawing.org/xmlns}"
+
+
+class CountingFile(io.BytesIO):
+    """Counts the calls to write."""
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, data):
+        self.writes += 1
+        return super().write(data)
+
+
+class Test_Exporter(unittest.TestCase):
+    """
+    Test cases for the DOT, GraphML and JSON exporters.
+    """
+    def setUp(self):
+        """Set up root -> a, b and a, b -> c, with a removed task d, and a temporary directory."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Node("Root")
+        self.a = Node('Say "hi" & <wave>', date(2024, 6, 3), time(7, 30))
+        self.b = Node("Bügeln")
+        self.c = Node("C")
+        self.d = Node("D")
+        self.root.add_child(self.a)
+        self.root.add_child(self.b)
+        self.a.add_child(self.c)
+        self.b.add_child(self.c)
+        self.b.add_child(self.d)
+        self.b.set_completed(True)
+        self.graph = TaskGraph.from_root(self.root)
+        self.d.delete_subtree()
+        self.positions = {self.root.get_id(): (500.0, 500.0), self.a.get_id(): (250.5, 800.0)}
+        return
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        return
+
+    def export(self, name, positions=None):
+        path = os.path.join(self.tmp.name, name)
+        size = export_graph(self.graph, path, positions)
+        self.assertEqual(os.path.getsize(path), size)
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+    def test_json(self):
+        """Test that the JSON export holds every live task with its fields and positions, and the edges."""
+        exported = json.loads(self.export("tree.json", self.positions))
+        self.assertEqual(exported["root"], self.root.get_id())
+        nodes = {n["id"]: n for n in exported["nodes"]}
+        self.assertEqual(set(nodes), {self.root.get_id(), self.a.get_id(), self.b.get_id(), self.c.get_id()})
+        self.assertEqual(nodes[self.a.get_id()], {"id": self.a.get_id(), "value": 'Say "hi" & <wave>', "due_date": "2024-06-03",
+                                                  "due_time": "07:30:00", "completed": False, "x": 250.5, "y": 800.0})
+        self.assertEqual(nodes[self.b.get_id()], {"id": self.b.get_id(), "value": "Bügeln", "completed": True})
+        links = [(l["source"], l["target"]) for l in exported["links"]]
+        self.assertEqual(len(links), 4)
+        self.assertEqual(set(links), {(self.root.get_id(), self.a.get_id()), (self.root.get_id(), self.b.get_id()),
+                                      (self.a.get_id(), self.c.get_id()), (self.b.get_id(), self.c.get_id())})
+        self.assertLess(links.index((self.root.get_id(), self.a.get_id())), links.index((self.root.get_id(), self.b.get_id())))
+        return
+
+    def test_graphml(self):
+        """Test that the GraphML export parses, with escaped values, typed data and positions."""
+        tree = ET.fromstring(self.export("tree.graphml", self.positions))
+        graph = tree.find(GRAPHML + "graph")
+        nodes = {n.get("id"): {d.get("key"): d.text for d in n} for n in graph.iter(GRAPHML + "node")}
+        self.assertEqual(len(nodes), 4)
+        a = nodes[str(self.a.get_id())]
+        self.assertEqual((a["value"], a["due_date"], a["x"], a["y"]), ('Say "hi" & <wave>', "2024-06-03", "250.5", "800.0"))
+        self.assertEqual(nodes[str(self.b.get_id())]["completed"], "true")
+        self.assertNotIn("x", nodes[str(self.c.get_id())])
+        edges = [(e.get("source"), e.get("target")) for e in graph.iter(GRAPHML + "edge")]
+        self.assertEqual(len(edges), 4)
+        self.assertIn((str(self.b.get_id()), str(self.c.get_id())), edges)
+        return
+
+    def test_dot(self):
+        """Test the DOT export's labels, pinned positions with y flipped, and edges."""
+        exported = self.export("tree.dot", self.positions)
+        self.assertTrue(exported.startswith("digraph tasks {\n"))
+        self.assertIn(f'{self.a.get_id()} [label="Say \\"hi\\" & <wave>", due_date="2024-06-03", due_time="07:30:00", '
+                      f'completed=false, pos="250.5,-800!"];', exported)
+        self.assertIn(f"{self.b.get_id()} -> {self.c.get_id()};", exported)
+        self.assertNotIn('"D"', exported)
+        self.assertEqual(exported.count("->"), 4)
+        return
+
+    def test_export_unloaded_task_file(self):
+        """Test that a lazily opened task file exports in whole without creating its nodes."""
+        path = os.path.join(self.tmp.name, "tree.tasks")
+        write_task_file(self.graph, path)
+        self.graph = open_task_file(path)
+        exported = json.loads(self.export("tree.json"))
+        self.assertEqual(sorted(n["value"] for n in exported["nodes"]), ["Bügeln", "C", "Root", 'Say "hi" & <wave>'])
+        self.assertGreater(self.graph._unloaded, 0)
+        return
+
+    def test_chunked_writes(self):
+        """Test that output reaches the file in chunks of at least the chunk size."""
+        f = CountingFile()
+        out = ChunkedWriter(f, chunk_size=10)
+        for _ in range(7):
+            out.write("abc")
+        self.assertEqual(f.writes, 1)
+        self.assertEqual(out.get_written(), 12)
+        out.write("é")
+        out.flush()
+        self.assertEqual(f.getvalue(), b"abc" * 7 + "é".encode("utf-8"))
+        self.assertEqual(out.get_written(), 23)
+        return
+
+    def test_unknown_format(self):
+        """Test that an unsupported suffix raises ValueError before anything is written."""
+        path = os.path.join(self.tmp.name, "tree.xlsx")
+        with self.assertRaises(ValueError):
+            export_graph(self.graph, path)
+        self.assertFalse(os.path.exists(path))
+        return
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import unittest
+import random
+from array import array
+from unittest.mock import patch
+
+from src.node import Node
+from src.force_layout import FORCE_EDGE_LENGTH, FORCE_GRAVITY, FORCE_ITERATIONS, QuadTree, coarsen, relax, relax_coarse_to_fine, repulsion, shift_expansion
+from src.layout import force_coordinates, level_coordinates, spanning_tree
+
+
+class Test_ForceLayout(unittest.TestCase):
+    """
+    Test cases for the Barnes–Hut force layout.
+    """
+    def test_quadtree(self):
+        """Test that every cell holds the points inside its square and leaves hold few points."""
+        rng = random.Random(3)
+        points = [complex(rng.uniform(0, 100), rng.uniform(-50, 50)) for _ in range(500)]
+        tree = QuadTree(points, leaf_size=8)
+        self.assertEqual(sorted(tree.order), list(range(500)))
+        for cell in range(len(tree.lo)):
+            inside = tree.points[tree.lo[cell]:tree.hi[cell]]
+            half = tree.side[cell] / 2
+            for z in inside:
+                self.assertLessEqual(abs(z.real - tree.center[cell].real), half + 1e-9)
+                self.assertLessEqual(abs(z.imag - tree.center[cell].imag), half + 1e-9)
+            self.assertAlmostEqual(tree.com[cell], sum(inside) / len(inside))
+        self.assertTrue(all(tree.hi[leaf] - tree.lo[leaf] <= 8 for leaf in tree.leaves))
+        self.assertEqual(sum(tree.hi[leaf] - tree.lo[leaf] for leaf in tree.leaves), 500)
+        return
+
+    def test_shift_expansion(self):
+        """Test that a re-centred polynomial has the same values."""
+        coefficients = [1 + 2j, 3, 0.5j, 2, -1j]
+        delta = 0.3 - 0.1j
+        shifted = shift_expansion(coefficients, delta)
+        for u in (0j, 1.1 + 0.4j, -2 + 1j):
+            self.assertAlmostEqual(sum(c * u**k for k, c in enumerate(coefficients)),
+                                   sum(c * (u - delta)**k for k, c in enumerate(shifted)))
+        return
+
+    def test_repulsion_matches_exact_sum(self):
+        """Test that the Barnes–Hut sums are off by a few percent of the average exact one."""
+        rng = random.Random(5)
+        points = [complex(rng.gauss(0, 1000), rng.gauss(0, 1000)) for _ in range(1500)]
+        exact = [sum(1 / (z - w) for j, w in enumerate(points) if j != i) for i, z in enumerate(points)]
+        average = sum(map(abs, exact)) / len(exact)
+        errors = [abs(a - e) / average for a, e in zip(repulsion(points), exact)]
+        self.assertLess(sum(errors) / len(errors), 0.02)
+        self.assertLess(max(errors), 0.2)
+        return
+
+    def test_repulsion_of_points_on_top_of_each_other(self):
+        """Test that points in the same place push each other nowhere instead of dividing by zero."""
+        points = [0j, 0j, 10 + 0j]
+        sums = repulsion(points)
+        self.assertAlmostEqual(sums[0], -0.1)
+        self.assertAlmostEqual(sums[2], 0.2)
+        return
+
+    def test_relax_edge_settles_at_edge_length(self):
+        """Test that the two ends of an edge settle where their push balances the edge's pull and the pull to their centre."""
+        points = [0j, 1000 + 0j]
+        ran = relax(points, array("l", [0]), array("l", [1]), iterations=300, tolerance=0.0)
+        self.assertEqual(ran, 300)
+        d = abs(points[1] - points[0])
+        k = FORCE_EDGE_LENGTH
+        self.assertAlmostEqual(k * k / d, d * d / k + FORCE_GRAVITY * d / 2, delta=0.5)
+        return
+
+    def test_relax_stops_early(self):
+        """Test that relaxing stops once the moves are below the tolerance, well within the budget."""
+        points = [0j, 1000 + 0j]
+        ran = relax(points, array("l", [0]), array("l", [1]), iterations=300, tolerance=0.01)
+        self.assertLess(ran, 300)
+        return
+
+    def test_relax_stops_at_time_limit(self):
+        """Test that relaxing stops after the first iteration once its time limit has passed."""
+        points = [complex(i, 0) for i in range(50)]
+        edges = array("l", range(49))
+        ran = relax(points, edges, array("l", range(1, 50)), iterations=300, tolerance=0.0, time_limit=0.0)
+        self.assertEqual(ran, 1)
+        return
+
+    def test_coarsen(self):
+        """Test that leaves join their neighbour's cluster and other points are matched in pairs along edges."""
+        #a star of 0 with leaves 1 to 4, and a chain 0 - 5 - 6 - 7 - 8
+        parents = array("l", [0, 0, 0, 0, 0, 5, 6, 7])
+        children = array("l", [1, 2, 3, 4, 5, 6, 7, 8])
+        cluster, count = coarsen(9, parents, children)
+        self.assertEqual(count, 2)
+        self.assertEqual({cluster[i] for i in range(5)}, {cluster[0]})
+        self.assertEqual(cluster[5], cluster[0])
+        self.assertEqual(cluster[6], cluster[7])
+        self.assertEqual(cluster[8], cluster[7])
+        self.assertEqual(coarsen(2, array("l", [0]), array("l", [1])), (array("l", [0, 0]), 1))
+        return
+
+    def test_relax_coarse_to_fine(self):
+        """Test that a graph larger than FORCE_COARSEST is relaxed on coarser levels first, reports its progress and ends with its edges short."""
+        rng = random.Random(4)
+        count = 600
+        parents = array("l", [rng.randrange(max(0, i - 10), i) for i in range(1, count)])
+        children = array("l", range(1, count))
+        points = [complex(rng.uniform(0, 100), rng.uniform(0, 100)) for _ in range(count)]
+        reports = []
+        with patch("src.force_layout.FORCE_COARSEST", 100):
+            ran = relax_coarse_to_fine(points, parents, children, tolerance=0.0, time_limit=float("inf"), progress=lambda p: reports.append(list(p)))
+        self.assertGreater(ran, FORCE_ITERATIONS)
+        #one report per coarser level, then one per iteration of the finest
+        self.assertGreater(len(reports), 2)
+        self.assertTrue(all(len(report) == count for report in reports))
+        self.assertEqual(reports[-1], points)
+        lengths = sorted(abs(points[a] - points[b]) for a, b in zip(parents, children))
+        self.assertLess(lengths[len(lengths) // 2], 2 * FORCE_EDGE_LENGTH)
+        self.assertGreater(min(abs(points[i] - points[j]) for i in range(0, count, 7) for j in range(i + 1, count, 7)), 0)
+        return
+
+    def test_relax_coarse_to_fine_is_relax_on_small_graphs(self):
+        """Test that graphs of at most FORCE_COARSEST points are relaxed as relax would."""
+        rng = random.Random(6)
+        points = [complex(rng.uniform(0, 100), rng.uniform(0, 100)) for _ in range(50)]
+        parents = array("l", range(49))
+        children = array("l", range(1, 50))
+        expected = list(points)
+        self.assertEqual(relax_coarse_to_fine(points, parents, children), relax(expected, parents, children))
+        self.assertEqual(points, expected)
+        return
+
+    def test_force_coordinates(self):
+        """Test that the root stays in place and a task with two parents at both ends of a chain ends near both."""
+        root = Node("Root")
+        chain = [root]
+        for i in range(30):
+            node = Node(f"Task {i}")
+            chain[-1].add_child(node)
+            chain.append(node)
+        shared = Node("Shared")
+        chain[1].add_child(shared)
+        chain[-1].add_child(shared)
+        levels = spanning_tree(root, lambda n: True, ())
+        nodes, coords = force_coordinates(levels, 500.0, 500.0)
+        self.assertEqual(nodes, level_coordinates(levels, 500.0, 500.0)[0])
+        self.assertEqual((coords[0], coords[1]), (500.0, 500.0))
+        positions = {node: complex(coords[2 * k], coords[2 * k + 1]) for k, node in enumerate(nodes)}
+        for parent in (chain[1], chain[-1]):
+            self.assertLess(abs(positions[shared] - positions[parent]), 3 * FORCE_EDGE_LENGTH)
+        return
+
+
+if __name__ == "__main__":
+    unittest.main()
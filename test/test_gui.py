@@ -1,4 +1,8 @@
 import unittest
+import json
+import os
+import pickle
+import tempfile
 from datetime import date, time, datetime
 from unittest.mock import MagicMock, patch
 import tkinter as tk
@@ -6,7 +10,8 @@ from collections import deque
 
 # Import the classes to be tested
 from src.node import Node
-from src.gui import Gui  # Assuming gui.py is in the same directory
+from src.layout import LAYOUT_ENGINES, spanning_tree
+from src.gui import Gui, progress_color, parse_slice_spec  # Assuming gui.py is in the same directory
 
 class TestGui(unittest.TestCase):
     """
@@ -26,6 +31,11 @@ class TestGui(unittest.TestCase):
             self.gui = Gui(self.node_tree) #create a Gui instance with the mock objects
         return
 
+    def tearDown(self):
+        """Close the journal or database a test saved to or opened."""
+        self.gui.close_files()
+        return
+
 
     def test_gui_initialization(self):
         """Test that the Gui is initialized with the correct attributes."""
@@ -136,6 +146,539 @@ class TestGui(unittest.TestCase):
         self.assertIn(line_id, self.gui._node_to_parent_line_ids[child_node])
         return
 
+    def test_delete_node_and_descendants(self):
+        """Test that deleting a branch removes its nodes, lines and canvas items in one call."""
+        child = Node("Child")
+        grandchild = Node("Grandchild")
+        sibling = Node("Sibling")
+        self.node_tree.add_child(child)
+        self.node_tree.add_child(sibling)
+        child.add_child(grandchild)
+        item_ids = iter(range(100, 200))
+        self.canvas.create_oval.side_effect = lambda *a, **k: next(item_ids)
+        self.canvas.create_text.side_effect = lambda *a, **k: next(item_ids)
+        self.canvas.create_line.side_effect = lambda *a, **k: next(item_ids)
+        self.gui.rebuild_canvas_from_tree(self.node_tree)
+        self.canvas.delete.reset_mock()
+
+        c_id, t_id = self.gui._node_positions[child][2:]
+        self.gui.delete_node_and_descendants(child)
+
+        self.assertEqual(self.node_tree.get_children(), [sibling])
+        self.assertEqual(set(self.gui._node_positions), {self.node_tree, sibling})
+        self.assertEqual(set(self.gui._id_to_node), {self.node_tree.get_id(), sibling.get_id()})
+        self.assertEqual(len(self.gui._line_positions), 1)
+        self.assertEqual(len(self.gui._node_to_child_line_ids[self.node_tree]), 1)
+        self.canvas.delete.assert_called_once()
+        deleted = set(self.canvas.delete.call_args[0])
+        self.assertEqual(len(deleted), 6)  # 2 circles, 2 texts, 2 lines
+        self.assertIn(c_id, deleted)
+        self.assertIn(t_id, deleted)
+        return
+
+    def build_tree(self):
+        """Builds root -> a, b, c with a -> a1, a2 and c -> c1, shared d under a2 and c, and draws it."""
+        nodes = {name: Node(name) for name in ("a", "b", "c", "a1", "a2", "c1", "d")}
+        for parent, child in (("a", "a1"), ("a", "a2"), ("c", "c1"), ("a2", "d"), ("c", "d")):
+            nodes[parent].add_child(nodes[child])
+        for name in ("a", "b", "c"):
+            self.node_tree.add_child(nodes[name])
+        item_ids = iter(range(100, 1000))
+        self.canvas.create_oval.side_effect = lambda *a, **k: next(item_ids)
+        self.canvas.create_text.side_effect = lambda *a, **k: next(item_ids)
+        self.canvas.create_line.side_effect = lambda *a, **k: next(item_ids)
+        self.gui.rebuild_canvas_from_tree(self.node_tree)
+        self.canvas.reset_mock()
+        return nodes
+
+    def assert_layout_is_current(self):
+        """Checks the layout and the drawn positions against a layout from scratch."""
+        positions = dict(self.gui._optimal_node_positions)
+        placed_under = dict(self.gui._placed_under)
+        drawn = {n: p[:2] for n, p in self.gui._node_positions.items()}
+        self.gui.calculate_node_positions()
+        self.assertEqual(positions, self.gui._optimal_node_positions)
+        self.assertEqual(placed_under, self.gui._placed_under)
+        self.assertEqual(drawn, self.gui._optimal_node_positions)
+        for line_id, (parent, child) in self.gui._line_ids_to_nodes.items():
+            self.assertEqual(self.gui._line_positions[line_id], drawn[parent] + drawn[child])
+        return
+
+    def test_add_child_is_laid_out_alone(self):
+        """Test that an added task is drawn where a full layout puts it, without touching other canvas items."""
+        nodes = self.build_tree()
+        self.gui._selected_node = nodes["a"]
+        with patch("tkinter.simpledialog.askstring", return_value="a3"):
+            self.gui.prompt_add_child()
+        self.canvas.delete.assert_not_called()
+        self.canvas.move.assert_not_called()
+        self.assertEqual(self.canvas.create_oval.call_count, 1)
+        self.assertEqual(self.canvas.create_line.call_count, 1)
+        self.assertEqual(len(self.gui._node_positions), 9)
+        self.assert_layout_is_current()
+        return
+
+    def test_delete_moves_only_later_siblings(self):
+        """Test that deleting a task moves only the siblings after it and what is placed under them."""
+        nodes = self.build_tree()
+        self.gui.delete_node_and_descendants(nodes["b"])
+        moved = {c.args[0] for c in self.canvas.move.call_args_list}
+        expected = set()
+        for name in ("c", "c1"):
+            expected.update(self.gui._node_positions[nodes[name]][2:])
+        self.assertEqual(moved, expected)
+        self.canvas.delete.assert_called_once()
+        self.assert_layout_is_current()
+        return
+
+    def test_tidy_layout_engine(self):
+        """Test that the tidy tree engine can be selected, hangs the tree below the root and is laid out again after edits."""
+        nodes = self.build_tree()
+        self.gui.set_layout_engine("tidy")
+        self.assertEqual(self.gui.get_layout_engine(), "tidy")
+        positions = self.gui._optimal_node_positions
+        root_x, root_y = positions[self.node_tree]
+        xs = [positions[nodes[name]][0] for name in ("a", "b", "c")]
+        self.assertEqual(xs, sorted(xs))
+        self.assertEqual({positions[nodes[name]][1] for name in ("a", "b", "c")}, {root_y + 100})
+        self.assertEqual(root_x, (xs[0] + xs[2]) / 2)
+        self.gui._selected_node = nodes["b"]
+        with patch("tkinter.simpledialog.askstring", return_value="b1"):
+            self.gui.prompt_add_child()
+        self.assertEqual(len(self.gui._node_positions), 9)
+        self.assert_layout_is_current()
+        self.gui.delete_node_and_descendants(nodes["a"])
+        self.assert_layout_is_current()
+        with self.assertRaises(ValueError):
+            self.gui.set_layout_engine("circular")
+        return
+
+    def test_background_layout(self):
+        """Test that a large tree is laid out in worker processes, taken over a few tasks at a time, stays drawn as it was until then, and an edit starts the layout over."""
+        nodes = self.build_tree()
+        self.addCleanup(self.gui._background_layout.shutdown)
+        with patch("src.gui.BACKGROUND_LAYOUT_TASKS", 1), patch("src.layout.TAKE_OVER_CHUNK", 2):
+            self.gui.redraw_tree()
+            self.assertTrue(self.gui._background_layout.is_running())
+            self.assertEqual(len(self.gui._node_positions), 8)
+            self.gui._selected_node = nodes["b"]
+            with patch("tkinter.simpledialog.askstring", return_value="b1"):
+                self.gui.prompt_add_child()
+            self.assertTrue(self.gui._background_layout.is_running())
+            self.gui._background_layout.wait()
+        self.assertFalse(self.gui._background_layout.is_running())
+        self.assertEqual(len(self.gui._node_positions), 9)
+        self.assert_layout_is_current()
+        return
+
+    def test_force_layout_engine(self):
+        """Test that the force layout can be selected, keeps the root in place and is laid out again after edits."""
+        nodes = self.build_tree()
+        self.gui.set_layout_engine("force")
+        self.assertEqual(self.gui._optimal_node_positions[self.node_tree], (500.0, 500.0))
+        self.assertEqual(len(self.gui._optimal_node_positions), 8)
+        self.gui._selected_node = nodes["c1"]
+        with patch("tkinter.simpledialog.askstring", return_value="c2"):
+            self.gui.prompt_add_child()
+        self.assertEqual(len(self.gui._node_positions), 9)
+        self.assert_layout_is_current()
+        return
+
+    def test_large_force_layout_is_drawn_as_it_progresses(self):
+        """Test that a force layout of many tasks runs in the background, is drawn from its first progress report and moved into place after that."""
+        self.build_tree()
+        self.addCleanup(self.gui._background_layout.shutdown)
+        with patch("src.gui.BACKGROUND_FORCE_TASKS", 3):
+            self.gui.set_layout_engine("force")
+            self.assertTrue(self.gui._background_layout.is_running())
+            self.gui._background_layout.cancel()
+
+            def row_levels():
+                levels = spanning_tree(self.node_tree, self.gui.is_shown, self.gui._collapsed)
+                for level in levels:
+                    level.nodes = [self.gui._graph.get_row(node) for node in level.nodes]
+                return levels
+            _, spiral = LAYOUT_ENGINES["spiral"](spanning_tree(self.node_tree, self.gui.is_shown, self.gui._collapsed), 500.0, 500.0)
+            _, force = LAYOUT_ENGINES["force"](spanning_tree(self.node_tree, self.gui.is_shown, self.gui._collapsed), 500.0, 500.0)
+            self.gui._progress_drawn = False
+            list(self.gui.background_layout_progress(row_levels(), spiral))
+            self.assertEqual(self.canvas.create_oval.call_count, 8)
+            self.canvas.move.assert_not_called()
+            with patch("src.gui.REDRAW_CHUNK", 3):
+                steps = list(self.gui.background_layout_finished(row_levels(), force))
+            self.assertGreaterEqual(len(steps), 3)
+        self.assertEqual(self.canvas.create_oval.call_count, 8)
+        self.canvas.move.assert_called()
+        self.assertFalse(self.gui._progress_drawn)
+        self.assert_layout_is_current()
+        return
+
+    def test_toggle_completed_recolors_ancestors(self):
+        """Test that completing a task recolors it and its ancestors, and nothing else."""
+        child = Node("Child")
+        sibling = Node("Sibling")
+        self.node_tree.add_child(child)
+        self.node_tree.add_child(sibling)
+        item_ids = iter(range(100, 200))
+        self.canvas.create_oval.side_effect = lambda *a, **k: next(item_ids)
+        self.canvas.create_text.side_effect = lambda *a, **k: next(item_ids)
+        self.canvas.create_line.side_effect = lambda *a, **k: next(item_ids)
+        self.gui.rebuild_canvas_from_tree(self.node_tree)
+        self.assertEqual(self.canvas.create_oval.call_args_list[0][1]["fill"], progress_color(0.0))
+        self.canvas.itemconfig.reset_mock()
+
+        self.gui.toggle_completed(child)
+
+        self.assertTrue(child.is_completed())
+        fills = {c[0][0]: c[1]["fill"] for c in self.canvas.itemconfig.call_args_list}
+        self.assertEqual(fills, {
+            self.gui._node_positions[child][2]: progress_color(100.0),
+            self.gui._node_positions[self.node_tree][2]: progress_color(100.0 / 3),
+        })
+        return
+
+    def test_update_search(self):
+        """Test that typing in the search box lists the matching tasks, best first."""
+        teeth = Node("Brush My Teeth")
+        face = Node("Wash My Face")
+        self.node_tree.add_child(teeth)
+        self.node_tree.add_child(face)
+        self.gui._search_entry.get = MagicMock(return_value="my")
+        self.gui._search_list = MagicMock()
+
+        self.gui.update_search()
+
+        self.assertEqual(self.gui._search_results, [face, teeth])
+        self.gui._search_list.delete.assert_called_once_with(0, tk.END)
+        inserted = [c[0][1] for c in self.gui._search_list.insert.call_args_list]
+        self.assertEqual(inserted, ["Wash My Face", "Brush My Teeth"])
+        return
+
+    def test_search_database_without_loading_it(self):
+        """Test that searching a partly loaded database loads only the matches."""
+        child = Node("Child")
+        grandchild = Node("Grandchild")
+        leaf = Node("Leaf")
+        self.node_tree.add_child(child)
+        child.add_child(grandchild)
+        grandchild.add_child(leaf)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tree.db")
+            with patch("tkinter.filedialog.asksaveasfilename", return_value=path):
+                self.gui.save_tree_to_file()
+            with patch("tkinter.filedialog.askopenfilename", return_value=path):
+                self.gui.load_tree_from_file()
+            self.gui._search_entry.get = MagicMock(return_value="lea")
+            self.gui._search_list = MagicMock()
+            self.gui.update_search()
+            self.assertEqual([n.get_id() for n in self.gui._search_results], [leaf.get_id()])
+            self.assertFalse(self.gui._graph.is_loaded())
+            self.assertIs(self.gui._id_to_node[leaf.get_id()], self.gui._search_results[0])
+        return
+
+    def test_focus_node(self):
+        """Test that selecting a match zooms back in, centres the node and outlines it."""
+        child = Node("Child")
+        self.node_tree.add_child(child)
+        self.gui._node_positions[self.node_tree] = (100.0, 100.0, 1, 2)
+        self.gui._node_positions[child] = (300.0, 200.0, 3, 4)
+        self.gui._scale_factor = 0.5
+        self.canvas.winfo_width.return_value = 1000
+        self.canvas.winfo_height.return_value = 800
+        self.canvas.canvasx.side_effect = lambda v: v
+        self.canvas.canvasy.side_effect = lambda v: v
+        self.gui._search_entry.get = MagicMock(return_value="child")
+
+        self.gui.select_first_search_result()
+
+        self.assertAlmostEqual(self.gui._scale_factor, 1.0)
+        self.canvas.scale.assert_called_once_with("all", 300.0, 200.0, 2.0, 2.0)
+        self.assertEqual(self.gui._node_positions[child][:2], (500.0, 400.0))
+        self.assertEqual(self.gui._node_positions[self.node_tree][:2], (100.0, 200.0))
+        self.canvas.itemconfig.assert_called_with(3, outline="orange", width=3)
+        self.assertIs(self.gui._focused_node, child)
+        return
+
+    def test_save_and_load_tree(self):
+        """Test that a saved tree loads back with its ids and without id collisions afterwards."""
+        child = Node("Child")
+        self.node_tree.add_child(child)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tree.pkl")
+            with patch("tkinter.filedialog.asksaveasfilename", return_value=path):
+                self.gui.save_tree_to_file()
+            with patch("tkinter.filedialog.askopenfilename", return_value=path):
+                self.gui.load_tree_from_file()
+        loaded_root = self.gui._tree
+        self.assertIsNot(loaded_root, self.node_tree)
+        self.assertEqual(loaded_root.get_id(), self.node_tree.get_id())
+        self.assertEqual([c.get_value() for c in loaded_root.get_children()], ["Child"])
+        self.assertEqual(set(self.gui._id_to_node), {self.node_tree.get_id(), child.get_id()})
+
+        new_child = Node("New Child")
+        self.assertTrue(loaded_root.add_child(new_child))
+        self.assertIs(self.gui._id_to_node[new_child.get_id()], new_child)
+        self.assertEqual(len(self.gui._id_to_node), 3)
+        return
+
+    def test_save_again_appends_to_journal(self):
+        """Test that saving to the same file again only appends the changes, which load back."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tree.tasks")
+            with patch("tkinter.filedialog.asksaveasfilename", return_value=path):
+                self.gui.save_tree_to_file()
+                size = os.path.getsize(path)
+                self.node_tree.set_value("Renamed Root")
+                self.gui.save_tree_to_file()
+            self.assertEqual(os.path.getsize(path), size)
+            self.assertGreater(os.path.getsize(path + ".journal"), 20)
+            with patch("tkinter.filedialog.askopenfilename", return_value=path):
+                self.gui.load_tree_from_file()
+        self.assertEqual(self.gui._tree.get_value(), "Renamed Root")
+        return
+
+    def test_load_recovers_autosave(self):
+        """Test that loading offers the changes in a newer autosave and opens them when accepted."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tree.tasks")
+            with patch("tkinter.filedialog.asksaveasfilename", return_value=path):
+                self.gui.save_tree_to_file()
+            self.gui.close_files()
+            self.node_tree.set_value("Unsaved")
+            self.assertTrue(self.gui._autosave.save_now())
+            self.gui._autosave.wait()
+            os.utime(path + ".autosave", (os.path.getmtime(path + ".journal") + 10,) * 2)
+            for accept, value in ((False, "Root Node"), (True, "Unsaved")):
+                with patch("tkinter.filedialog.askopenfilename", return_value=path), \
+                     patch("tkinter.messagebox.askyesno", return_value=accept) as ask:
+                    self.gui.load_tree_from_file()
+                ask.assert_called_once()
+                self.assertEqual(self.gui._tree.get_value(), value)
+            self.assertIsNone(self.gui._journal)
+        return
+
+    def test_saved_layout_is_restored(self):
+        """Test that a reloaded tree is drawn where it was saved, a dragged branch included, without laying it out again."""
+        nodes = self.build_tree()
+        self.gui.event_to_canvas_coords = MagicMock(side_effect=lambda event: (event.x, event.y))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tree.tasks")
+            with patch("tkinter.filedialog.asksaveasfilename", return_value=path):
+                self.gui.save_tree_to_file()
+                x, y = self.gui._node_positions[nodes["a"]][:2]
+                self.gui.start_drag(MagicMock(x=x, y=y))
+                self.gui.drag(MagicMock(x=x + 25, y=y - 5))
+                self.gui.stop_drag(MagicMock())
+                self.gui.save_tree_to_file()
+            saved = self.gui.get_layout_positions()
+            self.assertEqual(saved[nodes["a1"].get_id()][0], self.gui._node_positions[nodes["a1"]][0])
+            with patch("tkinter.filedialog.askopenfilename", return_value=path), \
+                 patch.object(Gui, "calculate_node_positions") as calculate:
+                self.gui.load_tree_from_file()
+            calculate.assert_not_called()
+            self.assertEqual(self.gui.get_layout_positions(), saved)
+        return
+
+    def test_layout_entries_follow_edits_incrementally(self):
+        """Test that after an added task, a deletion and a drag only the changed layout cache entries are taken, without walking the tree, and that they add up to the full ones."""
+        nodes = self.build_tree()
+        self.gui.event_to_canvas_coords = MagicMock(side_effect=lambda event: (event.x, event.y))
+        entries = self.gui.layout_entries()
+        self.assertEqual(self.gui.changed_layout_entries(), {})
+        with patch("src.gui.spanning_tree", side_effect=AssertionError("full walk")):
+            self.gui._selected_node = nodes["a1"]
+            with patch("tkinter.simpledialog.askstring", return_value="a11"):
+                self.gui.prompt_add_child()
+            added = nodes["a1"].get_children()[0]
+            changed = self.gui.changed_layout_entries()
+            self.assertEqual(set(changed), {n.get_id() for n in (added, nodes["a1"], nodes["a"], self.node_tree)})
+            entries.update(changed)
+
+            self.gui.delete_node_and_descendants(nodes["b"])
+            changed = self.gui.changed_layout_entries()
+            self.assertIn(nodes["c1"].get_id(), changed)
+            self.assertNotIn(nodes["a1"].get_id(), changed)
+            entries.update(changed)
+
+            #the mocked canvas finds no task under the pointer, so c1 is picked up by hand
+            x, y = self.gui._node_positions[nodes["c1"]][:2]
+            self.gui._selected_nodes = {nodes["c1"]}
+            self.gui._drag_start_x, self.gui._drag_start_y = x, y
+            self.gui.drag(MagicMock(x=x + 25, y=y - 5))
+            self.gui.stop_drag(MagicMock())
+            changed = self.gui.changed_layout_entries()
+            self.assertIn(nodes["c1"].get_id(), changed)
+            self.assertNotIn(self.node_tree.get_id(), changed)
+            entries.update(changed)
+        full = self.gui.layout_entries()
+        self.assertEqual({i: e for i, e in entries.items() if i in full}, full)
+        return
+
+    def test_explore_database(self):
+        """Test that an opened database draws only the top levels and loads a branch when it is expanded."""
+        child = Node("Child")
+        grandchild = Node("Grandchild")
+        leaf = Node("Leaf")
+        self.node_tree.add_child(child)
+        child.add_child(grandchild)
+        grandchild.add_child(leaf)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tree.db")
+            with patch("tkinter.filedialog.asksaveasfilename", return_value=path):
+                self.gui.save_tree_to_file()
+            with patch("tkinter.filedialog.askopenfilename", return_value=path):
+                self.gui.load_tree_from_file()
+            self.assertEqual([n.get_value() for n in self.gui._collapsed], ["Grandchild"])
+            self.assertEqual(len(self.gui._node_positions), 3)
+            self.assertNotIn(leaf.get_id(), self.gui._id_to_node)
+
+            loaded_grandchild = self.gui._id_to_node[grandchild.get_id()]
+            self.gui.toggle_expanded(loaded_grandchild)
+            self.assertEqual(len(self.gui._node_positions), 4)
+            loaded_leaf = self.gui._id_to_node[leaf.get_id()]
+            self.gui.toggle_completed(loaded_leaf)
+            with patch("tkinter.filedialog.asksaveasfilename", return_value=path):
+                self.gui.save_tree_to_file()
+            self.gui.toggle_expanded(loaded_grandchild)
+            self.assertEqual(len(self.gui._node_positions), 3)
+            self.gui.close_files()
+            with patch("tkinter.filedialog.askopenfilename", return_value=path):
+                self.gui.load_tree_from_file()
+            self.assertTrue(self.gui._graph.get_node_by_id(leaf.get_id()).is_completed())
+        return
+
+    def test_load_part_of_tree(self):
+        """Test that a branch of a saved tree loads alone within a task budget, and expands later."""
+        child = Node("Child")
+        other = Node("Other")
+        self.node_tree.add_child(child)
+        self.node_tree.add_child(other)
+        kids = [Node(f"Kid {i}") for i in range(3)]
+        for kid in kids:
+            child.add_child(kid)
+        kids[0].add_child(Node("Grandkid"))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tree.tasks")
+            with patch("tkinter.filedialog.asksaveasfilename", return_value=path):
+                self.gui.save_tree_to_file()
+            spec = f"root={child.get_id()} tasks=4"
+            with patch("tkinter.filedialog.askopenfilename", return_value=path), \
+                 patch("tkinter.simpledialog.askstring", return_value=spec):
+                self.gui.load_part_of_tree_from_file()
+            self.assertEqual(self.gui._tree.get_value(), "Child")
+            self.assertEqual(sorted(n.get_value() for n in self.gui._node_positions), ["Child", "Kid 0", "Kid 1", "Kid 2"])
+            self.assertNotIn(other.get_id(), self.gui._id_to_node)
+            self.gui.toggle_expanded(self.gui._id_to_node[kids[0].get_id()])
+            self.assertEqual(len(self.gui._node_positions), 5)
+        return
+
+    def test_load_box_of_database(self):
+        """Test that positions saved with a database select the tasks loaded from a box."""
+        first = Node("First")
+        second = Node("Second")
+        self.node_tree.add_child(first)
+        self.node_tree.add_child(second)
+        self.gui.rebuild_canvas_from_tree(self.node_tree)
+        x, y = self.gui._optimal_node_positions[first]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tree.db")
+            with patch("tkinter.filedialog.asksaveasfilename", return_value=path):
+                self.gui.save_tree_to_file()
+            with patch("tkinter.filedialog.askopenfilename", return_value=path):
+                self.gui.load_tree_from_file(box=(x - 1, y - 1, x + 1, y + 1))
+            self.assertEqual(sorted(n.get_value() for n in self.gui._node_positions), ["First", "Root Node"])
+            self.assertEqual(self.gui._optimal_node_positions[self.gui._id_to_node[first.get_id()]], (x, y))
+        return
+
+    def test_load_box_of_task_file(self):
+        """Test that positions saved with a task file and its journal select the tasks loaded from a box."""
+        first = Node("First")
+        second = Node("Second")
+        self.node_tree.add_child(first)
+        self.node_tree.add_child(second)
+        self.gui.rebuild_canvas_from_tree(self.node_tree)
+        x, y = self.gui._optimal_node_positions[first]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tree.tasks")
+            with patch("tkinter.filedialog.asksaveasfilename", return_value=path):
+                self.gui.save_tree_to_file()
+                #moved into the box after the task file was written, so only the journal has it there
+                self.gui._optimal_node_positions[second] = (x + 0.5, y)
+                self.gui.mark_layout_changed((second,))
+                self.gui.save_tree_to_file()
+            with patch("tkinter.filedialog.askopenfilename", return_value=path), patch("builtins.print") as printed:
+                self.gui.load_tree_from_file(box=(x - 1, y - 1, x + 1, y + 1))
+            self.assertEqual(sorted(n.get_value() for n in self.gui._node_positions), ["First", "Root Node", "Second"])
+            self.assertNotIn("loading without the box", str(printed.call_args_list))
+        return
+
+    def test_parse_slice_spec(self):
+        """Test that the partial load prompt is read into loader arguments and rejects anything else."""
+        self.assertEqual(parse_slice_spec("root=3 depth=2 tasks=50 box=0,0,10.5,20"),
+                         {"root_id": 3, "max_depth": 2, "max_nodes": 50, "box": (0.0, 0.0, 10.5, 20.0)})
+        self.assertEqual(parse_slice_spec(""), {})
+        for bad in ("root=x", "box=1,2,3", "size=4"):
+            with self.assertRaises(ValueError):
+                parse_slice_spec(bad)
+        return
+
+    def test_load_legacy_node_pickle(self):
+        """Test that files holding a pickled root node still load."""
+        child = Node("Child")
+        self.node_tree.add_child(child)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tree.pkl")
+            with open(path, "wb") as f:
+                pickle.dump(self.node_tree, f)
+            with patch("tkinter.filedialog.askopenfilename", return_value=path):
+                self.gui.load_tree_from_file()
+        self.assertEqual(self.gui._tree.get_value(), "Root Node")
+        self.assertEqual(len(self.gui._id_to_node), 2)
+        return
+
+    def test_import_tasks_from_file(self):
+        """Test that an imported JSONL task list replaces the tree on the canvas."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tasks.jsonl")
+            with open(path, "w") as f:
+                f.write('{"id": 2, "value": "Child", "parent": 1}\n{"id": 1, "value": "Imported Root"}\n')
+            with patch("tkinter.filedialog.askopenfilename", return_value=path):
+                self.gui.import_tasks_from_file()
+        self.assertEqual(self.gui._tree.get_value(), "Imported Root")
+        self.assertEqual(set(self.gui._id_to_node), {1, 2})
+        self.assertEqual(len(self.gui._node_positions), 2)
+        return
+
+    def test_import_reports_hidden_roots(self):
+        """Test that importing several top-level tasks says which ones are not shown."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tasks.jsonl")
+            with open(path, "w") as f:
+                f.write('{"id": 1, "value": "First"}\n{"id": 2, "value": "Second"}\n{"id": 3, "value": "Third", "parent": 2}\n')
+            with patch("tkinter.filedialog.askopenfilename", return_value=path), patch("builtins.print") as printed:
+                self.gui.import_tasks_from_file()
+        self.assertEqual(self.gui._tree.get_value(), "First")
+        messages = [call.args[0] for call in printed.call_args_list]
+        self.assertTrue(any("2 top-level tasks" in m and "'Second' (id 2)" in m for m in messages), messages)
+        return
+
+    def test_export_tree_to_file(self):
+        """Test that an export holds the whole graph with the layout positions of the drawn tasks."""
+        child = Node("Child")
+        self.node_tree.add_child(child)
+        self.gui.rebuild_canvas_from_tree(self.node_tree)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tree.json")
+            with patch("tkinter.filedialog.asksaveasfilename", return_value=path):
+                self.gui.export_tree_to_file()
+            with open(path) as f:
+                exported = json.load(f)
+        nodes = {n["id"]: n for n in exported["nodes"]}
+        self.assertEqual(nodes[child.get_id()]["value"], "Child")
+        self.assertEqual((nodes[child.get_id()]["x"], nodes[child.get_id()]["y"]), self.gui._optimal_node_positions[child])
+        self.assertEqual(exported["links"], [{"source": self.node_tree.get_id(), "target": child.get_id()}])
+        return
+
     def test_distance_from_node(self):
         """Test that distance_from_node calculates the correct distance."""
         node = Node("Distance Test")
@@ -349,10 +892,14 @@ class TestGui(unittest.TestCase):
         return
 
     def test_run(self):
-        """Test that run calls the mainloop method of the Tkinter window."""
+        """Test that run calls the mainloop method of the Tkinter window and closes the journal on exit."""
         self.gui._window.mainloop = MagicMock()  # Mock mainloop
+        self.gui._journal = MagicMock()
+        journal = self.gui._journal
         self.gui.run()
         self.gui._window.mainloop.assert_called_once()
+        journal.close.assert_called_once()
+        self.assertIsNone(self.gui._journal)
         return
 
 if __name__ == '__main__':
@@ -0,0 +1,128 @@
+import unittest
+import io
+import json
+import os
+import tempfile
+from datetime import date, time
+from unittest.mock import patch
+
+from src.importer import GraphImporter, import_csv, import_jsonl, import_records, parse_record, read_csv, read_jsonl
+
+
+class Test_Importer(unittest.TestCase):
+    """
+    Test cases for the streaming JSONL and CSV importer.
+    """
+    def setUp(self):
+        """Set up a temporary directory for input files."""
+        self.tmp = tempfile.TemporaryDirectory()
+        return
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        return
+
+    def write(self, name: str, text: str) -> str:
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_import_jsonl_with_forward_references(self):
+        """Test that children listed before their parents are linked once the parent appears."""
+        records = [
+            {"id": 3, "value": "Brush My Teeth", "parent": 1},
+            {"id": 4, "value": "Apply Face Wash", "parents": [2], "due_date": "2024-06-03", "due_time": "07:30"},
+            {"id": 1, "value": "Morning Routine"},
+            {"id": 2, "value": "Wash My Face", "parent": 1, "completed": True},
+        ]
+        path = self.write("tasks.jsonl", "\n".join(json.dumps(r) for r in records) + "\n\n")
+        graph = import_jsonl(path)
+
+        root = graph.get_root()
+        self.assertEqual(root.get_value(), "Morning Routine")
+        self.assertEqual([c.get_id() for c in root.get_children()], [3, 2])
+        face = graph.get_node_by_id(2)
+        wash = graph.get_node_by_id(4)
+        self.assertTrue(face.is_completed())
+        self.assertEqual(face.get_children(), [wash])
+        self.assertEqual(wash.get_due_date(), date(2024, 6, 3))
+        self.assertEqual(wash.get_due_time(), time(7, 30))
+        for node in graph:
+            for child in node.get_children():
+                self.assertLess(node.get_order(), child.get_order())
+        return
+
+    def test_import_csv(self):
+        """Test CSV input, with parents separated by semicolons and empty cells as missing."""
+        path = self.write("tasks.csv", (
+            "id,value,parents,due_date,completed\n"
+            "1,Plan,,,\n"
+            "2,\"Design, draft\",1,2024-01-05,yes\n"
+            "3,Build,1;2,,false\n"
+        ))
+        graph = import_csv(path)
+        self.assertEqual(len(graph), 3)
+        build = graph.get_node_by_id(3)
+        self.assertEqual([p.get_value() for p in build.get_parents()], ["Plan", "Design, draft"])
+        self.assertTrue(graph.get_node_by_id(2).is_completed())
+        self.assertFalse(build.is_completed())
+        self.assertEqual(graph.get_node_by_id(2).get_due_date(), date(2024, 1, 5))
+        return
+
+    def test_pending_edges(self):
+        """Test the pending edge table while records stream in."""
+        importer = GraphImporter()
+        importer.add((5, "Child", [1, 2], None, None, False))
+        self.assertEqual(importer.pending_count(), 2)
+        importer.add((1, "Parent", [], None, None, False))
+        self.assertEqual(importer.pending_count(), 1)
+        with self.assertRaises(ValueError):
+            importer.finish()
+        importer.add((2, "Other Parent", [], None, None, False))
+        self.assertEqual(importer.pending_count(), 0)
+        graph = importer.finish()
+        self.assertEqual(len(graph.get_node_by_id(5).get_parents()), 2)
+        return
+
+    def test_invalid_records(self):
+        """Test that bad input is reported with its line number."""
+        with self.assertRaisesRegex(ValueError, "Line 2"):
+            list(read_jsonl(io.BytesIO(b'{"id": 1, "value": "a"}\n{not json\n')))
+        with self.assertRaisesRegex(ValueError, "Line 7: missing field value"):
+            parse_record({"id": 1}, 7)
+        with self.assertRaisesRegex(ValueError, "Line 3"):
+            parse_record({"id": 1, "value": "a", "due_date": "tomorrow"}, 3)
+        with self.assertRaisesRegex(ValueError, "Line 5: parents must be a list"):
+            parse_record({"id": 1, "value": "a", "parents": "12"}, 5)
+        with self.assertRaisesRegex(ValueError, "Line 6: parents must be a list"):
+            parse_record({"id": 1, "value": "a", "parents": {"12": 1}}, 6)
+        self.assertEqual(parse_record({"id": 1, "value": "a", "parents": 12}, 1)[2], [12])
+        importer = GraphImporter()
+        importer.add((1, "a", [], None, None, False))
+        with self.assertRaises(ValueError):
+            importer.add((1, "b", [], None, None, False))
+        return
+
+    def test_csv_errors_report_file_lines(self):
+        """Test that a CSV error names the line in the file, counting values that span several lines."""
+        csv_text = b'id,value,parents\n1,"Plan\nwith notes",\n2,Build,x\n'
+        with self.assertRaisesRegex(ValueError, "Line 4"):
+            import_records(io.BytesIO(csv_text), read_csv)
+        return
+
+    def test_progress(self):
+        """Test that progress is reported every PROGRESS_EVERY records and at the end."""
+        lines = b"".join(json.dumps({"id": i, "value": f"Task {i}", "parent": i - 1 if i else None}).encode() + b"\n"
+                         for i in range(7))
+        reports = []
+        with patch("src.importer.PROGRESS_EVERY", 3):
+            graph = import_records(io.BytesIO(lines), read_jsonl, lambda count, position: reports.append((count, position)))
+        self.assertEqual([count for count, _ in reports], [3, 6, 7])
+        self.assertEqual(reports[-1][1], len(lines))
+        self.assertEqual(len(graph), 7)
+        return
+
+
+if __name__ == "__main__":
+    unittest.main()
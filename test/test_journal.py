@@ -0,0 +1,172 @@
+import unittest
+import os
+import tempfile
+from datetime import date, time
+from unittest.mock import patch
+
+from src.node import Node
+from src.task_graph import TaskGraph
+from src.task_file import TaskFile, read_generation, write_task_file
+from src.journal import Journal, journal_path
+
+
+class Test_Journal(unittest.TestCase):
+    """
+    Test cases for the append-only change journal.
+    """
+    def setUp(self):
+        """Set up root -> a, b and a -> c, saved with an empty journal."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "tree.tasks")
+        self.root = Node("Root")
+        self.a = Node("A")
+        self.b = Node("B")
+        self.c = Node("C")
+        self.root.add_child(self.a)
+        self.root.add_child(self.b)
+        self.a.add_child(self.c)
+        self.graph = TaskGraph.from_root(self.root)
+        self.journal = Journal.create(self.graph, self.path)
+        return
+
+    def tearDown(self):
+        self.journal.close()
+        self.tmp.cleanup()
+        return
+
+    def snapshot(self, graph):
+        return sorted((n.get_id(), n.get_value(), n.get_due_date(), n.get_due_time(), n.is_completed(),
+                       [c.get_id() for c in n.get_children()]) for n in graph)
+
+    def test_replay(self):
+        """Test that saved changes of every kind come back when the file is opened."""
+        self.a.set_value("Renamed")
+        self.b.set_due_date(date(2024, 6, 3))
+        self.b.set_due_time(time(9, 15))
+        self.c.set_completed(True)
+        new = Node("New")
+        self.b.add_child(new)
+        self.b.add_child(self.c)
+        self.a.remove_child(self.c)
+        self.a.remove_from_tree()
+        self.assertEqual(self.journal.save(), 10)
+
+        reopened = Journal.open(self.path)
+        self.assertEqual(self.snapshot(reopened.get_graph()), self.snapshot(self.graph))
+        reopened.close()
+        return
+
+    def test_save_appends_only_changes(self):
+        """Test that a save writes a few bytes to the journal and leaves the task file alone."""
+        size = os.path.getsize(self.path)
+        before = self.journal.journal_size()
+        self.c.set_value("D")
+        self.assertEqual(self.journal.pending_count(), 1)
+        self.journal.save()
+        self.assertLess(self.journal.journal_size() - before, 40)
+        self.assertEqual(os.path.getsize(self.path), size)
+        self.assertEqual(self.journal.save(), 0)
+        return
+
+    def test_delete_subtree_and_unsaved_changes(self):
+        """Test that a deleted subtree replays and that changes made after the last save are not kept."""
+        self.a.delete_subtree()
+        self.journal.save()
+        self.b.set_value("Unsaved")
+
+        reopened = Journal.open(self.path)
+        graph = reopened.get_graph()
+        self.assertEqual(sorted(n.get_value() for n in graph), ["B", "Root"])
+        self.assertIsNone(graph.get_node_by_id(self.c.get_id()))
+        reopened.close()
+        return
+
+    def test_damaged_tail_is_dropped(self):
+        """Test that a record torn by a crash is ignored and cut off, and later records append cleanly."""
+        self.a.set_value("Kept")
+        self.journal.save()
+        self.journal.close()
+        good_size = os.path.getsize(journal_path(self.path))
+        with open(journal_path(self.path), "ab") as f:
+            f.write(b"\x05\x20\x00\x00\x00partial")
+
+        with self.assertLogs(level="WARNING"):
+            self.journal = Journal.open(self.path)
+        self.assertEqual(os.path.getsize(journal_path(self.path)), good_size)
+        graph = self.journal.get_graph()
+        self.assertEqual(graph.get_node_by_id(self.a.get_id()).get_value(), "Kept")
+        graph.get_node_by_id(self.b.get_id()).set_completed(True)
+        self.journal.save()
+
+        reopened = Journal.open(self.path)
+        self.assertTrue(reopened.get_graph().get_node_by_id(self.b.get_id()).is_completed())
+        reopened.close()
+        return
+
+    def test_compaction(self):
+        """Test that a large journal is folded into the task file and starts over."""
+        with patch("src.journal.COMPACT_MIN_BYTES", 0), patch("src.journal.COMPACT_RATIO", 0.0):
+            self.c.set_value("Compacted")
+            self.journal.save()
+        self.assertEqual(read_generation(self.path), 1)
+        self.assertEqual(self.journal.journal_size(), os.path.getsize(journal_path(self.path)))
+        self.a.set_value("After")
+        self.journal.save()
+
+        reopened = Journal.open(self.path)
+        graph = reopened.get_graph()
+        self.assertEqual(graph.get_node_by_id(self.c.get_id()).get_value(), "Compacted")
+        self.assertEqual(graph.get_node_by_id(self.a.get_id()).get_value(), "After")
+        reopened.close()
+        return
+
+    def test_layout(self):
+        """Test that only changed layout cache entries are journaled, that they replay over the task file's and that compaction keeps them."""
+        self.journal.close()
+        self.journal = Journal.create(self.graph, self.path, {self.root.get_id(): (1, 500.0, 500.0), self.a.get_id(): (2, 100.0, 50.0)})
+        self.assertEqual(self.journal.set_layout({self.root.get_id(): (1, 500.0, 500.0), self.a.get_id(): (2, 110.0, 50.0)}), 1)
+        self.assertEqual(self.journal.set_layout({self.b.get_id(): (3, 900.0, 50.0)}), 1)
+        self.assertEqual(self.journal.set_layout({self.b.get_id(): (3, 900.0, 50.0)}), 0)
+        self.journal.save()
+        expected = {self.root.get_id(): (1, 500.0, 500.0), self.a.get_id(): (2, 110.0, 50.0), self.b.get_id(): (3, 900.0, 50.0)}
+
+        reopened = Journal.open(self.path)
+        self.assertEqual(reopened.get_layout(), expected)
+        reopened.compact()
+        reopened.close()
+        self.assertEqual(read_generation(self.path), 1)
+        reopened = Journal.open(self.path)
+        self.assertEqual(reopened.get_layout(), expected)
+        reopened.close()
+        return
+
+    def test_layout_is_read_on_demand(self):
+        """Test that opening a task file reads none of its layout cache entries, and a lookup only the one looked up."""
+        self.journal.close()
+        self.journal = Journal.create(self.graph, self.path, {self.root.get_id(): (1, 500.0, 500.0), self.a.get_id(): (2, 100.0, 50.0)})
+        self.journal.close()
+        with patch.object(TaskFile, "layout_entry", autospec=True, side_effect=TaskFile.layout_entry) as read:
+            self.journal = Journal.open(self.path)
+            read.assert_not_called()
+            self.assertEqual(self.journal.get_layout()[self.a.get_id()], (2, 100.0, 50.0))
+            self.assertIsNone(self.journal.get_layout().get(self.b.get_id()))
+            self.assertEqual(read.call_count, 2)
+        return
+
+    def test_crash_during_compaction(self):
+        """Test that a journal left over from before the task file was rewritten is not applied again."""
+        self.b.set_value("Once")
+        self.b.add_child(Node("Child"))
+        self.journal.save()
+        #the task file was rewritten with the changes, but the journal was never reset
+        write_task_file(self.graph, self.path, read_generation(self.path) + 1)
+
+        reopened = Journal.open(self.path)
+        self.assertEqual(self.snapshot(reopened.get_graph()), self.snapshot(self.graph))
+        self.assertEqual(reopened.journal_size(), os.path.getsize(journal_path(self.path)))
+        reopened.close()
+        return
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,197 @@
+import unittest
+import math
+import random
+from unittest.mock import patch
+
+from src.node import Node
+from src.layout import (ANGLE_INCREMENT, BASE_DISTANCE, DISTANCE_LEVEL_FACTOR, SPIRAL_FACTOR, TIDY_LEVEL_HEIGHT, TIDY_SPACING,
+                        child_position, level_coordinates, placements, radial_layout, relayout_subtree, spanning_tree, take_over_rows,
+                        tidy_coordinates)
+
+
+def recursive_layout(root, root_x, root_y, is_shown, collapsed):
+    """The recursive layout Gui.calculate_node_positions used before, kept as the reference."""
+    positions = {root: (root_x, root_y)}
+
+    def place_children(parent, parent_x, parent_y, level, start_angle_offset):
+        if parent in collapsed:
+            return
+        for i, child in enumerate(parent.get_children()):
+            if child not in positions and is_shown(child):
+                angle = i * ANGLE_INCREMENT + start_angle_offset
+                distance = BASE_DISTANCE * (DISTANCE_LEVEL_FACTOR**level)
+                child_x = int(parent_x + distance * math.cos(angle))
+                child_y = int(parent_y + distance * math.sin(angle))
+                positions[child] = (child_x, child_y)
+                place_children(child, child_x, child_y, level + 1, start_angle_offset + level * SPIRAL_FACTOR)
+
+    place_children(root, root_x, root_y, 1, 0)
+    return positions
+
+
+class Test_Layout(unittest.TestCase):
+    """
+    Test cases for the radial spiral layout.
+    """
+    def setUp(self):
+        """Set up a random graph of 300 tasks where some tasks have several parents."""
+        rng = random.Random(7)
+        self.nodes = [Node(f"Task {i}") for i in range(300)]
+        for i, node in enumerate(self.nodes[1:], start=1):
+            self.nodes[rng.randrange(max(0, i - 20), i)].add_child(node)
+            if i > 5 and rng.random() < 0.2:
+                _ = self.nodes[rng.randrange(0, i)].add_child(node)
+        self.root = self.nodes[0]
+        return
+
+    def layout(self, is_shown=lambda n: True, collapsed=()):
+        nodes, coords = radial_layout(self.root, 500.0, 500.0, is_shown, collapsed)
+        return dict(zip(nodes, zip(coords[0::2], coords[1::2])))
+
+    def test_matches_recursive_layout(self):
+        """Test that every task gets the same position, under the same parent, as with the recursive layout."""
+        self.assertEqual(self.layout(), recursive_layout(self.root, 500.0, 500.0, lambda n: True, ()))
+        return
+
+    def test_hidden_and_collapsed_tasks(self):
+        """Test that hidden tasks keep their siblings' places and collapsed tasks hide their descendants, as before."""
+        hidden = set(self.nodes[1::7])
+        collapsed = set(self.nodes[2::11])
+        is_shown = lambda n: n not in hidden
+        positions = self.layout(is_shown, collapsed)
+        self.assertEqual(positions, recursive_layout(self.root, 500.0, 500.0, is_shown, collapsed))
+        self.assertFalse(hidden & set(positions))
+        return
+
+    def test_spanning_tree(self):
+        """Test the levels, parent positions and child indexes of a small graph."""
+        root, a, b, c = Node("Root"), Node("A"), Node("B"), Node("C")
+        root.add_child(a)
+        root.add_child(b)
+        b.add_child(c)
+        a.add_child(c)
+        levels = spanning_tree(root, lambda n: True, ())
+        #depth first: c is reached through a, which comes first, at index 0 of a's children
+        self.assertEqual([level.nodes for level in levels], [[root], [a, b], [c]])
+        self.assertEqual([list(level.parents) for level in levels], [[-1], [0, 0], [0]])
+        self.assertEqual([list(level.indexes) for level in levels], [[0], [0, 1], [0]])
+        return
+
+    def test_single_positions(self):
+        """Test that each task's position follows from its parent's and its placement alone."""
+        positions = self.layout()
+        placed_under = placements(spanning_tree(self.root, lambda n: True, ()))
+        self.assertEqual(len(placed_under), len(positions) - 1)
+        for node, (parent, index, depth) in placed_under.items():
+            self.assertEqual(child_position(*positions[parent], depth, index), positions[node])
+        return
+
+    def test_relayout_subtree(self):
+        """Test that a task and what is placed under it are recomputed from its parent, and nothing else."""
+        positions = self.layout()
+        placed_under = placements(spanning_tree(self.root, lambda n: True, ()))
+        node = self.nodes[1]
+        expected = dict(positions)
+        positions[node] = (0.0, 0.0)
+        old = relayout_subtree(node, positions, placed_under)
+        self.assertEqual(positions, expected)
+        self.assertEqual(old[node], (0.0, 0.0))
+        self.assertLess(len(old), len(positions))
+        return
+
+    def test_take_over_rows(self):
+        """Test that rows laid out in a worker become the tasks, positions and placements of the same layout, a chunk per step."""
+        levels = spanning_tree(self.root, lambda n: True, ())
+        nodes, coords = level_coordinates(levels, 500.0, 500.0)
+        expected_levels = [level.nodes for level in levels]
+        expected_placed = placements(levels)
+        for level in levels:
+            level.nodes = [self.nodes.index(node) for node in level.nodes]
+        positions = {}
+        placed = {}
+        with patch("src.layout.TAKE_OVER_CHUNK", 50):
+            steps = sum(1 for _ in take_over_rows(levels, coords, self.nodes.__getitem__, positions, placed))
+        self.assertEqual(steps, len(nodes) // 50)
+        self.assertEqual([level.nodes for level in levels], expected_levels)
+        self.assertEqual(positions, dict(zip(nodes, zip(coords[0::2], coords[1::2]))))
+        self.assertEqual(placed, expected_placed)
+        return
+
+    def test_deep_chain(self):
+        """Test that a chain far deeper than the recursion limit is laid out."""
+        first = Node("Step 0")
+        curr = first
+        for i in range(1, 5000):
+            nxt = Node(f"Step {i}")
+            curr.add_child(nxt)
+            curr = nxt
+        nodes, coords = radial_layout(first, 0.0, 0.0)
+        self.assertEqual(len(nodes), 5000)
+        self.assertEqual(len(coords), 10000)
+        self.assertEqual((coords[2], coords[3]), (int(BASE_DISTANCE * DISTANCE_LEVEL_FACTOR), 0))
+        return
+
+
+
+class Test_TidyLayout(unittest.TestCase):
+    """
+    Test cases for the tidy tree layout.
+    """
+    def tidy(self, root, is_shown=lambda n: True, collapsed=()):
+        levels = spanning_tree(root, is_shown, collapsed)
+        nodes, coords = tidy_coordinates(levels, 500.0, 50.0)
+        return levels, dict(zip(nodes, zip(coords[0::2], coords[1::2])))
+
+    def test_small_tree(self):
+        """Test the exact positions of a small tree, where a wide subtree pushes its neighbour right and the root stays centred."""
+        root, a, b, c = Node("Root"), Node("A"), Node("B"), Node("C")
+        a1, a2, a3 = Node("A1"), Node("A2"), Node("A3")
+        for parent, child in ((root, a), (root, b), (root, c), (a, a1), (a, a2), (a, a3)):
+            parent.add_child(child)
+        _, positions = self.tidy(root)
+        s, h = TIDY_SPACING, TIDY_LEVEL_HEIGHT
+        self.assertEqual(positions[root], (500.0, 50.0))
+        self.assertEqual([positions[n][0] - 500.0 for n in (a, b, c)], [-s, 0.0, s])
+        self.assertEqual([positions[n] for n in (a1, a2, a3)], [(500.0 - 2 * s, 50.0 + 2 * h), (500.0 - s, 50.0 + 2 * h), (500.0, 50.0 + 2 * h)])
+        return
+
+    def test_random_graph(self):
+        """Test that levels are apart, neighbours on a level are far enough apart and in order, and parents are centred over their children."""
+        rng = random.Random(11)
+        nodes = [Node(f"Task {i}") for i in range(2000)]
+        for i, node in enumerate(nodes[1:], start=1):
+            nodes[rng.randrange(max(0, i - 40), i)].add_child(node)
+            if i > 5 and rng.random() < 0.1:
+                _ = nodes[rng.randrange(0, i)].add_child(node)
+        hidden = set(nodes[3::17])
+        collapsed = set(nodes[5::29])
+        levels, positions = self.tidy(nodes[0], lambda n: n not in hidden, collapsed)
+        self.assertFalse(hidden & set(positions))
+        for depth, level in enumerate(levels):
+            xs = [positions[n][0] for n in level.nodes]
+            self.assertEqual({positions[n][1] for n in level.nodes}, {50.0 + depth * TIDY_LEVEL_HEIGHT})
+            for left, right in zip(xs, xs[1:]):
+                self.assertGreaterEqual(right - left, TIDY_SPACING - 1e-6)
+        for parent_level, level in zip(levels, levels[1:]):
+            children = {}
+            for node, parent in zip(level.nodes, level.parents):
+                children.setdefault(parent, []).append(positions[node][0])
+            for parent, xs in children.items():
+                self.assertAlmostEqual(positions[parent_level.nodes[parent]][0], (xs[0] + xs[-1]) / 2)
+        return
+
+    def test_deep_chain(self):
+        """Test that a chain far deeper than the recursion limit is laid out straight down."""
+        first = Node("Step 0")
+        curr = first
+        for i in range(1, 5000):
+            nxt = Node(f"Step {i}")
+            curr.add_child(nxt)
+            curr = nxt
+        _, positions = self.tidy(first)
+        self.assertEqual(len(positions), 5000)
+        self.assertEqual(positions[curr], (500.0, 50.0 + 4999 * TIDY_LEVEL_HEIGHT))
+        return
+
+if __name__ == "__main__":
+    unittest.main()
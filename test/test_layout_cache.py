@@ -0,0 +1,135 @@
+import unittest
+import random
+
+from src.node import Node
+from src.layout import LAYOUT_ENGINES, level_coordinates, placements, spanning_tree
+from src.layout_cache import SavedLayout, cache_entries, engine_code, restore_coordinates, subtree_key, subtree_keys
+
+
+class Test_LayoutCache(unittest.TestCase):
+    """
+    Test cases for reusing saved positions of subtrees that did not change.
+    """
+    def setUp(self):
+        """Set up a random graph of 300 tasks where some tasks have several parents, and its spiral layout as saved."""
+        rng = random.Random(7)
+        self.nodes = [Node(f"Task {i}") for i in range(300)]
+        for i, node in enumerate(self.nodes[1:], start=1):
+            self.nodes[rng.randrange(max(0, i - 20), i)].add_child(node)
+            if i > 5 and rng.random() < 0.2:
+                _ = self.nodes[rng.randrange(0, i)].add_child(node)
+        self.root = self.nodes[0]
+        #far from 0, so truncating to whole numbers rounds every coordinate the same way
+        self.saved = self.save("spiral", 5000.0, 5000.0)
+        return
+
+    def save(self, engine, root_x, root_y):
+        levels = spanning_tree(self.root, lambda n: True, ())
+        nodes, coords = LAYOUT_ENGINES[engine](levels, root_x, root_y)
+        return cache_entries(levels, subtree_keys(levels, engine), dict(zip(nodes, zip(coords[0::2], coords[1::2]))))
+
+    def restore(self, engine, root_x=5000.0, root_y=5000.0):
+        levels = spanning_tree(self.root, lambda n: True, ())
+        nodes = [node for level in levels for node in level.nodes]
+        coords = restore_coordinates(levels, subtree_keys(levels, engine), self.saved, engine, root_x, root_y)
+        return None if coords is None else dict(zip(nodes, zip(coords[0::2], coords[1::2])))
+
+    def spiral(self):
+        nodes, coords = level_coordinates(spanning_tree(self.root, lambda n: True, ()), 5000.0, 5000.0)
+        return dict(zip(nodes, zip(coords[0::2], coords[1::2])))
+
+    def test_keys_change_only_above_a_change(self):
+        """Test that an added task changes the keys of the tasks it is placed under and of no other task."""
+        levels = spanning_tree(self.root, lambda n: True, ())
+        before = {node: key for level, keys in zip(levels, subtree_keys(levels, "spiral")) for node, key in zip(level.nodes, keys)}
+        self.assertEqual(subtree_keys(levels, "spiral"), subtree_keys(spanning_tree(self.root, lambda n: True, ()), "spiral"))
+        self.assertNotEqual(subtree_keys(levels, "spiral")[0], subtree_keys(levels, "tidy")[0])
+        task = self.nodes[200]
+        _ = task.add_child(Node("New"))
+        levels = spanning_tree(self.root, lambda n: True, ())
+        after = {node: key for level, keys in zip(levels, subtree_keys(levels, "spiral")) for node, key in zip(level.nodes, keys)}
+        above = {task}
+        for depth in range(len(levels) - 1, 0, -1):
+            for node, parent in zip(levels[depth].nodes, levels[depth].parents):
+                if node in above:
+                    above.add(levels[depth - 1].nodes[parent])
+        self.assertEqual({node for node in before if before[node] != after[node]}, above)
+        return
+
+    def test_keys_do_not_depend_on_the_run(self):
+        """Test that a key is a fixed digest of its ints, so keys saved by one Python process or version match in the next."""
+        self.assertEqual(subtree_key(engine_code("spiral"), 7, -1, 0, 0, [11, -12]), -7961310550254186555)
+        return
+
+    def test_saved_layout_reads_on_demand(self):
+        """Test that a saved layout reads only the entries looked up, each once, and that entries set override the saved ones."""
+        saved = {1: (10, 0.0, 0.0), 2: (20, 5.0, 5.0), 3: (30, 50.0, 50.0)}
+        reads = []
+        def read(node_id):
+            reads.append(node_id)
+            return saved.get(node_id)
+        in_box = lambda x0, y0, x1, y1: [i for i, (_, x, y) in saved.items() if x0 <= x <= x1 and y0 <= y <= y1]
+        layout = SavedLayout(read, saved.keys, in_box)
+        self.assertEqual(layout[2], (20, 5.0, 5.0))
+        self.assertIsNone(layout.get(4))
+        self.assertEqual(layout.get(2), (20, 5.0, 5.0))
+        self.assertEqual(reads, [2, 4])
+        layout.update({3: (31, 1.0, 1.0), 4: (40, 2.0, 2.0)})
+        del layout[1]
+        self.assertEqual(dict(layout), {2: (20, 5.0, 5.0), 3: (31, 1.0, 1.0), 4: (40, 2.0, 2.0)})
+        self.assertEqual(layout.ids_in_box(0.0, 0.0, 10.0, 10.0), {2, 3, 4})
+        return
+
+    def test_unchanged_tree_is_not_laid_out(self):
+        """Test that every task is restored where it was saved, moved ones included, for every engine."""
+        for engine in LAYOUT_ENGINES:
+            self.saved = self.save(engine, 500.0, 500.0)
+            for node in filter(lambda n: n.get_id() in self.saved, self.nodes[10:40]):
+                key, x, y = self.saved[node.get_id()]
+                self.saved[node.get_id()] = (key, x + 33.0, y - 12.5)
+            restored = self.restore(engine, 500.0, 500.0)
+            self.assertEqual({n.get_id(): xy for n, xy in restored.items()}, {i: e[1:] for i, e in self.saved.items()})
+        return
+
+    def test_only_changed_subtrees_are_laid_out(self):
+        """Test that after edits the spiral matches a layout from scratch, except that a subtree moved before it was saved stays moved."""
+        _ = self.nodes[120].add_child(Node("New"))
+        self.nodes[299].remove_from_tree()
+        #dragged with what is placed under it, as Gui.drag does, 20 tasks none of which were edited
+        moved = self.nodes[25]
+        placed_under = placements(spanning_tree(self.root, lambda n: True, ()))
+        subtree = {node for node in placed_under if self.placed_below(node, moved, placed_under)}
+        self.assertGreater(len(subtree), 1)
+        for node in subtree:
+            key, x, y = self.saved[node.get_id()]
+            self.saved[node.get_id()] = (key, x + 40.0, y + 10.0)
+        restored = self.restore("spiral")
+        expected = self.spiral()
+        self.assertEqual(set(restored), set(expected))
+        for node, (x, y) in expected.items():
+            self.assertEqual(restored[node], (x + 40.0, y + 10.0) if node in subtree else (x, y))
+        return
+
+    def placed_below(self, node, ancestor, placed_under):
+        while node is not ancestor and node in placed_under:
+            node = placed_under[node][0]
+        return node is ancestor
+
+    def test_other_engines_lay_out_after_a_change(self):
+        """Test that engines that move every task after an edit are left to run."""
+        self.saved = self.save("tidy", 500.0, 500.0)
+        _ = self.nodes[120].add_child(Node("New"))
+        self.assertIsNone(self.restore("tidy", 500.0, 500.0))
+        return
+
+    def test_missing_entries_are_laid_out(self):
+        """Test that tasks without a saved position are placed by the spiral, with no other cache to go on."""
+        self.saved = {self.root.get_id(): self.saved[self.root.get_id()]}
+        self.assertEqual(self.restore("spiral"), self.spiral())
+        self.saved = {}
+        self.assertEqual(self.restore("spiral"), self.spiral())
+        return
+
+
+if __name__ == "__main__":
+    unittest.main()
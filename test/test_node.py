@@ -1,8 +1,11 @@
 import unittest
+import random
+import pickle
 from datetime import date, time, datetime, timedelta
+from unittest.mock import patch
 
 # Import the classes to be tested
-from src.node import Node
+from src.node import Node, IdAllocator
 
 class Test_Node(unittest.TestCase):
     """
@@ -52,6 +55,22 @@ class Test_Node(unittest.TestCase):
             Node("Test Node", due_time="12:00:00")
         return
 
+    def test_id_allocator(self):
+        """Test that IdAllocator counts up and skips reserved ids."""
+        allocator = IdAllocator()
+        self.assertEqual([next(allocator) for _ in range(3)], [0, 1, 2])
+        allocator.reserve(10)
+        self.assertEqual(next(allocator), 11)
+        allocator.reserve(5)  # reserving an id below the mark changes nothing
+        self.assertEqual(allocator.peek(), 12)
+        return
+
+    def test_ids_are_unique(self):
+        """Test that every new node gets a new id."""
+        nodes = [Node(f"Node {i}") for i in range(10)]
+        self.assertEqual(len({n.get_id() for n in nodes}), 10)
+        return
+
     def test_get_value(self):
         """Test that the get_value method returns the correct value."""
         self.assertEqual(self.node.get_value(), "Test Node")
@@ -162,13 +181,13 @@ class Test_Node(unittest.TestCase):
 
     def test_add_child_max_children(self):
         """Test that add_child does not add more than max_children children."""
-        self.node._max_children = 2  # Set a maximum of 2 children for this test
         child1 = Node("Child 1")
         child2 = Node("Child 2")
         child3 = Node("Child 3")
-        self.assertTrue(self.node.add_child(child1))
-        self.assertTrue(self.node.add_child(child2))
-        self.assertFalse(self.node.add_child(child3))  # Should not be able to add a third child
+        with patch.object(Node, "_max_children", 2):  # Set a maximum of 2 children for this test
+            self.assertTrue(self.node.add_child(child1))
+            self.assertTrue(self.node.add_child(child2))
+            self.assertFalse(self.node.add_child(child3))  # Should not be able to add a third child
         self.assertEqual(len(self.node.get_children()), 2)
         return
 
@@ -179,14 +198,190 @@ class Test_Node(unittest.TestCase):
         parent3 = Node("Parent 3")
         parent4 = Node("Parent 4")
         child_node = Node("Child")
-        child_node._max_parents = 2
-        parent1.add_child(child_node)
-        parent2.add_child(child_node)
-        self.assertFalse(parent3.add_child(child_node))
-        self.assertFalse(parent4.add_child(child_node))
+        with patch.object(Node, "_max_parents", 2):
+            parent1.add_child(child_node)
+            parent2.add_child(child_node)
+            self.assertFalse(parent3.add_child(child_node))
+            self.assertFalse(parent4.add_child(child_node))
         self.assertEqual(len(child_node.get_parents()), 2)
         return
 
+    def test_limits_are_shared(self):
+        """Test that the child/parent limits live on the class, not on each node."""
+        other = Node("Other")
+        self.assertEqual(self.node._max_children, other._max_children)
+        with self.assertRaises(AttributeError):
+            self.node._max_children = 2
+        return
+
+    def test_node_has_no_instance_dict(self):
+        """Test that nodes use __slots__ instead of a per-instance __dict__."""
+        self.assertFalse(hasattr(self.node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            self.node.extra = 1
+        return
+
+    def test_get_created(self):
+        """Test that the packed creation timestamp is exposed as a datetime."""
+        before = datetime.now()
+        node = Node("Timed")
+        after = datetime.now()
+        self.assertIsInstance(node.get_created(), datetime)
+        self.assertLessEqual(before, node.get_created())
+        self.assertLessEqual(node.get_created(), after)
+        return
+
+    def test_intern_values(self):
+        """Test that repeated values share one string when interning is enabled."""
+        with patch.object(Node, "intern_values", True):
+            node_a = Node("".join(["Repeated", " Task"]))
+            node_b = Node("".join(["Repeated", " Task"]))
+            self.assertIs(node_a.get_value(), node_b.get_value())
+            node_c = Node("Other")
+            node_c.set_value("".join(["Repeated", " Task"]))
+            self.assertIs(node_c.get_value(), node_a.get_value())
+        node_d = Node("".join(["Repeated", " Task"]))
+        self.assertIsNot(node_d.get_value(), node_a.get_value())
+        return
+
+    def test_get_children_preserves_order(self):
+        """Test that children and parents come back in insertion order."""
+        children = [Node(f"Child {i}") for i in range(4)]
+        for child in reversed(children):
+            self.node.add_child(child)
+        self.assertEqual(self.node.get_children(), list(reversed(children)))
+        self.node.remove_child(children[2])
+        self.assertEqual(self.node.get_children(), [children[3], children[1], children[0]])
+        return
+
+    def test_get_children_returns_copy(self):
+        """Test that mutating the returned list does not change the node."""
+        child = Node("Child")
+        self.node.add_child(child)
+        self.node.get_children().clear()
+        self.node.get_parents().append(child)
+        self.assertEqual(self.node.get_children(), [child])
+        self.assertEqual(self.node.get_parents(), [])
+        return
+
+    def test_has_child(self):
+        """Test that has_child reports direct children only."""
+        child = Node("Child")
+        grandchild = Node("Grandchild")
+        self.node.add_child(child)
+        child.add_child(grandchild)
+        self.assertTrue(self.node.has_child(child))
+        self.assertFalse(self.node.has_child(grandchild))
+        return
+
+    def test_remove_child(self):
+        """Test that remove_child removes a single edge in both directions."""
+        child = Node("Child")
+        other = Node("Other")
+        self.node.add_child(child)
+        self.node.add_child(other)
+        self.assertTrue(self.node.remove_child(child))
+        self.assertEqual(self.node.get_children(), [other])
+        self.assertEqual(child.get_parents(), [])
+        self.assertFalse(self.node.remove_child(child))
+        return
+
+    def test_high_fan_out(self):
+        """Test adding and removing many children once the child cap is lifted."""
+        children = [Node(f"Child {i}") for i in range(1000)]
+        with patch.object(Node, "_max_children", len(children)):
+            for child in children:
+                self.assertTrue(self.node.add_child(child))
+        self.assertEqual(self.node.get_children(), children)
+        for child in children[::2]:
+            child.remove_from_tree()
+        self.assertEqual(self.node.get_children(), children[1::2])
+        return
+
+    def test_add_child_rejects_self_loop(self):
+        """Test that a node cannot be its own child."""
+        self.assertFalse(self.node.add_child(self.node))
+        self.assertEqual(self.node.get_children(), [])
+        return
+
+    def test_add_child_rejects_cycle(self):
+        """Test that add_child refuses an edge that would close a cycle."""
+        child = Node("Child")
+        grandchild = Node("Grandchild")
+        self.node.add_child(child)
+        child.add_child(grandchild)
+        self.assertFalse(grandchild.add_child(self.node))
+        self.assertFalse(child.add_child(self.node))
+        self.assertEqual(grandchild.get_children(), [])
+        self.assertEqual(self.node.get_parents(), [])
+        self.assertNotIn(self.node, self.node.get_children_r())
+        return
+
+    def test_add_child_keeps_topological_order(self):
+        """Test that parents stay ordered before children when edges go against creation order."""
+        nodes = [Node(f"Node {i}") for i in range(6)]
+        # link newer nodes as parents of older ones, forcing reorders
+        self.assertTrue(nodes[5].add_child(nodes[0]))
+        self.assertTrue(nodes[4].add_child(nodes[5]))
+        self.assertTrue(nodes[0].add_child(nodes[3]))
+        self.assertTrue(nodes[3].add_child(nodes[1]))
+        self.assertTrue(nodes[2].add_child(nodes[4]))
+        self.assertFalse(nodes[1].add_child(nodes[2]))
+        for node in nodes:
+            for child in node.get_children():
+                self.assertLess(node.get_order(), child.get_order())
+        self.assertEqual(len({n.get_order() for n in nodes}), len(nodes))
+        return
+
+    def test_add_child_random_edges(self):
+        """Test add_child against a brute-force reachability check on random edges."""
+        rng = random.Random(4)
+        nodes = [Node(f"Node {i}") for i in range(40)]
+        with patch.object(Node, "_max_children", 40), patch.object(Node, "_max_parents", 40):
+            for _ in range(300):
+                parent, child = rng.sample(nodes, 2)
+                creates_cycle = child is parent or parent in child.get_children_r()
+                already = child in parent.get_children()
+                self.assertEqual(parent.add_child(child), already or not creates_cycle)
+        for node in nodes:
+            for child in node.get_children():
+                self.assertLess(node.get_order(), child.get_order())
+        return
+
+    def test_order_topologically(self):
+        """Test that order_topologically renumbers nodes parents-first and detects cycles."""
+        a, b, c = Node("A"), Node("B"), Node("C")
+        a.add_child(b)
+        b.add_child(c)
+        self.assertEqual(Node.order_topologically([c, b, a]), [a, b, c])
+        self.assertLess(a.get_order(), b.get_order())
+        self.assertLess(b.get_order(), c.get_order())
+        # force a cycle past add_child's check
+        c._children[a] = None
+        a._parents[c] = None
+        with self.assertRaises(ValueError):
+            Node.order_topologically([a, b, c])
+        return
+
+    def test_unpickled_nodes_keep_topological_order(self):
+        """Test that nodes restored from a pickle on their own are ordered parents first, so add_child still rejects cycles."""
+        rng = random.Random(9)
+        nodes = [Node(f"Node {i}") for i in range(30)]
+        with patch.object(Node, "_max_children", 30):
+            for i, node in enumerate(nodes[1:], start=1):
+                _ = rng.choice(nodes[max(0, i - 5):i]).add_child(node)
+        for start in (nodes[0], nodes[-1], nodes[15]):
+            restored = pickle.loads(pickle.dumps(start))
+            component = restored._connected()
+            self.assertEqual(len(component), len(nodes))
+            for node in component:
+                for child in node.get_children():
+                    self.assertLess(node.get_order(), child.get_order())
+            root = next(n for n in component if not n.get_parents())
+            leaf = next(n for n in component if not n.get_children() and n.get_value() == nodes[-1].get_value())
+            self.assertFalse(leaf.add_child(root))
+        return
+
     def test_get_children_r(self):
         """Test that get_children_r returns all recursive children."""
         child1 = Node("Child 1")
@@ -259,6 +454,40 @@ class Test_Node(unittest.TestCase):
         return
        
 
+    def test_delete_subtree(self):
+        """Test that delete_subtree removes the node and its descendants but not other branches."""
+        parent = Node("Parent")
+        sibling = Node("Sibling")
+        child = Node("Child")
+        grandchild = Node("Grandchild")
+        parent.add_child(self.node)
+        parent.add_child(sibling)
+        self.node.add_child(child)
+        child.add_child(grandchild)
+        sibling.add_child(grandchild)  # grandchild is also reachable from a surviving node
+
+        doomed = self.node.delete_subtree()
+
+        self.assertEqual(set(doomed), {self.node, child, grandchild})
+        self.assertEqual(parent.get_children(), [sibling])
+        self.assertEqual(sibling.get_children(), [])
+        for node in doomed:
+            self.assertEqual(node.get_parents(), [])
+            self.assertEqual(node.get_children(), [])
+        return
+
+    def test_delete_subtree_deep_chain(self):
+        """Test that delete_subtree handles chains deeper than the recursion limit."""
+        import sys
+        curr = self.node
+        for i in range(sys.getrecursionlimit() + 100):
+            nxt = Node(f"Link {i}")
+            curr.add_child(nxt)
+            curr = nxt
+        doomed = self.node.delete_subtree()
+        self.assertEqual(len(doomed), sys.getrecursionlimit() + 101)
+        return
+
     def test_remove_from_tree_no_parents_no_children(self):
         """Test remove_from_tree on a node with no parents and no children."""
         self.node.remove_from_tree()
@@ -0,0 +1,124 @@
+import unittest
+
+from src.node import Node
+from src.task_graph import TaskGraph
+from src.progress import ProgressIndex
+
+
+class Test_ProgressIndex(unittest.TestCase):
+    """
+    Test cases for the ProgressIndex.
+    """
+    def setUp(self):
+        """Set up root -> (a, b), a -> (a1, a2), b -> b1."""
+        self.root = Node("Root")
+        self.a = Node("A")
+        self.b = Node("B")
+        self.a1 = Node("A1")
+        self.a2 = Node("A2")
+        self.b1 = Node("B1")
+        self.root.add_child(self.a)
+        self.root.add_child(self.b)
+        self.a.add_child(self.a1)
+        self.a.add_child(self.a2)
+        self.b.add_child(self.b1)
+        self.graph = TaskGraph.from_root(self.root)
+        self.index = self.graph.get_index(ProgressIndex)
+        return
+
+    def test_counts(self):
+        """Test counts on a fresh graph, with the node itself included."""
+        self.assertEqual(self.index.counts(self.root), (0, 6))
+        self.assertEqual(self.index.counts(self.a), (0, 3))
+        self.assertEqual(self.index.remaining(self.b1), 1)
+        self.assertEqual(self.index.percent_complete(self.root), 0.0)
+        return
+
+    def test_completion_updates_ancestors(self):
+        """Test that completing a task moves every ancestor's count without a recount."""
+        self.index.counts(self.root)
+        self.a1.set_completed(True)
+        self.assertEqual(self.index._dirty, set())
+        self.assertEqual(self.index.counts(self.a), (1, 3))
+        self.assertEqual(self.index.counts(self.root), (1, 6))
+        self.assertEqual(self.index.counts(self.b), (0, 2))
+
+        self.a1.set_completed(True) #no change
+        self.assertEqual(self.index.counts(self.root), (1, 6))
+        self.a1.set_completed(False)
+        self.assertEqual(self.index.counts(self.root), (0, 6))
+        return
+
+    def test_structural_change_dirties_ancestors_only(self):
+        """Test that a new edge only dirties the parent and its ancestors."""
+        self.index.counts(self.root)
+        new = Node("New")
+        new.set_completed(True)
+        self.a2.add_child(new)
+        self.assertEqual(self.index._dirty, {new, self.a2, self.a, self.root})
+        self.assertEqual(self.index.counts(self.a), (1, 4))
+        self.assertEqual(self.index.counts(self.root), (1, 7))
+        self.assertEqual(self.index.percent_complete(new), 100.0)
+        return
+
+    def test_multi_parent_counted_once(self):
+        """Test that a task reachable through two parents is counted once."""
+        self.b.add_child(self.a1)
+        self.a1.set_completed(True)
+        self.assertEqual(self.index.counts(self.b), (1, 3))
+        self.assertEqual(self.index.counts(self.a), (1, 3))
+        self.assertEqual(self.index.counts(self.root), (1, 6))
+
+        self.a1.set_completed(False)
+        self.assertEqual(self.index.counts(self.root), (0, 6))
+
+        #a diamond below the shared task is counted once as well
+        leaf = Node("Leaf")
+        self.a1.add_child(leaf)
+        self.assertEqual(self.index.counts(self.root), (0, 7))
+        return
+
+    def test_removal(self):
+        """Test that removing tasks updates the surviving ancestors."""
+        self.a2.set_completed(True)
+        self.assertEqual(self.index.counts(self.root), (1, 6))
+        self.a.delete_subtree()
+        self.assertEqual(self.index.counts(self.root), (0, 3))
+        self.b1.remove_from_tree()
+        self.assertEqual(self.index.counts(self.b), (0, 1))
+        self.assertEqual(self.index.counts(self.root), (0, 2))
+        return
+
+    def test_node_outside_graph(self):
+        """Test that tasks outside the graph are counted directly."""
+        loose = Node("Loose")
+        loose_child = Node("Loose Child")
+        loose.add_child(loose_child)
+        loose_child.set_completed(True)
+        self.assertEqual(self.index.counts(loose), (1, 2))
+        return
+
+    def test_matches_full_recount(self):
+        """Test the cached counts against a recount after a series of edits."""
+        extra = [Node(f"Extra {i}") for i in range(6)]
+        self.a1.add_child(extra[0])
+        self.b1.add_child(extra[0])
+        extra[0].add_child(extra[1])
+        self.a2.add_child(extra[1])
+        self.index.counts(self.root)
+        for node in extra[1:4]:
+            self.b.add_child(node)
+        extra[1].set_completed(True)
+        self.a.set_completed(True)
+        extra[0].remove_child(extra[1])
+        extra[4].set_completed(True)
+        self.b1.add_child(extra[4])
+        for node in self.graph:
+            subtree = [node] + node.get_children_r()
+            expected = (sum(n.is_completed() for n in subtree), len(subtree))
+            self.assertEqual(self.index.counts(node), expected, node.get_value())
+        return
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import unittest
+import random
+from unittest.mock import patch
+
+from src.node import Node
+from src.task_graph import TaskGraph
+from src.reachability import ReachabilityIndex
+
+
+class Test_ReachabilityIndex(unittest.TestCase):
+    """
+    Test cases for the ReachabilityIndex.
+    """
+    def setUp(self):
+        """Set up root -> a, b; a -> c, d; b -> e."""
+        self.root = Node("Root")
+        self.a, self.b, self.c, self.d, self.e = (Node(v) for v in "ABCDE")
+        self.root.add_child(self.a)
+        self.root.add_child(self.b)
+        self.a.add_child(self.c)
+        self.a.add_child(self.d)
+        self.b.add_child(self.e)
+        self.graph = TaskGraph.from_root(self.root)
+        self.index = self.graph.get_index(ReachabilityIndex)
+        return
+
+    def assertMatchesTraversal(self, graph, index):
+        for node in graph:
+            expected = set(node.get_children_r())
+            self.assertEqual(set(index.descendants(node)), expected)
+            for other in graph:
+                self.assertEqual(index.is_descendant(other, node), other in expected)
+        return
+
+    def test_get_index_is_shared(self):
+        """Test that get_index returns one index per graph."""
+        self.assertIs(self.graph.get_index(ReachabilityIndex), self.index)
+        return
+
+    def test_descendants_tree(self):
+        """Test descendants and is_descendant on a tree."""
+        self.assertEqual(set(self.index.descendants(self.root)), {self.a, self.b, self.c, self.d, self.e})
+        self.assertEqual(set(self.index.descendants(self.a)), {self.c, self.d})
+        self.assertEqual(self.index.descendants(self.e), [])
+        self.assertTrue(self.index.is_descendant(self.d, self.root))
+        self.assertFalse(self.index.is_descendant(self.d, self.b))
+        self.assertFalse(self.index.is_descendant(self.a, self.a))
+        return
+
+    def test_multi_parent_fallback(self):
+        """Test that descendants reached through a second parent are included."""
+        f = Node("F")
+        self.d.add_child(f)
+        self.assertTrue(self.b.add_child(self.d))
+        self.assertEqual(set(self.index.descendants(self.b)), {self.e, self.d, f})
+        self.assertTrue(self.index.is_descendant(f, self.b))
+        self.assertFalse(self.index.is_descendant(self.c, self.b))
+        self.assertMatchesTraversal(self.graph, self.index)
+        return
+
+    def test_add_leaf_updates_without_relabel(self):
+        """Test that adding a leaf child is handled in place, without marking the index stale."""
+        self.index.descendants(self.root)
+        leaf = Node("Leaf")
+        self.c.add_child(leaf)
+        self.assertFalse(self.index._stale)
+        self.assertTrue(self.index.is_descendant(leaf, self.a))
+        self.assertFalse(self.index.is_descendant(leaf, self.b))
+        self.assertMatchesTraversal(self.graph, self.index)
+        return
+
+    def test_remove_updates_without_relabel(self):
+        """Test that removing nodes keeps the labels of the rest valid."""
+        self.index.descendants(self.root)
+        self.a.remove_from_tree()
+        self.assertFalse(self.index._stale)
+        self.assertEqual(set(self.index.descendants(self.root)), {self.b, self.e})
+        self.assertEqual(self.index.descendants(self.c), [])
+        self.assertMatchesTraversal(self.graph, self.index)
+        return
+
+    def test_delete_subtree_updates_without_relabel(self):
+        """Test that a bulk subtree deletion cuts whole label blocks."""
+        f = Node("F")
+        self.e.add_child(f)
+        self.c.add_child(f)
+        self.index.descendants(self.root)
+        self.a.delete_subtree()
+        self.assertFalse(self.index._stale)
+        self.assertEqual(set(self.index.descendants(self.root)), {self.b, self.e})
+        self.assertMatchesTraversal(self.graph, self.index)
+        return
+
+    def test_gap_exhaustion_relabels(self):
+        """Test that the index relabels itself once an interval has no room left."""
+        with patch("src.reachability.LABEL_GAP", 4):
+            self.index._stale = True
+            self.index.descendants(self.root)
+            chain = self.e
+            for i in range(10):
+                nxt = Node(f"Chain {i}")
+                chain.add_child(nxt)
+                chain = nxt
+            self.assertMatchesTraversal(self.graph, self.index)
+        return
+
+    def test_node_outside_graph(self):
+        """Test that nodes the index does not know about fall back to a traversal."""
+        lone = Node("Lone")
+        child = Node("Child")
+        lone.add_child(child)
+        self.assertEqual(self.index.descendants(lone), [child])
+        self.assertTrue(self.index.is_descendant(child, lone))
+        return
+
+    def test_random_edits(self):
+        """Test the index against get_children_r over random adds and removals."""
+        rng = random.Random(7)
+        nodes = [self.root, self.a, self.b, self.c, self.d, self.e]
+        with patch.object(Node, "_max_children", 8), patch.object(Node, "_max_parents", 3):
+            for step in range(200):
+                roll = rng.random()
+                if roll < 0.4:
+                    new = Node(f"New {step}")
+                    rng.choice(nodes).add_child(new)
+                    nodes.append(new)
+                elif roll < 0.75:
+                    parent, child = rng.sample(nodes, 2)
+                    parent.add_child(child)
+                elif roll < 0.9 and len(nodes) > 2:
+                    parent = rng.choice(nodes)
+                    if parent.get_children():
+                        parent.remove_child(rng.choice(parent.get_children()))
+                elif len(nodes) > 2:
+                    victim = rng.choice(nodes[1:])
+                    victim.remove_from_tree()
+                    nodes.remove(victim)
+                if step % 20 == 0:
+                    graph = self.root.get_graph()
+                    self.assertMatchesTraversal(graph, graph.get_index(ReachabilityIndex))
+        graph = self.root.get_graph()
+        self.assertMatchesTraversal(graph, graph.get_index(ReachabilityIndex))
+        return
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,261 @@
+import unittest
+import random
+from datetime import date, time, datetime, timedelta
+from unittest.mock import patch
+
+from src.node import Node
+from src.task_graph import TaskGraph
+from src.schedule import Schedule
+
+START = datetime(2024, 1, 1)
+HOUR = timedelta(hours=1)
+
+
+def brute_force(schedule: Schedule, nodes: list[Node]) -> tuple[dict[Node, datetime], dict[Node, datetime]]:
+    """Returns earliest starts and latest finishes of nodes from the critical-path definitions, by plain recursion."""
+    earliest_finish: dict[Node, datetime] = {}
+    latest_finish: dict[Node, datetime] = {}
+
+    def ef(node: Node) -> datetime:
+        if node not in earliest_finish:
+            start: datetime = max((ef(c) for c in node.get_children()), default=START)
+            earliest_finish[node] = start + schedule.get_duration(node)
+        return earliest_finish[node]
+
+    def deadline(node: Node) -> datetime|None:
+        if node.get_due_date() is None:
+            return None
+        due_time: time = node.get_due_time() if node.get_due_time() is not None else time.max
+        return datetime.combine(node.get_due_date(), due_time)
+
+    finish: datetime = max(ef(n) for n in nodes if not n.get_parents())
+
+    def lf(node: Node) -> datetime:
+        if node not in latest_finish:
+            parents: list[Node] = node.get_parents()
+            latest: datetime = min(lf(p) - schedule.get_duration(p) for p in parents) if parents else finish
+            due: datetime|None = deadline(node)
+            latest_finish[node] = min(latest, due) if due is not None else latest
+        return latest_finish[node]
+
+    return {n: ef(n) - schedule.get_duration(n) for n in nodes}, {n: lf(n) for n in nodes}
+
+
+class Test_Schedule(unittest.TestCase):
+    """
+    Test cases for the critical-path Schedule.
+    """
+    def setUp(self):
+        """
+        Set up a project whose children must finish first:
+        release <- build (3h) <- code (5h)
+        release <- docs (2h)
+        """
+        self.release = Node("Release")
+        self.build = Node("Build")
+        self.code = Node("Code")
+        self.docs = Node("Docs")
+        self.release.add_child(self.build)
+        self.release.add_child(self.docs)
+        self.build.add_child(self.code)
+        self.graph = TaskGraph.from_root(self.release)
+        self.schedule = Schedule(self.graph, start=START)
+        self.schedule.set_duration(self.build, 3 * HOUR)
+        self.schedule.set_duration(self.code, 5 * HOUR)
+        self.schedule.set_duration(self.docs, 2 * HOUR)
+        return
+
+    def test_forward_pass(self):
+        """Test earliest start and finish."""
+        self.assertEqual(self.schedule.earliest_start(self.code), START)
+        self.assertEqual(self.schedule.earliest_start(self.build), START + 5 * HOUR)
+        self.assertEqual(self.schedule.earliest_finish(self.build), START + 8 * HOUR)
+        self.assertEqual(self.schedule.earliest_start(self.release), START + 8 * HOUR)
+        self.assertEqual(self.schedule.project_finish(), START + 8 * HOUR)
+        return
+
+    def test_backward_pass_and_slack(self):
+        """Test latest times, slack and the critical path."""
+        self.assertEqual(self.schedule.latest_finish(self.docs), START + 8 * HOUR)
+        self.assertEqual(self.schedule.latest_start(self.docs), START + 6 * HOUR)
+        self.assertEqual(self.schedule.slack(self.docs), 6 * HOUR)
+        self.assertEqual(self.schedule.slack(self.code), timedelta(0))
+        self.assertEqual(self.schedule.critical_path(), [self.code, self.build, self.release])
+        return
+
+    def test_task_with_several_parents(self):
+        """Test that a task under two parents must finish in time for the longer path above it."""
+        root, short, long, shared = (Node(name) for name in ("Root", "Short", "Long", "Shared"))
+        root.add_child(short)
+        root.add_child(long)
+        short.add_child(shared)
+        long.add_child(shared)
+        graph = TaskGraph.from_root(root)
+        schedule = Schedule(graph, start=START)
+        schedule.set_duration(short, HOUR)
+        schedule.set_duration(long, 5 * HOUR)
+        schedule.set_duration(shared, HOUR)
+        self.assertEqual(schedule.project_finish(), START + 6 * HOUR)
+        self.assertEqual(schedule.latest_finish(shared), START + HOUR)
+        self.assertEqual(schedule.slack(shared), timedelta(0))
+        self.assertEqual(schedule.slack(short), 4 * HOUR)
+        self.assertEqual(schedule.slack(long), timedelta(0))
+        self.assertEqual(schedule.critical_path(), [shared, long, root])
+
+        #lengthening the short path past the long one moves the critical path
+        schedule.set_duration(short, 7 * HOUR)
+        self.assertEqual(schedule.latest_finish(shared), START + HOUR)
+        self.assertEqual(schedule.slack(long), 2 * HOUR)
+        self.assertEqual(schedule.critical_path(), [shared, short, root])
+        return
+
+    def test_due_date_limits_latest_finish(self):
+        """Test that a due date before the natural finish shows up as negative slack."""
+        self.schedule.slack(self.code)  # compute once so the change below is incremental
+        self.build.set_due_date(date(2024, 1, 1))
+        self.build.set_due_time(time(6, 0))
+        self.assertEqual(self.schedule.latest_finish(self.build), START + 6 * HOUR)
+        self.assertEqual(self.schedule.slack(self.code), -2 * HOUR)
+        self.assertEqual(self.schedule.critical_path(), [self.code, self.build])
+        return
+
+    def test_duration_change_is_incremental(self):
+        """Test that a duration change updates the schedule without a full recomputation."""
+        self.schedule.slack(self.code)
+        with patch.object(Schedule, "_recompute", side_effect=AssertionError("full recompute")):
+            self.schedule.set_duration(self.docs, 10 * HOUR)
+            self.assertEqual(self.schedule.project_finish(), START + 10 * HOUR)
+            self.assertEqual(self.schedule.critical_path(), [self.docs, self.release])
+            self.assertEqual(self.schedule.slack(self.code), 2 * HOUR)
+        return
+
+    def test_structure_change_recomputes(self):
+        """Test that adding a task is picked up."""
+        test = Node("Test")
+        self.build.add_child(test)
+        self.schedule.set_duration(test, 7 * HOUR)
+        self.assertEqual(self.schedule.project_finish(), START + 10 * HOUR)
+        self.assertEqual(self.schedule.critical_path(), [test, self.build, self.release])
+        return
+
+    def test_durations_follow_compacted_rows(self):
+        """Test that durations stay with their tasks when the graph compacts its rows."""
+        for _ in range(3):
+            temporary = Node("Temporary")
+            self.docs.add_child(temporary)
+            self.schedule.set_duration(temporary, 9 * HOUR)
+            temporary.remove_from_tree()
+        self.graph.compact_rows()
+        self.assertEqual(self.graph.row_count(), 4)
+        self.assertEqual(self.schedule.get_duration(self.code), 5 * HOUR)
+        self.assertEqual(self.schedule.get_duration(self.docs), 2 * HOUR)
+        self.assertEqual(self.schedule.project_finish(), START + 8 * HOUR)
+        return
+
+    def test_set_duration_invalid(self):
+        """Test that set_duration rejects bad durations."""
+        with self.assertRaises(TypeError):
+            self.schedule.set_duration(self.docs, 3)
+        with self.assertRaises(ValueError):
+            self.schedule.set_duration(self.docs, -HOUR)
+        return
+
+    def test_incremental_matches_full(self):
+        """Test incremental updates against a fresh schedule on a random DAG."""
+        rng = random.Random(11)
+        with patch.object(Node, "_max_children", 6), patch.object(Node, "_max_parents", 3):
+            nodes = [self.release, self.build, self.code, self.docs]
+            for i in range(60):
+                node = Node(f"Task {i}")
+                rng.choice(nodes).add_child(node)
+                nodes.append(node)
+            for _ in range(40):
+                parent, child = rng.sample(nodes, 2)
+                parent.add_child(child)
+        for node in nodes:
+            self.schedule.set_duration(node, rng.randrange(10) * HOUR)
+        self.schedule.slack(self.release)
+        for _ in range(30):
+            node = rng.choice(nodes)
+            if rng.random() < 0.7:
+                self.schedule.set_duration(node, rng.randrange(10) * HOUR)
+            else:
+                node.set_due_date(date(2024, 1, 1) + timedelta(days=rng.randrange(3)))
+            fresh = Schedule(self.graph, start=START)
+            for other in nodes:
+                fresh.set_duration(other, self.schedule.get_duration(other))
+            self.graph.remove_observer(fresh)
+            earliest_start, latest_finish = brute_force(self.schedule, nodes)
+            for other in nodes:
+                self.assertEqual(self.schedule.earliest_start(other), fresh.earliest_start(other))
+                self.assertEqual(self.schedule.latest_finish(other), fresh.latest_finish(other))
+                self.assertEqual(self.schedule.earliest_start(other), earliest_start[other])
+                self.assertEqual(self.schedule.latest_finish(other), latest_finish[other])
+        return
+
+    def test_structure_changes_are_incremental(self):
+        """Test that added, reordered and removed tasks update the schedule without a full recomputation."""
+        rng = random.Random(5)
+        nodes = [self.release, self.build, self.code, self.docs]
+        self.schedule.slack(self.code)
+        with patch.object(Node, "_max_children", 6), patch.object(Node, "_max_parents", 3), \
+                patch.object(self.schedule, "_recompute", side_effect=AssertionError("full recompute")):
+            for i in range(80):
+                if i % 3 == 0:
+                    node = Node(f"Task {i}")
+                    rng.choice(nodes).add_child(node)
+                    nodes.append(node)
+                    self.schedule.set_duration(node, rng.randrange(10) * HOUR)
+                elif i % 3 == 1:
+                    #edges between existing tasks often move them in the topological order
+                    parent, child = rng.sample(nodes, 2)
+                    parent.add_child(child)
+                elif len(nodes) > 10:
+                    removed = rng.choice(nodes[4:])
+                    removed.remove_from_tree()
+                    nodes = [n for n in nodes if n.get_graph() is self.graph]
+                node = rng.choice(nodes)
+                node.set_due_date(date(2024, 1, 1) + timedelta(days=rng.randrange(3)))
+                self.schedule.slack(rng.choice(nodes))
+
+                fresh = Schedule(self.graph, start=START)
+                for other in nodes:
+                    fresh.set_duration(other, self.schedule.get_duration(other))
+                self.graph.remove_observer(fresh)
+                self.assertEqual(self.schedule.project_finish(), fresh.project_finish())
+                earliest_start, latest_finish = brute_force(self.schedule, nodes)
+                for other in nodes:
+                    self.assertEqual(self.schedule.earliest_start(other), fresh.earliest_start(other))
+                    self.assertEqual(self.schedule.latest_finish(other), fresh.latest_finish(other))
+                    self.assertEqual(self.schedule.earliest_start(other), earliest_start[other])
+                    self.assertEqual(self.schedule.latest_finish(other), latest_finish[other])
+        return
+
+    def test_reordered_task_stays_stale(self):
+        """Test that a task moved before an edit it has not caught up with is still recomputed."""
+        root, first, second, edited, task, last = (Node(name) for name in ("Root", "First", "Second", "Edited", "Task", "Last"))
+        root.add_child(first)
+        first.add_child(second)
+        root.add_child(edited)
+        edited.add_child(task)
+        task.add_child(last)
+        graph = TaskGraph.from_root(root)
+        nodes = [root, first, second, edited, task, last]
+        schedule = Schedule(graph, start=START)
+        for node in nodes:
+            schedule.set_duration(node, HOUR)
+        schedule.latest_finish(task)
+        schedule.set_duration(edited, 20 * HOUR)
+        edit_position = edited.get_order()
+        #first and second move after last, which moves task below the position of the edit
+        last.add_child(first)
+        self.assertLess(task.get_order(), edit_position)
+
+        fresh = Schedule(graph, start=START)
+        for node in nodes:
+            fresh.set_duration(node, schedule.get_duration(node))
+        self.assertEqual(schedule.latest_finish(task), fresh.latest_finish(task))
+        return
+
+if __name__ == "__main__":
+    _ = unittest.main()
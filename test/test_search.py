@@ -0,0 +1,94 @@
+import unittest
+
+from src.node import Node
+from src.task_graph import TaskGraph
+from src.search import SearchIndex, search_values
+
+
+class Test_SearchIndex(unittest.TestCase):
+    """
+    Test cases for the SearchIndex.
+    """
+    def setUp(self):
+        """Set up a small morning routine graph."""
+        self.root = Node("Morning Routine")
+        self.teeth = Node("Brush My Teeth")
+        self.face = Node("Wash My Face")
+        self.wash = Node("Apply PREMIUM Face Wash")
+        self.scrub = Node("Scrubba Dub Dub")
+        self.root.add_child(self.teeth)
+        self.root.add_child(self.face)
+        self.face.add_child(self.wash)
+        self.face.add_child(self.scrub)
+        self.graph = TaskGraph.from_root(self.root)
+        self.index = self.graph.get_index(SearchIndex)
+        return
+
+    def test_builds_from_existing_nodes(self):
+        """Test that every task in the graph is indexed."""
+        self.assertEqual(len(self.index), 5)
+        return
+
+    def test_substring_and_case(self):
+        """Test that words of three or more letters match anywhere, ignoring case."""
+        self.assertEqual(self.index.search("premium"), [self.wash])
+        self.assertEqual(self.index.search("EETH"), [self.teeth])
+        self.assertEqual(self.index.search("rub"), [self.scrub])
+        self.assertEqual(self.index.search("ush"), [self.teeth])
+        self.assertEqual(self.index.search("xyz"), [])
+        self.assertEqual(self.index.search("   "), [])
+        return
+
+    def test_ranking(self):
+        """Test that prefixes rank above word starts, and word starts above the rest."""
+        self.assertEqual(self.index.search("wash"), [self.face, self.wash])
+        self.assertEqual(self.index.search("face"), [self.face, self.wash])
+        exact = self.graph.add_task("Face")
+        self.assertEqual(self.index.search("face"), [exact, self.face, self.wash])
+        self.assertEqual(self.index.search("face", limit=1), [exact])
+        return
+
+    def test_several_words(self):
+        """Test that every word of the query must match."""
+        self.assertEqual(self.index.search("my face"), [self.face])
+        self.assertEqual(self.index.search("face my"), [self.face])
+        self.assertEqual(self.index.search("dub scrub"), [self.scrub])
+        return
+
+    def test_short_queries_match_word_starts(self):
+        """Test that one or two letter queries match the start of a word."""
+        self.assertEqual(self.index.search("m"), [self.root, self.face, self.teeth])
+        self.assertEqual(self.index.search("du"), [self.scrub])
+        self.assertEqual(self.index.search("ub"), [])
+        self.assertEqual(self.index.search("m", limit=2), [self.root, self.face])
+        return
+
+    def test_search_values_ranks_like_the_index(self):
+        """Test that unindexed (id, value) pairs are matched and ranked like indexed tasks."""
+        values = [(n.get_id(), n.get_value()) for n in self.graph]
+        for query in ("wash", "face", "m", "my face", "du", "xyz"):
+            self.assertEqual(search_values(values, query, 20), [n.get_id() for n in self.index.search(query)], query)
+        return
+
+    def test_kept_current(self):
+        """Test that renaming, adding and removing tasks updates the index."""
+        self.scrub.set_value("Rinse")
+        self.assertEqual(self.index.search("scrub"), [])
+        self.assertEqual(self.index.search("rinse"), [self.scrub])
+        self.assertEqual(self.index.search("r"), [self.scrub, self.root])
+
+        floss = Node("Floss")
+        self.teeth.add_child(floss)
+        self.assertEqual(self.index.search("flo"), [floss])
+
+        floss.remove_from_tree()
+        self.assertEqual(self.index.search("flo"), [])
+        self.face.delete_subtree()
+        self.assertEqual(self.index.search("wash"), [])
+        self.assertEqual(self.index.search("m"), [self.root, self.teeth])
+        self.assertEqual(len(self.index), 2)
+        return
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,222 @@
+import unittest
+import os
+import pickle
+import struct
+import tempfile
+from datetime import date, time
+from unittest.mock import patch
+
+from src.node import Node, LazyNode
+from src.task_graph import TaskGraph
+from src.task_file import HEADER, MAGIC, SECTION, SECTIONS, SECTIONS_OF_VERSION, TaskFile, load_graph, open_task_file, write_task_file
+
+
+class Test_TaskFile(unittest.TestCase):
+    """
+    Test cases for the binary task file format and its lazy loading.
+    """
+    def setUp(self):
+        """Set up a small graph: root -> a, b and a, b -> c, saved to a temporary directory."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "tree.tasks")
+        self.root = Node("Root")
+        self.a = Node("Wäsche", date(2024, 6, 3), time(7, 30, 15))
+        self.b = Node("B")
+        self.c = Node("C")
+        self.root.add_child(self.a)
+        self.root.add_child(self.b)
+        self.b.add_child(self.c)
+        self.a.add_child(self.c)
+        self.b.set_completed(True)
+        self.graph = TaskGraph.from_root(self.root)
+        write_task_file(self.graph, self.path)
+        return
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        return
+
+    def test_round_trip(self):
+        """Test that fields, ids, edge order, the root and the id high-water mark survive a save."""
+        loaded = open_task_file(self.path)
+        self.assertEqual(len(loaded), 4)
+        root = loaded.get_root()
+        self.assertEqual(root.get_id(), self.root.get_id())
+        self.assertEqual([n.get_value() for n in root.get_children()], ["Wäsche", "B"])
+        a = loaded.get_node_by_id(self.a.get_id())
+        self.assertEqual(a.get_due_date(), date(2024, 6, 3))
+        self.assertEqual(a.get_due_time(), time(7, 30, 15))
+        self.assertEqual(a.get_created(), self.a.get_created())
+        self.assertTrue(loaded.get_node_by_id(self.b.get_id()).is_completed())
+        self.assertEqual([n.get_value() for n in loaded.get_node_by_id(self.c.get_id()).get_parents()], ["B", "Wäsche"])
+        self.assertEqual(loaded.get_next_id(), self.graph.get_next_id())
+        for node in loaded:
+            for child in node.get_children():
+                self.assertLess(node.get_order(), child.get_order())
+        return
+
+    def test_nodes_are_created_lazily(self):
+        """Test that opening creates only the root and that edges are read on first use."""
+        loaded = open_task_file(self.path)
+        self.assertEqual(loaded._unloaded, 3)
+        root = loaded.get_root()
+        self.assertIs(type(root), LazyNode)
+        self.assertIsNone(loaded.get_node_by_id(-5))
+
+        children = root.get_children()
+        self.assertIs(type(root), Node)
+        self.assertEqual(loaded._unloaded, 1)
+        self.assertTrue(all(type(n) is LazyNode for n in children))
+        self.assertEqual(len(loaded.find_due(date(2024, 6, 1), date(2024, 6, 30))), 1)
+        return
+
+    def test_snapshot_shares_value_heap(self):
+        """Test that a snapshot reads unloaded values from the file's map, also after the file was closed."""
+        loaded = open_task_file(self.path)
+        snapshot = loaded.snapshot()
+        self.assertIsInstance(snapshot._heap[1], memoryview)
+        loaded._source.close()
+        self.assertEqual(sorted(snapshot.value(row) for row in range(snapshot.num_rows)), ["B", "C", "Root", "Wäsche"])
+        return
+
+    def test_loaded_index_is_kept_in_place(self):
+        """Test that the index of loaded nodes stays the same dict when the rest of the file is loaded."""
+        loaded = open_task_file(self.path)
+        index = loaded.get_loaded_index()
+        self.assertEqual(len(index), 1)
+        self.assertIs(loaded.get_id_index(), index)
+        self.assertEqual(set(index), {self.root.get_id(), self.a.get_id(), self.b.get_id(), self.c.get_id()})
+        return
+
+    def test_slice_reads_no_further(self):
+        """Test that stubs of a slice of an opened file are not expanded."""
+        loaded = open_task_file(self.path)
+        found, stubs = loaded.load_slice(loaded.get_root(), max_depth=1)
+        self.assertEqual([n.get_value() for n in found], ["Root", "Wäsche", "B"])
+        self.assertTrue(all(type(n) is LazyNode for n in stubs))
+        self.assertEqual(loaded._unloaded, 1)
+        return
+
+    def test_edit_and_save_over_open_file(self):
+        """Test that a lazily opened graph can be edited and saved back to the file it reads from."""
+        loaded = open_task_file(self.path)
+        a = loaded.get_node_by_id(self.a.get_id())
+        new = Node("New")
+        self.assertTrue(a.add_child(new))
+        self.assertEqual(len(loaded), 5)
+        loaded.get_node_by_id(self.b.get_id()).delete_subtree()
+        self.assertEqual(len(loaded), 3)
+        self.assertEqual(len(list(loaded)), 3)
+
+        write_task_file(loaded, self.path)
+        reloaded = open_task_file(self.path)
+        self.assertEqual(sorted(n.get_value() for n in reloaded), ["New", "Root", "Wäsche"])
+        self.assertEqual(reloaded.get_node_by_id(new.get_id()).get_parents()[0].get_id(), self.a.get_id())
+        self.assertGreater(Node("Later").get_id(), new.get_id())
+        return
+
+    def test_child_order_after_edits(self):
+        """Test that children keep their order through removals and re-adds before a save."""
+        d = Node("D")
+        self.root.add_child(d)
+        self.root.remove_child(self.a)
+        self.root.add_child(self.a)
+        write_task_file(self.graph, self.path)
+        loaded = open_task_file(self.path)
+        self.assertEqual([n.get_value() for n in loaded.get_root().get_children()], ["B", "D", "Wäsche"])
+        return
+
+    def test_deep_chain(self):
+        """Test that a chain far deeper than the recursion limit saves and loads."""
+        first = Node("Step 0")
+        curr = first
+        for i in range(1, 5000):
+            nxt = Node(f"Step {i}")
+            curr.add_child(nxt)
+            curr = nxt
+        write_task_file(TaskGraph.from_root(first), self.path)
+        loaded = open_task_file(self.path)
+        self.assertEqual(len(loaded.get_root().get_children_r()), 4999)
+        return
+
+    def test_load_pickles(self):
+        """Test that pickled graphs and legacy pickled root nodes still load."""
+        for saved in (self.graph, self.root):
+            path = os.path.join(self.tmp.name, "tree.pkl")
+            with open(path, "wb") as f:
+                pickle.dump(saved, f)
+            loaded = load_graph(path)
+            self.assertEqual(len(loaded), 4)
+            self.assertEqual(loaded.get_root().get_value(), "Root")
+        self.assertEqual(len(load_graph(self.path)), 4)
+        return
+
+    def test_layout_round_trip(self):
+        """Test that the layout cache is saved for the tasks the file holds, and that tasks without an entry have none."""
+        layout = {self.root.get_id(): (-3, 500.0, 500.0), self.c.get_id(): (2**63 - 1, -20.5, 7.25), 10**6: (1, 0.0, 0.0)}
+        write_task_file(self.graph, self.path, layout=layout)
+        task_file = TaskFile(self.path)
+        self.assertEqual(task_file.layout(), {self.root.get_id(): (-3, 500.0, 500.0), self.c.get_id(): (2**63 - 1, -20.5, 7.25)})
+        task_file.close()
+        return
+
+    def test_reads_version_1(self):
+        """Test that files written before the layout cache open, without one."""
+        with patch("src.task_file.SECTIONS", SECTIONS_OF_VERSION[1]), patch("src.task_file.VERSION", 1):
+            write_task_file(self.graph, self.path, layout={self.root.get_id(): (1, 2.0, 3.0)})
+        task_file = TaskFile(self.path)
+        self.assertEqual(task_file.layout(), {})
+        task_file.close()
+        loaded = open_task_file(self.path)
+        self.assertEqual([n.get_value() for n in loaded.get_root().get_children()], ["Wäsche", "B"])
+        return
+
+    def test_rejects_invalid_files(self):
+        """Test that foreign, newer and truncated files raise ValueError."""
+        with open(self.path, "rb") as f:
+            data = f.read()
+        newer = MAGIC + struct.pack("<I", 99) + data[len(MAGIC) + 4:]
+        for name, content in (("other", b"x" * 400), ("newer", newer), ("short", data[:HEADER.size]), ("cut", data[:-8])):
+            path = os.path.join(self.tmp.name, name)
+            with open(path, "wb") as f:
+                f.write(content)
+            with self.assertRaises(ValueError):
+                open_task_file(path)
+        return
+
+    def test_rejects_corrupt_index(self):
+        """Test that rows out of bounds raise ValueError when the file is opened, and bad offsets when their row is read."""
+        with open(self.path, "rb") as f:
+            data = f.read()
+        names = [name for name, _, _ in SECTIONS]
+        def section(name):
+            return SECTION.unpack_from(data, HEADER.size + names.index(name) * SECTION.size)
+        def corrupt(name, position, value):
+            path = os.path.join(self.tmp.name, name)
+            with open(path, "wb") as f:
+                f.write(data[:position] + struct.pack("<q", value) + data[position + 8:])
+            return path
+        children, _ = section("children")
+        edge_parents, _ = section("edge_parents")
+        child_offsets, _ = section("child_offsets")
+        parent_offsets, nbytes = section("parent_offsets")
+        at_open = {
+            "row": (children, 99),
+            "negative_row": (edge_parents, -1),
+            "first_offset": (child_offsets, 1),
+            "last_offset": (parent_offsets + nbytes - 8, 100),
+        }
+        for name, (position, value) in at_open.items():
+            with self.subTest(name), self.assertRaisesRegex(ValueError, "corrupt"):
+                TaskFile(corrupt(name, position, value))
+
+        #row 0 ends past where row 1 ends
+        task_file = TaskFile(corrupt("falling_offset", child_offsets + 8, 4))
+        with self.assertRaisesRegex(ValueError, "row 1"):
+            task_file.children(1)
+        self.assertEqual(len(task_file.children(0)), 4)
+        task_file.close()
+        return
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,415 @@
+import unittest
+import pickle
+from datetime import date, time, timedelta
+from unittest.mock import patch
+
+from src.node import Node
+from src.task_graph import TaskGraph, GraphObserver, NO_DATE
+
+
+class RecordingObserver(GraphObserver):
+    def __init__(self):
+        self.events = []
+
+    def node_added(self, node):
+        self.events.append(("node_added", node))
+
+    def node_removed(self, node):
+        self.events.append(("node_removed", node))
+
+    def node_changed(self, node, field):
+        self.events.append(("node_changed", node, field))
+
+    def edge_added(self, parent, child):
+        self.events.append(("edge_added", parent, child))
+
+    def edge_removed(self, parent, child):
+        self.events.append(("edge_removed", parent, child))
+
+
+class Test_TaskGraph(unittest.TestCase):
+    """
+    Test cases for the TaskGraph container.
+    """
+    def setUp(self):
+        """Set up a small tree: root -> a, b and a -> c."""
+        self.root = Node("Root")
+        self.a = Node("A")
+        self.b = Node("B")
+        self.c = Node("C")
+        self.root.add_child(self.a)
+        self.root.add_child(self.b)
+        self.a.add_child(self.c)
+        self.graph = TaskGraph.from_root(self.root)
+        return
+
+    def test_from_root_adopts_connected_nodes(self):
+        """Test that from_root pulls in every connected node and reuses an existing graph."""
+        self.assertEqual(len(self.graph), 4)
+        for node in (self.root, self.a, self.b, self.c):
+            self.assertIn(node, self.graph)
+            self.assertIs(node.get_graph(), self.graph)
+        self.assertIs(TaskGraph.from_root(self.c), self.graph)
+        return
+
+    def test_columns_mirror_nodes(self):
+        """Test that the columns hold the node fields."""
+        row = self.graph.get_row(self.a)
+        self.assertIs(self.graph.get_node(row), self.a)
+        self.assertEqual(self.graph._ids[row], self.a.get_id())
+        self.assertEqual(self.graph._values[row], "A")
+        self.assertEqual(self.graph._due_dates[row], NO_DATE)
+        self.assertFalse(self.graph._completed[row])
+        return
+
+    def test_setters_write_through(self):
+        """Test that Node setters update the graph columns."""
+        row = self.graph.get_row(self.b)
+        self.b.set_value("Renamed")
+        self.b.set_due_date(date(2024, 3, 1))
+        self.b.set_due_time(time(9, 30))
+        self.b.set_completed(True)
+        self.assertEqual(self.graph._values[row], "Renamed")
+        self.assertEqual(self.graph._due_dates[row], date(2024, 3, 1).toordinal())
+        self.assertEqual(self.graph._due_times[row], 9 * 3600 + 30 * 60)
+        self.assertTrue(self.graph._completed[row])
+        return
+
+    def test_set_completed_invalid_type(self):
+        """Test that set_completed raises TypeError for non-bool values."""
+        with self.assertRaises(TypeError):
+            self.a.set_completed(1)
+        return
+
+    def test_add_child_adopts_new_node(self):
+        """Test that adding an unattached child to a graph node adopts it and its subtree."""
+        d = Node("D")
+        e = Node("E")
+        d.add_child(e)
+        self.assertTrue(self.c.add_child(d))
+        self.assertIn(d, self.graph)
+        self.assertIn(e, self.graph)
+        self.assertEqual(len(self.graph), 6)
+        offsets, targets = self.graph.adjacency()
+        row_c = self.graph.get_row(self.c)
+        self.assertEqual(list(targets[offsets[row_c]:offsets[row_c + 1]]), [self.graph.get_row(d)])
+        return
+
+    def test_add_child_merges_graphs(self):
+        """Test that linking nodes of two graphs moves the other graph's nodes over."""
+        other_root = Node("Other")
+        other_child = Node("Other Child")
+        other_root.add_child(other_child)
+        other = TaskGraph.from_root(other_root)
+        self.b.add_child(other_root)
+        self.assertIs(other_child.get_graph(), self.graph)
+        self.assertEqual(len(self.graph), 6)
+        self.assertEqual(len(other), 0)
+        return
+
+    def test_remove_from_tree_detaches_from_graph(self):
+        """Test that remove_from_tree drops the node's row and edges."""
+        self.c.remove_from_tree()
+        self.assertNotIn(self.c, self.graph)
+        self.assertIsNone(self.c.get_graph())
+        self.assertEqual(len(self.graph), 3)
+        offsets, targets = self.graph.adjacency()
+        row_a = self.graph.get_row(self.a)
+        self.assertEqual(offsets[row_a + 1] - offsets[row_a], 0)
+        return
+
+    def test_delete_subtree_updates_graph(self):
+        """Test that delete_subtree tombstones all rows and edges at once."""
+        observer = self.graph.add_observer(RecordingObserver())
+        doomed = self.a.delete_subtree()
+        self.assertEqual(set(doomed), {self.a, self.c})
+        self.assertEqual(len(self.graph), 2)
+        self.assertNotIn(self.a, self.graph)
+        self.assertIsNone(self.c.get_graph())
+        self.assertEqual(self.graph._edge_slot.keys(), {(self.graph.get_row(self.root), self.graph.get_row(self.b))})
+        self.assertEqual(set(observer.events), {
+            ("edge_removed", self.root, self.a),
+            ("edge_removed", self.a, self.c),
+            ("node_removed", self.a),
+            ("node_removed", self.c),
+        })
+        return
+
+    def test_adjacency(self):
+        """Test that adjacency returns the child rows of every row."""
+        offsets, targets = self.graph.adjacency()
+        row_root = self.graph.get_row(self.root)
+        children = {self.graph.get_node(r) for r in targets[offsets[row_root]:offsets[row_root + 1]]}
+        self.assertEqual(children, {self.a, self.b})
+        return
+
+    def test_find_due(self):
+        """Test that find_due returns incomplete tasks due in the range."""
+        today = date(2024, 5, 6)
+        self.a.set_due_date(today)
+        self.b.set_due_date(today + timedelta(days=3))
+        self.c.set_due_date(today + timedelta(days=10))
+        self.root.set_due_date(today + timedelta(days=1))
+        self.root.set_completed(True)
+        week = self.graph.find_due(today, today + timedelta(days=6))
+        self.assertEqual(set(week), {self.a, self.b})
+        week_all = self.graph.find_due(today, today + timedelta(days=6), include_completed=True)
+        self.assertEqual(set(week_all), {self.a, self.b, self.root})
+        return
+
+    def test_find_incomplete(self):
+        """Test that find_incomplete skips completed and removed tasks."""
+        self.a.set_completed(True)
+        self.b.remove_from_tree()
+        self.assertEqual(set(self.graph.find_incomplete()), {self.root, self.c})
+        return
+
+    def test_observers(self):
+        """Test that observers receive change notifications."""
+        observer = self.graph.add_observer(RecordingObserver())
+        d = Node("D")
+        self.b.add_child(d)
+        self.a.set_value("A2")
+        d.remove_from_tree()
+        self.assertEqual(observer.events, [
+            ("node_added", d),
+            ("edge_added", self.b, d),
+            ("node_changed", self.a, "value"),
+            ("edge_removed", self.b, d),
+            ("node_removed", d),
+        ])
+        return
+
+    def test_pickle_round_trip(self):
+        """Test that a pickled graph restores its nodes and edges."""
+        self.c.set_due_date(date(2024, 1, 2))
+        self.c.set_completed(True)
+        restored = pickle.loads(pickle.dumps(self.graph))
+        self.assertEqual(len(restored), 4)
+        by_value = {n.get_value(): n for n in restored}
+        self.assertEqual({n.get_value() for n in by_value["Root"].get_children()}, {"A", "B"})
+        self.assertEqual([n.get_value() for n in by_value["C"].get_parents()], ["A"])
+        self.assertEqual(by_value["C"].get_due_date(), date(2024, 1, 2))
+        self.assertTrue(by_value["C"].is_completed())
+        self.assertEqual(by_value["A"].get_id(), self.a.get_id())
+        self.assertIs(by_value["A"].get_graph(), restored)
+        return
+
+    def test_topological_order(self):
+        """Test that topological_order lists parents before their children."""
+        d = Node("D")
+        d.add_child(self.root)
+        order = self.graph.topological_order()
+        position = {n: i for i, n in enumerate(order)}
+        for node in order:
+            for child in node.get_children():
+                self.assertLess(position[node], position[child])
+        return
+
+    def test_pickle_restores_topological_order(self):
+        """Test that a restored graph still rejects cycles."""
+        restored = pickle.loads(pickle.dumps(self.graph))
+        by_value = {n.get_value(): n for n in restored}
+        self.assertFalse(by_value["C"].add_child(by_value["Root"]))
+        self.assertTrue(by_value["Root"].add_child(by_value["C"]))
+        return
+
+    def test_id_index(self):
+        """Test that the id index follows adds, merges and deletes."""
+        for node in (self.root, self.a, self.b, self.c):
+            self.assertIs(self.graph.get_node_by_id(node.get_id()), node)
+        d = Node("D")
+        self.c.add_child(d)
+        self.assertIs(self.graph.get_node_by_id(d.get_id()), d)
+        self.a.delete_subtree()
+        self.assertIsNone(self.graph.get_node_by_id(self.a.get_id()))
+        self.assertIsNone(self.graph.get_node_by_id(d.get_id()))
+        self.assertEqual(set(self.graph.get_id_index().values()), {self.root, self.b})
+        return
+
+    def test_get_root(self):
+        """Test that the graph remembers the node it was created from."""
+        self.assertIs(self.graph.get_root(), self.root)
+        self.root.delete_subtree()
+        self.assertIsNone(self.graph.get_root())
+        return
+
+    def test_pickle_keeps_ids_and_root(self):
+        """Test that ids, the root and the id high-water mark survive a pickle round trip."""
+        extra = Node("Extra")
+        self.b.add_child(extra)
+        extra.delete_subtree()  # its id must not be handed out again either
+        restored = pickle.loads(pickle.dumps(self.graph))
+        self.assertEqual(restored.get_root().get_id(), self.root.get_id())
+        self.assertEqual({n.get_id() for n in restored}, {n.get_id() for n in self.graph})
+        self.assertGreater(Node("New").get_id(), extra.get_id())
+        self.assertGreater(restored._id_allocator.peek(), extra.get_id())
+        return
+
+    def test_merge_rejects_colliding_ids(self):
+        """Test that a node whose id is already in use is not merged in, and its id is left as it is."""
+        other_root = Node("Other")
+        other_child = Node("Other Child")
+        other_root.add_child(other_child)
+        other = pickle.loads(pickle.dumps(TaskGraph.from_root(other_root)))
+        copy_root = other.get_root()
+        copy_child = copy_root.get_children()[0]
+        self.assertIs(other.get_node_by_id(other_root.get_id()), copy_root)
+        # the original can be merged in, its copy then collides with it
+        self.assertTrue(self.b.add_child(other_root))
+        self.assertFalse(self.b.add_child(copy_root))
+        with self.assertRaises(ValueError):
+            self.graph.add_node(copy_child)
+        self.assertEqual(len(self.graph), 6)
+        self.assertEqual(self.b.get_children(), [other_root])
+        self.assertEqual((copy_root.get_id(), copy_child.get_id()), (other_root.get_id(), other_child.get_id()))
+        self.assertIs(copy_root.get_graph(), other)
+        for node in (other_root, other_child):
+            self.assertIs(self.graph.get_node_by_id(node.get_id()), node)
+        return
+
+    def test_pickle_node_without_graph(self):
+        """Test that pickling a node leaves the graph out of its state."""
+        restored = pickle.loads(pickle.dumps(self.root))
+        self.assertIsNone(restored.get_graph())
+        self.assertEqual(len(restored.get_children()), 2)
+        return
+
+    def test_adopting_unpickled_nodes_fixes_order(self):
+        """Test that nodes restored from a pickle get a valid topological order when adopted."""
+        restored = pickle.loads(pickle.dumps(self.root))
+        graph = TaskGraph.from_root(restored)
+        for node in graph:
+            for child in node.get_children():
+                self.assertLess(node.get_order(), child.get_order())
+        return
+    def test_from_columns(self):
+        """Test building a graph from columns of ids, values and edges."""
+        graph = TaskGraph.from_columns(
+            ids=[500, 501, 502, 503],
+            values=["Plan", "Design", "Build", "Test"],
+            edge_parents=[500, 500, 501, 502, 500],
+            edge_children=[501, 502, 503, 503, 501],
+            due_dates=[None, date(2024, 1, 5), None, None],
+            completed=[False, True, False, False],
+        )
+        plan, design, build, test = (graph.get_node_by_id(i) for i in (500, 501, 502, 503))
+        self.assertEqual(len(graph), 4)
+        self.assertIs(graph.get_root(), plan)
+        self.assertEqual(plan.get_children(), [design, build])
+        self.assertEqual(test.get_parents(), [design, build])
+        self.assertEqual(design.get_due_date(), date(2024, 1, 5))
+        self.assertTrue(design.is_completed())
+        self.assertEqual(graph.find_incomplete(), [plan, build, test])
+        self.assertEqual(graph.topological_order()[0], plan)
+        self.assertEqual(graph.topological_order()[-1], test)
+        offsets, targets = graph.adjacency()
+        self.assertEqual(sorted(targets[offsets[0]:offsets[1]]), [1, 2])
+        # the loaded nodes behave like any other
+        extra = Node("Extra")
+        self.assertTrue(test.add_child(extra))
+        self.assertFalse(extra.add_child(plan))
+        self.assertGreater(extra.get_id(), 503)
+        restored = pickle.loads(pickle.dumps(graph))
+        self.assertEqual(restored.get_node_by_id(503).get_children()[0].get_value(), "Extra")
+        return
+
+    def test_from_columns_rejects_invalid_input(self):
+        """Test that invalid columns raise before anything is built."""
+        with self.assertRaises(ValueError):
+            TaskGraph.from_columns([1, 2], ["a"], [], [])
+        with self.assertRaises(ValueError):
+            TaskGraph.from_columns([1, 1], ["a", "b"], [], [])
+        with self.assertRaises(TypeError):
+            TaskGraph.from_columns([1, 2], ["a", 2], [], [])
+        with self.assertRaises(TypeError):
+            TaskGraph.from_columns([1, 2], ["a", "b"], [], [], due_dates=[None, "2024-01-01"])
+        with self.assertRaises(ValueError):
+            TaskGraph.from_columns([1, 2], ["a", "b"], [1], [3])
+        with self.assertRaises(ValueError):
+            TaskGraph.from_columns([1, 2], ["a", "b"], [1, 2], [2, 2])
+        with self.assertRaises(ValueError):
+            TaskGraph.from_columns([1, 2, 3], ["a", "b", "c"], [1, 2, 3], [2, 3, 1])
+        with self.assertRaises(ValueError):
+            TaskGraph.from_columns(list(range(6)), list("abcdef"), [0] * 5, [1, 2, 3, 4, 5])
+        with self.assertRaises(ValueError):
+            TaskGraph.from_columns([1, 2], ["a", "b"], [1], [2], root=7)
+        return
+
+    def test_load_slice(self):
+        """Test that a slice stops at the depth, the task budget and tasks keep rejects, and lists its stubs."""
+        root = Node("root")
+        graph = TaskGraph.from_root(root)
+        a, b, a1, a2, b1, leaf = (graph.add_task(v) for v in ("a", "b", "a1", "a2", "b1", "leaf"))
+        for parent, child in ((root, a), (root, b), (a, a1), (a, a2), (b, b1), (a1, leaf)):
+            parent.add_child(child)
+
+        found, stubs = graph.load_slice(root, max_depth=1)
+        self.assertEqual((found, stubs), ([root, a, b], [a, b]))
+        found, stubs = graph.load_slice(root, max_nodes=5)
+        self.assertEqual((found, stubs), ([root, a, b, a1, a2], [b, a1, a2])) #b's child would be the sixth
+        found, stubs = graph.load_slice(a, keep=lambda n: n is not a2)
+        self.assertEqual((found, stubs), ([a, a1, leaf], []))
+        self.assertEqual(graph.load_slice(root), (graph.load_slice(root, max_depth=10)[0], []))
+        return
+
+    def test_snapshot_keeps_its_columns(self):
+        """Test that changes after a snapshot copy the shared columns instead of writing into them."""
+        snapshot = self.graph.snapshot()
+        row = self.graph.get_row(self.a)
+        self.a.set_value("Renamed")
+        self.c.remove_from_tree()
+        self.b.add_child(Node("New"))
+        self.assertEqual(snapshot.value(row), "A")
+        self.assertEqual(snapshot.num_rows, 4)
+        self.assertTrue(all(snapshot.alive[:snapshot.num_rows]))
+        self.assertEqual(len(list(snapshot.edges())), 3)
+        self.assertEqual([snapshot.ids[r] for r in snapshot.topological_rows()][0], self.root.get_id())
+        self.assertEqual(self.graph._values[row], "Renamed")
+
+        #once no snapshot is left, changes happen in place again
+        del snapshot
+        values = self.graph._values
+        self.a.set_value("Again")
+        self.assertIs(self.graph._values, values)
+        return
+
+    def test_removed_edges_are_squeezed_out(self):
+        """Test that tombstoned edges are dropped once they outnumber the live ones, keeping edge order."""
+        with patch("src.task_graph.MIN_DEAD_EDGES", 2):
+            for _ in range(3):
+                self.a.remove_child(self.c)
+                self.a.add_child(self.c)
+            self.assertLessEqual(len(self.graph._edge_parents), 5)
+        edges = [(self.graph.get_node(p), self.graph.get_node(c))
+                 for p, c in zip(self.graph._edge_parents, self.graph._edge_children) if p >= 0]
+        self.assertEqual(edges, [(self.root, self.a), (self.root, self.b), (self.a, self.c)])
+        return
+
+    def test_removed_rows_are_compacted(self):
+        """Test that a snapshot compacts the rows once tombstones outnumber live rows, keeping the order and observers in step."""
+        observer = self.graph.add_observer(RecordingObserver())
+        observer.rows_compacted = lambda kept: observer.events.append(("rows_compacted", list(kept)))
+        for _ in range(6):
+            child = Node("Temporary")
+            self.b.add_child(child)
+            child.delete_subtree()
+        new = Node("New")
+        self.b.add_child(new)
+        before = [node for node in self.graph._nodes if node is not None]
+        with patch("src.task_graph.MIN_DEAD_ROWS", 2):
+            snapshot = self.graph.snapshot()
+        self.assertEqual(self.graph.row_count(), 5)
+        self.assertEqual(observer.events[-1], ("rows_compacted", [0, 1, 2, 3, 10]))
+        self.assertEqual([self.graph.get_node(r) for r in range(5)], before)
+        self.assertEqual({(snapshot.ids[p], snapshot.ids[c]) for p, c in snapshot.edges()},
+                         {(p.get_id(), c.get_id()) for p in self.graph for c in p.get_children()})
+        self.assertEqual(self.graph.get_row_generation(), 1)
+        #the graph keeps working on the new rows
+        self.c.add_child(Node("Later"))
+        self.assertEqual(self.graph.row_count(), 6)
+        self.assertEqual(self.graph.get_row(self.c.get_children()[0]), 5)
+        return
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,251 @@
+import unittest
+import os
+import sqlite3
+import tempfile
+from datetime import date, time
+
+from src.node import Node, LazyNode
+from src.task_graph import TaskGraph
+from src.task_file import open_task_file, write_task_file
+from src.task_store import TaskStore, is_task_store
+
+
+class Test_TaskStore(unittest.TestCase):
+    """
+    Test cases for keeping a graph in an SQLite database and loading it as it is explored.
+    """
+    def setUp(self):
+        """Set up root -> a, b and a, b -> c, written to a database in a temporary directory."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "tree.db")
+        self.root = Node("Root")
+        self.a = Node("Wäsche", date(2024, 6, 3), time(7, 30, 15))
+        self.b = Node("B")
+        self.c = Node("C")
+        self.root.add_child(self.a)
+        self.root.add_child(self.b)
+        self.b.add_child(self.c)
+        self.a.add_child(self.c)
+        self.b.set_completed(True)
+        self.graph = TaskGraph.from_root(self.root)
+        TaskStore.create(self.graph, self.path).close()
+        self.stores = []
+        return
+
+    def tearDown(self):
+        for store in self.stores:
+            store.close()
+        self.tmp.cleanup()
+        return
+
+    def open(self) -> TaskStore:
+        store = TaskStore.open(self.path)
+        self.stores.append(store)
+        return store
+
+    def test_round_trip(self):
+        """Test that fields, ids, child and parent order, the root and the id high-water mark survive."""
+        self.assertTrue(is_task_store(self.path))
+        loaded = self.open().get_graph()
+        self.assertEqual(len(loaded), 4)
+        root = loaded.get_root()
+        self.assertEqual(root.get_id(), self.root.get_id())
+        self.assertEqual([n.get_value() for n in root.get_children()], ["Wäsche", "B"])
+        a = loaded.get_node_by_id(self.a.get_id())
+        self.assertEqual((a.get_due_date(), a.get_due_time()), (date(2024, 6, 3), time(7, 30, 15)))
+        self.assertEqual(a.get_created(), self.a.get_created())
+        self.assertTrue(loaded.get_node_by_id(self.b.get_id()).is_completed())
+        self.assertEqual([n.get_value() for n in loaded.get_node_by_id(self.c.get_id()).get_parents()], ["B", "Wäsche"])
+        self.assertEqual(loaded.get_next_id(), self.graph.get_next_id())
+        return
+
+    def test_loads_only_what_is_explored(self):
+        """Test that opening loads the root alone and expanding a node loads its neighbours."""
+        loaded = self.open().get_graph()
+        self.assertEqual(len(loaded.get_loaded_index()), 1)
+        self.assertFalse(loaded.is_loaded())
+        root = loaded.get_root()
+        self.assertIs(type(root), LazyNode)
+        children = root.get_children()
+        self.assertIs(type(root), Node)
+        self.assertEqual(len(loaded.get_loaded_index()), 3)
+        self.assertTrue(all(type(n) is LazyNode for n in children))
+        self.assertIsNone(loaded.get_node_by_id(-5))
+
+        self.assertEqual(len(list(loaded)), 4)
+        self.assertTrue(loaded.is_loaded())
+        self.assertFalse(any(type(n) is LazyNode for n in loaded))
+        self.assertEqual(len(list(loaded.snapshot().edges())), 4)
+        return
+
+    def test_save_changes(self):
+        """Test that edits, additions, removals and edge changes are written by save()."""
+        store = self.open()
+        loaded = store.get_graph()
+        a = loaded.get_node_by_id(self.a.get_id())
+        _ = a.set_value("Renamed")
+        new = Node("New", date(2025, 1, 2))
+        self.assertTrue(a.add_child(new))
+        self.assertTrue(new.add_child(loaded.get_node_by_id(self.c.get_id())))
+        loaded.get_node_by_id(self.b.get_id()).remove_from_tree()
+        self.assertGreater(store.pending_count(), 0)
+        self.assertGreater(store.save(), 0)
+        self.assertEqual(store.pending_count(), 0)
+
+        reloaded = self.open().get_graph()
+        self.assertEqual(len(reloaded), 4)
+        root = reloaded.get_root()
+        self.assertEqual([n.get_value() for n in root.get_children()], ["Renamed"])
+        c = reloaded.get_node_by_id(self.c.get_id())
+        self.assertEqual([n.get_value() for n in c.get_parents()], ["Renamed", "New"])
+        self.assertEqual(reloaded.get_node_by_id(new.get_id()).get_due_date(), date(2025, 1, 2))
+        self.assertIsNone(reloaded.get_node_by_id(self.b.get_id()))
+        for node in reloaded:
+            for child in node.get_children():
+                self.assertLess(node.get_order(), child.get_order())
+        return
+
+    def test_reordered_tasks_keep_a_valid_order(self):
+        """Test that positions changed by an insertion are saved, so later sessions still detect cycles."""
+        store = self.open()
+        loaded = store.get_graph()
+        c = loaded.get_node_by_id(self.c.get_id())
+        b = loaded.get_node_by_id(self.b.get_id())
+        late = Node("Late")
+        self.assertTrue(c.add_child(late))
+        b.remove_child(c)
+        #late was created after c, so c has to move behind it
+        self.assertTrue(late.add_child(b))
+        _ = store.save()
+
+        reloaded = self.open().get_graph()
+        late = reloaded.get_node_by_id(late.get_id())
+        b = reloaded.get_node_by_id(self.b.get_id())
+        self.assertLess(late.get_order(), b.get_order())
+        self.assertFalse(b.add_child(reloaded.get_node_by_id(self.c.get_id())))
+        return
+
+    def test_removed_task_is_not_loaded_again(self):
+        """Test that a task removed but not saved yet is not read back from the database."""
+        store = self.open()
+        loaded = store.get_graph()
+        b_id = self.b.get_id()
+        loaded.get_node_by_id(b_id).remove_from_tree()
+        self.assertIsNone(loaded.get_node_by_id(b_id))
+        self.assertEqual(sorted(n.get_value() for n in loaded), ["C", "Root", "Wäsche"])
+        return
+
+    def test_search_without_loading(self):
+        """Test that a search loads only the matches, and sees changes that are not saved yet."""
+        store = self.open()
+        loaded = store.get_graph()
+        self.assertEqual([n.get_value() for n in store.search("wäs", 10)], ["Wäsche"])
+        self.assertEqual(len(loaded.get_loaded_index()), 2) #the root and the match
+        self.assertIsNotNone(loaded._source)
+        loaded.get_node_by_id(self.b.get_id()).set_value("Buy 100% soap")
+        self.assertEqual([n.get_value() for n in store.search("100%", 10)], ["Buy 100% soap"])
+        self.assertEqual([n.get_value() for n in store.search("b", 10)], ["Buy 100% soap"])
+        loaded.get_node_by_id(self.c.get_id()).remove_from_tree()
+        self.assertEqual(store.search("c", 10), [])
+        self.assertEqual(store.search("   ", 10), [])
+        return
+
+    def test_write_task_file_from_store(self):
+        """Test that a graph opened from a database can be written to a task file and back."""
+        loaded = self.open().get_graph()
+        _ = loaded.get_root().get_children()[0].add_child(Node("D"))
+        path = os.path.join(self.tmp.name, "tree.tasks")
+        write_task_file(loaded, path)
+        self.assertEqual(sorted(n.get_value() for n in open_task_file(path)), ["B", "C", "D", "Root", "Wäsche"])
+
+        again = os.path.join(self.tmp.name, "again.db")
+        TaskStore.create(open_task_file(path), again).close()
+        store = TaskStore.open(again)
+        self.stores.append(store)
+        self.assertEqual(len(store.get_graph()), 5)
+        return
+
+    def test_overwrite_own_database(self):
+        """Test that a graph opened from a database can be written over that database."""
+        loaded = self.open().get_graph()
+        _ = loaded.get_root().add_child(Node("D"))
+        TaskStore.create(loaded, self.path).close()
+        self.assertEqual(len(self.open().get_graph()), 5)
+        return
+
+    def test_positions(self):
+        """Test that saved positions survive edits of the task and find the tasks in a box."""
+        store = self.open()
+        store.set_positions({self.root.get_id(): (500.0, 500.0), self.a.get_id(): (100.0, 80.0), self.b.get_id(): (900.0, 80.0)})
+        _ = store.save()
+        _ = store.get_graph().get_node_by_id(self.a.get_id()).set_value("Moved on")
+        _ = store.save()
+        reopened = self.open()
+        self.assertEqual(reopened.ids_in_box(0, 0, 600, 600), {self.root.get_id(), self.a.get_id()})
+        self.assertEqual(reopened.ids_in_box(1000, 100, 800, 0), {self.b.get_id()})
+        self.assertEqual(len(reopened.get_graph().get_loaded_index()), 1)
+        return
+
+    def test_upgrade_from_version_1(self):
+        """Test that a database written before positions were saved opens and gains them."""
+        conn = sqlite3.connect(self.path)
+        conn.executescript("DROP INDEX tasks_by_position; ALTER TABLE tasks DROP COLUMN x; ALTER TABLE tasks DROP COLUMN y; "
+                           "ALTER TABLE tasks DROP COLUMN layout_key; PRAGMA user_version=1;")
+        conn.close()
+        store = self.open()
+        self.assertEqual(len(store.get_graph()), 4)
+        store.set_positions({self.c.get_id(): (1.0, 2.0)})
+        _ = store.save()
+        self.assertEqual(self.open().ids_in_box(0, 0, 5, 5), {self.c.get_id()})
+        return
+
+    def test_layout(self):
+        """Test that layout cache entries come back one at a time without loading tasks, and positions saved without a key are not entries."""
+        store = self.open()
+        store.set_layout({self.root.get_id(): (-7, 500.0, 500.0), self.a.get_id(): (2**62, 100.0, 80.0)})
+        store.set_positions({self.b.get_id(): (900.0, 80.0)})
+        _ = store.save()
+        reopened = self.open()
+        layout = reopened.get_layout()
+        self.assertEqual(layout[self.a.get_id()], (2**62, 100.0, 80.0))
+        self.assertIsNone(layout.get(self.b.get_id()))
+        self.assertEqual(layout, {self.root.get_id(): (-7, 500.0, 500.0), self.a.get_id(): (2**62, 100.0, 80.0)})
+        self.assertEqual(reopened.ids_in_box(0, 0, 1000, 100), {self.a.get_id(), self.b.get_id()})
+        self.assertEqual(len(reopened.get_graph().get_loaded_index()), 1)
+        return
+
+    def test_upgrade_from_version_2(self):
+        """Test that a database written before layout keys were saved opens with its positions and gains them."""
+        store = self.open()
+        store.set_positions({self.c.get_id(): (1.0, 2.0)})
+        _ = store.save()
+        conn = sqlite3.connect(self.path)
+        conn.executescript("ALTER TABLE tasks DROP COLUMN layout_key; PRAGMA user_version=2;")
+        conn.close()
+        store = self.open()
+        self.assertEqual(store.ids_in_box(0, 0, 5, 5), {self.c.get_id()})
+        self.assertEqual(store.get_layout(), {})
+        store.set_layout({self.c.get_id(): (3, 1.0, 2.0)})
+        _ = store.save()
+        self.assertEqual(self.open().get_layout(), {self.c.get_id(): (3, 1.0, 2.0)})
+        return
+
+    def test_rejects_invalid_files(self):
+        """Test that files that are not task databases raise ValueError."""
+        other = os.path.join(self.tmp.name, "other.db")
+        with open(other, "wb") as f:
+            f.write(b"x" * 400)
+        with self.assertRaises(ValueError):
+            TaskStore.open(other)
+        foreign = os.path.join(self.tmp.name, "foreign.db")
+        conn = sqlite3.connect(foreign)
+        conn.execute("CREATE TABLE meta (key TEXT, value INTEGER)")
+        conn.commit()
+        conn.close()
+        with self.assertRaises(ValueError):
+            TaskStore.open(foreign)
+        return
+
+
+if __name__ == "__main__":
+    unittest.main()